@@ -0,0 +1,187 @@
+"""Local stand-in for the ZEN Study API and exercise pages.
+
+The server is an httpx transport, so crawls run end to end through the real
+clients without any network access.
+"""
+
+import asyncio
+import gzip
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from src.config import Config
+
+_CHAPTER_PATH = re.compile(r"/v2/material/courses/(\d+)/chapters/(\d+)$")
+_COURSE_PATH = re.compile(r"/v2/material/courses/(\d+)$")
+_EXERCISE_PATH = re.compile(r"/exercises/(\d+)$")
+
+# Markup that surrounds the exercises on every real page
+_BOILERPLATE_HEAD = (
+    '<head><meta charset="utf-8"><title>確認テスト</title>'
+    '<link rel="stylesheet" href="/assets/application.css">'
+    "<script>window.__STATE__ = {\"user\": {\"id\": 1}};</script></head>"
+)
+_BOILERPLATE_NAV = "".join(
+    f'<li class="nav-item"><a href="/courses/{i}">メニュー {i}</a></li>' for i in range(40)
+)
+
+
+class _Body(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Response body sent as a stream, so httpx counts the bytes received."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def __iter__(self):
+        yield self._data
+
+    async def __aiter__(self):
+        yield self._data
+
+
+def _respond(request: httpx.Request, content_type: str, text: str) -> httpx.Response:
+    """Build a response, gzip-compressed if the client accepts it."""
+    headers = {"Content-Type": content_type}
+    body = text.encode("utf-8")
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        body = gzip.compress(body, compresslevel=6)
+    return httpx.Response(200, headers=headers, stream=_Body(body))
+
+
+def _json(request: httpx.Request, data: Any) -> httpx.Response:
+    """Build a JSON response."""
+    return _respond(request, "application/json", json.dumps(data, ensure_ascii=False))
+
+
+@dataclass
+class FakeZenStudy:
+    """Synthetic enrollment served over an httpx transport.
+
+    Every course is on-demand. Course, chapter and exercise IDs are derived
+    from their positions, so the content is deterministic. Exercises added
+    with add_exercise() bump the revision of their chapter and course, which
+    the course list and the course information report.
+    """
+
+    courses: int = 5
+    chapters: int = 4
+    exercises: int = 5
+    questions: int = 5
+    latency: float = 0.0  # seconds added to every response
+    requests: int = field(default=0, init=False)
+    session_valid: bool = field(default=True, init=False)  # False answers 401
+    added: dict[int, int] = field(default_factory=dict, init=False)  # by chapter ID
+    revisions: dict[int, int] = field(default_factory=dict, init=False)  # by course/chapter ID
+
+    @property
+    def total_exercises(self) -> int:
+        """Number of exercise pages in the enrollment."""
+        return self.courses * self.chapters * self.exercises + sum(self.added.values())
+
+    def add_exercise(self, chapter_id: int) -> None:
+        """Add an exercise to the end of a chapter."""
+        self.added[chapter_id] = self.added.get(chapter_id, 0) + 1
+        for unit_id in (chapter_id // 100, chapter_id):
+            self.revisions[unit_id] = self.revisions.get(unit_id, 0) + 1
+
+    @property
+    def total_questions(self) -> int:
+        """Number of questions in the enrollment."""
+        return self.total_exercises * self.questions
+
+    def exercise_html(self, exercise_id: int) -> str:
+        """Build the page of an exercise."""
+        sections = []
+        for q_num in range(1, self.questions + 1):
+            choices = "".join(
+                f'<li data-input-value="{c}"><label>{"①②③④"[c - 1]} '
+                f"選択肢 {c}（問{q_num} / {exercise_id}）</label></li>"
+                for c in range(1, 5)
+            )
+            sections.append(
+                '<section class="exercise">'
+                f'<div class="statement"><p>次のうち正しいものを選べ。問{q_num}</p>'
+                f"<p>補足説明 {exercise_id}</p></div>"
+                f'<ul class="answers">{choices}</ul></section>'
+            )
+        return (
+            f"<!DOCTYPE html><html>{_BOILERPLATE_HEAD}<body>"
+            f'<nav><ul class="nav">{_BOILERPLATE_NAV}</ul></nav>'
+            f'<div id="kokuban-input-target">{"".join(sections)}</div>'
+            "<footer>ZEN Study</footer></body></html>"
+        )
+
+    def _route(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if not self.session_valid:
+            return httpx.Response(401)
+        path = request.url.path
+
+        if path.endswith("/v3/dashboard/my_courses"):
+            limit = int(request.url.params.get("limit", 20))
+            offset = int(request.url.params.get("offset", 0))
+            courses = [
+                {
+                    "id": 1000 + i,
+                    "title": f"ベンチマーク{i}:オンデマンド",
+                    "revision": self.revisions.get(1000 + i, 0),
+                }
+                for i in range(offset, min(offset + limit, self.courses))
+            ]
+            return _json(request, {"services": [{"courses": courses}]})
+
+        if match := _CHAPTER_PATH.search(path):
+            chapter_id = int(match.group(2))
+            sections = [{"id": chapter_id * 100 + 99, "resource_type": "movie"}]
+            sections += [
+                {
+                    "id": chapter_id * 100 + e,
+                    "title": f"確認テスト{e}",
+                    "resource_type": "exercise",
+                    "content_url": f"{Config.PAGE_BASE_URL}/exercises/{chapter_id * 100 + e}/result",
+                }
+                for e in range(self.exercises + self.added.get(chapter_id, 0))
+            ]
+            return _json(request, {"chapter": {"sections": sections}})
+
+        if match := _COURSE_PATH.search(path):
+            course_id = int(match.group(1))
+            chapters = [
+                {
+                    "id": course_id * 100 + k,
+                    "title": f"{k + 1:02d}. 章{k + 1}",
+                    "revision": self.revisions.get(course_id * 100 + k, 0),
+                }
+                for k in range(self.chapters)
+            ]
+            return _json(request, {"course": {"chapters": chapters}})
+
+        if match := _EXERCISE_PATH.search(path):
+            html = self.exercise_html(int(match.group(1)))
+            return _respond(request, "text/html; charset=utf-8", html)
+
+        return httpx.Response(404)
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._route(request)
+
+    async def _handle_async(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._route(request)
+
+    def transport(self) -> httpx.MockTransport:
+        """Transport for the synchronous client."""
+        return httpx.MockTransport(self._handle)
+
+    def async_transport(self) -> httpx.MockTransport:
+        """Transport for the asynchronous client."""
+        return httpx.MockTransport(self._handle_async)
@@ -0,0 +1,349 @@
+"""Offline benchmarks for the scraper.
+
+Each case runs in a fresh subprocess so its peak RSS is its own, and the
+results are written as JSON:
+
+    uv run python -m benchmarks.run --output results.json
+    uv run python -m benchmarks.run --compare results.json
+
+The crawl cases run the real crawl modes against FakeZenStudy; the other
+cases microbenchmark parsing, question file writes and markdown generation
+on generated corpora.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from benchmarks.fake_server import FakeZenStudy
+
+# Metrics where a higher value is better; all others are better when lower
+_HIGHER_IS_BETTER = ("pages_per_sec", "questions_per_sec", "files_per_sec")
+
+
+def _peak_rss_kb() -> dict[str, int]:
+    """Peak resident set size of this process and its children, in KiB."""
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    scale = 1024 if sys.platform == "darwin" else 1
+    return {
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        "children_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+    }
+
+
+def _server(args: argparse.Namespace) -> FakeZenStudy:
+    return FakeZenStudy(
+        courses=args.courses,
+        chapters=args.chapters,
+        exercises=args.exercises,
+        questions=args.questions,
+        latency=args.latency,
+    )
+
+
+def _crawl(args: argparse.Namespace, mode: str) -> dict[str, Any]:
+    """Run a crawl mode end to end against the stand-in server."""
+    from src.config import Config
+    from src.crawler import CrawlRecorder, scrape_exercises_concurrent
+    from src.main import scrape_exercises
+    from src.pipeline import CrawlPipeline
+    from src.ratelimit import TokenBucket
+    from src.storage import open_question_store
+    from src.summary import SummaryWriter
+
+    os.environ.setdefault("ZANE_SESSION", "benchmark")
+    server = _server(args)
+    rate_limiter = TokenBucket(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.OUTPUT_DIR = tmp
+        summary = SummaryWriter()
+        store = open_question_store(args.store)
+        recorder = CrawlRecorder(summary=summary, store=store)
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if mode == "sequential":
+                scrape_exercises(rate_limiter, None, recorder, server.transport())
+            elif mode == "concurrent":
+                scrape_exercises_concurrent(
+                    rate_limiter=rate_limiter,
+                    recorder=recorder,
+                    transport=server.async_transport(),
+                )
+            else:
+                CrawlPipeline(
+                    rate_limiter=rate_limiter, recorder=recorder, transport=server.transport()
+                ).run()
+            summary.close()
+        elapsed = time.perf_counter() - started
+        store.close()
+
+    totals = recorder.totals
+    if totals.questions != server.total_questions:
+        raise RuntimeError(
+            f"crawl saved {totals.questions} of {server.total_questions} questions"
+        )
+    return {
+        "seconds": elapsed,
+        "pages": server.total_exercises,
+        "requests": server.requests,
+        "pages_per_sec": server.total_exercises / elapsed,
+        "questions_per_sec": totals.questions / elapsed,
+    }
+
+
+def _parse(args: argparse.Namespace, engine: str) -> dict[str, Any]:
+    """Parse generated exercise pages with one engine."""
+    from src.parser import ExerciseParser
+
+    server = _server(args)
+    pages = [server.exercise_html(i) for i in range(args.pages)]
+    ExerciseParser.parse_exercise_html(pages[0], engine)  # load the engine
+
+    started = time.perf_counter()
+    questions = sum(len(ExerciseParser.parse_exercise_html(p, engine)) for p in pages)
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": elapsed,
+        "pages": len(pages),
+        "pages_per_sec": len(pages) / elapsed,
+        "questions_per_sec": questions / elapsed,
+    }
+
+
+def _save_files(args: argparse.Namespace) -> dict[str, Any]:
+    """Write per-question files with save_question_file()."""
+    from src.config import Config
+    from src.models import Choice, Question
+    from src.storage import save_question_file
+
+    question = Question("次のうち正しいものを選べ。", [Choice(n, f"選択肢 {n}") for n in range(1, 5)])
+    count = args.pages * args.questions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.OUTPUT_DIR = tmp
+        started = time.perf_counter()
+        for i in range(count):
+            exercise_index = i // args.questions
+            save_question_file(
+                course_title="ベンチマーク:オンデマンド",
+                course_id=1,
+                chapter_title=f"{exercise_index // args.exercises + 1:02d}. 章",
+                chapter_id=exercise_index // args.exercises,
+                exercise_title="確認テスト",
+                exercise_id=exercise_index,
+                exercise_index=exercise_index % args.exercises + 1,
+                question_num=i % args.questions + 1,
+                question=question,
+            )
+        elapsed = time.perf_counter() - started
+
+    return {"seconds": elapsed, "files": count, "files_per_sec": count / elapsed}
+
+
+def _summary(args: argparse.Namespace) -> dict[str, Any]:
+    """Write a summary with SummaryWriter and read it back."""
+    from src.models import Chapter, Choice, Course, Exercise, Question
+    from src.summary import SummaryWriter, read_summary
+
+    questions = [
+        Question(f"次のうち正しいものを選べ。問{q}", [Choice(n, f"選択肢 {n}") for n in range(1, 5)])
+        for q in range(args.questions)
+    ]
+    # As many courses as it takes to hold --pages exercise pages
+    exercises = [Exercise(e, "確認テスト", questions) for e in range(args.exercises)]
+    chapters = [Chapter(k, f"{k + 1:02d}. 章", exercises) for k in range(args.chapters)]
+    courses = [
+        Course(c, f"ベンチマーク{c}:オンデマンド", chapters)
+        for c in range(max(args.pages // (args.chapters * args.exercises), 1))
+    ]
+    count = len(courses) * args.chapters * args.exercises * args.questions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        with SummaryWriter(Path(tmp) / "summary.json", "json") as summary:
+            for course in courses:
+                summary.write_course(course)
+        write_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        read = sum(1 for _ in read_summary(summary.path))
+        read_seconds = time.perf_counter() - started
+
+    if read != len(courses):
+        raise RuntimeError(f"read {read} of {len(courses)} courses")
+    return {
+        "seconds": write_seconds + read_seconds,
+        "write_seconds": write_seconds,
+        "read_seconds": read_seconds,
+        "questions": count,
+        "questions_per_sec": count / (write_seconds + read_seconds),
+    }
+
+
+def _markdown(args: argparse.Namespace) -> dict[str, Any]:
+    """Generate the markdown of a course from its question files."""
+    import generate_markdown
+    from src.config import Config
+    from src.main import scrape_exercises
+    from src.crawler import CrawlRecorder
+    from src.ratelimit import TokenBucket
+
+    os.environ.setdefault("ZANE_SESSION", "benchmark")
+    server = _server(args)
+    server.courses = 1
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            Config.OUTPUT_DIR = "output"
+            with contextlib.redirect_stdout(io.StringIO()):
+                scrape_exercises(TokenBucket(0), None, CrawlRecorder(), server.transport())
+            (course_dir,) = [p for p in Path("output").iterdir() if p.is_dir()]
+
+            started = time.perf_counter()
+            generate_markdown.render_course(course_dir)
+            elapsed = time.perf_counter() - started
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "seconds": elapsed,
+        "questions": server.total_questions,
+        "questions_per_sec": server.total_questions / elapsed,
+    }
+
+
+CASES: dict[str, Callable[[argparse.Namespace], dict[str, Any]]] = {
+    "crawl_sequential": lambda args: _crawl(args, "sequential"),
+    "crawl_concurrent": lambda args: _crawl(args, "concurrent"),
+    "crawl_pipeline": lambda args: _crawl(args, "pipeline"),
+    "parse_bs4": lambda args: _parse(args, "bs4"),
+    "parse_bs4_strainer": lambda args: _parse(args, "bs4-strainer"),
+    "parse_lxml": lambda args: _parse(args, "lxml"),
+    "parse_selectolax": lambda args: _parse(args, "selectolax"),
+    "save_question_file": _save_files,
+    "summary": _summary,
+    "generate_markdown": _markdown,
+}
+
+
+def run_case(name: str, args: argparse.Namespace) -> dict[str, Any]:
+    """Run a case in this process.
+
+    Returns:
+        Metrics of the case, or the reason it was skipped
+    """
+    try:
+        result = CASES[name](args)
+    except ImportError as e:
+        return {"skipped": str(e)}
+    result.update(_peak_rss_kb())
+    return result
+
+
+def run_isolated(name: str, argv: list[str]) -> dict[str, Any]:
+    """Run a case in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--case", name, *argv],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any]) -> None:
+    """Print the change of each metric against a baseline run."""
+    print(f"{'case':<22} {'metric':<22} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, metrics in results["results"].items():
+        old = baseline.get("results", {}).get(name, {})
+        for metric, value in metrics.items():
+            if not isinstance(value, (int, float)) or metric not in old or not old[metric]:
+                continue
+            change = (value - old[metric]) / old[metric] * 100
+            better = change >= 0 if metric in _HIGHER_IS_BETTER else change <= 0
+            flag = "" if better or abs(change) < 5 else "  !"
+            print(
+                f"{name:<22} {metric:<22} {old[metric]:>12.4g} {value:>12.4g}"
+                f" {change:>+7.1f}%{flag}"
+            )
+
+
+def parse_args(argv: list[str] | None = None) -> tuple[argparse.Namespace, list[str]]:
+    """Parse command line arguments.
+
+    Returns:
+        Parsed arguments and the scale options to pass on to case processes
+    """
+    parser = argparse.ArgumentParser(description="オフラインベンチマーク")
+    parser.add_argument("--case", choices=CASES, help="このケースだけをこのプロセスで実行する")
+    parser.add_argument("--only", nargs="+", choices=CASES, help="実行するケース")
+    parser.add_argument("--output", type=Path, help="結果を書き出すJSONファイル")
+    parser.add_argument("--compare", type=Path, help="比較する以前の結果のJSONファイル")
+
+    scale = parser.add_argument_group("規模")
+    scale.add_argument("--courses", type=int, default=5)
+    scale.add_argument("--chapters", type=int, default=4)
+    scale.add_argument("--exercises", type=int, default=5)
+    scale.add_argument("--questions", type=int, default=5)
+    scale.add_argument("--pages", type=int, default=200, help="解析・保存ケースのページ数")
+    scale.add_argument("--latency", type=float, default=0.005, help="レスポンスごとの遅延 (秒)")
+    scale.add_argument("--store", choices=("files", "sqlite"), default="files")
+
+    args = parser.parse_args(argv)
+    scale_argv = [
+        arg
+        for action in scale._group_actions
+        for arg in (action.option_strings[0], str(getattr(args, action.dest)))
+    ]
+    return args, scale_argv
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Main entry point."""
+    args, scale_argv = parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args)))
+        return
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "scale": {k: v for k, v in vars(args).items() if k not in ("case", "only", "output", "compare")},
+        "results": {},
+    }
+    for name in args.only or CASES:
+        print(f"{name} ...", file=sys.stderr)
+        results["results"][name] = run_isolated(name, scale_argv)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2, default=str)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
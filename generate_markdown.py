@@ -1,81 +1,205 @@
 """Generate markdown files from output JSON files."""
 
+import argparse
+import hashlib
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Bump whenever the generated markdown changes, so every course is regenerated
+RENDER_VERSION = 1
+
+# Fingerprints of the sources each markdown file was generated from
+STATE_FILE = ".markdown_state.json"
+
 
 def generate_markdown_for_course(course_dir: Path) -> None:
     """Generate markdown file for a course.
-    
+
+    Args:
+        course_dir: Path to course directory
+    """
+    output_file = render_course(course_dir)
+    print(f"✓ 生成: {output_file.name}")
+
+
+def render_course(course_dir: Path) -> Path:
+    """Write the markdown file of a course, streaming it chapter by chapter.
+
+    Only the question file being rendered is held in memory.
+
     Args:
         course_dir: Path to course directory
+
+    Returns:
+        Path to the generated markdown file
     """
     course_name = course_dir.name.rsplit('_', 1)[0]  # Remove course_id from name
-    
-    # Collect all questions
-    questions_by_chapter = {}
-    
-    for chapter_dir in sorted(course_dir.iterdir()):
-        if not chapter_dir.is_dir():
-            continue
-            
-        chapter_name = chapter_dir.name
-        questions = []
-
-        # Sort by filename to maintain API response order (files are prefixed with index)
-        for json_file in sorted(chapter_dir.glob("*.json")):
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                questions.append(data)
-        
-        if questions:
-            questions_by_chapter[chapter_name] = questions
-    
-    # Generate markdown
-    md_lines = []
-    md_lines.append(f"# {course_name}\n")
-    
-    for chapter_name, questions in questions_by_chapter.items():
-        chapter_title = chapter_name.rsplit('_', 1)[0]  # Remove chapter_id
-        md_lines.append(f"## {chapter_title}\n")
-        
-        for q_data in questions:
-            exercise_title = q_data['exercise_title']
-            question = q_data['question']
-            q_num = q_data['question_number']
-            
-            md_lines.append(f"### {exercise_title} - 問{q_num}\n")
-            md_lines.append(f"**問題:** {question['statement']}\n")
-            
-            for choice in question['choices']:
-                md_lines.append(f"{choice['number']}. {choice['text']}")
-            
-            md_lines.append("\n---\n")
-    
-    # Save markdown file
     output_file = Path("output") / f"{course_name}.md"
+
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(md_lines))
-    
-    print(f"✓ 生成: {output_file.name}")
+        f.write(f"# {course_name}\n")
+
+        def write_line(line: str) -> None:
+            # Lines are joined with newlines, without a trailing one
+            f.write('\n')
+            f.write(line)
+
+        for chapter_dir in sorted(course_dir.iterdir()):
+            if not chapter_dir.is_dir():
+                continue
+
+            # Sort by filename to maintain API response order (files are prefixed with index)
+            json_files = sorted(chapter_dir.glob("*.json"))
+            if not json_files:
+                continue
+
+            chapter_title = chapter_dir.name.rsplit('_', 1)[0]  # Remove chapter_id
+            write_line(f"## {chapter_title}\n")
+
+            for json_file in json_files:
+                with open(json_file, 'r', encoding='utf-8') as qf:
+                    q_data = json.load(qf)
+
+                exercise_title = q_data['exercise_title']
+                question = q_data['question']
+                q_num = q_data['question_number']
+
+                write_line(f"### {exercise_title} - 問{q_num}\n")
+                write_line(f"**問題:** {question['statement']}\n")
+
+                for choice in question['choices']:
+                    write_line(f"{choice['number']}. {choice['text']}")
+
+                write_line("\n---\n")
+
+    return output_file
+
+
+def _file_digest(path: Path) -> str:
+    """Hash a source file's content."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
 
+def course_fingerprint(course_dir: Path, known_files: dict) -> tuple[str, dict]:
+    """Fingerprint the question files of a course.
 
-def main():
+    Files whose size and modification time are unchanged reuse their known
+    content hash, so only new or rewritten files are read. A rewritten file
+    with the same content keeps the course fingerprint unchanged.
+
+    Args:
+        course_dir: Path to course directory
+        known_files: File entries from the previous run's state
+
+    Returns:
+        Fingerprint of the course and the file entries for the next state
+    """
+    files = {}
+    for json_file in sorted(course_dir.glob("*/*.json")):
+        name = json_file.relative_to(course_dir).as_posix()
+        stat = json_file.stat()
+        known = known_files.get(name)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            digest = known[2]
+        else:
+            digest = _file_digest(json_file)
+        files[name] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    fingerprint = hashlib.sha256(
+        json.dumps([RENDER_VERSION, [[n, e[2]] for n, e in files.items()]]).encode()
+    ).hexdigest()
+    return fingerprint, files
+
+
+def load_state(output_dir: Path) -> dict:
+    """Load the fingerprints of the previous run."""
+    state_path = output_dir / STATE_FILE
+    if not state_path.exists():
+        return {}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(output_dir: Path, state: dict) -> None:
+    """Save the fingerprints for the next run."""
+    state_path = output_dir / STATE_FILE
+    tmp_path = state_path.with_name(STATE_FILE + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="マークダウン生成ツール")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="変更の有無にかかわらず、すべてのコースを生成し直す",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="並列に生成するプロセス数 (デフォルト: CPUコア数)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
     """Main entry point."""
+    args = parse_args(argv)
+
     print("マークダウン生成ツール")
     print("=" * 50)
-    
+
     output_dir = Path("output")
-    
+
     if not output_dir.exists():
         print("エラー: output ディレクトリが見つかりません")
         return
-    
-    # Process each course directory
+
+    state = {} if args.full else load_state(output_dir)
+    new_state = {}
+    changed = []
+
+    # Only regenerate courses whose question files changed since the last run
     for course_dir in sorted(output_dir.iterdir()):
-        if course_dir.is_dir():
+        if not course_dir.is_dir():
+            continue
+
+        known = state.get(course_dir.name, {})
+        fingerprint, files = course_fingerprint(course_dir, known.get("files", {}))
+        if not files:
+            # Not a course: the search index, page archive, tables and the like
+            continue
+        new_state[course_dir.name] = {"fingerprint": fingerprint, "files": files}
+
+        course_name = course_dir.name.rsplit('_', 1)[0]
+        up_to_date = (
+            known.get("fingerprint") == fingerprint
+            and (output_dir / f"{course_name}.md").exists()
+        )
+        if not up_to_date:
+            changed.append(course_dir)
+
+    # Render changed courses in parallel; results are reported in course order
+    if len(changed) > 1 and args.workers != 1:
+        with ProcessPoolExecutor(args.workers) as pool:
+            for output_file in pool.map(render_course, changed):
+                print(f"✓ 生成: {output_file.name}")
+    else:
+        for course_dir in changed:
             generate_markdown_for_course(course_dir)
-    
+
+    save_state(output_dir, new_state)
+
+    unchanged = len(new_state) - len(changed)
+    if unchanged:
+        print(f"変更なし: {unchanged} コース")
+
     print("\n完了！")
 
 
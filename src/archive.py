@@ -0,0 +1,523 @@
+"""Append-only archive of the exercise pages fetched by a crawl.
+
+Every exercise page is compressed on its own and appended to a pack file.
+A SQLite index maps each exercise to the offset and length of its latest
+page, together with the course, chapter and exercise dictionaries it was
+crawled with, so the crawl can be replayed from the archive alone. A page
+that did not change since it was archived is not stored again.
+
+Exercise pages share most of their markup, but a compressor only sees one
+page at a time. Once ARCHIVE_TRAIN_PAGES pages are stored, a dictionary is
+trained on them and every page is compressed with it, including the pages
+stored before. zstd dictionaries are used when the zstandard package is
+installed (uv sync --extra archive), zlib with a preset dictionary
+otherwise.
+
+Replaced pages stay in the pack until compact() rewrites it, which also
+trains the dictionary again on a larger sample:
+
+    uv run python -m src.archive --compact
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .config import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pack (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    generation INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO pack VALUES (0, 0, 0);
+CREATE TABLE IF NOT EXISTS dictionaries (
+    dict_id INTEGER PRIMARY KEY,
+    codec TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    course_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    exercise_id INTEGER NOT NULL,
+    course_position INTEGER NOT NULL,
+    chapter_position INTEGER NOT NULL,
+    exercise_index INTEGER NOT NULL,
+    exercise_total INTEGER NOT NULL,
+    course TEXT NOT NULL,
+    chapter TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    dict_id INTEGER,
+    pack_offset INTEGER NOT NULL,
+    pack_length INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    archived_at REAL NOT NULL,
+    PRIMARY KEY (course_id, chapter_id, exercise_id)
+) WITHOUT ROWID;
+"""
+
+CODECS = ("zstd", "zlib")
+
+# zlib only looks back this far, so a longer preset dictionary is wasted
+_ZLIB_WINDOW = 32 * 1024
+
+# A page is split into segments starting at each tag
+_SEGMENT = re.compile(rb"<[^<]*")
+
+
+def _zstandard() -> Any:
+    """Import zstandard, or return None if it is not installed."""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def default_codec() -> str:
+    """Get the codec new pages are compressed with.
+
+    Returns:
+        Config.ARCHIVE_CODEC, or zlib if zstd was chosen but zstandard is not
+        installed
+    """
+    if Config.ARCHIVE_CODEC == "zstd" and _zstandard() is None:
+        return "zlib"
+    return Config.ARCHIVE_CODEC
+
+
+def shared_segments(samples: list[bytes], size: int) -> bytes:
+    """Build a raw dictionary from the markup that pages have in common.
+
+    Pages are split before every tag. The segments found in most samples are
+    kept up to ``size`` bytes, in the order they appear in the pages, so
+    runs of boilerplate match the dictionary as a whole.
+
+    Args:
+        samples: Uncompressed pages
+        size: Maximum dictionary size in bytes
+
+    Returns:
+        Dictionary content
+    """
+    counts: Counter[bytes] = Counter()
+    for sample in samples:
+        # dict.fromkeys keeps the page order, which sorting below preserves
+        counts.update(dict.fromkeys(_SEGMENT.findall(sample), 1))
+
+    chosen = set()
+    total = 0
+    for segment, count in sorted(counts.items(), key=lambda item: -item[1]):
+        if count < 2:
+            break
+        if total + len(segment) <= size:
+            chosen.add(segment)
+            total += len(segment)
+    return b"".join(segment for segment in counts if segment in chosen)
+
+
+def train_dictionary(codec: str, samples: list[bytes], size: int) -> bytes:
+    """Train a compression dictionary on sample pages.
+
+    Args:
+        codec: One of CODECS
+        samples: Uncompressed pages
+        size: Maximum dictionary size in bytes
+
+    Returns:
+        Dictionary for the codec
+    """
+    if codec == "zstd":
+        zstandard = _zstandard()
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError:
+            pass  # too few samples; zstd also accepts a raw content dictionary
+    else:
+        size = min(size, _ZLIB_WINDOW)
+    return shared_segments(samples, size)
+
+
+class _Codec:
+    """Compressor and decompressor of one codec and dictionary."""
+
+    def __init__(self, codec: str, dictionary: bytes | None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown archive codec: {codec}")
+        self.codec = codec
+        self.dictionary = dictionary
+        if codec == "zstd":
+            zstandard = _zstandard()
+            if zstandard is None:
+                raise RuntimeError("The archive holds zstd pages, but zstandard is not installed")
+            data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self._compressor = zstandard.ZstdCompressor(level=Config.ARCHIVE_LEVEL, dict_data=data)
+            self._decompressor = zstandard.ZstdDecompressor(dict_data=data)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a page."""
+        if self.codec == "zstd":
+            return self._compressor.compress(data)
+        if self.dictionary:
+            compressor = zlib.compressobj(Config.ARCHIVE_LEVEL, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(Config.ARCHIVE_LEVEL)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress a page."""
+        if self.codec == "zstd":
+            return self._decompressor.decompress(data)
+        if self.dictionary:
+            decompressor = zlib.decompressobj(zdict=self.dictionary)
+        else:
+            decompressor = zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+@dataclass
+class ArchivedPage:
+    """An archived exercise page and where it was found in the crawl."""
+
+    course_id: int
+    chapter_id: int
+    exercise_id: int
+    course_position: int
+    chapter_position: int
+    exercise_index: int
+    exercise_total: int
+    course: dict[str, Any]
+    chapter: dict[str, Any]
+    exercise: dict[str, Any]
+    codec: str
+    dict_id: int | None
+    offset: int
+    length: int
+    size: int
+
+
+class PageArchive:
+    """Pack file of compressed exercise pages with a SQLite index.
+
+    Pages are appended to the pack before the index row pointing at them is
+    committed. Bytes past the indexed size are left by an interrupted write
+    and cut off when the archive is opened.
+    """
+
+    def __init__(self, path: Path | str | None = None, readonly: bool = False):
+        """Open or create the archive.
+
+        Args:
+            path: Archive directory (defaults to PAGE_ARCHIVE_DIR in the
+                output directory)
+            readonly: Only read pages, e.g. in a reparse worker process
+        """
+        self.path = Path(path or Path(Config.OUTPUT_DIR) / Config.PAGE_ARCHIVE_DIR)
+        self.readonly = readonly
+        self.codec = default_codec()
+        index = self.path / "index.sqlite3"
+        if readonly:
+            self._conn = sqlite3.connect(f"{index.resolve().as_uri()}?mode=ro", uri=True)
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(index)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        self._codecs: dict[int | None, _Codec] = {}
+
+        generation, size = self._conn.execute(
+            "SELECT generation, size FROM pack"
+        ).fetchone()
+        self._pack_path = self._pack_name(generation)
+        self._pack = open(self._pack_path, "rb" if readonly else "a+b")
+        if not readonly:
+            self._pack.truncate(size)
+            # Left behind by an interrupted compaction
+            for path in self.path.glob("pages-*.pack"):
+                if path != self._pack_path:
+                    path.unlink()
+
+        (self._dict_id,) = self._conn.execute(
+            "SELECT MAX(dict_id) FROM dictionaries WHERE codec = ?", (self.codec,)
+        ).fetchone()
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the archive."""
+        self._pack.close()
+        self._conn.close()
+
+    def __len__(self) -> int:
+        """Number of archived pages."""
+        return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def _pack_name(self, generation: int) -> Path:
+        return self.path / f"pages-{generation}.pack"
+
+    def _codec(self, codec: str, dict_id: int | None) -> _Codec:
+        """Get the codec of a dictionary, loading the dictionary once."""
+        if dict_id not in self._codecs:
+            dictionary = None
+            if dict_id is not None:
+                (dictionary,) = self._conn.execute(
+                    "SELECT data FROM dictionaries WHERE dict_id = ?", (dict_id,)
+                ).fetchone()
+            self._codecs[dict_id] = _Codec(codec, dictionary)
+        return self._codecs[dict_id]
+
+    def add(
+        self,
+        html: str,
+        course: dict[str, Any],
+        chapter: dict[str, Any],
+        exercise: dict[str, Any],
+        course_position: int,
+        chapter_position: int,
+        exercise_index: int,
+        exercise_total: int,
+    ) -> bool:
+        """Archive an exercise page.
+
+        Args:
+            html: Page content
+            course: Course dictionary from the my_courses API
+            chapter: Chapter dictionary from the course information API
+            exercise: Section dictionary from the chapter information API
+            course_position: Position of the course in the crawl (1-indexed)
+            chapter_position: Position of the chapter in its course
+                (1-indexed)
+            exercise_index: Exercise index in chapter (1-indexed)
+            exercise_total: Number of exercises in chapter
+
+        Returns:
+            True if the page was stored, False if it was archived already
+        """
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        key = (course.get("id"), chapter.get("id"), exercise.get("id"))
+        placement = (
+            course_position,
+            chapter_position,
+            exercise_index,
+            exercise_total,
+            json.dumps(course, ensure_ascii=False),
+            json.dumps(chapter, ensure_ascii=False),
+            json.dumps(exercise, ensure_ascii=False),
+        )
+
+        row = self._conn.execute(
+            "SELECT digest FROM pages WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?",
+            key,
+        ).fetchone()
+        if row is not None and row[0] == digest:
+            self._conn.execute(
+                "UPDATE pages SET course_position = ?, chapter_position = ?,"
+                " exercise_index = ?, exercise_total = ?, course = ?, chapter = ?, exercise = ?"
+                " WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?",
+                (*placement, *key),
+            )
+            self._conn.commit()
+            return False
+
+        blob = self._codec(self.codec, self._dict_id).compress(data)
+        offset = self._pack.seek(0, os.SEEK_END)
+        self._pack.write(blob)
+        self._pack.flush()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES"
+            " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                *key,
+                *placement,
+                digest,
+                self.codec,
+                self._dict_id,
+                offset,
+                len(blob),
+                len(data),
+                time.time(),
+            ),
+        )
+        self._conn.execute("UPDATE pack SET size = ?", (offset + len(blob),))
+        self._conn.commit()
+
+        if self._dict_id is None and len(self) >= Config.ARCHIVE_TRAIN_PAGES:
+            self.compact(Config.ARCHIVE_TRAIN_PAGES)
+        return True
+
+    def pages(self) -> list[ArchivedPage]:
+        """List the archived pages in crawl order.
+
+        Returns:
+            Pages ordered by course, chapter and exercise position
+        """
+        rows = self._conn.execute(
+            "SELECT course_id, chapter_id, exercise_id, course_position, chapter_position,"
+            " exercise_index, exercise_total, course, chapter, exercise, codec, dict_id,"
+            " pack_offset, pack_length, size FROM pages"
+            " ORDER BY course_position, course_id, chapter_position, chapter_id,"
+            " exercise_index, exercise_id"
+        )
+        return [
+            ArchivedPage(
+                *row[:7], json.loads(row[7]), json.loads(row[8]), json.loads(row[9]), *row[10:]
+            )
+            for row in rows
+        ]
+
+    def read(self, page: ArchivedPage) -> str:
+        """Read an archived page.
+
+        Args:
+            page: Page from pages()
+
+        Returns:
+            Page content
+        """
+        self._pack.seek(page.offset)
+        blob = self._pack.read(page.length)
+        return self._codec(page.codec, page.dict_id).decompress(blob).decode("utf-8")
+
+    def compact(self, samples: int | None = None) -> None:
+        """Train a new dictionary and rewrite the pack with the current pages.
+
+        Pages are recompressed with the new dictionary into a new pack file,
+        which replaces the old one when the index is committed; replaced
+        pages are dropped.
+
+        Args:
+            samples: Number of pages to train the dictionary on (defaults to
+                Config.ARCHIVE_TRAIN_SAMPLES)
+        """
+        pages = self.pages()
+        if not pages:
+            return
+        contents = [self.read(page).encode("utf-8") for page in pages]
+        # Evenly spread over the courses rather than the first ones
+        step = max(1, len(pages) // (samples or Config.ARCHIVE_TRAIN_SAMPLES))
+        dictionary = train_dictionary(self.codec, contents[::step], Config.ARCHIVE_DICT_SIZE)
+
+        (generation,) = self._conn.execute("SELECT generation FROM pack").fetchone()
+        pack_path = self._pack_name(generation + 1)
+        cursor = self._conn.execute(
+            "INSERT INTO dictionaries (codec, data) VALUES (?, ?)", (self.codec, dictionary)
+        )
+        dict_id = cursor.lastrowid
+        codec = _Codec(self.codec, dictionary)
+        offset = 0
+        try:
+            with open(pack_path, "wb") as f:
+                for page, data in zip(pages, contents):
+                    blob = codec.compress(data)
+                    f.write(blob)
+                    self._conn.execute(
+                        "UPDATE pages SET codec = ?, dict_id = ?, pack_offset = ?, pack_length = ?"
+                        " WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?",
+                        (
+                            self.codec,
+                            dict_id,
+                            offset,
+                            len(blob),
+                            page.course_id,
+                            page.chapter_id,
+                            page.exercise_id,
+                        ),
+                    )
+                    offset += len(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            self._conn.execute("UPDATE pack SET generation = ?, size = ?", (generation + 1, offset))
+            self._conn.execute("DELETE FROM dictionaries WHERE dict_id != ?", (dict_id,))
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            pack_path.unlink(missing_ok=True)
+            raise
+
+        self._pack.close()
+        self._pack_path.unlink()
+        self._pack_path = pack_path
+        self._pack = open(pack_path, "a+b")
+        self._codecs = {dict_id: codec}
+        self._dict_id = dict_id
+
+    def stats(self) -> dict[str, Any]:
+        """Summarize the archive.
+
+        Returns:
+            Number of pages, their total and compressed size, the pack file
+            size and the codec of new pages
+        """
+        pages, size, packed = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(pack_length), 0) FROM pages"
+        ).fetchone()
+        return {
+            "pages": pages,
+            "bytes": size,
+            "compressed_bytes": packed,
+            "pack_bytes": self._pack_path.stat().st_size,
+            "codec": self.codec,
+            "dictionary": self._dict_id is not None,
+        }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv: Argument list (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="取得したページのアーカイブを表示・整理します")
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="辞書を学習し直し、置き換えられたページを除いてアーカイブを書き直す",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Print the size of the page archive, compacting it if requested."""
+    args = parse_args(argv)
+    with PageArchive() as archive:
+        if args.compact:
+            archive.compact()
+            print("アーカイブを書き直しました")
+        stats = archive.stats()
+
+    ratio = stats["compressed_bytes"] / stats["bytes"] if stats["bytes"] else 0.0
+    print(f"ページ: {stats['pages']} 件")
+    print(
+        f"サイズ: {stats['bytes'] / 1024 / 1024:.1f} MiB →"
+        f" 圧縮後 {stats['compressed_bytes'] / 1024 / 1024:.1f} MiB ({ratio:.1%})"
+    )
+    print(f"パックファイル: {stats['pack_bytes'] / 1024 / 1024:.1f} MiB")
+    dictionary = "辞書あり" if stats["dictionary"] else "辞書なし"
+    print(f"圧縮形式: {stats['codec']} ({dictionary})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""Persistent HTTP response cache for ZEN Study clients."""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from . import models
+from .config import Config
+from .models import Question
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    body BLOB NOT NULL,
+    body_digest TEXT NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+CREATE INDEX IF NOT EXISTS responses_body_digest ON responses (body_digest);
+-- Superseded by parse_results, which is also keyed by the parser engine
+DROP TABLE IF EXISTS parsed;
+CREATE TABLE IF NOT EXISTS parse_results (
+    digest TEXT NOT NULL,
+    parser_version INTEGER NOT NULL,
+    engine TEXT NOT NULL,
+    questions TEXT NOT NULL,
+    PRIMARY KEY (digest, parser_version, engine)
+);
+"""
+
+# Entries read per round when evicting
+_EVICT_BATCH = 64
+
+
+@dataclass
+class CacheEntry:
+    """A cached response body with its validators."""
+
+    key: str
+    body: bytes
+    content_type: str | None
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        """Check whether the entry can be used without revalidation.
+
+        Args:
+            ttl: Time to live in seconds
+
+        Returns:
+            True if the entry is younger than ttl
+        """
+        return time.time() - self.stored_at < ttl
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Build the headers for a conditional request.
+
+        Returns:
+            If-None-Match / If-Modified-Since headers for the stored validators
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        """Rebuild a successful response from the stored body.
+
+        Args:
+            request: Request the response answers
+
+        Returns:
+            Response with status 200 and the stored body
+        """
+        headers = {"Content-Type": self.content_type} if self.content_type else {}
+        return httpx.Response(200, content=self.body, headers=headers, request=request)
+
+
+class ResponseCache:
+    """Disk-backed response cache keyed by URL and query parameters.
+
+    Entries are served without a request while they are younger than the TTL
+    of their endpoint, and revalidated with If-None-Match/If-Modified-Since
+    afterwards. The total body size is capped, evicting least recently used
+    entries first.
+
+    The cache also remembers the questions parsed from each distinct exercise
+    page, so a page that did not change is not parsed again.
+    """
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        max_bytes: int | None = None,
+        ttls: tuple[tuple[str, float], ...] | None = None,
+        default_ttl: float | None = None,
+    ):
+        """Open or create the cache.
+
+        Args:
+            path: SQLite database file
+            max_bytes: Maximum total size of cached bodies
+            ttls: (URL path pattern, seconds) pairs, first match wins
+            default_ttl: TTL for URLs that match no pattern
+        """
+        self.path = Path(path or Path(Config.CACHE_DIR) / "http_cache.sqlite3")
+        self.max_bytes = max_bytes if max_bytes is not None else Config.CACHE_MAX_BYTES
+        self._ttls = [
+            (re.compile(pattern), ttl) for pattern, ttl in (ttls or Config.CACHE_TTLS)
+        ]
+        self.default_ttl = default_ttl if default_ttl is not None else Config.CACHE_DEFAULT_TTL
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        (self._total_bytes,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+        # Statistics
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def make_key(url: str, params: dict[str, Any] | None = None) -> str:
+        """Build the cache key of a request.
+
+        Args:
+            url: Request URL
+            params: Query parameters
+
+        Returns:
+            Hex digest identifying URL and parameters
+        """
+        query = sorted((str(k), str(v)) for k, v in (params or {}).items())
+        return hashlib.sha256(json.dumps([url, query]).encode()).hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        """Get the TTL of the endpoint a URL belongs to.
+
+        Args:
+            url: Request URL
+
+        Returns:
+            TTL in seconds
+        """
+        path = httpx.URL(url).path
+        for pattern, ttl in self._ttls:
+            if pattern.search(path):
+                return ttl
+        return self.default_ttl
+
+    def lookup(self, key: str) -> CacheEntry | None:
+        """Get a cached entry and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            CacheEntry, or None if the key is not cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, content_type, etag, last_modified, stored_at"
+                " FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return CacheEntry(key, *row)
+
+    def store(self, key: str, response: httpx.Response) -> None:
+        """Store a successful response.
+
+        Args:
+            key: Cache key
+            response: Response to store
+        """
+        body = response.content
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    str(response.request.url),
+                    body,
+                    hashlib.sha256(body).hexdigest(),
+                    response.headers.get("Content-Type"),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    now,
+                    now,
+                    len(body),
+                ),
+            )
+            self._total_bytes += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, key: str, response: httpx.Response) -> None:
+        """Mark an entry as fresh again after a 304 Not Modified response.
+
+        Args:
+            key: Cache key
+            response: The 304 response, which may carry updated validators
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?,"
+                " etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)"
+                " WHERE key = ?",
+                (
+                    time.time(),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    key,
+                ),
+            )
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the size cap is met.
+
+        Entries are deleted in small batches read from the accessed_at
+        index, so an eviction only touches the rows it removes.
+        """
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size, body_digest FROM responses"
+                " ORDER BY accessed_at LIMIT ?",
+                (_EVICT_BATCH,),
+            ).fetchall()
+            if not rows:
+                break
+
+            evicted = []
+            for key, size, digest in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                evicted.append((key, digest))
+                self._total_bytes -= size
+
+            self._conn.executemany(
+                "DELETE FROM responses WHERE key = ?", [(key,) for key, _ in evicted]
+            )
+            # Parse results go with the last response carrying their page
+            self._conn.executemany(
+                "DELETE FROM parse_results WHERE digest = ?"
+                " AND NOT EXISTS (SELECT 1 FROM responses WHERE body_digest = ?)",
+                [(digest, digest) for _, digest in evicted],
+            )
+
+    def get_parsed(
+        self, digest: str, parser_version: int, engine: str
+    ) -> list[Question] | None:
+        """Get the questions parsed from a page with the given digest.
+
+        Args:
+            digest: Digest from page_digest()
+            parser_version: Version of the parser that produced the result
+            engine: Parser engine that produced the result
+
+        Returns:
+            List of Question objects, or None if the page was not parsed yet
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT questions FROM parse_results"
+                " WHERE digest = ? AND parser_version = ? AND engine = ?",
+                (digest, parser_version, engine),
+            ).fetchone()
+        if row is None:
+            return None
+        return [Question.from_dict(q) for q in json.loads(row[0])]
+
+    def put_parsed(
+        self, digest: str, parser_version: int, engine: str, questions: list[Question]
+    ) -> None:
+        """Remember the questions parsed from a page.
+
+        Args:
+            digest: Digest from page_digest()
+            parser_version: Version of the parser that produced the result
+            engine: Parser engine that produced the result
+            questions: Questions parsed from the page
+        """
+        data = models.dumps_list(questions)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parse_results VALUES (?, ?, ?, ?)",
+                (digest, parser_version, engine, data),
+            )
+            self._conn.commit()
+
+
+def page_digest(html: str) -> str:
+    """Build the key under which the parse result of a page is stored.
+
+    For UTF-8 pages this equals the body digest of the cached response, so
+    parse results are evicted together with their page.
+
+    Args:
+        html: Page content
+
+    Returns:
+        Hex digest of the page content
+    """
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
@@ -0,0 +1,68 @@
+"""Command line entry point with one subcommand per tool.
+
+Installed as the ``zen-study`` command:
+
+    zen-study crawl --resume
+    zen-study render
+    zen-study stats --json
+
+Each subcommand is the main() of its own module, imported only when the
+subcommand runs, so quick commands such as ``stats`` start without loading
+httpx, BeautifulSoup or python-dotenv.
+"""
+
+import argparse
+import importlib
+import sys
+
+# Subcommand -> (module whose main(argv) runs it, description)
+COMMANDS = {
+    "crawl": ("src.main", "確認テストを取得する"),
+    "render": ("generate_markdown", "コースごとのマークダウンを生成する"),
+    "stats": ("src.stats", "取得済みデータの件数を表示する"),
+    "reparse": ("src.reparse", "保存したページを通信せずに解析し直す"),
+    "archive": ("src.archive", "保存したページのアーカイブを表示・整理する"),
+    "search": ("src.search", "保存した問題を検索する"),
+    "duplicates": ("src.duplicates", "言い換えられた重複問題を検出する"),
+    "tables": ("src.columnar", "問題を分析用の表 (Parquet / Arrow) に書き出す"),
+    "queue": ("src.workqueue", "複数のプロセスで分担して取得する"),
+    "watch": ("src.watch", "コース一覧を定期的に確認して変更分を取得し続ける"),
+}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the subcommand, leaving its arguments to the subcommand.
+
+    Args:
+        argv: Argument list (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments with the subcommand and its argument list
+    """
+    width = max(map(len, COMMANDS))
+    parser = argparse.ArgumentParser(
+        prog="zen-study",
+        description="ZEN Study 確認テスト取得ツール",
+        epilog="サブコマンド:\n"
+        + "\n".join(f"  {name:<{width}}  {text}" for name, (_, text) in COMMANDS.items())
+        + "\n\n各サブコマンドのオプションは zen-study <サブコマンド> --help で表示します",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "command", choices=COMMANDS, metavar="サブコマンド", help="実行するサブコマンド (下記参照)"
+    )
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run a subcommand."""
+    args = parse_args(argv)
+    # Usage messages of the subcommand name it as it was typed
+    sys.argv[0] = f"zen-study {args.command}"
+    module = importlib.import_module(COMMANDS[args.command][0])
+    module.main(args.args)
+
+
+if __name__ == "__main__":
+    main()
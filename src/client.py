@@ -1,24 +1,403 @@
 """HTTP client for ZEN Study API."""
 
-import sys
+import asyncio
+import importlib.util
+import random
 import time
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any
 
 import httpx
 
+from .cache import CacheEntry, ResponseCache
 from .config import Config
+from .ratelimit import TokenBucket, get_shared_limiter
+from .telemetry import Telemetry
 
+# Responses that are worth sending the request again for
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
 
-class ZenStudyClient:
+# Responses telling the client to slow down
+THROTTLE_STATUSES = frozenset({429, 503})
+
+# Errors that a later attempt may not run into
+TRANSIENT_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+class AuthenticationError(Exception):
+    """The server rejected the session cookie (401 / 403)."""
+
+
+def print_authentication_help() -> None:
+    """Tell the user how to replace a session cookie that was rejected."""
+    print("\nエラー: 認証に失敗しました。")
+    print("セッションCookieの有効期限が切れている可能性があります。")
+    print("ブラウザのDevToolsから新しいセッションCookieを取得して、")
+    print("環境変数 ZANE_SESSION を更新してください。")
+
+
+# Packages httpx needs to decode each content encoding
+_DECODER_PACKAGES = {"br": ("brotli", "brotlicffi"), "zstd": ("zstandard",)}
+
+
+def _installed(*packages: str) -> bool:
+    """Check whether any of the packages can be imported."""
+    return any(importlib.util.find_spec(package) is not None for package in packages)
+
+
+def accepted_encodings() -> list[str]:
+    """Content encodings to offer the server.
+
+    Returns:
+        Config.ACCEPT_ENCODINGS without the ones that cannot be decoded here
+    """
+    return [
+        encoding
+        for encoding in Config.ACCEPT_ENCODINGS
+        if encoding not in _DECODER_PACKAGES or _installed(*_DECODER_PACKAGES[encoding])
+    ]
+
+
+def http2_enabled() -> bool:
+    """Check whether requests are sent over HTTP/2 where the server supports it."""
+    return Config.HTTP2 and _installed("h2")
+
+
+def parse_retry_after(response: httpx.Response) -> float | None:
+    """Read how long the server asked to wait from a Retry-After header.
+
+    Args:
+        response: HTTP response
+
+    Returns:
+        Seconds to wait (at most Config.RETRY_AFTER_MAX), or None if the
+        header is missing or invalid
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        # An HTTP date
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), Config.RETRY_AFTER_MAX)
+
+
+class _ZenStudyClientBase:
+    """Request building and response handling shared by sync and async clients."""
+
+    cache: ResponseCache | None = None
+    telemetry: Telemetry | None = None
+    revalidate = False
+    rate_limiter: TokenBucket
+    session_cookie: str
+    client: httpx.Client | httpx.AsyncClient
+
+    def _client_options(self, max_connections: int) -> dict[str, Any]:
+        """Build the options shared by the sync and async httpx clients.
+
+        Idle connections are kept up to the number of requests the crawl can
+        have in flight, so no request waits for a new TCP and TLS handshake.
+        Over HTTP/2, requests to one host share a single connection.
+
+        Args:
+            max_connections: Maximum number of open connections
+
+        Returns:
+            Keyword arguments for httpx.Client / httpx.AsyncClient
+        """
+        return {
+            "headers": {
+                "Cookie": self.session_cookie,
+                "Accept-Encoding": ", ".join(accepted_encodings()),
+            },
+            "timeout": 30.0,
+            "follow_redirects": True,
+            "http2": http2_enabled(),
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=Config.KEEPALIVE_EXPIRY,
+            ),
+        }
+
+    @staticmethod
+    def _handle_response(response: httpx.Response) -> httpx.Response:
+        """Handle response and check for authentication errors.
+
+        Args:
+            response: HTTP response
+
+        Returns:
+            Response if successful
+
+        Raises:
+            AuthenticationError: If authentication fails
+        """
+        if response.status_code in (401, 403):
+            raise AuthenticationError(
+                f"Session rejected with {response.status_code} for {response.request.url}"
+            )
+
+        response.raise_for_status()
+        return response
+
+    def _cache_lookup(
+        self, url: str, params: dict[str, Any] | None, revalidate: bool = False
+    ) -> tuple[str | None, CacheEntry | None, httpx.Response | None]:
+        """Look up a request in the response cache.
+
+        Args:
+            url: Request URL
+            params: Query parameters
+            revalidate: Never serve the entry without asking the server
+
+        Returns:
+            Cache key, cached entry, and the cached response if it is still
+            fresh (key and entry are None when caching is disabled)
+        """
+        if self.cache is None:
+            return None, None, None
+
+        key = self.cache.make_key(url, params)
+        entry = self.cache.lookup(key)
+        fresh = entry is not None and entry.is_fresh(self.cache.ttl_for(url))
+        if fresh and not (revalidate or self.revalidate):
+            self.cache.hits += 1
+            request = self.client.build_request("GET", url, params=params)
+            return key, entry, entry.to_response(request)
+        return key, entry, None
+
+    def _cache_update(
+        self, key: str | None, entry: CacheEntry | None, response: httpx.Response
+    ) -> httpx.Response:
+        """Store a response in the cache, resolving 304 from the cached entry.
+
+        Args:
+            key: Cache key from _cache_lookup()
+            entry: Cached entry from _cache_lookup()
+            response: Response of the (conditional) request
+
+        Returns:
+            The response, or the cached response if the server answered 304
+        """
+        if key is None:
+            return response
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated += 1
+            self.cache.refresh(key, response)
+            return entry.to_response(response.request)
+
+        self.cache.misses += 1
+        if response.is_success:
+            self.cache.store(key, response)
+        return response
+
+    def _record_request(
+        self,
+        endpoint: str,
+        url: str,
+        started: float,
+        response: httpx.Response | None,
+        cache: str | None,
+        throttled: float = 0.0,
+        error: BaseException | None = None,
+        attempt: int = 0,
+    ) -> None:
+        """Record a request in the telemetry, if enabled.
+
+        Args:
+            endpoint: Name of the API endpoint or page type
+            url: Request URL
+            started: time.monotonic() when the request was sent
+            response: Response, or None if the request failed
+            cache: Cache outcome ("hit", "revalidated", "miss"; None when
+                caching is disabled)
+            throttled: Seconds spent waiting for the rate limiter
+            error: Exception raised by the request
+            attempt: Number of earlier attempts of the request
+        """
+        if self.telemetry is None:
+            return
+
+        details: dict[str, Any] = {"url": url, "cache": cache, "throttled": throttled}
+        if attempt:
+            details["attempt"] = attempt
+        if response is not None:
+            details["status"] = response.status_code
+            details["bytes"] = len(response.content)
+            details["wire_bytes"] = 0 if cache == "hit" else response.num_bytes_downloaded
+            if cache != "hit":
+                details["http_version"] = response.http_version
+                details["encoding"] = response.headers.get("Content-Encoding", "identity")
+        if error is not None:
+            details["error"] = type(error).__name__
+        self.telemetry.record(
+            "http", endpoint, started, time.monotonic() - started, **details
+        )
+
+    def _observe(
+        self,
+        endpoint: str,
+        started: float,
+        response: httpx.Response | None,
+        error: BaseException | None = None,
+    ) -> None:
+        """Tell the rate limiter how the server handled an attempt.
+
+        Args:
+            endpoint: Name of the endpoint
+            started: time.monotonic() when the attempt was sent
+            response: Response, or None if the attempt failed
+            error: Exception raised by the attempt
+        """
+        if isinstance(error, httpx.TimeoutException) or (
+            response is not None and response.status_code in THROTTLE_STATUSES
+        ):
+            self.rate_limiter.record_throttle()
+        elif response is not None and response.status_code < 500:
+            self.rate_limiter.record_success(endpoint, time.monotonic() - started)
+
+    def _retry_delay(
+        self,
+        attempt: int,
+        response: httpx.Response | None = None,
+        error: BaseException | None = None,
+    ) -> float | None:
+        """Decide whether to send a failed request again.
+
+        A Retry-After header pauses the whole rate limiter, since the server
+        asked this client to wait, not just this request. Otherwise the
+        request backs off exponentially with jitter, so that requests that
+        failed together do not retry together.
+
+        Args:
+            attempt: Number of earlier attempts of the request
+            response: Response of the attempt, if it got one
+            error: Exception raised by the attempt
+
+        Returns:
+            Seconds to sleep before the next attempt, or None if the request
+            must not be retried
+        """
+        if error is not None:
+            if not isinstance(error, TRANSIENT_ERRORS):
+                return None
+        elif response.status_code not in RETRY_STATUSES:
+            return None
+        if attempt >= Config.MAX_RETRIES:
+            return None
+
+        self.rate_limiter.record_retry()
+        retry_after = parse_retry_after(response) if response is not None else None
+        if retry_after is not None:
+            self.rate_limiter.pause(retry_after)
+            return 0.0
+
+        backoff = min(Config.RETRY_BACKOFF * 2**attempt, Config.RETRY_BACKOFF_MAX)
+        return random.uniform(backoff / 2, backoff)
+
+    def _cache_outcome(self, key: str | None, response: httpx.Response) -> str | None:
+        """Describe how the cache took part in a request that was sent."""
+        if key is None:
+            return None
+        return "revalidated" if response.status_code == 304 else "miss"
+
+    @staticmethod
+    def _is_last_page(response: dict[str, Any], limit: int, seen: set[Any]) -> bool:
+        """Check whether a my_courses page is the last one.
+
+        A page with fewer courses than requested is the last one. A page
+        listing only courses seen on earlier pages also ends the listing, in
+        case the server ignores the offset.
+
+        Args:
+            response: my_courses response
+            limit: Number of courses requested
+            seen: IDs of courses on earlier pages; the page's IDs are added
+
+        Returns:
+            True if no further page has to be requested
+        """
+        ids = [
+            course.get("id")
+            for service in response.get("services", [])
+            for course in service.get("courses", [])
+        ]
+        repeated = bool(ids) and seen.issuperset(ids)
+        seen.update(ids)
+        return len(ids) < limit or repeated
+
+    @staticmethod
+    def _my_courses_request(limit: int, offset: int) -> tuple[str, dict[str, Any]]:
+        """Build URL and query parameters for the enrolled course list."""
+        url = f"{Config.API_BASE_URL}/v3/dashboard/my_courses"
+        params = {"service": Config.SERVICE, "limit": limit, "offset": offset}
+        return url, params
+
+    @staticmethod
+    def _course_info_request(course_id: int) -> tuple[str, dict[str, Any]]:
+        """Build URL and query parameters for course information."""
+        url = f"{Config.API_BASE_URL}/v2/material/courses/{course_id}"
+        params = {"revision": 1}
+        return url, params
+
+    @staticmethod
+    def _chapter_info_request(
+        course_id: int, chapter_id: int
+    ) -> tuple[str, dict[str, Any]]:
+        """Build URL and query parameters for chapter information."""
+        url = f"{Config.API_BASE_URL}/v2/material/courses/{course_id}/chapters/{chapter_id}"
+        params = {"revision": 1}
+        return url, params
+
+
+class ZenStudyClient(_ZenStudyClientBase):
     """HTTP client for ZEN Study API and page requests."""
 
-    def __init__(self):
-        """Initialize the client."""
+    def __init__(
+        self,
+        rate_limiter: TokenBucket | None = None,
+        cache: ResponseCache | None = None,
+        transport: httpx.BaseTransport | None = None,
+        telemetry: Telemetry | None = None,
+        max_connections: int | None = None,
+        revalidate: bool = False,
+    ):
+        """Initialize the client.
+
+        Args:
+            rate_limiter: Rate limiter shared with other clients
+                (defaults to the process-wide limiter)
+            cache: Response cache (no caching if omitted)
+            transport: Transport to send requests with (e.g. a
+                MockTransport serving a stand-in server)
+            telemetry: Collector to record requests in
+            max_connections: Maximum number of open connections, i.e. the
+                number of threads sending requests through the client
+                (defaults to Config.POOL_CONNECTIONS)
+            revalidate: Revalidate cached responses even while they are
+                fresh, for crawls that must see every change
+        """
+        self.rate_limiter = rate_limiter or get_shared_limiter()
+        self.cache = cache
+        self.telemetry = telemetry
+        self.revalidate = revalidate
         self.session_cookie = Config.get_cookie_header()
         self.client = httpx.Client(
-            headers={"Cookie": self.session_cookie},
-            timeout=30.0,
-            follow_redirects=True,
+            transport=transport,
+            **self._client_options(max_connections or Config.POOL_CONNECTIONS),
         )
 
     def __enter__(self):
@@ -29,47 +408,126 @@ class ZenStudyClient:
         """Context manager exit."""
         self.client.close()
 
-    def _handle_response(self, response: httpx.Response) -> httpx.Response:
-        """Handle response and check for authentication errors.
+    def _get(
+        self,
+        endpoint: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        revalidate: bool = False,
+    ) -> httpx.Response:
+        """Send a GET request within the rate limit, using the cache if enabled.
+
+        Throttled (429), failed (5xx) and timed out requests are sent again
+        up to Config.MAX_RETRIES times.
 
         Args:
-            response: HTTP response
+            endpoint: Name of the endpoint, for telemetry
+            url: Request URL
+            params: Query parameters
+            revalidate: Send the request even if the cached response is
+                fresh (conditionally, so an unchanged response stays cheap)
 
         Returns:
-            Response if successful
+            Successful response
 
         Raises:
-            SystemExit: If authentication fails
+            AuthenticationError: If the server rejects the session cookie
         """
-        if response.status_code in (401, 403):
-            print("\nエラー: 認証に失敗しました。")
-            print("セッションCookieの有効期限が切れている可能性があります。")
-            print("ブラウザのDevToolsから新しいセッションCookieを取得して、")
-            print("環境変数 ZANE_SESSION を更新してください。")
-            sys.exit(1)
-
-        response.raise_for_status()
-        return response
+        started = time.monotonic()
+        key, entry, cached = self._cache_lookup(url, params, revalidate)
+        if cached is not None:
+            self._record_request(endpoint, url, started, cached, "hit")
+            return cached
+
+        headers = entry.conditional_headers() if entry else None
+        attempt = 0
+        while True:
+            throttled = self.rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self.client.get(url, params=params, headers=headers)
+            except Exception as e:
+                self._observe(endpoint, started, None, e)
+                self._record_request(endpoint, url, started, None, None, throttled, e, attempt)
+                delay = self._retry_delay(attempt, error=e)
+                if delay is None:
+                    raise
+            else:
+                self._observe(endpoint, started, response)
+                delay = self._retry_delay(attempt, response=response)
+                if delay is None:
+                    break
+                self._record_request(
+                    endpoint, url, started, response, None, throttled, None, attempt
+                )
+            attempt += 1
+            time.sleep(delay)
+
+        outcome = self._cache_outcome(key, response)
+        response = self._cache_update(key, entry, response)
+        self._record_request(
+            endpoint, url, started, response, outcome, throttled, None, attempt
+        )
+        return self._handle_response(response)
 
-    def get_my_courses(self, limit: int = 20, offset: int = 0) -> dict[str, Any]:
+    def get_my_courses(
+        self, limit: int = 20, offset: int = 0, revalidate: bool = False
+    ) -> dict[str, Any]:
         """Get list of courses the user is enrolled in.
 
         Args:
             limit: Number of courses to fetch
             offset: Offset for pagination
+            revalidate: Ask the server even if the cached list is fresh
 
         Returns:
             API response as dictionary
         """
-        url = f"{Config.API_BASE_URL}/v3/dashboard/my_courses"
-        params = {"service": Config.SERVICE, "limit": limit, "offset": offset}
-
-        response = self.client.get(url, params=params)
-        self._handle_response(response)
-        time.sleep(Config.REQUEST_DELAY)
+        url, params = self._my_courses_request(limit, offset)
 
+        response = self._get("my_courses", url, params=params, revalidate=revalidate)
         return response.json()
 
+    def check_session(self) -> None:
+        """Check that the server accepts the session cookie.
+
+        The first course of the course list is requested, bypassing fresh
+        cache entries, so an expired cookie is found before a crawl starts.
+
+        Raises:
+            AuthenticationError: If the server rejects the session cookie
+        """
+        self.get_my_courses(1, 0, revalidate=True)
+
+    def iter_my_courses(self, page_size: int | None = None) -> Iterator[dict[str, Any]]:
+        """Iterate over all pages of the enrolled course list.
+
+        While the caller handles a page, the next one is requested in a
+        background thread, so paging adds no round trips to the crawl.
+
+        Args:
+            page_size: Courses per page (defaults to Config.COURSES_PAGE_SIZE)
+
+        Yields:
+            my_courses responses in page order
+        """
+        limit = page_size or Config.COURSES_PAGE_SIZE
+        seen: set[Any] = set()
+        with ThreadPoolExecutor(1, thread_name_prefix="my_courses") as prefetcher:
+            next_page: Future | None = prefetcher.submit(self.get_my_courses, limit, 0)
+            offset = 0
+            try:
+                while next_page is not None:
+                    page = next_page.result()
+                    next_page = None
+                    if not self._is_last_page(page, limit, seen):
+                        offset += limit
+                        next_page = prefetcher.submit(self.get_my_courses, limit, offset)
+                    yield page
+            finally:
+                if next_page is not None:
+                    next_page.cancel()
+
     def get_course_info(self, course_id: int) -> dict[str, Any]:
         """Get course information including chapter list.
 
@@ -79,13 +537,9 @@ class ZenStudyClient:
         Returns:
             API response as dictionary
         """
-        url = f"{Config.API_BASE_URL}/v2/material/courses/{course_id}"
-        params = {"revision": 1}
-
-        response = self.client.get(url, params=params)
-        self._handle_response(response)
-        time.sleep(Config.REQUEST_DELAY)
+        url, params = self._course_info_request(course_id)
 
+        response = self._get("course", url, params=params)
         return response.json()
 
     def get_chapter_info(self, course_id: int, chapter_id: int) -> dict[str, Any]:
@@ -98,13 +552,9 @@ class ZenStudyClient:
         Returns:
             API response as dictionary
         """
-        url = f"{Config.API_BASE_URL}/v2/material/courses/{course_id}/chapters/{chapter_id}"
-        params = {"revision": 1}
-
-        response = self.client.get(url, params=params)
-        self._handle_response(response)
-        time.sleep(Config.REQUEST_DELAY)
+        url, params = self._chapter_info_request(course_id, chapter_id)
 
+        response = self._get("chapter", url, params=params)
         return response.json()
 
     def get_exercise_html(self, exercise_url: str) -> str:
@@ -116,8 +566,234 @@ class ZenStudyClient:
         Returns:
             HTML content as string
         """
-        response = self.client.get(exercise_url)
-        self._handle_response(response)
-        time.sleep(Config.REQUEST_DELAY)
+        response = self._get("exercise", exercise_url)
+        return response.text
+
+
+class AsyncZenStudyClient(_ZenStudyClientBase):
+    """Asynchronous HTTP client for ZEN Study with bounded parallelism.
+
+    At most ``max_concurrency`` requests are in flight in total, and at most
+    ``per_host_concurrency`` of them go to the same host. The request rate
+    is paced by the same rate limiter as the sequential client.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        per_host_concurrency: int | None = None,
+        rate_limiter: TokenBucket | None = None,
+        cache: ResponseCache | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        telemetry: Telemetry | None = None,
+        revalidate: bool = False,
+    ):
+        """Initialize the client.
+
+        Args:
+            max_concurrency: Maximum number of requests in flight
+            per_host_concurrency: Maximum number of requests in flight per host
+            rate_limiter: Rate limiter shared with other clients
+                (defaults to the process-wide limiter)
+            cache: Response cache (no caching if omitted)
+            transport: Transport to send requests with (e.g. a
+                MockTransport serving a stand-in server)
+            telemetry: Collector to record requests in
+            revalidate: Revalidate cached responses even while they are
+                fresh, for crawls that must see every change
+        """
+        self.rate_limiter = rate_limiter or get_shared_limiter()
+        self.cache = cache
+        self.telemetry = telemetry
+        self.revalidate = revalidate
+        self.max_concurrency = max_concurrency or Config.MAX_CONCURRENCY
+        self.per_host_concurrency = min(
+            per_host_concurrency or Config.PER_HOST_CONCURRENCY,
+            self.max_concurrency,
+        )
+        self.session_cookie = Config.get_cookie_header()
+        self.client = httpx.AsyncClient(
+            transport=transport, **self._client_options(self.max_concurrency)
+        )
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
 
+    async def __aenter__(self):
+        """Async context manager entry."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit."""
+        await self.client.aclose()
+
+    async def _get(
+        self, endpoint: str, url: str, params: dict[str, Any] | None = None
+    ) -> httpx.Response:
+        """Send a GET request within the rate and concurrency limits.
+
+        Throttled (429), failed (5xx) and timed out requests are sent again
+        up to Config.MAX_RETRIES times.
+
+        Args:
+            endpoint: Name of the endpoint, for telemetry
+            url: Request URL
+            params: Query parameters
+
+        Returns:
+            Successful response
+
+        Raises:
+            AuthenticationError: If the server rejects the session cookie
+        """
+        started = time.monotonic()
+        key, entry, cached = self._cache_lookup(url, params)
+        if cached is not None:
+            self._record_request(endpoint, url, started, cached, "hit")
+            return cached
+
+        host = httpx.URL(url).host
+        host_slots = self._host_slots.get(host)
+        if host_slots is None:
+            host_slots = self._host_slots[host] = asyncio.Semaphore(
+                self.per_host_concurrency
+            )
+
+        headers = entry.conditional_headers() if entry else None
+
+        # Wait for the rate limit before taking a slot, so throttled requests
+        # do not keep slots idle. Take the per-host slot first so a busy host
+        # does not hold global slots.
+        attempt = 0
+        while True:
+            throttled = await self.rate_limiter.acquire_async()
+            async with host_slots, self._slots:
+                started = time.monotonic()
+                try:
+                    response = await self.client.get(url, params=params, headers=headers)
+                except Exception as e:
+                    error = e
+                else:
+                    error = None
+
+            if error is not None:
+                self._observe(endpoint, started, None, error)
+                self._record_request(
+                    endpoint, url, started, None, None, throttled, error, attempt
+                )
+                delay = self._retry_delay(attempt, error=error)
+                if delay is None:
+                    raise error
+            else:
+                self._observe(endpoint, started, response)
+                delay = self._retry_delay(attempt, response=response)
+                if delay is None:
+                    break
+                self._record_request(
+                    endpoint, url, started, response, None, throttled, None, attempt
+                )
+            # Back off without holding a slot
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        outcome = self._cache_outcome(key, response)
+        response = self._cache_update(key, entry, response)
+        self._record_request(
+            endpoint, url, started, response, outcome, throttled, None, attempt
+        )
+        return self._handle_response(response)
+
+    async def get_my_courses(self, limit: int = 20, offset: int = 0) -> dict[str, Any]:
+        """Get list of courses the user is enrolled in.
+
+        Args:
+            limit: Number of courses to fetch
+            offset: Offset for pagination
+
+        Returns:
+            API response as dictionary
+        """
+        url, params = self._my_courses_request(limit, offset)
+        response = await self._get("my_courses", url, params=params)
+        return response.json()
+
+    async def iter_my_courses(
+        self, page_size: int | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Iterate over all pages of the enrolled course list.
+
+        While the caller handles a page, the next one is already being
+        requested, so paging adds no round trips to the crawl.
+
+        Args:
+            page_size: Courses per page (defaults to Config.COURSES_PAGE_SIZE)
+
+        Yields:
+            my_courses responses in page order
+        """
+        limit = page_size or Config.COURSES_PAGE_SIZE
+
+        async def fetch(offset: int) -> dict[str, Any] | BaseException:
+            # Errors (including an authentication failure) are raised where
+            # the page is awaited, not inside the task
+            try:
+                return await self.get_my_courses(limit, offset)
+            except asyncio.CancelledError:
+                raise
+            except BaseException as e:
+                return e
+
+        seen: set[Any] = set()
+        next_page: asyncio.Task | None = asyncio.create_task(fetch(0))
+        offset = 0
+        try:
+            while next_page is not None:
+                page = await next_page
+                next_page = None
+                if isinstance(page, BaseException):
+                    raise page
+                if not self._is_last_page(page, limit, seen):
+                    offset += limit
+                    next_page = asyncio.create_task(fetch(offset))
+                yield page
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def get_course_info(self, course_id: int) -> dict[str, Any]:
+        """Get course information including chapter list.
+
+        Args:
+            course_id: Course ID
+
+        Returns:
+            API response as dictionary
+        """
+        url, params = self._course_info_request(course_id)
+        response = await self._get("course", url, params=params)
+        return response.json()
+
+    async def get_chapter_info(self, course_id: int, chapter_id: int) -> dict[str, Any]:
+        """Get chapter information including section list.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+
+        Returns:
+            API response as dictionary
+        """
+        url, params = self._chapter_info_request(course_id, chapter_id)
+        response = await self._get("chapter", url, params=params)
+        return response.json()
+
+    async def get_exercise_html(self, exercise_url: str) -> str:
+        """Get exercise HTML page.
+
+        Args:
+            exercise_url: Exercise URL (with /result removed if present)
+
+        Returns:
+            HTML content as string
+        """
+        response = await self._get("exercise", exercise_url)
         return response.text
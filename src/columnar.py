@@ -0,0 +1,255 @@
+"""Columnar export of the questions for bulk analytics.
+
+The summary is flattened into two tables:
+
+- ``questions``: one row per question with the IDs and titles of its
+  course, chapter and exercise, its number in the exercise and the
+  statement
+- ``choices``: one row per choice with the ``question_id`` of its question,
+  its number and text
+
+The tables are written as Parquet or Arrow IPC files in
+``OUTPUT_DIR/COLUMNAR_DIR``. Titles repeat on every question, so their
+columns are dictionary-encoded. load_tables() reads them back as pyarrow
+tables, which compute counts, length distributions and joins without a
+Python loop.
+
+Requires pyarrow (``uv sync --extra columnar``).
+
+    uv run python -m src.columnar
+    uv run python -m src.columnar --format arrow
+"""
+
+import argparse
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from .config import Config
+from .models import Course
+from .summary import find_summary, read_summary
+
+FORMATS = ("parquet", "arrow")
+TABLES = ("questions", "choices")
+
+
+def _pyarrow() -> Any:
+    """Import pyarrow with its Parquet and IPC modules.
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Columnar export requires pyarrow (the columnar extra)") from e
+    return pyarrow
+
+
+def _schemas(pa: Any) -> dict[str, Any]:
+    """Build the schemas of the tables."""
+    title = pa.dictionary(pa.int32(), pa.string())
+    return {
+        "questions": pa.schema(
+            [
+                ("question_id", pa.int64()),
+                ("course_id", pa.int64()),
+                ("course_title", title),
+                ("chapter_id", pa.int64()),
+                ("chapter_title", title),
+                ("exercise_id", pa.int64()),
+                ("exercise_title", title),
+                ("question_number", pa.int32()),
+                ("statement", pa.string()),
+            ]
+        ),
+        "choices": pa.schema(
+            [
+                ("question_id", pa.int64()),
+                ("number", pa.int32()),
+                ("text", pa.string()),
+            ]
+        ),
+    }
+
+
+def question_tables(courses: Iterable[Course]) -> dict[str, Any]:
+    """Flatten courses into the questions and choices tables.
+
+    Args:
+        courses: Courses, e.g. ExerciseCollection.courses or read_summary()
+
+    Returns:
+        pyarrow tables by name ("questions" and "choices"); question_id
+        numbers the questions in course order
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    pa = _pyarrow()
+    schemas = _schemas(pa)
+    columns = {name: {field: [] for field in schemas[name].names} for name in TABLES}
+    questions, choices = columns["questions"], columns["choices"]
+
+    question_id = 0
+    for course in courses:
+        for chapter in course.chapters:
+            for exercise in chapter.exercises:
+                for number, question in enumerate(exercise.questions, 1):
+                    questions["question_id"].append(question_id)
+                    questions["course_id"].append(course.course_id)
+                    questions["course_title"].append(course.course_title)
+                    questions["chapter_id"].append(chapter.chapter_id)
+                    questions["chapter_title"].append(chapter.chapter_title)
+                    questions["exercise_id"].append(exercise.exercise_id)
+                    questions["exercise_title"].append(exercise.exercise_title)
+                    questions["question_number"].append(number)
+                    questions["statement"].append(question.statement)
+                    for choice in question.choices:
+                        choices["question_id"].append(question_id)
+                        choices["number"].append(choice.number)
+                        choices["text"].append(choice.text)
+                    question_id += 1
+
+    return {name: pa.table(columns[name], schema=schemas[name]) for name in TABLES}
+
+
+def _table_path(directory: Path, name: str, fmt: str) -> Path:
+    """Path of a table file."""
+    return directory / f"{name}.{fmt}"
+
+
+def write_tables(
+    courses: Iterable[Course], directory: Path | str | None = None, fmt: str | None = None
+) -> dict[str, Path]:
+    """Export courses as Parquet or Arrow IPC tables.
+
+    Each file is written under a temporary name and moved into place, so a
+    failed export leaves the previous tables intact.
+
+    Args:
+        courses: Courses to export
+        directory: Output directory (defaults to COLUMNAR_DIR in the output
+            directory)
+        fmt: One of FORMATS (defaults to Config.COLUMNAR_FORMAT)
+
+    Returns:
+        Written files by table name
+
+    Raises:
+        ValueError: If the format is unknown
+        RuntimeError: If pyarrow is not installed
+    """
+    fmt = fmt or Config.COLUMNAR_FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown table format: {fmt}")
+    pa = _pyarrow()
+    directory = Path(directory or Path(Config.OUTPUT_DIR) / Config.COLUMNAR_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    paths = {}
+    for name, table in question_tables(courses).items():
+        path = _table_path(directory, name, fmt)
+        tmp_path = path.with_name(path.name + ".tmp")
+        if fmt == "parquet":
+            pa.parquet.write_table(table, tmp_path, compression=Config.COLUMNAR_COMPRESSION)
+        else:
+            with pa.OSFile(str(tmp_path), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        os.replace(tmp_path, path)
+        paths[name] = path
+    return paths
+
+
+def load_tables(directory: Path | str | None = None, fmt: str | None = None) -> dict[str, Any]:
+    """Load the tables written by write_tables().
+
+    Arrow IPC files are memory-mapped, so loading them copies nothing.
+
+    Args:
+        directory: Directory of the tables (defaults to COLUMNAR_DIR in the
+            output directory)
+        fmt: One of FORMATS (defaults to Config.COLUMNAR_FORMAT)
+
+    Returns:
+        pyarrow tables by name ("questions" and "choices")
+
+    Raises:
+        ValueError: If the format is unknown
+        RuntimeError: If pyarrow is not installed
+    """
+    fmt = fmt or Config.COLUMNAR_FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown table format: {fmt}")
+    pa = _pyarrow()
+    directory = Path(directory or Path(Config.OUTPUT_DIR) / Config.COLUMNAR_DIR)
+
+    tables = {}
+    for name in TABLES:
+        path = _table_path(directory, name, fmt)
+        if fmt == "parquet":
+            tables[name] = pa.parquet.read_table(path, memory_map=True)
+        else:
+            tables[name] = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    return tables
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv: Argument list (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="サマリーの問題を分析用の表 (Parquet / Arrow) に書き出します"
+    )
+    parser.add_argument(
+        "--summary",
+        type=Path,
+        default=None,
+        help=f"読み込むサマリー (デフォルト: {Config.OUTPUT_DIR} の最新の summary.json / .jsonl)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default=Config.COLUMNAR_FORMAT,
+        help=f"表の形式 (デフォルト: {Config.COLUMNAR_FORMAT})",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help=f"出力先ディレクトリ (デフォルト: {Config.OUTPUT_DIR}/{Config.COLUMNAR_DIR})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Export the summary as columnar tables."""
+    args = parse_args(argv)
+    summary_path = args.summary or find_summary()
+    if summary_path is None:
+        print(f"{Config.OUTPUT_DIR} にサマリーがありません。先に取得を実行してください。")
+        return
+    try:
+        paths = write_tables(read_summary(summary_path), args.output, args.format)
+    except RuntimeError as e:
+        print(f"エラー: {e}")
+        print("uv sync --extra columnar で pyarrow をインストールしてください。")
+        return
+
+    tables = load_tables(paths["questions"].parent, args.format)
+    print(f"{summary_path} の問題を書き出しました")
+    for name, path in paths.items():
+        print(f"  {path} ({tables[name].num_rows} 行)")
+
+
+if __name__ == "__main__":
+    main()
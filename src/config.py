@@ -1,14 +1,25 @@
 """Configuration management for ZEN Study scraper."""
 
+import functools
 import os
 import sys
 from pathlib import Path
 
-from dotenv import load_dotenv
-
-# Load .env file from project root
+# .env file in the project root
 env_path = Path(__file__).parent.parent / ".env"
-load_dotenv(dotenv_path=env_path)
+
+
+@functools.cache
+def load_env() -> None:
+    """Load the .env file into the environment, once.
+
+    Only commands that talk to ZEN Study need it, so python-dotenv is
+    imported on first use. Variables already set in the environment are
+    kept.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=env_path)
 
 
 class Config:
@@ -30,12 +41,103 @@ class Config:
     # Content type
     CONTENT_TYPE = "zen_univ"
 
+    # Courses requested per page of the enrolled course list
+    COURSES_PAGE_SIZE = 20
+
     # Output directory
     OUTPUT_DIR = "output"
     OUTPUT_FILE = "exercises.json"
+    SUMMARY_FORMAT = "json"  # json (summary.json) or jsonl (summary.jsonl)
+    QUESTION_STORE = "files"  # files (one JSON file per question), sqlite or cas
+    QUESTION_DB_FILE = "questions.sqlite3"  # inside OUTPUT_DIR
+    QUESTION_CAS_FILE = "question_objects.sqlite3"  # inside OUTPUT_DIR, for the cas store
+    SEARCH_INDEX_DIR = "search_index"  # inside OUTPUT_DIR
+    SEARCH_MAX_SEGMENTS = 8  # merge the index segments when there are more
+    DUPLICATES_FILE = "duplicates.sqlite3"  # inside OUTPUT_DIR
+    DUPLICATES_REPORT = "duplicates.json"  # inside OUTPUT_DIR
+    DUPLICATE_THRESHOLD = 0.8  # shingle Jaccard similarity of near-duplicate statements
+    MINHASH_BANDS = 16  # LSH bands of MINHASH_ROWS signature values each
+    MINHASH_ROWS = 8
+    JOURNAL_FILE = "crawl_journal.sqlite3"  # inside OUTPUT_DIR
+    # Incremental crawl: units recorded longer ago than this are fetched
+    # again even if their metadata is unchanged
+    PLAN_MAX_AGE = 7 * 24 * 60 * 60
+    # Metadata fields that change without the content changing, left out of
+    # the fingerprints that decide what an incremental crawl fetches
+    PLAN_IGNORED_FIELDS = ()
+    WATCH_INTERVAL = 10 * 60  # seconds between two polls of the course list
+    PAGE_ARCHIVE_DIR = "page_archive"  # inside OUTPUT_DIR, exercise pages for reparse
+    ARCHIVE_CODEC = "zstd"  # zstd (falls back to zlib without zstandard) or zlib
+    ARCHIVE_LEVEL = 9  # compression level (zlib 1-9, zstd 1-22)
+    ARCHIVE_DICT_SIZE = 64 * 1024  # bytes; zlib uses at most the last 32 KiB
+    ARCHIVE_TRAIN_PAGES = 64  # pages archived before the first dictionary is trained
+    ARCHIVE_TRAIN_SAMPLES = 1000  # pages the dictionary is trained on when compacting
+    COLUMNAR_DIR = "tables"  # inside OUTPUT_DIR, questions and choices for analytics
+    COLUMNAR_FORMAT = "parquet"  # parquet or arrow (Arrow IPC, memory-mapped on load)
+    COLUMNAR_COMPRESSION = "zstd"  # Parquet compression codec
+
+    # HTML parser engine (bs4, bs4-strainer, lxml, selectolax)
+    PARSER_ENGINE = "bs4"
 
     # Rate limiting
-    REQUEST_DELAY = 0.1  # seconds between requests
+    REQUESTS_PER_SECOND = 10.0  # sustained request rate across all clients
+    RATE_BURST = 5  # requests allowed back to back
+
+    # HTTP transport
+    HTTP2 = True  # used when the h2 package is installed (uv sync --extra net)
+    # Content encodings offered to the server, preferred first. zstd and br
+    # are only offered when their decoder is installed.
+    ACCEPT_ENCODINGS = ("zstd", "br", "gzip", "deflate")
+    POOL_CONNECTIONS = 4  # connections kept by the sequential client
+    KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection is kept open
+
+    # Retries of throttled (429), failed (5xx) and timed out requests
+    MAX_RETRIES = 4
+    RETRY_BACKOFF = 1.0  # seconds before the first retry, doubled per attempt
+    RETRY_BACKOFF_MAX = 60.0
+    RETRY_AFTER_MAX = 300.0  # longest Retry-After honored, in seconds
+
+    # Adaptive request rate (--adaptive-rate)
+    ADAPTIVE_MIN_RATE = 1.0  # requests per second
+    ADAPTIVE_MAX_RATE = 50.0
+    ADAPTIVE_INCREASE = 1.0  # requests per second added per second of healthy responses
+    ADAPTIVE_DECREASE = 0.5  # rate multiplier on a throttling signal
+    ADAPTIVE_LATENCY_TOLERANCE = 3.0  # latency over this multiple of the usual one is congestion
+
+    # Response cache
+    CACHE_DIR = ".cache"
+    CACHE_MAX_BYTES = 512 * 1024 * 1024
+    # (URL path pattern, seconds) pairs; entries older than their TTL are
+    # revalidated with If-None-Match / If-Modified-Since
+    CACHE_TTLS = (
+        (r"/v3/dashboard/my_courses$", 5 * 60),
+        (r"/v2/material/courses/\d+$", 24 * 60 * 60),
+        (r"/v2/material/courses/\d+/chapters/\d+$", 60 * 60),
+    )
+    CACHE_DEFAULT_TTL = 60 * 60  # exercise pages
+
+    # Concurrent crawl
+    MAX_CONCURRENCY = 8  # requests in flight across all hosts
+    PER_HOST_CONCURRENCY = 4  # requests in flight per host
+    CONCURRENT_LOOK_AHEAD = 32  # exercise pages fetched ahead of the writer
+
+    # Pipeline crawl
+    PIPELINE_FETCH_WORKERS = 4  # threads downloading exercise pages
+    PIPELINE_QUEUE_SIZE = 32  # capacity of each queue between stages
+
+    # Crawl with several worker processes (python -m src.workqueue)
+    WORK_QUEUE_FILE = "work_queue.sqlite3"  # inside OUTPUT_DIR
+    WORK_LEASE_SECONDS = 120.0  # a unit not acknowledged in time is leased again
+    WORK_MAX_ATTEMPTS = 3  # leases of a unit before it is given up
+    WORK_POLL_SECONDS = 0.5  # wait of an idle worker for units other workers may add
+
+    # Profiling (--profile)
+    PROFILE_FILE = "crawl_profile.json"  # Chrome trace, inside OUTPUT_DIR
+
+    # Progress display (--progress)
+    PROGRESS_MODE = "live"  # live (counts, rates and ETA), quiet (problems only) or jsonl
+    PROGRESS_INTERVAL = 0.5  # seconds between redraws of the live display on a terminal
+    PROGRESS_LOG_INTERVAL = 10.0  # seconds between live progress lines when not on a terminal
 
     @classmethod
     def get_session_cookie(cls) -> str:
@@ -47,6 +149,7 @@ class Config:
         Raises:
             SystemExit: If ZANE_SESSION environment variable is not set
         """
+        load_env()
         session = os.environ.get("ZANE_SESSION")
         if not session:
             print("エラー: 環境変数 ZANE_SESSION が設定されていません。")
@@ -0,0 +1,985 @@
+"""Crawl traversal helpers and the concurrent crawl engine."""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Iterable, Iterator
+from contextlib import aclosing
+from typing import Any
+
+import httpx
+
+from .archive import PageArchive
+from .cache import ResponseCache, page_digest
+from .client import AsyncZenStudyClient, AuthenticationError
+from .config import Config
+from .duplicates import DuplicateFinder
+from .journal import CrawlJournal, metadata_fingerprint
+from .models import Chapter, Course, Exercise, ExerciseCollection, Question
+from .parser import ExerciseParser
+from .progress import ProgressReporter
+from .ratelimit import TokenBucket
+from .search import SearchIndex
+from .storage import FileQuestionStore, SqliteQuestionStore
+from .summary import SummaryTotals, SummaryWriter
+from .telemetry import Telemetry
+
+
+def normalize_exercise_url(content_url: str) -> str:
+    """Remove /result from exercise URL if present.
+
+    Args:
+        content_url: Original content URL
+
+    Returns:
+        Normalized URL without /result
+    """
+    return content_url.replace("/result", "")
+
+
+def is_ondemand_course(course_title: str) -> bool:
+    """Check if course is an on-demand course.
+
+    Args:
+        course_title: Course title
+
+    Returns:
+        True if the course is on-demand (contains 'オンデマンド')
+    """
+    return "オンデマンド" in course_title
+
+
+def select_ondemand_courses(
+    my_courses_response: dict[str, Any], seen: set[Any] | None = None
+) -> list[dict[str, Any]]:
+    """Extract on-demand courses from a my_courses response.
+
+    A course listed more than once (in several services, or on several
+    pages when ``seen`` is shared) is selected only the first time.
+
+    Args:
+        my_courses_response: Response of the my_courses API
+        seen: IDs of courses selected before; selected IDs are added to it
+
+    Returns:
+        Course dictionaries in API order
+    """
+    seen = set() if seen is None else seen
+    selected = []
+
+    # Extract courses from services array
+    for service in my_courses_response.get("services", []):
+        for course in service.get("courses", []):
+            if not is_ondemand_course(course.get("title", "")) or course.get("id") in seen:
+                continue
+            seen.add(course.get("id"))
+            selected.append(course)
+
+    return selected
+
+
+def ondemand_course_pages(pages: Iterable[dict[str, Any]]) -> Iterator[list[dict[str, Any]]]:
+    """Select the on-demand courses of each page of the course list.
+
+    Args:
+        pages: my_courses responses, e.g. from ZenStudyClient.iter_my_courses()
+
+    Yields:
+        Courses first listed on each page, in API order
+    """
+    seen: set[Any] = set()
+    for page in pages:
+        yield select_ondemand_courses(page, seen)
+
+
+async def ondemand_course_pages_async(
+    pages: AsyncIterator[dict[str, Any]],
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """Select the on-demand courses of each page of the course list.
+
+    Args:
+        pages: my_courses responses, e.g. from
+            AsyncZenStudyClient.iter_my_courses()
+
+    Yields:
+        Courses first listed on each page, in API order
+    """
+    seen: set[Any] = set()
+    async with aclosing(pages):
+        async for page in pages:
+            yield select_ondemand_courses(page, seen)
+
+
+def iter_ondemand_courses(
+    pages: Iterable[dict[str, Any]], recorder: "CrawlRecorder"
+) -> Iterator[dict[str, Any]]:
+    """Iterate over the on-demand courses of all pages of the course list.
+
+    Args:
+        pages: my_courses responses
+        recorder: Recorder to announce the courses found on each page to
+
+    Yields:
+        Course dictionaries in API order
+    """
+    for number, courses in enumerate(ondemand_course_pages(pages)):
+        recorder.announce_courses(len(courses), more=number > 0)
+        yield from courses
+
+
+def extract_chapters(course_info: dict[str, Any]) -> list[dict[str, Any]]:
+    """Extract the chapter list from a course information response.
+
+    Args:
+        course_info: Response of the course information API
+
+    Returns:
+        Chapter dictionaries in API order
+    """
+    return course_info.get("course", {}).get("chapters", [])
+
+
+def extract_exercises(chapter_info: dict[str, Any]) -> list[dict[str, Any]]:
+    """Extract exercise sections from a chapter information response.
+
+    Args:
+        chapter_info: Response of the chapter information API
+
+    Returns:
+        Exercise section dictionaries in API order
+    """
+    sections = chapter_info.get("chapter", {}).get("sections", [])
+    return [s for s in sections if s.get("resource_type") == "exercise"]
+
+
+def parse_exercise(
+    html: str,
+    cache: ResponseCache | None = None,
+    telemetry: Telemetry | None = None,
+) -> list[Question]:
+    """Parse an exercise page, reusing the cached result for an unchanged page.
+
+    Args:
+        html: HTML content of exercise page
+        cache: Response cache holding earlier parse results
+        telemetry: Collector to record the parse time in
+
+    Returns:
+        List of Question objects
+    """
+    engine = ExerciseParser.default_engine
+    started = time.monotonic()
+    cached = False
+    if cache is None:
+        questions = ExerciseParser.parse_exercise_html(html, engine)
+    else:
+        digest = page_digest(html)
+        questions = cache.get_parsed(digest, ExerciseParser.VERSION, engine)
+        cached = questions is not None
+        if not cached:
+            questions = ExerciseParser.parse_exercise_html(html, engine)
+            cache.put_parsed(digest, ExerciseParser.VERSION, engine, questions)
+
+    if telemetry is not None:
+        telemetry.record(
+            "parse",
+            "parse",
+            started,
+            time.monotonic() - started,
+            engine=engine,
+            cached=cached,
+            questions=len(questions),
+        )
+    return questions
+
+
+class CrawlRecorder:
+    """Record crawl results in traversal order.
+
+    The recorder saves questions to a store and assembles the
+    ExerciseCollection. Every crawl mode reports courses, chapters and
+    exercises to it in API order, so the output does not depend on the order
+    in which responses arrive.
+
+    With a journal, finished units are recorded as they complete, and units
+    recorded by an earlier run are restored from it by the resume_* methods
+    instead of being crawled again.
+
+    With a summary writer, each finished course is written to the summary
+    and released instead of being kept in the collection, so memory use does
+    not grow with the number of courses. ``totals`` counts the recorded
+    courses either way.
+
+    With telemetry, the recorder records a span for every crawled course
+    and chapter and the time spent saving each exercise. Crawl modes pass
+    the same collector to their clients.
+
+    With a search index, the questions of every finished course are added
+    to it, so new questions are searchable as soon as their course is done.
+    A duplicate finder is fed finished courses the same way.
+
+    With a page archive, crawl modes hand every fetched exercise page to
+    record_page(), which archives it with its place in the crawl.
+
+    With a progress reporter, every unit is reported to it as an event; the
+    reporter writes them from its own thread, so recording never waits for
+    the terminal. Without one, nothing is printed.
+    """
+
+    def __init__(
+        self,
+        journal: CrawlJournal | None = None,
+        summary: SummaryWriter | None = None,
+        store: FileQuestionStore | SqliteQuestionStore | None = None,
+        telemetry: Telemetry | None = None,
+        index: SearchIndex | None = None,
+        duplicates: DuplicateFinder | None = None,
+        archive: PageArchive | None = None,
+        progress: ProgressReporter | None = None,
+    ):
+        """Initialize the recorder.
+
+        Args:
+            journal: Journal to record finished units in and resume from
+            summary: Writer to stream finished courses to
+            store: Store to save questions in (defaults to one file per
+                question)
+            telemetry: Collector to record crawl timings in
+            index: Search index to add finished courses to
+            duplicates: Near-duplicate finder to add finished courses to
+            archive: Archive to keep the fetched exercise pages in
+            progress: Reporter to report courses, chapters and exercises to
+        """
+        self.collection = ExerciseCollection()
+        self.journal = journal
+        self.summary = summary
+        self.store = store or FileQuestionStore()
+        self.telemetry = telemetry
+        self.index = index
+        self.duplicates = duplicates
+        self.archive = archive
+        self.progress = progress
+        self.totals = summary.totals if summary is not None else SummaryTotals()
+        self._course: Course | None = None
+        self._chapter: Chapter | None = None
+        self._course_data: dict[str, Any] = {}
+        self._chapter_data: dict[str, Any] = {}
+        self._course_position = 0
+        self._chapter_position = 0
+        self._exercise_data: dict[str, Any] = {}
+        self._exercise_index = 0
+        # IDs the current course and chapter have, restored ones included
+        self._chapter_ids: list[int] = []
+        self._exercise_ids: list[int] = []
+        self._exercise_total = 0
+        self._course_failed = False
+        self._chapter_failed = False
+        self._course_started = 0.0
+        self._chapter_started = 0.0
+
+    def announce_courses(self, count: int, more: bool = False) -> None:
+        """Report the on-demand courses found on a page of the course list.
+
+        Args:
+            count: Number of courses first listed on the page
+            more: Whether this is a later page
+        """
+        self._report("courses", count=count, more=more)
+
+    def _report(self, event: str, **fields: Any) -> None:
+        """Hand an event to the progress reporter, if there is one."""
+        if self.progress is not None:
+            self.progress.emit(event, **fields)
+
+    @property
+    def incremental(self) -> bool:
+        """Whether units are restored only while their metadata is unchanged.
+
+        Clients of an incremental crawl revalidate cached responses, since a
+        fresh cache entry would hide the change that made the crawl descend.
+        """
+        return self.journal is not None and self.journal.incremental
+
+    def is_course_done(self, course_data: dict[str, Any]) -> bool:
+        """Check whether a course can be restored from the journal.
+
+        Args:
+            course_data: Course dictionary from the my_courses API
+        """
+        return self.journal is not None and self.journal.is_course_complete(
+            course_data.get("id"), metadata_fingerprint(course_data)
+        )
+
+    def is_chapter_done(
+        self, course_id: int, chapter_data: dict[str, Any], position: int
+    ) -> bool:
+        """Check whether a chapter can be restored from the journal.
+
+        Args:
+            course_id: Course ID
+            chapter_data: Chapter dictionary from the course information API
+            position: Position of the chapter in its course (1-indexed)
+        """
+        return self.journal is not None and self.journal.is_chapter_complete(
+            course_id, chapter_data.get("id"), metadata_fingerprint(chapter_data, position)
+        )
+
+    def is_exercise_done(
+        self, course_id: int, chapter_id: int, exercise_data: dict[str, Any], index: int
+    ) -> bool:
+        """Check whether an exercise can be restored from the journal.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+            exercise_data: Section dictionary from the chapter information API
+            index: Exercise index in chapter (1-indexed)
+        """
+        return self.journal is not None and self.journal.is_exercise_complete(
+            course_id,
+            chapter_id,
+            exercise_data.get("id"),
+            metadata_fingerprint(exercise_data, index),
+        )
+
+    def restore_course(self, course_data: dict[str, Any]) -> None:
+        """Restore a course completed by an earlier run from the journal.
+
+        Args:
+            course_data: Course dictionary from the my_courses API
+        """
+        self._course_position += 1
+        course = self.journal.load_course(course_data.get("id"))
+        if self.progress is not None:
+            self._report_restored("course", course.course_id, course.course_title, course.chapters)
+        if course.chapters:
+            self._add_course(course)
+
+    def _report_restored(
+        self, unit: str, unit_id: int, title: str, chapters: list[Chapter]
+    ) -> None:
+        """Report a course or chapter restored from the journal."""
+        exercises = [exercise for chapter in chapters for exercise in chapter.exercises]
+        self._report(
+            "restored",
+            unit=unit,
+            id=unit_id,
+            title=title,
+            exercises=len(exercises),
+            questions=sum(len(exercise.questions) for exercise in exercises),
+        )
+
+    def restore_chapter(self, chapter_data: dict[str, Any]) -> None:
+        """Restore a chapter of the current course from the journal.
+
+        Args:
+            chapter_data: Chapter dictionary from the course information API
+        """
+        self._chapter_position += 1
+        self._chapter_ids.append(chapter_data.get("id"))
+        chapter = self.journal.load_chapter(self._course.course_id, chapter_data.get("id"))
+        if self.progress is not None:
+            self._report_restored("chapter", chapter.chapter_id, chapter.chapter_title, [chapter])
+        if chapter.exercises:
+            self._course.chapters.append(chapter)
+
+    def restore_exercise(self) -> None:
+        """Restore the current exercise from the journal."""
+        exercise_id = self._exercise_data.get("id")
+        questions = self.journal.load_exercise(
+            self._course.course_id, self._chapter.chapter_id, exercise_id
+        )
+        self._report(
+            "restored",
+            unit="exercise",
+            id=exercise_id,
+            title=self._exercise_data.get("title", ""),
+            exercises=1,
+            questions=len(questions),
+        )
+        if questions:
+            self._chapter.exercises.append(
+                Exercise(
+                    exercise_id=exercise_id,
+                    exercise_title=self._exercise_data.get("title", ""),
+                    questions=questions,
+                )
+            )
+
+    def resume_course(self, course_data: dict[str, Any]) -> bool:
+        """Restore a course from the journal if it was completed before.
+
+        Args:
+            course_data: Course dictionary from the my_courses API
+
+        Returns:
+            True if the course was restored and must not be crawled
+        """
+        if not self.is_course_done(course_data):
+            return False
+        self.restore_course(course_data)
+        return True
+
+    def resume_chapter(self, chapter_data: dict[str, Any]) -> bool:
+        """Restore a chapter of the current course if it was completed before.
+
+        Args:
+            chapter_data: Chapter dictionary from the course information API
+
+        Returns:
+            True if the chapter was restored and must not be crawled
+        """
+        if not self.is_chapter_done(
+            self._course.course_id, chapter_data, self._chapter_position + 1
+        ):
+            return False
+        self.restore_chapter(chapter_data)
+        return True
+
+    def resume_exercise(self) -> bool:
+        """Restore the current exercise if it was recorded before.
+
+        Returns:
+            True if the exercise was restored and must not be crawled
+        """
+        if not self.is_exercise_done(
+            self._course.course_id,
+            self._chapter.chapter_id,
+            self._exercise_data,
+            self._exercise_index,
+        ):
+            return False
+        self.restore_exercise()
+        return True
+
+    def start_course(self, course_data: dict[str, Any]) -> None:
+        """Begin recording a course.
+
+        Args:
+            course_data: Course dictionary from the my_courses API
+        """
+        course_title = course_data.get("title", "")
+        self._report("course", course_id=course_data.get("id"), title=course_title)
+        self._course = Course(course_id=course_data.get("id"), course_title=course_title)
+        self._course_data = course_data
+        self._course_position += 1
+        self._chapter_position = 0
+        self._chapter_ids = []
+        self._course_failed = False
+        self._course_started = time.monotonic()
+
+    def start_chapter(self, chapter_data: dict[str, Any], position: int | None = None) -> None:
+        """Begin recording a chapter of the current course.
+
+        Args:
+            chapter_data: Chapter dictionary from the course information API
+            position: Position of the chapter in its course (1-indexed,
+                defaults to the one after the previous chapter)
+        """
+        chapter_title = chapter_data.get("title", "")
+        self._report(
+            "chapter",
+            course_id=self._course.course_id,
+            chapter_id=chapter_data.get("id"),
+            title=chapter_title,
+        )
+        self._chapter = Chapter(chapter_id=chapter_data.get("id"), chapter_title=chapter_title)
+        self._chapter_data = chapter_data
+        self._chapter_position = position or self._chapter_position + 1
+        self._chapter_ids.append(chapter_data.get("id"))
+        self._exercise_ids = []
+        self._chapter_failed = False
+        self._chapter_started = time.monotonic()
+
+    def start_exercise(self, index: int, total: int, exercise_data: dict[str, Any]) -> None:
+        """Begin recording an exercise of the current chapter.
+
+        Args:
+            index: Exercise index in chapter (1-indexed)
+            total: Number of exercises in chapter
+            exercise_data: Section dictionary from the chapter information API
+        """
+        self._report(
+            "exercise",
+            course_id=self._course.course_id,
+            chapter_id=self._chapter.chapter_id,
+            exercise_id=exercise_data.get("id"),
+            title=exercise_data.get("title", ""),
+            index=index,
+            total=total,
+        )
+        self._exercise_data = exercise_data
+        self._exercise_index = index
+        self._exercise_total = total
+        self._exercise_ids.append(exercise_data.get("id"))
+
+    def record_page(self, html: str) -> None:
+        """Archive the page of the current exercise, if pages are archived.
+
+        Args:
+            html: HTML content of the exercise page
+        """
+        if self.archive is not None:
+            self.archive.add(
+                html,
+                self._course_data,
+                self._chapter_data,
+                self._exercise_data,
+                self._course_position,
+                self._chapter_position,
+                self._exercise_index,
+                self._exercise_total,
+            )
+
+    def record_questions(self, questions: list[Question]) -> None:
+        """Save the questions of the current exercise.
+
+        Args:
+            questions: Questions parsed from the exercise page
+        """
+        course = self._course
+        chapter = self._chapter
+        exercise_id = self._exercise_data.get("id")
+        exercise_title = self._exercise_data.get("title", "")
+
+        if not questions:
+            self._report("empty", exercise_id=exercise_id, title=exercise_title)
+        else:
+            started = time.monotonic()
+            try:
+                # Save the questions immediately
+                names = self.store.save_exercise(
+                    course,
+                    chapter,
+                    self._chapter_position,
+                    exercise_id,
+                    exercise_title,
+                    self._exercise_index,  # Use 1-indexed value
+                    questions,
+                )
+            except Exception as e:
+                self.record_error(e)
+                return
+            if self.telemetry is not None:
+                self.telemetry.record(
+                    "write",
+                    "write",
+                    started,
+                    time.monotonic() - started,
+                    exercise_id=exercise_id,
+                    questions=len(questions),
+                )
+
+            self._report(
+                "saved", exercise_id=exercise_id, questions=len(questions), files=list(names)
+            )
+
+            # Still keep in memory for final summary
+            chapter.exercises.append(
+                Exercise(
+                    exercise_id=exercise_id,
+                    exercise_title=exercise_title,
+                    questions=questions,
+                )
+            )
+
+        if self.journal is not None:
+            self.journal.record_exercise(
+                course.course_id,
+                chapter.chapter_id,
+                exercise_id,
+                exercise_title,
+                self._exercise_index,
+                questions,
+                metadata_fingerprint(self._exercise_data, self._exercise_index),
+            )
+
+    def record_error(self, error: Exception) -> None:
+        """Report that the current exercise could not be fetched or parsed.
+
+        The exercise is not journaled, so a resumed crawl retries it.
+
+        Args:
+            error: The exception that was raised
+        """
+        self._report(
+            "error",
+            exercise_id=self._exercise_data.get("id"),
+            title=self._exercise_data.get("title", ""),
+            message=str(error),
+        )
+        self._chapter_failed = True
+
+    def record_unit_error(self, error: Exception) -> None:
+        """Report that the current chapter or course could not be crawled at all.
+
+        The chapter is reported while one is being recorded, the course
+        otherwise. The unit is not journaled, so a resumed crawl retries it.
+
+        Args:
+            error: The exception that was raised
+        """
+        data = self._chapter_data if self._chapter is not None else self._course_data
+        self._report("error", exercise_id=None, title=data.get("title", ""), message=str(error))
+        if self._chapter is not None:
+            self._chapter_failed = True
+        else:
+            self._course_failed = True
+
+    def finish_chapter(self) -> None:
+        """Finish the current chapter."""
+        if self.telemetry is not None:
+            self.telemetry.record(
+                "chapter",
+                self._chapter.chapter_title,
+                self._chapter_started,
+                time.monotonic() - self._chapter_started,
+                chapter_id=self._chapter.chapter_id,
+                exercises=len(self._chapter.exercises),
+            )
+
+        if self._chapter.exercises:
+            self._course.chapters.append(self._chapter)
+
+        if self._chapter_failed:
+            self._course_failed = True
+        elif self.journal is not None:
+            self.journal.complete_chapter(
+                self._course.course_id,
+                self._chapter.chapter_id,
+                self._chapter.chapter_title,
+                self._chapter_position,
+                metadata_fingerprint(self._chapter_data, self._chapter_position),
+                self._exercise_ids,
+            )
+        self._chapter = None
+
+    def _add_course(self, course: Course) -> None:
+        """Hand a course with exercises to the summary or the collection."""
+        if self.index is not None:
+            self.index.add_course(course)
+        if self.duplicates is not None:
+            self.duplicates.add_course(course)
+        if self.summary is not None:
+            self.summary.write_course(course)
+        else:
+            self.totals.add_course(course)
+            self.collection.courses.append(course)
+
+    def finish_course(self) -> None:
+        """Finish the current course."""
+        if self.telemetry is not None:
+            self.telemetry.record(
+                "course",
+                self._course.course_title,
+                self._course_started,
+                time.monotonic() - self._course_started,
+                course_id=self._course.course_id,
+                chapters=len(self._course.chapters),
+            )
+            self.telemetry.sample_memory(self._course.course_title)
+
+        if self._course.chapters:
+            self._add_course(self._course)
+
+        if not self._course_failed and self.journal is not None:
+            self.journal.complete_course(
+                self._course.course_id,
+                self._course.course_title,
+                metadata_fingerprint(self._course_data),
+                self._chapter_ids,
+            )
+        self._report(
+            "course_done",
+            course_id=self._course.course_id,
+            title=self._course.course_title,
+            chapters=len(self._course.chapters),
+        )
+        self._course = None
+
+
+async def _settle(awaitable: Awaitable[Any]) -> Any:
+    """Await a fetch, returning the error instead of raising it.
+
+    Errors are handed to the recorder in API order rather than aborting the
+    task group, so that everything before the failing unit is still recorded.
+    This includes an authentication failure, which then ends the crawl.
+    """
+    try:
+        return await awaitable
+    except asyncio.CancelledError:
+        raise
+    except BaseException as e:
+        return e
+
+
+async def _fetch_exercise_html(
+    client: AsyncZenStudyClient, exercise_data: dict[str, Any]
+) -> str | BaseException:
+    """Fetch an exercise page, returning the error instead of raising it."""
+    exercise_url = normalize_exercise_url(exercise_data.get("content_url", ""))
+    return await _settle(client.get_exercise_html(exercise_url))
+
+
+async def _schedule(
+    client: AsyncZenStudyClient,
+    tg: asyncio.TaskGroup,
+    recorder: CrawlRecorder,
+    pages: AsyncIterator[list[dict[str, Any]]],
+    window: asyncio.Semaphore,
+    events: asyncio.Queue,
+    tasks: list[asyncio.Task],
+) -> None:
+    """Walk the crawl in API order and queue its units for the recorder.
+
+    Course information is requested for all courses of a page of the course
+    list up front (the next page is prefetched meanwhile) and chapter
+    information for a whole course at once. Each exercise page takes a
+    ``window`` slot before its fetch is started, and the recorder releases
+    the slot once it has consumed the page, so only a bounded number of
+    pages is fetched ahead of the recorder. Units the recorder can restore
+    from its journal are not fetched.
+    """
+
+    def spawn(awaitable: Awaitable[Any]) -> asyncio.Task:
+        task = tg.create_task(_settle(awaitable))
+        tasks.append(task)
+        return task
+
+    try:
+        more = False
+        async for courses in pages:
+            events.put_nowait(("courses", len(courses), more))
+            more = True
+
+            course_tasks = [
+                None
+                if recorder.is_course_done(course_data)
+                else spawn(client.get_course_info(course_data.get("id")))
+                for course_data in courses
+            ]
+
+            for course_data, course_task in zip(courses, course_tasks):
+                course_id = course_data.get("id")
+                if course_task is None:
+                    events.put_nowait(("course", course_data, True))
+                    continue
+                events.put_nowait(("course", course_data, False))
+
+                course_info = await course_task
+                if isinstance(course_info, BaseException):
+                    events.put_nowait(("error", course_info))
+                    return
+
+                chapters = [
+                    (
+                        chapter_data,
+                        None
+                        if recorder.is_chapter_done(course_id, chapter_data, position)
+                        else spawn(
+                            client.get_chapter_info(course_id, chapter_data.get("id"))
+                        ),
+                    )
+                    for position, chapter_data in enumerate(extract_chapters(course_info), 1)
+                ]
+
+                for chapter_data, chapter_task in chapters:
+                    chapter_id = chapter_data.get("id")
+                    if chapter_task is None:
+                        events.put_nowait(("chapter", chapter_data, True))
+                        continue
+                    events.put_nowait(("chapter", chapter_data, False))
+
+                    chapter_info = await chapter_task
+                    if isinstance(chapter_info, BaseException):
+                        events.put_nowait(("error", chapter_info))
+                        return
+
+                    exercises = extract_exercises(chapter_info)
+                    for idx, exercise_data in enumerate(exercises, 1):
+                        if recorder.is_exercise_done(course_id, chapter_id, exercise_data, idx):
+                            html_task = None
+                        else:
+                            await window.acquire()
+                            html_task = tg.create_task(
+                                _fetch_exercise_html(client, exercise_data)
+                            )
+                            tasks.append(html_task)
+                        events.put_nowait(
+                            ("exercise", exercise_data, idx, len(exercises), html_task)
+                        )
+
+                    events.put_nowait(("chapter_end",))
+
+                events.put_nowait(("course_end",))
+    except asyncio.CancelledError:
+        raise
+    except BaseException as e:
+        # A page of the course list could not be fetched
+        events.put_nowait(("error", e))
+    finally:
+        events.put_nowait(None)
+
+
+async def _consume(
+    recorder: CrawlRecorder,
+    events: asyncio.Queue,
+    window: asyncio.Semaphore,
+    cache: ResponseCache | None,
+) -> BaseException | None:
+    """Apply the units queued by _schedule() to the recorder, in API order.
+
+    Returns:
+        The error that ended the crawl, or None if it completed
+    """
+    try:
+        while (event := await events.get()) is not None:
+            kind = event[0]
+            if kind == "courses":
+                _, count, more = event
+                recorder.announce_courses(count, more)
+            elif kind == "course":
+                _, course_data, restore = event
+                if restore:
+                    recorder.restore_course(course_data)
+                else:
+                    recorder.start_course(course_data)
+            elif kind == "chapter":
+                _, chapter_data, restore = event
+                if restore:
+                    recorder.restore_chapter(chapter_data)
+                else:
+                    recorder.start_chapter(chapter_data)
+            elif kind == "chapter_end":
+                recorder.finish_chapter()
+            elif kind == "course_end":
+                recorder.finish_course()
+            elif kind == "error":
+                return event[1]
+            else:
+                _, exercise_data, idx, total, html_task = event
+                recorder.start_exercise(idx, total, exercise_data)
+                if html_task is None:
+                    recorder.restore_exercise()
+                    continue
+
+                html = await html_task
+                window.release()
+                if isinstance(html, AuthenticationError) or (
+                    isinstance(html, BaseException) and not isinstance(html, Exception)
+                ):
+                    return html
+                if isinstance(html, Exception):
+                    recorder.record_error(html)
+                    continue
+
+                try:
+                    recorder.record_page(html)
+                    questions = parse_exercise(html, cache, recorder.telemetry)
+                except Exception as e:
+                    recorder.record_error(e)
+                    continue
+
+                recorder.record_questions(questions)
+    except Exception as e:
+        return e
+    return None
+
+
+async def scrape_exercises_async(
+    max_concurrency: int | None = None,
+    per_host_concurrency: int | None = None,
+    rate_limiter: TokenBucket | None = None,
+    cache: ResponseCache | None = None,
+    recorder: CrawlRecorder | None = None,
+    look_ahead: int | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> ExerciseCollection:
+    """Scrape exercises from ZEN Study with concurrent requests.
+
+    Course, chapter and exercise fetches run ahead of the recorder within the
+    client's concurrency limits, while the results are consumed in API order.
+    Progress output, saved files and the returned collection are the same as
+    for the sequential crawl.
+
+    Args:
+        max_concurrency: Maximum number of requests in flight
+        per_host_concurrency: Maximum number of requests in flight per host
+        rate_limiter: Rate limiter to pace requests with
+        cache: Response cache (no caching if omitted)
+        recorder: Recorder to report results to
+        look_ahead: Maximum number of exercise pages fetched ahead of the
+            recorder
+        transport: Transport to send requests with
+
+    Returns:
+        ExerciseCollection containing all courses and exercises
+    """
+    recorder = recorder or CrawlRecorder()
+    window = asyncio.Semaphore(look_ahead or Config.CONCURRENT_LOOK_AHEAD)
+    events: asyncio.Queue = asyncio.Queue()
+    tasks: list[asyncio.Task] = []
+
+    async with AsyncZenStudyClient(
+        max_concurrency,
+        per_host_concurrency,
+        rate_limiter,
+        cache,
+        transport,
+        recorder.telemetry,
+        revalidate=recorder.incremental,
+    ) as client:
+        print("コース一覧を取得中...")
+        pages = ondemand_course_pages_async(client.iter_my_courses())
+
+        async with aclosing(pages), asyncio.TaskGroup() as tg:
+            tasks.append(
+                tg.create_task(_schedule(client, tg, recorder, pages, window, events, tasks))
+            )
+
+            failure = await _consume(recorder, events, window, client.cache)
+            if failure is not None:
+                # Drop the fetches still running ahead of the failed unit
+                for task in tasks:
+                    task.cancel()
+
+    if failure is not None:
+        raise failure
+
+    return recorder.collection
+
+
+def scrape_exercises_concurrent(
+    max_concurrency: int | None = None,
+    per_host_concurrency: int | None = None,
+    rate_limiter: TokenBucket | None = None,
+    cache: ResponseCache | None = None,
+    recorder: CrawlRecorder | None = None,
+    look_ahead: int | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> ExerciseCollection:
+    """Run the concurrent crawl from synchronous code.
+
+    Args:
+        max_concurrency: Maximum number of requests in flight
+        per_host_concurrency: Maximum number of requests in flight per host
+        rate_limiter: Rate limiter to pace requests with
+        cache: Response cache (no caching if omitted)
+        recorder: Recorder to report results to
+        look_ahead: Maximum number of exercise pages fetched ahead of the
+            recorder
+        transport: Transport to send requests with
+
+    Returns:
+        ExerciseCollection containing all courses and exercises
+    """
+    return asyncio.run(
+        scrape_exercises_async(
+            max_concurrency,
+            per_host_concurrency,
+            rate_limiter,
+            cache,
+            recorder,
+            look_ahead,
+            transport,
+        )
+    )
@@ -0,0 +1,499 @@
+"""Near-duplicate detection of question statements.
+
+Statements are compared by the Jaccard similarity of their sets of
+character 3-grams (shingles). Comparing every pair is quadratic, so
+candidate pairs are found with MinHash signatures and locality-sensitive
+hashing:
+
+- A signature has MINHASH_BANDS * MINHASH_ROWS values. It is computed with
+  one-permutation hashing: every shingle is hashed once, into one of the
+  bins, and each bin keeps its minimum. Empty bins borrow the value of a
+  non-empty bin in a fixed pseudo-random order (densification). Two
+  signatures agree in about a fraction J of their bins, like classic
+  MinHash, but a statement costs one hash per shingle instead of one per
+  shingle and bin.
+- The signature is cut into bands of MINHASH_ROWS values. Statements that
+  agree on a whole band land in the same bucket and become a candidate
+  pair; with the defaults, a pair with J = 0.8 is found with a probability
+  of 95% and a pair with J = 0.5 with one of 6%.
+- Candidates are verified by computing their exact similarity.
+
+Signatures, buckets and verified pairs are kept in SQLite, so new questions
+are only compared with the buckets they fall in and the work grows with the
+number of new questions, not with the corpus.
+
+    uv run python -m src.duplicates
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sqlite3
+import struct
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .config import Config
+from .models import Course, Question
+from .storage import QUESTION_STORES, course_records, iter_store_records, normalize_text
+
+_SHINGLE_SIZE = 3
+# Pairs below this similarity are not kept; banding seldom finds them anyway
+_MIN_SIMILARITY = 0.5
+_EMPTY = 1 << 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS statements (
+    digest TEXT PRIMARY KEY,
+    statement TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, digest)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pairs (
+    first TEXT NOT NULL,
+    second TEXT NOT NULL,
+    similarity REAL NOT NULL,
+    PRIMARY KEY (first, second)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS refs (
+    course_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    exercise_id INTEGER NOT NULL,
+    question_number INTEGER NOT NULL,
+    course_title TEXT NOT NULL,
+    chapter_title TEXT NOT NULL,
+    exercise_title TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (course_id, chapter_id, exercise_id, question_number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS refs_digest ON refs (digest);
+"""
+
+
+def shingles(statement: str) -> set[str]:
+    """Character 3-grams of a normalized statement.
+
+    Args:
+        statement: Question statement
+
+    Returns:
+        Shingles; a statement shorter than a shingle is its only shingle
+    """
+    text = normalize_text(statement)
+    if len(text) <= _SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i : i + _SHINGLE_SIZE] for i in range(len(text) - _SHINGLE_SIZE + 1)}
+
+
+def similarity(first: set[str], second: set[str]) -> float:
+    """Jaccard similarity of two shingle sets."""
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+def _probes(bins: int) -> list[list[int]]:
+    """Order in which each bin looks for a value to borrow."""
+    rng = random.Random(bins)
+    return [[j for j in rng.sample(range(bins), bins) if j != i] for i in range(bins)]
+
+
+def signature(shingle_set: set[str], bins: int, probes: list[list[int]]) -> list[int]:
+    """Densified one-permutation MinHash signature of a shingle set.
+
+    Args:
+        shingle_set: Non-empty shingles of a statement
+        bins: Number of signature values
+        probes: Result of _probes(bins)
+
+    Returns:
+        Signature values
+    """
+    values = [_EMPTY] * bins
+    for shingle in shingle_set:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little")
+        b, v = h % bins, h // bins
+        if v < values[b]:
+            values[b] = v
+    if _EMPTY in values:
+        hashed = values[:]
+        for i, value in enumerate(hashed):
+            if value == _EMPTY:
+                for j in probes[i]:
+                    if hashed[j] != _EMPTY:
+                        values[i] = hashed[j]
+                        break
+    return values
+
+
+def _statement_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class DuplicateMember:
+    """A question in a cluster of near-duplicates."""
+
+    course_id: int
+    course_title: str
+    chapter_id: int
+    chapter_title: str
+    exercise_id: int
+    exercise_title: str
+    question_number: int
+    statement: str
+
+
+@dataclass
+class DuplicateCluster:
+    """Questions whose statements are near-duplicates of each other.
+
+    ``similarity`` is the lowest similarity of the pairs that link the
+    cluster (1.0 when all statements are the same).
+    """
+
+    similarity: float
+    members: list[DuplicateMember] = field(default_factory=list)
+
+
+class DuplicateFinder:
+    """Incremental near-duplicate detector of question statements.
+
+    Questions are identified by course, chapter, exercise and question
+    number, like in the question stores. Statements that are the same after
+    normalization share one signature, so only new statements are hashed
+    and looked up.
+    """
+
+    def __init__(self, path: Path | str | None = None):
+        """Open or create the duplicate database.
+
+        Args:
+            path: SQLite file (defaults to DUPLICATES_FILE in the output
+                directory)
+        """
+        self.path = Path(path or Path(Config.OUTPUT_DIR) / Config.DUPLICATES_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.bands = Config.MINHASH_BANDS
+        self.rows = Config.MINHASH_ROWS
+        self._probes = _probes(self.bands * self.rows)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._check_settings()
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the database."""
+        self._conn.close()
+
+    def __len__(self) -> int:
+        """Number of questions added."""
+        return self._conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+
+    def _check_settings(self) -> None:
+        """Start over if the signatures were computed with other settings."""
+        settings = {"shingle": _SHINGLE_SIZE, "bands": self.bands, "rows": self.rows}
+        stored = dict(self._conn.execute("SELECT name, value FROM settings"))
+        if stored == settings:
+            return
+        with self._conn:
+            for table in ("settings", "statements", "buckets", "pairs", "refs"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.executemany("INSERT INTO settings VALUES (?, ?)", settings.items())
+
+    def _band_keys(self, shingle_set: set[str]) -> list[int]:
+        """Bucket of a statement in every band, as signed 64-bit integers."""
+        values = signature(shingle_set, self.bands * self.rows, self._probes)
+        band = struct.Struct(f"<{self.rows}Q")
+        return [
+            int.from_bytes(
+                hashlib.blake2b(band.pack(*values[i : i + self.rows]), digest_size=8).digest(),
+                "little",
+                signed=True,
+            )
+            for i in range(0, len(values), self.rows)
+        ]
+
+    def update(self, records: Iterable[dict[str, Any]], complete: bool = False) -> tuple[int, int]:
+        """Add new and changed questions and find their near-duplicates.
+
+        Args:
+            records: Question records, as yielded by the stores'
+                iter_records() or by course_records() (exercise_index is not
+                used)
+            complete: The records are the whole corpus; questions missing
+                from them are removed
+
+        Returns:
+            Numbers of added (or changed) and removed questions
+        """
+        known = {
+            row[:4]: (row[4], row[5:])
+            for row in self._conn.execute(
+                "SELECT course_id, chapter_id, exercise_id, question_number, digest,"
+                " course_title, chapter_title, exercise_title FROM refs"
+            )
+        }
+        seen = set()
+        refs: list[tuple] = []
+        added = 0
+        new_statements: dict[str, str] = {}
+        for record in records:
+            key = (
+                record["course_id"],
+                record["chapter_id"],
+                record["exercise_id"],
+                record["question_number"],
+            )
+            question = record["question"]
+            if not isinstance(question, Question):
+                question = Question.from_dict(question)
+            text = normalize_text(question.statement)
+            if not text:
+                continue
+            seen.add(key)
+            digest = _statement_digest(text)
+            titles = (record["course_title"], record["chapter_title"], record["exercise_title"])
+            old = known.get(key)
+            if old == (digest, titles):
+                continue
+            if old is None or old[0] != digest:
+                new_statements[digest] = text
+                added += 1
+            refs.append((*key, *titles, digest))
+        removed = [key for key in known if key not in seen] if complete else []
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", refs
+            )
+            self._conn.executemany(
+                "DELETE FROM refs WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?"
+                " AND question_number = ?",
+                removed,
+            )
+            self._add_statements(new_statements)
+        return added, len(removed)
+
+    def _select(self, sql: str, values: Iterable[Any]) -> sqlite3.Cursor:
+        """Run a query with the values as the JSON array parameter of json_each()."""
+        return self._conn.execute(sql, (json.dumps(list(values)),))
+
+    def _add_statements(self, statements: dict[str, str]) -> None:
+        """Bucket new statements and verify the pairs they form.
+
+        Args:
+            statements: Normalized statements by digest, possibly already
+                stored
+        """
+        stored = {
+            digest
+            for digest, in self._select(
+                "SELECT digest FROM statements WHERE digest IN (SELECT value FROM json_each(?))",
+                statements,
+            )
+        }
+        new = {digest: text for digest, text in statements.items() if digest not in stored}
+        if not new:
+            return
+
+        shingle_sets = {digest: shingles(text) for digest, text in new.items()}
+        buckets: dict[tuple[int, int], list[str]] = {}
+        for digest, shingle_set in shingle_sets.items():
+            for band, key in enumerate(self._band_keys(shingle_set)):
+                buckets.setdefault((band, key), []).append(digest)
+
+        # Statements stored earlier that share a bucket with a new one
+        candidates = set()
+        for band, key, other in self._select(
+            "SELECT b.band, b.bucket, b.digest FROM json_each(?) j JOIN buckets b"
+            " ON b.band = json_extract(j.value, '$[0]')"
+            " AND b.bucket = json_extract(j.value, '$[1]')",
+            buckets,
+        ):
+            candidates.update((digest, other) for digest in buckets[(band, key)])
+        # and new statements that share a bucket
+        for digests in buckets.values():
+            candidates.update(
+                (digest, other) for i, digest in enumerate(digests) for other in digests[i + 1 :]
+            )
+
+        self._conn.executemany("INSERT INTO statements VALUES (?, ?)", new.items())
+        self._conn.executemany(
+            "INSERT INTO buckets VALUES (?, ?, ?)",
+            ((band, key, digest) for (band, key), digests in buckets.items() for digest in digests),
+        )
+        others = {digest for pair in candidates for digest in pair} - shingle_sets.keys()
+        for digest, text in self._select(
+            "SELECT digest, statement FROM statements WHERE digest IN"
+            " (SELECT value FROM json_each(?))",
+            others,
+        ):
+            shingle_sets[digest] = shingles(text)
+
+        pairs = []
+        for first, second in {(min(pair), max(pair)) for pair in candidates}:
+            score = similarity(shingle_sets[first], shingle_sets[second])
+            if score >= _MIN_SIMILARITY:
+                pairs.append((first, second, score))
+        self._conn.executemany("INSERT OR REPLACE INTO pairs VALUES (?, ?, ?)", pairs)
+
+    def add_course(self, course: Course) -> tuple[int, int]:
+        """Add the questions of a crawled course.
+
+        Args:
+            course: Course with its chapters, exercises and questions
+
+        Returns:
+            Numbers of added and removed questions
+        """
+        return self.update(course_records(course))
+
+    def clusters(self, threshold: float | None = None) -> list[DuplicateCluster]:
+        """Group the questions into clusters of near-duplicates.
+
+        Questions are in the same cluster when a chain of pairs with at
+        least the threshold similarity links their statements, or when
+        their statements are the same.
+
+        Args:
+            threshold: Lowest similarity of a pair (defaults to
+                Config.DUPLICATE_THRESHOLD; pairs below 0.5 are not kept)
+
+        Returns:
+            Clusters of two or more questions, largest first
+        """
+        threshold = Config.DUPLICATE_THRESHOLD if threshold is None else threshold
+        members: dict[str, list[DuplicateMember]] = {}
+        for *fields, digest, statement in self._conn.execute(
+            "SELECT r.course_id, r.course_title, r.chapter_id, r.chapter_title, r.exercise_id,"
+            " r.exercise_title, r.question_number, r.digest, s.statement"
+            " FROM refs r JOIN statements s USING (digest)"
+            " ORDER BY r.course_id, r.chapter_id, r.exercise_id, r.question_number"
+        ):
+            members.setdefault(digest, []).append(DuplicateMember(*fields, statement))
+
+        parent = {digest: digest for digest in members}
+        lowest: dict[str, float] = {}
+
+        def find(digest: str) -> str:
+            while parent[digest] != digest:
+                parent[digest] = parent[parent[digest]]
+                digest = parent[digest]
+            return digest
+
+        for first, second, score in self._conn.execute(
+            "SELECT first, second, similarity FROM pairs WHERE similarity >= ?"
+            " ORDER BY similarity DESC",
+            (threshold,),
+        ):
+            if first not in members or second not in members:
+                continue
+            a, b = find(first), find(second)
+            if a != b:
+                parent[b] = a
+                lowest[a] = min(score, lowest.get(a, 1.0), lowest.get(b, 1.0))
+
+        groups: dict[str, list[str]] = {}
+        for digest in members:
+            groups.setdefault(find(digest), []).append(digest)
+        clusters = [
+            DuplicateCluster(
+                lowest.get(root, 1.0),
+                sorted(
+                    (member for digest in digests for member in members[digest]),
+                    key=lambda m: (m.course_id, m.chapter_id, m.exercise_id, m.question_number),
+                ),
+            )
+            for root, digests in groups.items()
+        ]
+        clusters = [cluster for cluster in clusters if len(cluster.members) > 1]
+        clusters.sort(key=lambda c: (-len(c.members), -c.similarity, c.members[0].course_id))
+        return clusters
+
+
+def write_report(clusters: list[DuplicateCluster], path: Path | str | None = None) -> Path:
+    """Write clusters as JSON.
+
+    Args:
+        clusters: Result of DuplicateFinder.clusters()
+        path: Report file (defaults to DUPLICATES_REPORT in the output
+            directory)
+
+    Returns:
+        Path of the report
+    """
+    path = Path(path or Path(Config.OUTPUT_DIR) / Config.DUPLICATES_REPORT)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"clusters": [asdict(c) for c in clusters]}, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="言い換えられた重複問題を検出します")
+    parser.add_argument(
+        "--store",
+        choices=QUESTION_STORES,
+        default=Config.QUESTION_STORE,
+        help=f"問題を読み込む保存形式 (デフォルト: {Config.QUESTION_STORE})",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=Config.DUPLICATE_THRESHOLD,
+        help=f"重複とみなす類似度 (0.5〜1, デフォルト: {Config.DUPLICATE_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--output",
+        help=f"レポートの出力先 (デフォルト: {Config.OUTPUT_DIR}/{Config.DUPLICATES_REPORT})",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=10, help="表示するグループ数 (デフォルト: 10)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Find near-duplicate questions in the store and write the report."""
+    args = parse_args(argv)
+    with DuplicateFinder() as finder:
+        added, removed = finder.update(iter_store_records(args.store), complete=True)
+        print(f"問題を更新しました: 追加 {added} 問 / 削除 {removed} 問 (計 {len(finder)} 問)")
+        clusters = finder.clusters(args.threshold)
+    path = write_report(clusters, args.output)
+
+    print(f"重複の可能性がある問題: {len(clusters)} グループ "
+          f"({sum(len(c.members) for c in clusters)} 問)")
+    for cluster in clusters[: args.limit]:
+        print(f"\n類似度 {cluster.similarity:.2f}")
+        for m in cluster.members:
+            statement = m.statement if len(m.statement) <= 40 else m.statement[:40] + "…"
+            print(f"  {m.course_title} / {m.chapter_title} / {m.exercise_title}"
+                  f" 問{m.question_number}: {statement}")
+    print(f"\nレポート: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""Crash-safe crawl journal for resuming interrupted crawls."""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+from . import models
+from .config import Config
+from .models import Chapter, Course, Exercise, Question
+
+# Tables and the columns added to them since the journal was introduced
+_TABLES = ("courses", "chapters", "exercises")
+_ADDED_COLUMNS = ("fingerprint TEXT",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    course_id INTEGER PRIMARY KEY,
+    course_title TEXT NOT NULL,
+    completed_at REAL NOT NULL,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    course_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    chapter_title TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    completed_at REAL NOT NULL,
+    fingerprint TEXT,
+    PRIMARY KEY (course_id, chapter_id)
+);
+CREATE TABLE IF NOT EXISTS exercises (
+    course_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    exercise_id INTEGER NOT NULL,
+    exercise_title TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    questions TEXT NOT NULL,
+    completed_at REAL NOT NULL,
+    fingerprint TEXT,
+    PRIMARY KEY (course_id, chapter_id, exercise_id)
+);
+"""
+
+
+def metadata_fingerprint(data: dict[str, Any], position: int = 0) -> str:
+    """Fingerprint the API metadata of a course, chapter or exercise.
+
+    The fingerprint covers every field except Config.PLAN_IGNORED_FIELDS, and
+    the position of the unit, which is part of the question file names.
+
+    Args:
+        data: Dictionary from the my_courses, course or chapter API
+        position: Position of the unit in its parent (1-indexed, 0 for courses)
+
+    Returns:
+        Hex digest of the metadata
+    """
+    fields = {k: v for k, v in data.items() if k not in Config.PLAN_IGNORED_FIELDS}
+    text = json.dumps([position, fields], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _decode_questions(data: str) -> list[Question]:
+    """Decode questions stored as JSON."""
+    return [Question.from_dict(q) for q in json.loads(data)]
+
+
+class CrawlJournal:
+    """SQLite journal of completed crawl units.
+
+    An exercise is recorded once its questions are saved, a chapter once all
+    of its exercises are recorded, and a course once all of its chapters are.
+    Each unit is committed on its own, so everything recorded before a crash
+    or interruption survives it. A resumed crawl skips recorded units and
+    rebuilds their part of the summary from the journal.
+
+    Every unit is recorded with the fingerprint of its API metadata. An
+    incremental crawl keeps the journal of the previous run and skips only
+    the units whose metadata is unchanged and which were recorded less than
+    Config.PLAN_MAX_AGE seconds ago, so it fetches what changed since then.
+    """
+
+    def __init__(
+        self, path: Path | str | None = None, resume: bool = False, incremental: bool = False
+    ):
+        """Open the journal.
+
+        Args:
+            path: SQLite database file (defaults to JOURNAL_FILE in the
+                output directory)
+            resume: Keep the recorded units and skip all of them
+            incremental: Keep the recorded units and skip those whose
+                metadata is unchanged; otherwise start a new journal
+        """
+        self.path = Path(path or Path(Config.OUTPUT_DIR) / Config.JOURNAL_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.incremental = incremental and not resume
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+        if not resume and not incremental:
+            self._conn.executescript(
+                "DELETE FROM courses; DELETE FROM chapters; DELETE FROM exercises;"
+            )
+
+        # Fingerprints and completion times of the completed units, loaded
+        # once so lookups during the crawl are cheap
+        self._courses = {
+            row[0]: row[1:]
+            for row in self._conn.execute(
+                "SELECT course_id, fingerprint, completed_at FROM courses"
+            )
+        }
+        self._chapters = {
+            row[:2]: row[2:]
+            for row in self._conn.execute(
+                "SELECT course_id, chapter_id, fingerprint, completed_at FROM chapters"
+            )
+        }
+        self._exercises = {
+            row[:3]: row[3:]
+            for row in self._conn.execute(
+                "SELECT course_id, chapter_id, exercise_id, fingerprint, completed_at"
+                " FROM exercises"
+            )
+        }
+
+    def _migrate(self) -> None:
+        """Add the columns missing from a journal written by an older version."""
+        for table in _TABLES:
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for column in _ADDED_COLUMNS:
+                if column.split()[0] not in columns:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the journal."""
+        self._conn.close()
+
+    def __len__(self) -> int:
+        """Number of recorded exercises."""
+        return len(self._exercises)
+
+    def _is_current(self, recorded: tuple | None, fingerprint: str | None) -> bool:
+        """Check whether a recorded unit can be skipped.
+
+        Args:
+            recorded: Fingerprint and completion time of the unit, or None if
+                it is not recorded
+            fingerprint: Fingerprint of the unit's current metadata
+
+        Returns:
+            True if the unit is recorded and, in an incremental crawl, still
+            up to date
+        """
+        if recorded is None:
+            return False
+        if not self.incremental:
+            return True
+        recorded_fingerprint, completed_at = recorded
+        return (
+            fingerprint is not None
+            and recorded_fingerprint == fingerprint
+            and time.time() - completed_at < Config.PLAN_MAX_AGE
+        )
+
+    def is_course_complete(self, course_id: int, fingerprint: str | None = None) -> bool:
+        """Check whether a course is completely recorded.
+
+        Args:
+            course_id: Course ID
+            fingerprint: Fingerprint of the course's current metadata
+
+        Returns:
+            True if the course can be restored from the journal
+        """
+        return self._is_current(self._courses.get(course_id), fingerprint)
+
+    def is_chapter_complete(
+        self, course_id: int, chapter_id: int, fingerprint: str | None = None
+    ) -> bool:
+        """Check whether a chapter is completely recorded.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+            fingerprint: Fingerprint of the chapter's current metadata
+
+        Returns:
+            True if the chapter can be restored from the journal
+        """
+        return self._is_current(self._chapters.get((course_id, chapter_id)), fingerprint)
+
+    def is_exercise_complete(
+        self, course_id: int, chapter_id: int, exercise_id: int, fingerprint: str | None = None
+    ) -> bool:
+        """Check whether an exercise is recorded.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+            exercise_id: Exercise ID
+            fingerprint: Fingerprint of the exercise's current metadata
+
+        Returns:
+            True if the exercise can be restored from the journal
+        """
+        return self._is_current(
+            self._exercises.get((course_id, chapter_id, exercise_id)), fingerprint
+        )
+
+    def record_exercise(
+        self,
+        course_id: int,
+        chapter_id: int,
+        exercise_id: int,
+        exercise_title: str,
+        position: int,
+        questions: list[Question],
+        fingerprint: str | None = None,
+    ) -> None:
+        """Record a finished exercise.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+            exercise_id: Exercise ID
+            exercise_title: Exercise title
+            position: Exercise index in chapter (1-indexed)
+            questions: Saved questions (empty if the page had none)
+            fingerprint: Fingerprint of the exercise's metadata
+        """
+        data = models.dumps_list(questions)
+        completed_at = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO exercises VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    course_id,
+                    chapter_id,
+                    exercise_id,
+                    exercise_title,
+                    position,
+                    data,
+                    completed_at,
+                    fingerprint,
+                ),
+            )
+        self._exercises[(course_id, chapter_id, exercise_id)] = (fingerprint, completed_at)
+
+    def complete_chapter(
+        self,
+        course_id: int,
+        chapter_id: int,
+        chapter_title: str,
+        position: int,
+        fingerprint: str | None = None,
+        exercise_ids: list[int] | None = None,
+    ) -> None:
+        """Record that all exercises of a chapter are finished.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+            chapter_title: Chapter title
+            position: Chapter index in course (1-indexed)
+            fingerprint: Fingerprint of the chapter's metadata
+            exercise_ids: Exercises the chapter has now; recorded exercises
+                that it no longer has are forgotten
+        """
+        completed_at = time.time()
+        with self._conn:
+            if exercise_ids is not None:
+                removed = [
+                    key
+                    for key in self._exercises
+                    if key[:2] == (course_id, chapter_id) and key[2] not in exercise_ids
+                ]
+                self._conn.executemany(
+                    "DELETE FROM exercises"
+                    " WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?",
+                    removed,
+                )
+                for key in removed:
+                    del self._exercises[key]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?, ?, ?)",
+                (course_id, chapter_id, chapter_title, position, completed_at, fingerprint),
+            )
+        self._chapters[(course_id, chapter_id)] = (fingerprint, completed_at)
+
+    def complete_course(
+        self,
+        course_id: int,
+        course_title: str,
+        fingerprint: str | None = None,
+        chapter_ids: list[int] | None = None,
+    ) -> None:
+        """Record that all chapters of a course are finished.
+
+        Args:
+            course_id: Course ID
+            course_title: Course title
+            fingerprint: Fingerprint of the course's metadata
+            chapter_ids: Chapters the course has now; recorded chapters that
+                it no longer has are forgotten with their exercises
+        """
+        completed_at = time.time()
+        with self._conn:
+            if chapter_ids is not None:
+                removed = [
+                    key
+                    for key in self._chapters
+                    if key[0] == course_id and key[1] not in chapter_ids
+                ]
+                for table in ("chapters", "exercises"):
+                    self._conn.executemany(
+                        f"DELETE FROM {table} WHERE course_id = ? AND chapter_id = ?", removed
+                    )
+                for key in removed:
+                    del self._chapters[key]
+                removed = set(removed)
+                for key in [key for key in self._exercises if key[:2] in removed]:
+                    del self._exercises[key]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO courses VALUES (?, ?, ?, ?)",
+                (course_id, course_title, completed_at, fingerprint),
+            )
+        self._courses[course_id] = (fingerprint, completed_at)
+
+    def load_exercise(self, course_id: int, chapter_id: int, exercise_id: int) -> list[Question]:
+        """Load the questions of a recorded exercise.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+            exercise_id: Exercise ID
+
+        Returns:
+            List of Question objects
+        """
+        (data,) = self._conn.execute(
+            "SELECT questions FROM exercises"
+            " WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?",
+            (course_id, chapter_id, exercise_id),
+        ).fetchone()
+        return _decode_questions(data)
+
+    def load_chapter(self, course_id: int, chapter_id: int) -> Chapter:
+        """Rebuild a recorded chapter.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+
+        Returns:
+            Chapter with the exercises that have questions, in chapter order
+        """
+        (chapter_title,) = self._conn.execute(
+            "SELECT chapter_title FROM chapters WHERE course_id = ? AND chapter_id = ?",
+            (course_id, chapter_id),
+        ).fetchone()
+        chapter = Chapter(chapter_id=chapter_id, chapter_title=chapter_title)
+
+        rows = self._conn.execute(
+            "SELECT exercise_id, exercise_title, questions FROM exercises"
+            " WHERE course_id = ? AND chapter_id = ? ORDER BY position",
+            (course_id, chapter_id),
+        )
+        for exercise_id, exercise_title, data in rows:
+            questions = _decode_questions(data)
+            if questions:
+                chapter.exercises.append(
+                    Exercise(
+                        exercise_id=exercise_id,
+                        exercise_title=exercise_title,
+                        questions=questions,
+                    )
+                )
+        return chapter
+
+    def load_course(self, course_id: int) -> Course:
+        """Rebuild a recorded course.
+
+        Args:
+            course_id: Course ID
+
+        Returns:
+            Course with the chapters that have exercises, in course order
+        """
+        (course_title,) = self._conn.execute(
+            "SELECT course_title FROM courses WHERE course_id = ?", (course_id,)
+        ).fetchone()
+        course = Course(course_id=course_id, course_title=course_title)
+
+        rows = self._conn.execute(
+            "SELECT chapter_id FROM chapters WHERE course_id = ? ORDER BY position",
+            (course_id,),
+        ).fetchall()
+        for (chapter_id,) in rows:
+            chapter = self.load_chapter(course_id, chapter_id)
+            if chapter.exercises:
+                course.chapters.append(chapter)
+        return course
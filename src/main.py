@@ -1,289 +1,541 @@
 """Main entry point for ZEN Study exercise scraper."""
 
-import json
-import os
-import re
+import argparse
+import time
+from collections.abc import Iterable
 from pathlib import Path
+from typing import Any
 
-from .client import ZenStudyClient
+import httpx
+
+from .archive import PageArchive
+from .cache import ResponseCache
+from .client import AuthenticationError, ZenStudyClient, print_authentication_help
 from .config import Config
-from .models import Chapter, Course, Exercise, ExerciseCollection, Question
+from .crawler import (
+    CrawlRecorder,
+    extract_chapters,
+    extract_exercises,
+    iter_ondemand_courses,
+    normalize_exercise_url,
+    parse_exercise,
+    scrape_exercises_concurrent,
+)
+from .duplicates import DuplicateFinder, write_report
+from .journal import CrawlJournal
+from .models import ExerciseCollection
 from .parser import ExerciseParser
-
-
-def sanitize_filename(name: str) -> str:
-    """Sanitize string for use as filename.
+from .pipeline import CrawlPipeline
+from .planner import plan_crawl, print_plan
+from .progress import ProgressReporter
+from .ratelimit import AdaptiveTokenBucket, TokenBucket
+from .search import SearchIndex
+from .storage import (
+    QUESTION_STORES,
+    ContentAddressedQuestionStore,
+    SqliteQuestionStore,
+    open_question_store,
+)
+from .summary import SummaryWriter
+from .telemetry import Telemetry
+
+
+def crawl_courses(
+    client: ZenStudyClient,
+    courses: Iterable[dict[str, Any]],
+    recorder: CrawlRecorder,
+    cache: ResponseCache | None = None,
+) -> None:
+    """Crawl courses one request at a time.
+
+    Units the recorder's journal has are restored instead of being fetched.
 
     Args:
-        name: String to sanitize
-
-    Returns:
-        Sanitized string safe for filename
+        client: Client to send requests with; it is left open
+        courses: Course dictionaries from the my_courses API, in API order
+        recorder: Recorder to report results to
+        cache: Response cache holding earlier parse results
     """
-    # Remove or replace invalid characters
-    name = re.sub(r'[<>:"/\\|?*]', '', name)
-    # Replace spaces and other problematic chars
-    name = name.replace(' ', '_')
-    # Limit length
-    if len(name) > 100:
-        name = name[:100]
-    return name
-
-
-def save_question_file(
-    course_title: str,
-    course_id: int,
-    chapter_title: str,
-    chapter_id: int,
-    exercise_title: str,
-    exercise_id: int,
-    exercise_index: int,
-    question_num: int,
-    question: Question,
-) -> Path:
-    """Save a single question to a JSON file.
+    for course_data in courses:
+        course_id = course_data.get("id")
+        if recorder.resume_course(course_data):
+            continue
+        recorder.start_course(course_data)
 
-    Args:
-        course_title: Course title
-        course_id: Course ID
-        chapter_title: Chapter title
-        chapter_id: Chapter ID
-        exercise_title: Exercise title
-        exercise_id: Exercise ID
-        exercise_index: Exercise index in chapter (0-indexed)
-        question_num: Question number (1-indexed)
-        question: Question object
+        # Get course info (chapters)
+        course_info = client.get_course_info(course_id)
 
-    Returns:
-        Path to saved file
-    """
-    # Create directory structure
-    output_base = Path(Config.OUTPUT_DIR)
+        for chapter_data in extract_chapters(course_info):
+            chapter_id = chapter_data.get("id")
+            if recorder.resume_chapter(chapter_data):
+                continue
+            recorder.start_chapter(chapter_data)
 
-    course_dir = sanitize_filename(f"{course_title}_{course_id}")
-    chapter_dir = sanitize_filename(f"{chapter_title}_{chapter_id}")
+            # Get chapter info (sections)
+            chapter_info = client.get_chapter_info(course_id, chapter_id)
 
-    dir_path = output_base / course_dir / chapter_dir
-    dir_path.mkdir(parents=True, exist_ok=True)
+            # Filter exercises only
+            exercises_data = extract_exercises(chapter_info)
 
-    # Create filename with exercise index for proper ordering
-    exercise_safe = sanitize_filename(exercise_title)
-    filename = f"{exercise_index:03d}_{exercise_safe}_{exercise_id}_q{question_num}.json"
-    file_path = dir_path / filename
+            for idx, exercise_data in enumerate(exercises_data, 1):
+                recorder.start_exercise(idx, len(exercises_data), exercise_data)
+                if recorder.resume_exercise():
+                    continue
 
-    # Save question data
-    question_data = {
-        "course_id": course_id,
-        "course_title": course_title,
-        "chapter_id": chapter_id,
-        "chapter_title": chapter_title,
-        "exercise_id": exercise_id,
-        "exercise_title": exercise_title,
-        "exercise_index": exercise_index,
-        "question_number": question_num,
-        "question": question.to_dict(),
-    }
+                # Normalize URL (remove /result)
+                exercise_url = normalize_exercise_url(exercise_data.get("content_url", ""))
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(question_data, f, ensure_ascii=False, indent=2)
+                try:
+                    # Get exercise HTML
+                    html = client.get_exercise_html(exercise_url)
+                    recorder.record_page(html)
 
-    return file_path
+                    # Parse questions
+                    questions = parse_exercise(html, cache, recorder.telemetry)
+                except AuthenticationError:
+                    raise
+                except Exception as e:
+                    recorder.record_error(e)
+                    continue
 
+                recorder.record_questions(questions)
 
-def normalize_exercise_url(content_url: str) -> str:
-    """Remove /result from exercise URL if present.
+            recorder.finish_chapter()
 
-    Args:
-        content_url: Original content URL
-
-    Returns:
-        Normalized URL without /result
-    """
-    return content_url.replace("/result", "")
+        recorder.finish_course()
 
 
-def is_ondemand_course(course_title: str) -> bool:
-    """Check if course is an on-demand course.
+def scrape_exercises(
+    rate_limiter: TokenBucket | None = None,
+    cache: ResponseCache | None = None,
+    recorder: CrawlRecorder | None = None,
+    transport: httpx.BaseTransport | None = None,
+) -> ExerciseCollection:
+    """Scrape exercises from ZEN Study.
 
     Args:
-        course_title: Course title
-
-    Returns:
-        True if the course is on-demand (contains 'オンデマンド')
-    """
-    return "オンデマンド" in course_title
-
-
-def scrape_exercises() -> ExerciseCollection:
-    """Scrape exercises from ZEN Study.
+        rate_limiter: Rate limiter to pace requests with
+        cache: Response cache (no caching if omitted)
+        recorder: Recorder to report results to
+        transport: Transport to send requests with
 
     Returns:
         ExerciseCollection containing all courses and exercises
     """
-    collection = ExerciseCollection()
+    recorder = recorder or CrawlRecorder()
 
-    with ZenStudyClient() as client:
+    with ZenStudyClient(
+        rate_limiter, cache, transport, recorder.telemetry, revalidate=recorder.incremental
+    ) as client:
         print("コース一覧を取得中...")
-        my_courses_response = client.get_my_courses()
-
-        # Extract courses from services array
-        courses_data = []
-        for service in my_courses_response.get("services", []):
-            courses_data.extend(service.get("courses", []))
-
-        ondemand_courses = [
-            c for c in courses_data if is_ondemand_course(c.get("title", ""))
-        ]
-
-        print(f"オンデマンドコース {len(ondemand_courses)} 件を発見\n")
-
-        for course_data in ondemand_courses:
-            course_id = course_data.get("id")
-            course_title = course_data.get("title", "")
-
-            print(f"【{course_title}】")
-
-            course = Course(course_id=course_id, course_title=course_title)
-
-            # Get course info (chapters)
-            course_info = client.get_course_info(course_id)
-            chapters_data = course_info.get("course", {}).get("chapters", [])
-
-            for chapter_data in chapters_data:
-                chapter_id = chapter_data.get("id")
-                chapter_title = chapter_data.get("title", "")
-
-                print(f"  > {chapter_title}")
-
-                chapter = Chapter(chapter_id=chapter_id, chapter_title=chapter_title)
+        ondemand_courses = iter_ondemand_courses(client.iter_my_courses(), recorder)
+        crawl_courses(client, ondemand_courses, recorder, cache)
 
-                # Get chapter info (sections)
-                chapter_info = client.get_chapter_info(course_id, chapter_id)
-                sections = chapter_info.get("chapter", {}).get("sections", [])
+    return recorder.collection
 
-                # Filter exercises only
-                exercises_data = [
-                    s for s in sections if s.get("resource_type") == "exercise"
-                ]
 
-                for idx, exercise_data in enumerate(exercises_data, 1):
-                    exercise_id = exercise_data.get("id")
-                    exercise_title = exercise_data.get("title", "")
-                    content_url = exercise_data.get("content_url", "")
-
-                    total_exercises = len(exercises_data)
-                    print(
-                        f"    - 確認テスト {idx}/{total_exercises}: {exercise_title}"
-                    )
-
-                    # Normalize URL (remove /result)
-                    exercise_url = normalize_exercise_url(content_url)
-
-                    try:
-                        # Get exercise HTML
-                        html = client.get_exercise_html(exercise_url)
-
-                        # Parse questions
-                        questions = ExerciseParser.parse_exercise_html(html)
-
-                        if questions:
-                            # Save each question immediately
-                            for q_num, question in enumerate(questions, 1):
-                                file_path = save_question_file(
-                                    course_title=course_title,
-                                    course_id=course_id,
-                                    chapter_title=chapter_title,
-                                    chapter_id=chapter_id,
-                                    exercise_title=exercise_title,
-                                    exercise_id=exercise_id,
-                                    exercise_index=idx,  # Use 1-indexed value
-                                    question_num=q_num,
-                                    question=question,
-                                )
-                                print(f"      ✓ 問{q_num} 保存: {file_path.name}")
+def save_summary(collection: ExerciseCollection) -> None:
+    """Save summary JSON file with all courses and exercises.
 
-                            # Still keep in memory for final summary
-                            exercise = Exercise(
-                                exercise_id=exercise_id,
-                                exercise_title=exercise_title,
-                                questions=questions,
-                            )
-                            chapter.exercises.append(exercise)
-                        else:
-                            print("      ! 問題が見つかりませんでした")
+    Args:
+        collection: ExerciseCollection to save
+    """
+    with SummaryWriter(Path(Config.OUTPUT_DIR) / "summary.json", "json") as summary:
+        for course in collection.courses:
+            summary.write_course(course)
 
-                    except Exception as e:
-                        print(f"      ! エラー: {e}")
+    print(f"\nサマリーを {summary.path} に保存しました")
 
-                if chapter.exercises:
-                    course.chapters.append(chapter)
 
-            if course.chapters:
-                collection.courses.append(course)
+def export_question_files(kind: str | None = None) -> None:
+    """Write the questions of a SQLite store as per-question JSON files.
 
-            print()
+    Args:
+        kind: "cas" to export the content-addressed store; any other kind
+            exports the sqlite store
+    """
+    store = ContentAddressedQuestionStore() if kind == "cas" else SqliteQuestionStore()
+    try:
+        count = store.export_files()
+    finally:
+        store.close()
+    print(f"{store.path} から {count} 問を {Config.OUTPUT_DIR} に書き出しました")
 
-    return collection
 
-
-def save_summary(collection: ExerciseCollection) -> None:
-    """Save summary JSON file with all courses and exercises.
+def report_profile(telemetry: Telemetry, path: Path | None) -> None:
+    """Print the profile and write it as a Chrome trace.
 
     Args:
-        collection: ExerciseCollection to save
+        telemetry: Collected telemetry
+        path: Trace file (defaults to Config.PROFILE_FILE in the output
+            directory)
     """
-    output_dir = Path(Config.OUTPUT_DIR)
-    output_dir.mkdir(exist_ok=True)
-
-    summary_path = output_dir / "summary.json"
+    print()
+    telemetry.print_summary()
+    trace_path = telemetry.write_trace(path)
+    print(f"  トレース: {trace_path} (chrome://tracing または https://ui.perfetto.dev で表示)")
 
-    with open(summary_path, "w", encoding="utf-8") as f:
-        json.dump(collection.to_dict(), f, ensure_ascii=False, indent=2)
 
-    print(f"\nサマリーを {summary_path} に保存しました")
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments.
 
+    Args:
+        argv: Argument list (defaults to sys.argv)
 
-def main():
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="ZEN Study 確認テスト取得ツール")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="コース・チャプター・確認テストを並行して取得する",
+    )
+    mode.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="取得・解析・保存を別々のスレッド/プロセスで並行して行う",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=Config.MAX_CONCURRENCY,
+        help=f"同時リクエスト数の上限 (デフォルト: {Config.MAX_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--per-host-concurrency",
+        type=int,
+        default=Config.PER_HOST_CONCURRENCY,
+        help=f"ホストごとの同時リクエスト数の上限 (デフォルト: {Config.PER_HOST_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=Config.PIPELINE_FETCH_WORKERS,
+        help=f"--pipeline の取得スレッド数 (デフォルト: {Config.PIPELINE_FETCH_WORKERS})",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=None,
+        help="--pipeline の解析プロセス数 (デフォルト: CPUコア数)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=Config.REQUESTS_PER_SECOND,
+        help=f"1秒あたりのリクエスト数の上限 (0で無制限, デフォルト: {Config.REQUESTS_PER_SECOND})",
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=Config.RATE_BURST,
+        help=f"連続して送れるリクエスト数 (デフォルト: {Config.RATE_BURST})",
+    )
+    parser.add_argument(
+        "--adaptive-rate",
+        action="store_true",
+        help=(
+            "サーバーの応答に合わせてリクエストレートを自動調整する"
+            f" (--rate から開始し {Config.ADAPTIVE_MIN_RATE}〜{Config.ADAPTIVE_MAX_RATE} 件/秒の範囲)"
+        ),
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=Config.MAX_RETRIES,
+        help=(
+            "429 / 5xx / タイムアウト時に再試行する回数の上限"
+            f" (デフォルト: {Config.MAX_RETRIES})"
+        ),
+    )
+    parser.add_argument(
+        "--no-http2",
+        action="store_true",
+        help="HTTP/2 を使わず HTTP/1.1 で接続する (HTTP/2 は h2 がインストールされている場合のみ使用)",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=ExerciseParser.ENGINES,
+        default=Config.PARSER_ENGINE,
+        help=(
+            "HTMLパーサーエンジン (lxml / selectolax は追加インストールが必要,"
+            f" デフォルト: {Config.PARSER_ENGINE})"
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="レスポンスキャッシュを使わずにすべて取得し直す",
+    )
+    parser.add_argument(
+        "--no-archive",
+        action="store_true",
+        help=(
+            f"取得した確認テストのページを {Config.OUTPUT_DIR}/{Config.PAGE_ARCHIVE_DIR} に保存しない"
+            " (保存したページは python -m src.reparse で解析し直せる)"
+        ),
+    )
+    parser.add_argument(
+        "--store",
+        choices=QUESTION_STORES,
+        default=Config.QUESTION_STORE,
+        help=(
+            "問題の保存形式 (files: 問題ごとのJSONファイル,"
+            f" sqlite: {Config.QUESTION_DB_FILE} にまとめて保存,"
+            f" cas: 同じ問題を1回だけ {Config.QUESTION_CAS_FILE} に保存,"
+            f" デフォルト: {Config.QUESTION_STORE})"
+        ),
+    )
+    parser.add_argument(
+        "--export-files",
+        action="store_true",
+        help=(
+            f"{Config.QUESTION_DB_FILE} (--store cas の場合は {Config.QUESTION_CAS_FILE}) の問題を"
+            "問題ごとのJSONファイルに書き出して終了する"
+        ),
+    )
+    parser.add_argument(
+        "--summary-format",
+        choices=SummaryWriter.FORMATS,
+        default=Config.SUMMARY_FORMAT,
+        help=(
+            "サマリーの形式 (json: summary.json, jsonl: コースごとに1行の summary.jsonl,"
+            f" デフォルト: {Config.SUMMARY_FORMAT})"
+        ),
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help=(
+            f"取得した問題をコースごとに検索インデックス ({Config.OUTPUT_DIR}/{Config.SEARCH_INDEX_DIR})"
+            " に追加する (python -m src.search で検索)"
+        ),
+    )
+    parser.add_argument(
+        "--duplicates",
+        action="store_true",
+        help=(
+            "取得した問題から言い換えられた重複問題を検出し、"
+            f"{Config.OUTPUT_DIR}/{Config.DUPLICATES_REPORT} に書き出す"
+        ),
+    )
+    journal_mode = parser.add_mutually_exclusive_group()
+    journal_mode.add_argument(
+        "--resume",
+        action="store_true",
+        help="中断した前回の取得を、取得済みの部分を飛ばして再開する",
+    )
+    journal_mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "前回の取得からメタデータ (進捗・セクション数・更新日時など) が変わった"
+            "コース・チャプター・確認テストだけを取得する"
+            f" ({Config.PLAN_MAX_AGE // 86400} 日以上前に取得したものは取得し直す)"
+        ),
+    )
+    journal_mode.add_argument(
+        "--dry-run",
+        action="store_true",
+        help=(
+            "--incremental で送るリクエスト数を表示して終了する"
+            " (変更のあったコース・チャプターの情報は取得し、確認テストのページは取得しない)"
+        ),
+    )
+    parser.add_argument(
+        "--progress",
+        choices=ProgressReporter.MODES,
+        default=Config.PROGRESS_MODE,
+        help=(
+            "進捗の表示 (live: 件数・速度・残り時間を一定間隔で表示,"
+            " quiet: 問題のあった確認テストだけを表示,"
+            f" jsonl: イベントを1行1件の JSON で出力, デフォルト: {Config.PROGRESS_MODE})"
+        ),
+    )
+    parser.add_argument(
+        "--progress-file",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="進捗を標準出力の代わりにファイルに書き出す (--progress jsonl と組み合わせて使う)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=Path,
+        const=True,
+        default=None,
+        metavar="PATH",
+        help=(
+            "リクエスト・解析・保存の所要時間を計測し、集計表とChromeトレース (JSON) を出力する"
+            f" (デフォルト: {Config.OUTPUT_DIR}/{Config.PROFILE_FILE})"
+        ),
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="--profile に加えて、コースごとの最大メモリ使用量を tracemalloc で計測する (低速)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
     """Main entry point."""
+    args = parse_args(argv)
+    ExerciseParser.set_default_engine(args.parser)
+
     print("ZEN Study 確認テスト取得ツール")
     print("=" * 50)
     print()
 
-    try:
-        collection = scrape_exercises()
+    if args.export_files:
+        export_question_files(args.store)
+        return
+
+    Config.MAX_RETRIES = args.max_retries
+    if args.no_http2:
+        Config.HTTP2 = False
+    if args.adaptive_rate:
+        rate_limiter = AdaptiveTokenBucket(args.rate, args.burst)
+    else:
+        rate_limiter = TokenBucket(args.rate, args.burst)
+    cache = None if args.no_cache else ResponseCache()
+
+    if args.dry_run:
+        journal = CrawlJournal(incremental=True)
+        try:
+            print_plan(plan_crawl(CrawlRecorder(journal), rate_limiter, cache))
+        finally:
+            journal.close()
+            if cache is not None:
+                cache.close()
+        return
+
+    journal = CrawlJournal(resume=args.resume, incremental=args.incremental)
+    summary = SummaryWriter(fmt=args.summary_format)
+    store = open_question_store(args.store)
+    telemetry = Telemetry(args.profile_memory) if args.profile or args.profile_memory else None
+    index = SearchIndex() if args.index else None
+    duplicates = DuplicateFinder() if args.duplicates else None
+    archive = None if args.no_archive else PageArchive()
+    progress = ProgressReporter(args.progress, args.progress_file)
+    recorder = CrawlRecorder(
+        journal, summary, store, telemetry, index, duplicates, archive, progress
+    )
+    started = time.monotonic()
+
+    if args.resume:
+        print(f"前回の取得を再開します（記録済みの確認テスト: {len(journal)} 件）\n")
+    elif args.incremental:
+        print(f"前回の取得から変更のあった部分だけを取得します（記録済みの確認テスト: {len(journal)} 件）\n")
+
+    pipeline = None
 
-        if not collection.courses:
+    try:
+        # The progress is written out before anything else is printed
+        with progress:
+            if args.pipeline:
+                pipeline = CrawlPipeline(
+                    fetch_workers=args.fetch_workers,
+                    parse_workers=args.parse_workers,
+                    rate_limiter=rate_limiter,
+                    cache=cache,
+                    recorder=recorder,
+                )
+                pipeline.run()
+            elif args.concurrent:
+                scrape_exercises_concurrent(
+                    args.max_concurrency,
+                    args.per_host_concurrency,
+                    rate_limiter,
+                    cache,
+                    recorder,
+                )
+            else:
+                scrape_exercises(rate_limiter, cache, recorder)
+
+        elapsed = time.monotonic() - started
+
+        summary_path = summary.close()
+        if summary_path is None:
             print("取得できた確認テストがありませんでした。")
             return
 
-        save_summary(collection)
+        print(f"\nサマリーを {summary_path} に保存しました")
 
         # Print summary
-        total_courses = len(collection.courses)
-        total_chapters = sum(len(c.chapters) for c in collection.courses)
-        total_exercises = sum(
-            len(ch.exercises) for c in collection.courses for ch in c.chapters
-        )
-        total_questions = sum(
-            len(ex.questions)
-            for c in collection.courses
-            for ch in c.chapters
-            for ex in ch.exercises
-        )
-
+        totals = recorder.totals
         print()
         print("=" * 50)
         print("取得完了:")
-        print(f"  コース: {total_courses} 件")
-        print(f"  チャプター: {total_chapters} 件")
-        print(f"  確認テスト: {total_exercises} 件")
-        print(f"  問題数: {total_questions} 問")
+        print(f"  コース: {totals.courses} 件")
+        print(f"  チャプター: {totals.chapters} 件")
+        print(f"  確認テスト: {totals.exercises} 件")
+        print(f"  問題数: {totals.questions} 問")
+        print(f"  所要時間: {elapsed:.1f} 秒")
+        print(
+            f"  レート制限による待機: {rate_limiter.throttled_wall_seconds:.1f} 秒"
+            f" (延べ {rate_limiter.throttled_seconds:.1f} 秒,"
+            f" {rate_limiter.throttled_requests}/{rate_limiter.requests} リクエスト)"
+        )
+        if rate_limiter.retries or rate_limiter.throttle_signals:
+            print(
+                f"  再試行: {rate_limiter.retries} 回"
+                f" (サーバーからの制限 {rate_limiter.throttle_signals} 回)"
+            )
+        if isinstance(rate_limiter, AdaptiveTokenBucket):
+            print(
+                f"  リクエストレート: 最終 {rate_limiter.rate:.1f} 件/秒"
+                f" (最大 {rate_limiter.peak_rate:.1f} 件/秒, 減速 {rate_limiter.decreases} 回)"
+            )
+        if isinstance(store, ContentAddressedQuestionStore):
+            references, distinct = store.counts()
+            print(f"  保存した問題: {distinct} 種類 (参照 {references} 件)")
+        if index is not None:
+            print(f"  検索インデックス: {len(index)} 問")
+        if duplicates is not None:
+            clusters = duplicates.clusters()
+            path = write_report(clusters)
+            print(f"  重複の可能性がある問題: {len(clusters)} グループ ({path})")
+        if archive is not None:
+            print(f"  ページアーカイブ: {len(archive)} 件 ({archive.path})")
+        if pipeline is not None:
+            pipeline.print_stats()
+        if cache is not None:
+            print(
+                f"  キャッシュ: ヒット {cache.hits} 件 / 再検証 {cache.revalidated} 件"
+                f" / 取得 {cache.misses} 件"
+            )
 
     except KeyboardInterrupt:
         print("\n\n中断されました。")
+        print("--resume を指定して実行すると続きから再開できます。")
+    except AuthenticationError:
+        print_authentication_help()
+        print("--resume を指定して実行すると続きから再開できます。")
+        raise SystemExit(1) from None
     except Exception as e:
         print(f"\nエラーが発生しました: {e}")
+        print("--resume を指定して実行すると続きから再開できます。")
         raise
+    finally:
+        # Also report the profile of a failed or interrupted crawl
+        if telemetry is not None:
+            report_profile(telemetry, None if args.profile is True else args.profile)
+            telemetry.close()
+        summary.abort()
+        store.close()
+        if index is not None:
+            index.close()
+        if duplicates is not None:
+            duplicates.close()
+        if archive is not None:
+            archive.close()
+        journal.close()
+        if cache is not None:
+            cache.close()
 
 
 if __name__ == "__main__":
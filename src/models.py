@@ -1,10 +1,23 @@
 """Data models for ZEN Study scraper."""
 
+import json
 from dataclasses import dataclass, field
-from typing import Any
+from typing import IO, Any
 
+# The C string encoder json.dumps(..., ensure_ascii=False) uses
+_encode_str = json.encoder.encode_basestring
 
-@dataclass
+
+def _encode_scalar(value: Any) -> str:
+    """Encode a string, number or None as json.dumps() would."""
+    if type(value) is str:
+        return _encode_str(value)
+    if type(value) is int:
+        return int.__repr__(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+@dataclass(frozen=True, slots=True)
 class Choice:
     """A choice in a question."""
 
@@ -15,13 +28,26 @@ class Choice:
         """Convert to dictionary."""
         return {"number": self.number, "text": self.text}
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Choice":
+        """Create from a dictionary produced by to_dict()."""
+        return cls(data["number"], data["text"])
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Question:
-    """A question in an exercise."""
+    """A question in an exercise.
+
+    Choices are kept as a tuple, so questions are immutable and hashable; a
+    list passed in is converted.
+    """
 
     statement: str
-    choices: list[Choice] = field(default_factory=list)
+    choices: tuple[Choice, ...] = ()
+
+    def __post_init__(self) -> None:
+        if type(self.choices) is not tuple:
+            object.__setattr__(self, "choices", tuple(self.choices))
 
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary."""
@@ -30,8 +56,14 @@ class Question:
             "choices": [choice.to_dict() for choice in self.choices],
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Question":
+        """Create from a dictionary produced by to_dict()."""
+        choices = tuple([Choice(c["number"], c["text"]) for c in data["choices"]])
+        return cls(data["statement"], choices)
+
 
-@dataclass
+@dataclass(slots=True)
 class Exercise:
     """An exercise (confirmation test)."""
 
@@ -47,8 +79,17 @@ class Exercise:
             "questions": [question.to_dict() for question in self.questions],
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Exercise":
+        """Create from a dictionary produced by to_dict()."""
+        return cls(
+            data["exercise_id"],
+            data["exercise_title"],
+            [Question.from_dict(question) for question in data["questions"]],
+        )
+
 
-@dataclass
+@dataclass(slots=True)
 class Chapter:
     """A chapter in a course."""
 
@@ -64,8 +105,17 @@ class Chapter:
             "exercises": [exercise.to_dict() for exercise in self.exercises],
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Chapter":
+        """Create from a dictionary produced by to_dict()."""
+        return cls(
+            data["chapter_id"],
+            data["chapter_title"],
+            [Exercise.from_dict(exercise) for exercise in data["exercises"]],
+        )
 
-@dataclass
+
+@dataclass(slots=True)
 class Course:
     """A course."""
 
@@ -81,8 +131,17 @@ class Course:
             "chapters": [chapter.to_dict() for chapter in self.chapters],
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Course":
+        """Create from a dictionary produced by to_dict()."""
+        return cls(
+            data["course_id"],
+            data["course_title"],
+            [Chapter.from_dict(chapter) for chapter in data["chapters"]],
+        )
+
 
-@dataclass
+@dataclass(slots=True)
 class ExerciseCollection:
     """Collection of all courses with exercises."""
 
@@ -91,3 +150,162 @@ class ExerciseCollection:
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary."""
         return {"courses": [course.to_dict() for course in self.courses]}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ExerciseCollection":
+        """Create from a dictionary produced by to_dict()."""
+        return cls([Course.from_dict(course) for course in data["courses"]])
+
+
+# Scalar fields and the list field of every container, in to_dict() order
+_FIELDS: dict[type, tuple[tuple[str, ...], str]] = {
+    Exercise: (("exercise_id", "exercise_title"), "questions"),
+    Chapter: (("chapter_id", "chapter_title"), "exercises"),
+    Course: (("course_id", "course_title"), "chapters"),
+    ExerciseCollection: ((), "courses"),
+}
+
+Model = Choice | Question | Exercise | Chapter | Course | ExerciseCollection
+
+
+def _encode_question(question: Question, step: str, separator: str, newline: str) -> str:
+    """Encode a question with its choices; the bulk of every summary."""
+    inner = newline + step
+    if question.choices:
+        item = inner + step
+        member = item + step
+        encoded = (separator + item).join(
+            [
+                f'{{{member}"number": {_encode_scalar(choice.number)}{separator}'
+                f'{member}"text": {_encode_str(choice.text)}{item}}}'
+                for choice in question.choices
+            ]
+        )
+        choices = f"[{item}{encoded}{inner}]"
+    else:
+        choices = "[]"
+    return (
+        f'{{{inner}"statement": {_encode_scalar(question.statement)}{separator}'
+        f'{inner}"choices": {choices}{newline}}}'
+    )
+
+
+def _encode(model: Model, chunks: list[str], step: str, separator: str, newline: str) -> None:
+    """Append the JSON of a model to chunks.
+
+    Args:
+        model: Model to encode
+        chunks: Output pieces, joined once at the end
+        step: Indentation added per level ("" for a single line)
+        separator: Separator between members ("," or ", ")
+        newline: Newline and indentation of the line the model starts on
+            ("" for a single line)
+    """
+    if type(model) is Question:
+        chunks.append(_encode_question(model, step, separator, newline))
+        return
+    if type(model) is Choice:
+        inner = newline + step
+        chunks.append(
+            f'{{{inner}"number": {_encode_scalar(model.number)}{separator}'
+            f'{inner}"text": {_encode_scalar(model.text)}{newline}}}'
+        )
+        return
+
+    scalars, children = _FIELDS[type(model)]
+    inner = newline + step
+    chunks.append("{")
+    for name in scalars:
+        chunks.append(f'{inner}"{name}": {_encode_scalar(getattr(model, name))}{separator}')
+    items = getattr(model, children)
+    if not items:
+        chunks.append(f'{inner}"{children}": []{newline}}}')
+        return
+
+    item = inner + step
+    chunks.append(f'{inner}"{children}": [{item}')
+    if children == "questions":
+        chunks.append(
+            (separator + item).join(
+                [_encode_question(question, step, separator, item) for question in items]
+            )
+        )
+    else:
+        for i, child in enumerate(items):
+            if i:
+                chunks.append(separator + item)
+            _encode(child, chunks, step, separator, item)
+    chunks.append(f"{inner}]{newline}}}")
+
+
+def _chunks(model: Model, indent: int | None, level: int) -> list[str]:
+    """Encode a model as a list of pieces of JSON text."""
+    chunks: list[str] = []
+    if indent is None:
+        _encode(model, chunks, "", ", ", "")
+    else:
+        step = " " * indent
+        _encode(model, chunks, step, ",", "\n" + step * level)
+    return chunks
+
+
+def dumps(model: Model, indent: int | None = None, level: int = 0) -> str:
+    """Encode a model as JSON without building a dictionary tree.
+
+    The result is the same as ``json.dumps(model.to_dict(),
+    ensure_ascii=False, indent=indent)``.
+
+    Args:
+        model: Model to encode
+        indent: Spaces per level, or None for a single line
+        level: Number of levels the whole document is indented by (all
+            lines but the first)
+
+    Returns:
+        JSON text
+    """
+    return "".join(_chunks(model, indent, level))
+
+
+def dumps_list(items: list[Model]) -> str:
+    """Encode a list of models as single-line JSON.
+
+    Args:
+        items: Models to encode
+
+    Returns:
+        The same text as ``json.dumps([m.to_dict() for m in items],
+        ensure_ascii=False)``
+    """
+    chunks: list[str] = ["["]
+    for i, model in enumerate(items):
+        if i:
+            chunks.append(", ")
+        _encode(model, chunks, "", ", ", "")
+    chunks.append("]")
+    return "".join(chunks)
+
+
+def dump(model: Model, fp: IO[str], indent: int | None = None, level: int = 0) -> None:
+    """Write a model as JSON to a text file.
+
+    Args:
+        model: Model to encode
+        fp: File to write to
+        indent: Spaces per level, or None for a single line
+        level: Number of levels the whole document is indented by
+    """
+    fp.writelines(_chunks(model, indent, level))
+
+
+def loads[M: Model](text: str | bytes, model_type: type[M]) -> M:
+    """Decode a model from JSON written by dumps() or json.dumps(to_dict()).
+
+    Args:
+        text: JSON text
+        model_type: Class of the encoded model
+
+    Returns:
+        Decoded model
+    """
+    return model_type.from_dict(json.loads(text))
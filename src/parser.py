@@ -1,44 +1,281 @@
 """HTML parser for ZEN Study exercise pages."""
 
 import re
+from collections.abc import Iterable, Iterator
+from typing import Any
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
+from .config import Config
 from .models import Choice, Question
 
+# Choice labels are stripped in this order, e.g. "① 1. text" -> "text"
+_CHOICE_PREFIXES = (
+    re.compile(r"^[①②③④⑤⑥⑦⑧⑨⑩]\s*"),
+    re.compile(r"^\d+\.\s*"),
+    re.compile(r"^[①②③④⑤⑥⑦⑧⑨⑩]"),
+)
+
+# SoupStrainer sees the raw class attribute while parsing, so match the
+# class name within the whitespace-separated list itself
+_EXERCISE_CLASS = re.compile(r"(?:^|[ \t\n\r\f])exercise(?:[ \t\n\r\f]|$)")
+
+# Elements whose text BeautifulSoup's get_text() leaves out
+_NON_TEXT_TAGS = frozenset({"script", "style", "template"})
+
+
+def _clean_choice_text(text: str) -> str:
+    """Strip choice labels such as ① or 1. from a choice text."""
+    for pattern in _CHOICE_PREFIXES:
+        text = pattern.sub("", text, count=1)
+    return text
+
+
+class _Bs4Engine:
+    """Parser engine on BeautifulSoup with the html.parser tree builder.
+
+    With ``restricted`` set, only the kokuban container (or, for pages
+    without one, the exercise sections) is materialized instead of the
+    whole page.
+    """
+
+    def __init__(self, restricted: bool = False):
+        self.restricted = restricted
+
+    def sections(self, html: str) -> Iterable[Any]:
+        if self.restricted:
+            soup = BeautifulSoup(
+                html,
+                "html.parser",
+                parse_only=SoupStrainer("div", id="kokuban-input-target"),
+            )
+            kokuban = soup.find("div", id="kokuban-input-target")
+            if not kokuban:
+                kokuban = BeautifulSoup(
+                    html,
+                    "html.parser",
+                    parse_only=SoupStrainer("section", class_=_EXERCISE_CLASS),
+                )
+        else:
+            soup = BeautifulSoup(html, "html.parser")
+
+            # Find the kokuban container
+            kokuban = soup.find("div", id="kokuban-input-target")
+            if not kokuban:
+                # Some exercises might not have the kokuban container, try searching from root
+                kokuban = soup
+
+        # Find all exercise sections
+        return kokuban.find_all("section", class_="exercise")
+
+    def statement_text(self, section: Any) -> str | None:
+        statement_div = section.find("div", class_="statement")
+        if not statement_div:
+            return None
+        return statement_div.get_text(strip=True)
+
+    def choice_items(self, section: Any) -> list[tuple[str, str]] | None:
+        answers_ul = section.find("ul", class_="answers")
+        if not answers_ul:
+            return None
+        return [
+            (item.get("data-input-value", ""), item.get_text(strip=True))
+            for item in answers_ul.find_all("li", attrs={"data-input-value": True})
+        ]
+
+    def has_word_input(self, section: Any) -> bool:
+        word_input_li = section.find("li", attrs={"data-type": "word"})
+        return bool(word_input_li and word_input_li.find("input", class_="answers"))
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching a class name like BeautifulSoup's class_."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+class _LxmlEngine:
+    """Parser engine on lxml's libxml2 HTML parser."""
+
+    def __init__(self):
+        import lxml.etree
+        import lxml.html
+
+        self._etree = lxml.etree
+        self._html = lxml.html
+
+    def sections(self, html: str) -> Iterable[Any]:
+        try:
+            root = self._html.document_fromstring(html)
+        except ValueError:
+            # lxml rejects str input carrying an XML encoding declaration
+            root = self._html.document_fromstring(html.encode("utf-8"))
+        except self._etree.ParserError:
+            # Empty documents
+            return []
+
+        kokuban = root.find('.//div[@id="kokuban-input-target"]')
+        if kokuban is None:
+            kokuban = root
+        return kokuban.xpath(f".//section[{_has_class('exercise')}]")
+
+    def _strings(self, element: Any) -> Iterator[str]:
+        """Yield the text pieces get_text() would see, in document order."""
+        if element.text and element.tag not in _NON_TEXT_TAGS:
+            yield element.text
+        for child in element:
+            # Comments and processing instructions only contribute their tail
+            if isinstance(child.tag, str) and child.tag not in _NON_TEXT_TAGS:
+                yield from self._strings(child)
+            if child.tail:
+                yield child.tail
+
+    def _text(self, element: Any) -> str:
+        return "".join(s for s in (p.strip() for p in self._strings(element)) if s)
+
+    def statement_text(self, section: Any) -> str | None:
+        found = section.xpath(f"(.//div[{_has_class('statement')}])[1]")
+        if not found:
+            return None
+        return self._text(found[0])
+
+    def choice_items(self, section: Any) -> list[tuple[str, str]] | None:
+        found = section.xpath(f"(.//ul[{_has_class('answers')}])[1]")
+        if not found:
+            return None
+        return [
+            (item.get("data-input-value"), self._text(item))
+            for item in found[0].iterfind(".//li[@data-input-value]")
+        ]
+
+    def has_word_input(self, section: Any) -> bool:
+        word_input_li = section.find('.//li[@data-type="word"]')
+        return word_input_li is not None and bool(
+            word_input_li.xpath(f".//input[{_has_class('answers')}]")
+        )
+
+
+class _SelectolaxEngine:
+    """Parser engine on selectolax's lexbor HTML5 parser."""
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self._parser = LexborHTMLParser
+
+    def sections(self, html: str) -> Iterable[Any]:
+        tree = self._parser(html)
+        kokuban = tree.css_first("div#kokuban-input-target")
+        if kokuban is None:
+            kokuban = tree.root
+            if kokuban is None:
+                return []
+        return [node for node in kokuban.css("section.exercise") if node is not kokuban]
+
+    def _text(self, node: Any) -> str:
+        parts = []
+        for child in node.traverse(include_text=True):
+            # Template contents are not traversed; comments are not text nodes
+            if child.tag != "-text" or child.parent.tag in _NON_TEXT_TAGS:
+                continue
+            text = child.text_content.strip()
+            if text:
+                parts.append(text)
+        return "".join(parts)
+
+    def statement_text(self, section: Any) -> str | None:
+        statement_div = section.css_first("div.statement")
+        if statement_div is None:
+            return None
+        return self._text(statement_div)
+
+    def choice_items(self, section: Any) -> list[tuple[str, str]] | None:
+        answers_ul = section.css_first("ul.answers")
+        if answers_ul is None:
+            return None
+        return [
+            (item.attributes.get("data-input-value") or "", self._text(item))
+            for item in answers_ul.css("li[data-input-value]")
+        ]
+
+    def has_word_input(self, section: Any) -> bool:
+        word_input_li = section.css_first('li[data-type="word"]')
+        return (
+            word_input_li is not None
+            and word_input_li.css_first("input.answers") is not None
+        )
+
 
 class ExerciseParser:
-    """Parser for exercise HTML pages."""
+    """Parser for exercise HTML pages.
+
+    The HTML is read by a pluggable engine:
+
+    - ``bs4``: BeautifulSoup with html.parser over the whole page
+    - ``bs4-strainer``: BeautifulSoup that only materializes the exercise
+      sections
+    - ``lxml``: lxml (optional dependency)
+    - ``selectolax``: selectolax with the lexbor parser (optional dependency)
+
+    All engines produce the same questions for well-formed pages; the
+    lxml and selectolax parsers may repair broken markup differently from
+    html.parser.
+    """
+
+    # Bump whenever parse results change, so cached results are not reused
+    VERSION = 1
+
+    ENGINES = ("bs4", "bs4-strainer", "lxml", "selectolax")
+
+    _engines: dict[str, Any] = {}
+    default_engine = Config.PARSER_ENGINE
 
-    @staticmethod
-    def parse_exercise_html(html: str) -> list[Question]:
+    @classmethod
+    def set_default_engine(cls, engine: str) -> None:
+        """Select the engine used when none is passed explicitly.
+
+        Args:
+            engine: One of ENGINES
+
+        Raises:
+            ValueError: If the engine is unknown
+            ImportError: If the engine's library is not installed
+        """
+        cls._get_engine(engine)
+        cls.default_engine = engine
+
+    @classmethod
+    def _get_engine(cls, engine: str) -> Any:
+        """Get the engine instance for a name, creating it on first use."""
+        if engine not in cls._engines:
+            if engine == "bs4":
+                cls._engines[engine] = _Bs4Engine()
+            elif engine == "bs4-strainer":
+                cls._engines[engine] = _Bs4Engine(restricted=True)
+            elif engine == "lxml":
+                cls._engines[engine] = _LxmlEngine()
+            elif engine == "selectolax":
+                cls._engines[engine] = _SelectolaxEngine()
+            else:
+                raise ValueError(f"Unknown parser engine: {engine}")
+        return cls._engines[engine]
+
+    @classmethod
+    def parse_exercise_html(cls, html: str, engine: str | None = None) -> list[Question]:
         """Parse exercise HTML and extract questions and choices.
 
         Args:
             html: HTML content of exercise page
+            engine: Parser engine (defaults to default_engine)
 
         Returns:
             List of Question objects
         """
-        soup = BeautifulSoup(html, "html.parser")
+        parser = cls._get_engine(engine or cls.default_engine)
         questions = []
 
-        # Find the kokuban container
-        kokuban = soup.find("div", id="kokuban-input-target")
-        if not kokuban:
-            # Some exercises might not have the kokuban container, try searching from root
-            kokuban = soup
-
-        # Find all exercise sections
-        exercise_sections = kokuban.find_all("section", class_="exercise")
-
-        for section in exercise_sections:
+        for section in parser.sections(html):
             # Extract question statement
-            statement_div = section.find("div", class_="statement")
-            if not statement_div:
-                continue
-
-            statement_text = statement_div.get_text(strip=True)
+            statement_text = parser.statement_text(section)
             if not statement_text:
                 continue
 
@@ -47,36 +284,27 @@ class ExerciseParser:
             question_found = False
 
             # Try to parse as a multiple-choice question
-            answers_ul = section.find("ul", class_="answers")
-            if answers_ul:
-                choice_items = answers_ul.find_all("li", attrs={"data-input-value": True})
-                if choice_items:
-                    for item in choice_items:
-                        choice_number_str = item.get("data-input-value", "")
-                        try:
-                            choice_number = int(choice_number_str)
-                        except ValueError:
-                            continue
-
-                        choice_text = item.get_text(strip=True)
-                        choice_text = re.sub(r"^[①②③④⑤⑥⑦⑧⑨⑩]\s*", "", choice_text)
-                        choice_text = re.sub(r"^\d+\.\s*", "", choice_text)
-                        choice_text = re.sub(r"^[①②③④⑤⑥⑦⑧⑨⑩]", "", choice_text)
-
-                        if choice_text:
-                            choices.append(Choice(number=choice_number, text=choice_text))
-                    
-                    if choices:
-                        question_found = True
+            choice_items = parser.choice_items(section)
+            if choice_items:
+                for choice_number_str, choice_text in choice_items:
+                    try:
+                        choice_number = int(choice_number_str)
+                    except ValueError:
+                        continue
 
-            # If not a multiple-choice, check for fill-in-the-blank (word input)
-            if not question_found:
-                word_input_li = section.find("li", attrs={"data-type": "word"})
-                if word_input_li and word_input_li.find("input", class_="answers"):
-                    # This is a fill-in-the-blank question.
-                    # We record the question statement, but there are no choices to record.
+                    choice_text = _clean_choice_text(choice_text)
+                    if choice_text:
+                        choices.append(Choice(number=choice_number, text=choice_text))
+
+                if choices:
                     question_found = True
 
+            # If not a multiple-choice, check for fill-in-the-blank (word input)
+            if not question_found and parser.has_word_input(section):
+                # This is a fill-in-the-blank question.
+                # We record the question statement, but there are no choices to record.
+                question_found = True
+
             # If any type of question was found, create the Question object
             if question_found:
                 question = Question(statement=statement_text, choices=choices)
@@ -0,0 +1,468 @@
+"""Staged crawl pipeline decoupling fetching, parsing and writing."""
+
+import heapq
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from .cache import ResponseCache, page_digest
+from .client import AuthenticationError, ZenStudyClient
+from .config import Config
+from .crawler import (
+    CrawlRecorder,
+    extract_chapters,
+    extract_exercises,
+    normalize_exercise_url,
+    ondemand_course_pages,
+)
+from .models import ExerciseCollection, Question
+from .parser import ExerciseParser
+from .ratelimit import TokenBucket
+
+# Marks the end of a stage's input
+_STOP = None
+
+
+@dataclass
+class StageStats:
+    """Throughput counters of a pipeline stage."""
+
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    started: float = field(default_factory=time.monotonic)
+    finished: float | None = None
+    # Fetcher threads and parse callbacks count concurrently
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, busy_seconds: float, items: int = 1) -> None:
+        """Count processed items and the time spent on them."""
+        with self._lock:
+            self.items += items
+            self.busy_seconds += busy_seconds
+
+    @property
+    def rate(self) -> float:
+        """Items per second of stage wall time."""
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+
+@dataclass
+class _Item:
+    """A unit travelling through the pipeline.
+
+    Course list, course and chapter items carry the traversal structure and
+    pass the fetch and parse stages untouched; exercise items are fetched
+    and parsed.
+    Whether a unit is restored from the journal is decided once by the
+    planner, so the writer applies exactly what was planned.
+    """
+
+    seq: int
+    kind: str  # "courses", "course", "course_end", "chapter", "chapter_end", "exercise"
+    data: dict[str, Any]
+    index: int = 0
+    total: int = 0
+    restore: bool = False
+    html: str | None = None
+    digest: str | None = None
+    questions: list[Question] | Future | None = None
+    error: Exception | None = None
+    # Set when the item was dropped because the pipeline failed
+    aborted: bool = False
+
+    def __lt__(self, other: "_Item") -> bool:
+        return self.seq < other.seq
+
+
+class _Halted(Exception):
+    """Raised in the planner once another stage has failed."""
+
+
+def _parse_page(html: str, engine: str) -> tuple[list[Question], float, float, int]:
+    """Parse an exercise page in a worker process.
+
+    Returns:
+        Parsed questions, when parsing started (time.monotonic()), the time
+        spent parsing and the ID of the worker process
+    """
+    started = time.monotonic()
+    questions = ExerciseParser.parse_exercise_html(html, engine)
+    return questions, started, time.monotonic() - started, os.getpid()
+
+
+class CrawlPipeline:
+    """Crawl with separate fetch, parse and write stages.
+
+    - Fetch stage: a planner thread walks courses and chapters, and fetcher
+      threads download exercise pages.
+    - Parse stage: pages are parsed in a process pool, so parsing uses all
+      cores and does not hold up the network.
+    - Write stage: the calling thread puts results back into traversal order
+      and hands them to the recorder, which saves the files.
+
+    Stages are connected by bounded queues, and at most ``window`` items are
+    in flight between planner and writer, so a slow stage throttles the ones
+    before it instead of buffering the whole crawl.
+
+    If a stage fails with an error that ends the crawl (authentication
+    failure, broken process pool, interruption), the remaining items are
+    drained without being applied, and run() raises the error once all
+    stages have stopped. Everything written before the failing item stays
+    journaled.
+    """
+
+    def __init__(
+        self,
+        fetch_workers: int | None = None,
+        parse_workers: int | None = None,
+        queue_size: int | None = None,
+        rate_limiter: TokenBucket | None = None,
+        cache: ResponseCache | None = None,
+        recorder: CrawlRecorder | None = None,
+        transport: httpx.BaseTransport | None = None,
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            fetch_workers: Number of fetcher threads
+            parse_workers: Number of parser processes
+            queue_size: Capacity of each queue between stages
+            rate_limiter: Rate limiter to pace requests with
+            cache: Response cache (no caching if omitted)
+            recorder: Recorder to report results to
+            transport: Transport to send requests with
+        """
+        self.fetch_workers = fetch_workers or Config.PIPELINE_FETCH_WORKERS
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+        self.window = self.queue_size * 3 + self.fetch_workers + self.parse_workers * 2
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.recorder = recorder or CrawlRecorder()
+        self.engine = ExerciseParser.default_engine
+        self.transport = transport
+
+        self.stats = {
+            name: StageStats(name) for name in ("fetch", "parse", "write")
+        }
+
+        self._fetch_queue: queue.Queue = queue.Queue(self.queue_size)
+        self._parse_queue: queue.Queue = queue.Queue(self.queue_size)
+        self._write_queue: queue.Queue = queue.Queue(self.queue_size)
+        self._in_flight = threading.BoundedSemaphore(self.window)
+        self._parse_slots = threading.BoundedSemaphore(self.parse_workers * 2)
+        self._seq = 0
+        self._failure: BaseException | None = None
+        self._failure_lock = threading.Lock()
+
+    def _fail(self, error: BaseException) -> None:
+        """Record the error that ends the crawl; the first one wins."""
+        with self._failure_lock:
+            if self._failure is None:
+                self._failure = error
+
+    def _emit(self, kind: str, data: dict[str, Any], **kwargs: Any) -> None:
+        """Send an item from the planner into the pipeline.
+
+        Raises:
+            _Halted: If the pipeline failed while waiting for room
+        """
+        while not self._in_flight.acquire(timeout=0.1):
+            if self._failure is not None:
+                raise _Halted
+        if self._failure is not None:
+            self._in_flight.release()
+            raise _Halted
+        self._fetch_queue.put(_Item(self._seq, kind, data, **kwargs))
+        self._seq += 1
+
+    def _plan(self, client: ZenStudyClient) -> None:
+        """Walk courses and chapters, emitting items in traversal order."""
+        try:
+            print("コース一覧を取得中...")
+            pages = ondemand_course_pages(client.iter_my_courses())
+            for page_number, ondemand_courses in enumerate(pages):
+                self._emit("courses", {"count": len(ondemand_courses), "more": page_number > 0})
+                self._plan_courses(client, ondemand_courses)
+        except _Halted:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.fetch_workers):
+                self._fetch_queue.put(_STOP)
+
+    def _plan_courses(self, client: ZenStudyClient, courses: list[dict[str, Any]]) -> None:
+        """Emit the items of a page of courses."""
+        recorder = self.recorder
+        for course_data in courses:
+            course_id = course_data.get("id")
+            if recorder.is_course_done(course_data):
+                self._emit("course", course_data, restore=True)
+                continue
+            self._emit("course", course_data)
+
+            chapters_data = extract_chapters(client.get_course_info(course_id))
+            for position, chapter_data in enumerate(chapters_data, 1):
+                chapter_id = chapter_data.get("id")
+                if recorder.is_chapter_done(course_id, chapter_data, position):
+                    self._emit("chapter", chapter_data, restore=True)
+                    continue
+                self._emit("chapter", chapter_data)
+
+                chapter_info = client.get_chapter_info(course_id, chapter_id)
+                exercises_data = extract_exercises(chapter_info)
+                for idx, exercise_data in enumerate(exercises_data, 1):
+                    self._emit(
+                        "exercise",
+                        exercise_data,
+                        index=idx,
+                        total=len(exercises_data),
+                        restore=recorder.is_exercise_done(
+                            course_id, chapter_id, exercise_data, idx
+                        ),
+                    )
+                self._emit("chapter_end", chapter_data)
+
+            self._emit("course_end", course_data)
+
+    def _fetch(self, client: ZenStudyClient, finished: list[int], lock: threading.Lock) -> None:
+        """Download exercise pages."""
+        stats = self.stats["fetch"]
+        try:
+            while (item := self._fetch_queue.get()) is not _STOP:
+                try:
+                    if self._failure is not None:
+                        item.aborted = True
+                    elif item.kind == "exercise" and not item.restore:
+                        started = time.monotonic()
+                        try:
+                            exercise_url = normalize_exercise_url(
+                                item.data.get("content_url", "")
+                            )
+                            item.html = client.get_exercise_html(exercise_url)
+                        except AuthenticationError:
+                            raise
+                        except Exception as e:
+                            item.error = e
+                        stats.add(time.monotonic() - started)
+                except BaseException as e:
+                    # Authentication failures must end the crawl instead of
+                    # being recorded as a failed exercise or killing this thread
+                    self._fail(e)
+                    item.aborted = True
+                finally:
+                    self._parse_queue.put(item)
+        finally:
+            # The last fetcher to finish closes the parse stage
+            with lock:
+                finished[0] += 1
+                if finished[0] == self.fetch_workers:
+                    stats.finished = time.monotonic()
+                    self._parse_queue.put(_STOP)
+
+    def _dispatch(self, pool: ProcessPoolExecutor) -> None:
+        """Hand fetched pages to the parser processes."""
+        stats = self.stats["parse"]
+        telemetry = self.recorder.telemetry
+
+        def done(future: Future) -> None:
+            if future.exception() is None:
+                questions, started, seconds, worker = future.result()
+                stats.add(seconds)
+                if telemetry is not None:
+                    telemetry.record(
+                        "parse",
+                        "parse",
+                        started,
+                        seconds,
+                        process=worker,
+                        engine=self.engine,
+                        cached=False,
+                        questions=len(questions),
+                    )
+            else:
+                stats.add(0.0)
+            self._parse_slots.release()
+
+        try:
+            while (item := self._parse_queue.get()) is not _STOP:
+                try:
+                    if item.html is not None and not item.aborted:
+                        if self.cache is not None:
+                            item.digest = page_digest(item.html)
+                            item.questions = self.cache.get_parsed(
+                                item.digest, ExerciseParser.VERSION, self.engine
+                            )
+
+                        if item.questions is None:
+                            self._parse_slots.acquire()
+                            try:
+                                future = pool.submit(_parse_page, item.html, self.engine)
+                            except BaseException:
+                                self._parse_slots.release()
+                                raise
+                            future.add_done_callback(done)
+                            item.questions = future
+                        else:
+                            stats.add(0.0)
+                            if telemetry is not None:
+                                telemetry.record(
+                                    "parse",
+                                    "parse",
+                                    time.monotonic(),
+                                    0.0,
+                                    engine=self.engine,
+                                    cached=True,
+                                    questions=len(item.questions),
+                                )
+                except BaseException as e:
+                    # e.g. BrokenProcessPool when a worker process died
+                    self._fail(e)
+                    item.aborted = True
+                finally:
+                    # The writer archives the page; otherwise it is not needed any more
+                    if self.recorder.archive is None:
+                        item.html = None
+                    self._write_queue.put(item)
+        finally:
+            stats.finished = time.monotonic()
+            self._write_queue.put(_STOP)
+
+    def _write(self, item: _Item) -> None:
+        """Apply an item to the recorder, in traversal order."""
+        recorder = self.recorder
+        if item.kind == "courses":
+            recorder.announce_courses(item.data["count"], item.data["more"])
+        elif item.kind == "course":
+            if item.restore:
+                recorder.restore_course(item.data)
+            else:
+                recorder.start_course(item.data)
+        elif item.kind == "chapter":
+            if item.restore:
+                recorder.restore_chapter(item.data)
+            else:
+                recorder.start_chapter(item.data)
+        elif item.kind == "chapter_end":
+            recorder.finish_chapter()
+        elif item.kind == "course_end":
+            recorder.finish_course()
+        else:
+            recorder.start_exercise(item.index, item.total, item.data)
+            if item.restore:
+                recorder.restore_exercise()
+                return
+
+            if isinstance(item.questions, Future):
+                try:
+                    item.questions = item.questions.result()[0]
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    item.error = e
+                else:
+                    if self.cache is not None:
+                        self.cache.put_parsed(
+                            item.digest, ExerciseParser.VERSION, self.engine, item.questions
+                        )
+
+            if item.html is not None:
+                try:
+                    recorder.record_page(item.html)
+                except Exception as e:
+                    item.error = e
+                item.html = None
+            if item.error is not None:
+                recorder.record_error(item.error)
+            else:
+                recorder.record_questions(item.questions)
+
+    def run(self) -> ExerciseCollection:
+        """Run the crawl.
+
+        Returns:
+            ExerciseCollection containing all courses and exercises
+
+        Raises:
+            BaseException: The error that ended the crawl, if any stage failed
+        """
+        stats = self.stats["write"]
+        pending: list[_Item] = []
+        next_seq = 0
+        halted = False
+
+        # One connection per fetcher, plus the planner and the course list
+        # prefetch
+        client = ZenStudyClient(
+            self.rate_limiter,
+            self.cache,
+            self.transport,
+            self.recorder.telemetry,
+            max_connections=self.fetch_workers + 2,
+            revalidate=self.recorder.incremental,
+        )
+        pool = ProcessPoolExecutor(
+            self.parse_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        with client, pool:
+            finished = [0]
+            lock = threading.Lock()
+            threads = [threading.Thread(target=self._plan, args=(client,), daemon=True)]
+            threads += [
+                threading.Thread(target=self._fetch, args=(client, finished, lock), daemon=True)
+                for _ in range(self.fetch_workers)
+            ]
+            threads.append(threading.Thread(target=self._dispatch, args=(pool,), daemon=True))
+            for thread in threads:
+                thread.start()
+
+            # Keep draining after a failure so the other stages can finish
+            while True:
+                try:
+                    if (item := self._write_queue.get()) is _STOP:
+                        break
+                    heapq.heappush(pending, item)
+                    while pending and pending[0].seq == next_seq:
+                        item = heapq.heappop(pending)
+                        try:
+                            halted = halted or item.aborted
+                            if not halted:
+                                started = time.monotonic()
+                                self._write(item)
+                                if item.kind == "exercise":
+                                    stats.add(time.monotonic() - started)
+                        finally:
+                            self._in_flight.release()
+                            next_seq += 1
+                except BaseException as e:
+                    self._fail(e)
+                    halted = True
+
+            for thread in threads:
+                thread.join()
+            stats.finished = time.monotonic()
+
+        if self._failure is not None:
+            raise self._failure
+
+        return self.recorder.collection
+
+    def print_stats(self) -> None:
+        """Print per-stage throughput."""
+        print("パイプライン:")
+        for stage in self.stats.values():
+            print(
+                f"  {stage.name}: {stage.items} 件, {stage.rate:.1f} 件/秒"
+                f" (処理時間 {stage.busy_seconds:.1f} 秒)"
+            )
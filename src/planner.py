@@ -0,0 +1,123 @@
+"""Plan an incremental crawl from the metadata of the previous one.
+
+An incremental crawl (``python -m src.main --incremental``) keeps the journal
+of the previous run and descends only into the courses, chapters and
+exercises whose API metadata changed since then (see CrawlJournal). The
+planner walks the same way without fetching exercise pages, so the requests
+of a nightly run can be checked before it is started:
+
+    uv run python -m src.main --dry-run
+"""
+
+from dataclasses import dataclass, field
+
+import httpx
+
+from .cache import ResponseCache
+from .client import ZenStudyClient
+from .crawler import CrawlRecorder, extract_chapters, extract_exercises, ondemand_course_pages
+from .ratelimit import TokenBucket
+
+
+@dataclass
+class CoursePlan:
+    """Requests planned for a course whose metadata changed."""
+
+    course_id: int
+    course_title: str
+    chapters: int = 0  # chapters whose sections are requested
+    exercises: int = 0  # exercise pages requested
+
+    @property
+    def requests(self) -> int:
+        """Number of requests, the course information included."""
+        return 1 + self.chapters + self.exercises
+
+
+@dataclass
+class CrawlPlan:
+    """Requests an incremental crawl sends."""
+
+    list_requests: int = 0  # pages of the course list
+    courses: int = 0  # on-demand courses listed
+    changed: list[CoursePlan] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        """Number of requests of the whole crawl."""
+        return self.list_requests + sum(course.requests for course in self.changed)
+
+    @property
+    def exercises(self) -> int:
+        """Number of exercise pages requested."""
+        return sum(course.exercises for course in self.changed)
+
+
+def plan_crawl(
+    recorder: CrawlRecorder,
+    rate_limiter: TokenBucket | None = None,
+    cache: ResponseCache | None = None,
+    transport: httpx.BaseTransport | None = None,
+) -> CrawlPlan:
+    """Find the requests a crawl with the recorder's journal would send.
+
+    The course list, and the course and chapter information of changed
+    courses and chapters, are requested to find the changed units below
+    them; exercise pages are only counted.
+
+    Args:
+        recorder: Recorder with the journal of the previous crawl
+        rate_limiter: Rate limiter to pace requests with
+        cache: Response cache (no caching if omitted)
+        transport: Transport to send requests with
+
+    Returns:
+        Planned requests
+    """
+    plan = CrawlPlan()
+    with ZenStudyClient(
+        rate_limiter, cache, transport, revalidate=recorder.incremental
+    ) as client:
+        for courses in ondemand_course_pages(client.iter_my_courses()):
+            plan.list_requests += 1
+            plan.courses += len(courses)
+            for course_data in courses:
+                if recorder.is_course_done(course_data):
+                    continue
+                course_id = course_data.get("id")
+                course = CoursePlan(course_id, course_data.get("title", ""))
+                plan.changed.append(course)
+
+                chapters_data = extract_chapters(client.get_course_info(course_id))
+                for position, chapter_data in enumerate(chapters_data, 1):
+                    chapter_id = chapter_data.get("id")
+                    if recorder.is_chapter_done(course_id, chapter_data, position):
+                        continue
+                    course.chapters += 1
+
+                    chapter_info = client.get_chapter_info(course_id, chapter_id)
+                    for idx, exercise_data in enumerate(extract_exercises(chapter_info), 1):
+                        if not recorder.is_exercise_done(
+                            course_id, chapter_id, exercise_data, idx
+                        ):
+                            course.exercises += 1
+    return plan
+
+
+def print_plan(plan: CrawlPlan) -> None:
+    """Print the requests of a plan by course.
+
+    Args:
+        plan: Plan made by plan_crawl()
+    """
+    print(f"オンデマンドコース {plan.courses} 件のうち、変更のあったコース {len(plan.changed)} 件")
+    for course in plan.changed:
+        print(
+            f"  【{course.course_title}】 チャプター {course.chapters} 件"
+            f" / 確認テスト {course.exercises} 件 ({course.requests} リクエスト)"
+        )
+    print()
+    print(
+        f"予定リクエスト数: {plan.requests} 件"
+        f" (コース一覧 {plan.list_requests} 件, 確認テスト {plan.exercises} 件を含む)"
+    )
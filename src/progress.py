@@ -0,0 +1,218 @@
+"""Crawl progress reporting off the crawl threads.
+
+The recorder reports every course, chapter, exercise and saved exercise as
+an event. Events are put on a queue and written by a background thread, so
+a crawl never waits for a slow terminal or a full pipe. Three modes are
+supported:
+
+- ``live``: a status line with counts, rates and the estimated time left,
+  redrawn at most every PROGRESS_INTERVAL seconds on a terminal and
+  written as a line every PROGRESS_LOG_INTERVAL seconds otherwise
+- ``quiet``: only the exercises that failed or had no questions
+- ``jsonl``: every event as one JSON object per line, for other programs
+
+Problems are printed as their own lines in the live mode as well.
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import IO, Any
+
+from .config import Config
+
+# Ends the writer thread
+_STOP = object()
+
+
+def _duration(seconds: float) -> str:
+    """Format a duration for the status line."""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}時間{seconds % 3600 // 60:02d}分"
+    if seconds >= 60:
+        return f"{seconds // 60}分{seconds % 60:02d}秒"
+    return f"{seconds}秒"
+
+
+class ProgressReporter:
+    """Write crawl progress from a background thread.
+
+    emit() only puts the event on a queue, so it is cheap and never blocks,
+    and it is safe to call from any thread. close() writes the events still
+    queued and the final status line.
+
+    Events and their fields:
+
+    - ``courses``: count, more (on-demand courses found on a page of the
+      course list)
+    - ``course``: course_id, title
+    - ``chapter``: course_id, chapter_id, title
+    - ``exercise``: course_id, chapter_id, exercise_id, title, index, total
+    - ``saved``: exercise_id, questions, files
+    - ``empty``: exercise_id, title (no questions found)
+    - ``error``: exercise_id, title, message (exercise_id is None when a
+      whole course or chapter failed)
+    - ``restored``: unit ("course", "chapter" or "exercise"), id, title,
+      exercises, questions (restored from the journal)
+    - ``course_done``: course_id, title, chapters
+    """
+
+    MODES = ("live", "quiet", "jsonl")
+
+    def __init__(
+        self,
+        mode: str | None = None,
+        path: Path | str | None = None,
+        stream: IO[str] | None = None,
+    ):
+        """Initialize the reporter and start its writer thread.
+
+        Args:
+            mode: One of MODES (defaults to Config.PROGRESS_MODE)
+            path: File to write to instead of the stream
+            stream: Stream to write to (defaults to sys.stdout)
+
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        self.mode = mode or Config.PROGRESS_MODE
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown progress mode: {self.mode}")
+        self._file = open(path, "w", encoding="utf-8") if path is not None else None
+        self.stream = self._file or stream or sys.stdout
+        self.started = time.monotonic()
+        self.counts: Counter[str] = Counter()
+        self.courses_total = 0
+        self._queue: queue.SimpleQueue[Any] = queue.SimpleQueue()
+        self._tty = self.mode == "live" and self.stream.isatty()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "ProgressReporter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Queue an event for the writer thread.
+
+        Args:
+            event: Event name (see the class docstring)
+            **fields: Details of the event
+        """
+        self._queue.put((time.monotonic(), event, fields))
+
+    def close(self) -> None:
+        """Write the queued events and the final status, and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._file is not None:
+            self._file.close()
+        else:
+            self.stream.flush()
+
+    def status(self, now: float | None = None) -> str:
+        """Describe the progress so far in one line.
+
+        Args:
+            now: time.monotonic() value to compute the rates at (defaults to
+                the current time)
+
+        Returns:
+            Counts, rates and, while courses remain, the estimated time left
+        """
+        counts = self.counts
+        elapsed = max((now or time.monotonic()) - self.started, 1e-9)
+        courses = f"コース {counts['courses']}"
+        if self.courses_total:
+            courses += f"/{self.courses_total}"
+        parts = [
+            courses,
+            f"確認テスト {counts['exercises']} 件",
+            f"問題 {counts['questions']} 問",
+            f"{counts['exercises'] / elapsed:.1f} 件/秒",
+        ]
+        if counts["restored"]:
+            parts[1] += f" (取得済み {counts['restored']} 件)"
+        done, total = counts["courses"], self.courses_total
+        if 0 < done < total:
+            parts.append(f"残り約 {_duration(elapsed * (total - done) / done)}")
+        if counts["errors"]:
+            parts.append(f"エラー {counts['errors']} 件")
+        return " | ".join(parts)
+
+    def _run(self) -> None:
+        """Write events until close() is called."""
+        interval = Config.PROGRESS_INTERVAL if self._tty else Config.PROGRESS_LOG_INTERVAL
+        next_draw = 0.0
+        pending = False  # counts changed since the last status line
+        while True:
+            timeout = max(next_draw - time.monotonic(), 0.0) if pending else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                self._handle(*item)
+                pending = self.mode == "live"
+            if pending and time.monotonic() >= next_draw:
+                self._draw()
+                pending = False
+                next_draw = time.monotonic() + interval
+            if self._queue.empty():
+                self.stream.flush()
+
+        if self.mode == "live" and self.counts:
+            self._draw(final=True)
+
+    def _handle(self, at: float, event: str, fields: dict[str, Any]) -> None:
+        """Count an event and write what the mode shows of it."""
+        counts = self.counts
+        if event == "courses":
+            self.courses_total += fields["count"]
+        elif event == "saved":
+            counts["exercises"] += 1
+            counts["questions"] += fields["questions"]
+        elif event == "empty":
+            counts["exercises"] += 1
+        elif event == "error":
+            counts["errors"] += 1
+        elif event == "restored":
+            counts["restored"] += fields["exercises"]
+            counts["questions"] += fields["questions"]
+            if fields["unit"] == "course":
+                counts["courses"] += 1
+        elif event == "course_done":
+            counts["courses"] += 1
+
+        if self.mode == "jsonl":
+            record = {"event": event, "elapsed": round(at - self.started, 3), **fields}
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        elif event == "empty":
+            self._write_line(f"! {fields['title']}: 問題が見つかりませんでした")
+        elif event == "error":
+            self._write_line(f"! {fields['title']}: エラー: {fields['message']}")
+
+    def _write_line(self, line: str) -> None:
+        """Write a line, clearing the status line on a terminal first."""
+        self.stream.write(f"\r\x1b[K{line}\n" if self._tty else f"{line}\n")
+
+    def _draw(self, final: bool = False) -> None:
+        """Write the status line."""
+        line = self.status()
+        if not self._tty:
+            self.stream.write(f"{line}\n")
+        else:
+            self.stream.write(f"\r\x1b[K{line}\n" if final else f"\r\x1b[K{line}")
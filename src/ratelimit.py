@@ -0,0 +1,230 @@
+"""Request rate limiting for ZEN Study clients."""
+
+import asyncio
+import threading
+import time
+
+from .config import Config
+
+
+class TokenBucket:
+    """Token bucket limiting the request rate across threads and event loops.
+
+    The bucket holds up to ``burst`` tokens and refills at ``rate`` tokens per
+    second. Each request takes one token; a request only waits when the bucket
+    is empty, so an unused budget never adds latency. Waiting time is
+    reserved under a lock and slept outside it, which lets synchronous and
+    asynchronous callers share one bucket.
+
+    Clients report how the server responds: pause() holds back every caller
+    while the server asked to wait (Retry-After), and the record_* methods
+    count retries and throttling signals. AdaptiveTokenBucket also adjusts
+    the rate from them.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """Initialize the bucket.
+
+        Args:
+            rate: Requests per second (0 or less disables limiting)
+            burst: Number of requests allowed back to back
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Statistics. throttled_seconds sums the waits of all callers, while
+        # throttled_wall_seconds counts overlapping waits only once and can be
+        # compared with the wall time of a crawl.
+        self.requests = 0
+        self.throttled_requests = 0
+        self.throttled_seconds = 0.0
+        self.throttled_wall_seconds = 0.0
+        self._throttled_until = 0.0
+        self._paused_until = 0.0
+        self.retries = 0
+        self.throttle_signals = 0
+
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller has to wait for it."""
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if self.rate <= 0:
+                wait = self._paused_until - now
+            else:
+                self._refill(now)
+
+                # A negative balance is a reservation of a future token
+                self._tokens -= 1.0
+                wait = -self._tokens / self.rate
+            if wait <= 0:
+                return 0.0
+
+            self.throttled_requests += 1
+            self.throttled_seconds += wait
+            self.throttled_wall_seconds += now + wait - max(now, self._throttled_until)
+            self._throttled_until = now + wait
+            return wait
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last update (lock held)."""
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all requests for a while, e.g. for a Retry-After header.
+
+        Requests waiting at the end of the pause are spread out at the
+        current rate instead of being released at once.
+
+        Args:
+            seconds: How long to send no requests
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            if self.rate > 0:
+                self._refill(now)
+                self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+    def record_success(self, endpoint: str, latency: float) -> None:
+        """Report a response that showed no sign of overload.
+
+        Args:
+            endpoint: Name of the endpoint the request went to
+            latency: Seconds the request took
+        """
+
+    def record_throttle(self) -> None:
+        """Report a sign of overload (429, 503 or a timeout)."""
+        with self._lock:
+            self.throttle_signals += 1
+
+    def record_retry(self) -> None:
+        """Report that a request is sent again."""
+        with self._lock:
+            self.retries += 1
+
+    def acquire(self) -> float:
+        """Wait for a token in synchronous code.
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Wait for a token in asynchronous code.
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket whose rate follows what the server tolerates (AIMD).
+
+    While responses are healthy, the rate grows by ``increase`` requests per
+    second every second. A throttling signal (429, 503, timeout) or latency
+    well above the usual latency of the endpoint multiplies the rate by
+    ``decrease``. After a decrease, further signals are ignored for a second,
+    since requests already in flight were sent at the old rate.
+    """
+
+    # Weight of the newest sample in the smoothed latency
+    _SMOOTHING = 0.2
+    # Latencies below this are never treated as congestion
+    _LATENCY_FLOOR = 0.05
+    _COOLDOWN = 1.0
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        min_rate: float | None = None,
+        max_rate: float | None = None,
+    ):
+        """Initialize the bucket.
+
+        Args:
+            rate: Initial requests per second
+            burst: Number of requests allowed back to back
+            min_rate: Lowest rate (defaults to Config.ADAPTIVE_MIN_RATE)
+            max_rate: Highest rate (defaults to Config.ADAPTIVE_MAX_RATE)
+        """
+        self.min_rate = min_rate or Config.ADAPTIVE_MIN_RATE
+        self.max_rate = max_rate or Config.ADAPTIVE_MAX_RATE
+        super().__init__(min(max(rate, self.min_rate), self.max_rate), burst)
+        self.increase = Config.ADAPTIVE_INCREASE
+        self.decrease = Config.ADAPTIVE_DECREASE
+        self.latency_tolerance = Config.ADAPTIVE_LATENCY_TOLERANCE
+        self.peak_rate = self.rate
+        self.decreases = 0
+        self._latency: dict[str, float] = {}  # smoothed latency per endpoint
+        self._usual_latency: dict[str, float] = {}
+        self._cooldown_until = 0.0
+
+    def _set_rate(self, rate: float, now: float) -> None:
+        """Change the rate, keeping the tokens earned at the old one (lock held)."""
+        self._refill(now)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.peak_rate = max(self.peak_rate, self.rate)
+
+    def _back_off(self, now: float) -> None:
+        """Decrease the rate multiplicatively (lock held)."""
+        if now < self._cooldown_until:
+            return
+        self._set_rate(self.rate * self.decrease, now)
+        self._cooldown_until = now + self._COOLDOWN
+        self.decreases += 1
+
+    def record_success(self, endpoint: str, latency: float) -> None:
+        """Grow the rate, or back off if the endpoint got much slower."""
+        with self._lock:
+            now = time.monotonic()
+            smoothed = self._latency.get(endpoint, latency)
+            smoothed += (latency - smoothed) * self._SMOOTHING
+            self._latency[endpoint] = smoothed
+
+            # The usual latency follows the lowest one seen, but drifts
+            # towards the current one so a lasting slowdown becomes normal
+            usual = min(latency, self._usual_latency.get(endpoint, latency))
+            usual += (smoothed - usual) * 0.01
+            self._usual_latency[endpoint] = usual
+
+            if smoothed > max(usual * self.latency_tolerance, self._LATENCY_FLOOR):
+                self._back_off(now)
+            else:
+                # One full step per second's worth of requests
+                self._set_rate(self.rate + self.increase / self.rate, now)
+
+    def record_throttle(self) -> None:
+        """Back off the rate."""
+        super().record_throttle()
+        with self._lock:
+            self._back_off(time.monotonic())
+
+
+_shared_limiter: TokenBucket | None = None
+
+
+def get_shared_limiter() -> TokenBucket:
+    """Get the process-wide rate limiter configured from Config.
+
+    Returns:
+        Shared TokenBucket instance
+    """
+    global _shared_limiter
+    if _shared_limiter is None:
+        _shared_limiter = TokenBucket(Config.REQUESTS_PER_SECOND, Config.RATE_BURST)
+    return _shared_limiter
@@ -0,0 +1,281 @@
+"""Parse the fetched exercise pages again, without the network.
+
+After the parser is fixed or extended, the question files and the summary
+are rebuilt from the pages kept by an earlier crawl:
+
+- By default the pages come from the page archive. They are decompressed
+  and parsed in a process pool, and the results are handed to a
+  CrawlRecorder in crawl order, so the output is written as by a crawl.
+- With ``--from-cache`` the crawl is replayed from the response cache:
+  the course list, course and chapter details and exercise pages are all
+  served from the cached responses.
+
+Exercises whose page was not kept are missing from the output.
+
+    uv run python -m src.reparse
+    uv run python -m src.reparse --from-cache
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+
+from .archive import ArchivedPage, PageArchive
+from .cache import ResponseCache
+from .config import Config
+from .crawler import CrawlRecorder
+from .main import scrape_exercises
+from .models import Question
+from .parser import ExerciseParser
+from .progress import ProgressReporter
+from .ratelimit import TokenBucket
+from .storage import QUESTION_STORES, open_question_store
+from .summary import SummaryWriter
+
+# Pages sent to a worker process at a time
+_CHUNK_SIZE = 16
+
+# Pages submitted to the process pool at a time; results of at most two
+# windows wait for the writer
+_WINDOW = 64 * _CHUNK_SIZE
+
+# Archive of a worker process, opened by _open_archive()
+_archive: PageArchive | None = None
+
+
+def cache_transport(cache: ResponseCache) -> httpx.MockTransport:
+    """Build a transport that answers requests from the response cache only.
+
+    Cached responses are served regardless of their age; a request that is
+    not cached is answered with 404 Not Found, which is not retried.
+
+    Args:
+        cache: Response cache to serve from
+
+    Returns:
+        Transport for ZenStudyClient
+    """
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        # The client keys query parameters separately from the URL
+        base_url = str(request.url.copy_with(query=None))
+        for url, params in ((base_url, dict(request.url.params)), (str(request.url), None)):
+            entry = cache.lookup(cache.make_key(url, params))
+            if entry is not None:
+                headers = {"Content-Type": entry.content_type} if entry.content_type else {}
+                return httpx.Response(200, headers=headers, content=entry.body)
+        return httpx.Response(404, text="not in the response cache")
+
+    return httpx.MockTransport(handle)
+
+
+def reparse(cache: ResponseCache, recorder: CrawlRecorder) -> None:
+    """Replay a crawl from the response cache, parsing every page again.
+
+    Args:
+        cache: Response cache to serve the pages from
+        recorder: Recorder to report the parsed questions to
+    """
+    # The cookie is never sent, but the client requires one
+    os.environ.setdefault("ZANE_SESSION", "offline")
+    # Parse results are not taken from the cache, so every page is parsed
+    scrape_exercises(TokenBucket(0), None, recorder, cache_transport(cache))
+
+
+def _open_archive(path: str, engine: str) -> None:
+    """Initialize a worker process of reparse_archive()."""
+    global _archive
+    ExerciseParser.set_default_engine(engine)
+    _archive = PageArchive(path, readonly=True)
+
+
+def _parse_archived(page: ArchivedPage) -> list[Question] | Exception:
+    """Read and parse an archived page, returning the error if that fails."""
+    try:
+        return ExerciseParser.parse_exercise_html(_archive.read(page))
+    except Exception as e:
+        return e
+
+
+def _parse_in_pool(
+    pool: ProcessPoolExecutor, pages: list[ArchivedPage]
+) -> Iterator[list[Question] | Exception]:
+    """Parse pages in a process pool, yielding the results in page order."""
+    pending = pool.map(_parse_archived, pages[:_WINDOW], chunksize=_CHUNK_SIZE)
+    for start in range(_WINDOW, len(pages), _WINDOW):
+        # Keep the workers busy while the writer consumes the previous window
+        following = pool.map(
+            _parse_archived, pages[start : start + _WINDOW], chunksize=_CHUNK_SIZE
+        )
+        yield from pending
+        pending = following
+    yield from pending
+
+
+def _parse_in_process(
+    archive: PageArchive, pages: list[ArchivedPage]
+) -> Iterator[list[Question] | Exception]:
+    """Parse pages one after another in this process."""
+    for page in pages:
+        try:
+            yield ExerciseParser.parse_exercise_html(archive.read(page))
+        except Exception as e:
+            yield e
+
+
+def reparse_archive(
+    archive: PageArchive, recorder: CrawlRecorder, workers: int | None = None
+) -> None:
+    """Parse every archived page again and replay the crawl from the results.
+
+    Args:
+        archive: Archive to read the pages from
+        recorder: Recorder to report the parsed questions to
+        workers: Number of parser processes (defaults to the number of CPUs;
+            1 parses in this process)
+    """
+    pages = archive.pages()
+    pool = None
+    if workers == 1 or len(pages) < 2:
+        results = _parse_in_process(archive, pages)
+    else:
+        pool = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_open_archive,
+            initargs=(str(archive.path), ExerciseParser.default_engine),
+        )
+        results = _parse_in_pool(pool, pages)
+
+    try:
+        course = chapter = None
+        for page, result in zip(pages, results):
+            if page.course_id != course:
+                if chapter is not None:
+                    recorder.finish_chapter()
+                if course is not None:
+                    recorder.finish_course()
+                recorder.start_course(page.course)
+                course, chapter = page.course_id, None
+            if page.chapter_id != chapter:
+                if chapter is not None:
+                    recorder.finish_chapter()
+                recorder.start_chapter(page.chapter, page.chapter_position)
+                chapter = page.chapter_id
+
+            recorder.start_exercise(page.exercise_index, page.exercise_total, page.exercise)
+            if isinstance(result, Exception):
+                recorder.record_error(result)
+            else:
+                recorder.record_questions(result)
+
+        if chapter is not None:
+            recorder.finish_chapter()
+        if course is not None:
+            recorder.finish_course()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv: Argument list (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="保存したページを通信せずに解析し直し、問題ファイルとサマリーを書き直します"
+    )
+    parser.add_argument(
+        "--from-cache",
+        action="store_true",
+        help=(
+            f"ページアーカイブ ({Config.OUTPUT_DIR}/{Config.PAGE_ARCHIVE_DIR}) の代わりに"
+            "レスポンスキャッシュから取得を再現する"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="並列に解析するプロセス数 (デフォルト: CPUコア数)",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=ExerciseParser.ENGINES,
+        default=Config.PARSER_ENGINE,
+        help=f"HTMLパーサーエンジン (デフォルト: {Config.PARSER_ENGINE})",
+    )
+    parser.add_argument(
+        "--store",
+        choices=QUESTION_STORES,
+        default=Config.QUESTION_STORE,
+        help=f"問題の保存形式 (デフォルト: {Config.QUESTION_STORE})",
+    )
+    parser.add_argument(
+        "--summary-format",
+        choices=SummaryWriter.FORMATS,
+        default=Config.SUMMARY_FORMAT,
+        help=f"サマリーの形式 (デフォルト: {Config.SUMMARY_FORMAT})",
+    )
+    parser.add_argument(
+        "--progress",
+        choices=ProgressReporter.MODES,
+        default=Config.PROGRESS_MODE,
+        help=f"進捗の表示 (live / quiet / jsonl, デフォルト: {Config.PROGRESS_MODE})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Parse the kept pages again and rewrite the output."""
+    args = parse_args(argv)
+    ExerciseParser.set_default_engine(args.parser)
+
+    archive_path = Path(Config.OUTPUT_DIR) / Config.PAGE_ARCHIVE_DIR
+    if not args.from_cache and not (archive_path / "index.sqlite3").exists():
+        print(f"ページアーカイブ {archive_path} がありません。")
+        print("--from-cache を指定するとレスポンスキャッシュから解析し直せます。")
+        return
+
+    source = ResponseCache() if args.from_cache else PageArchive(archive_path)
+    summary = SummaryWriter(fmt=args.summary_format)
+    store = open_question_store(args.store)
+    progress = ProgressReporter(args.progress)
+    recorder = CrawlRecorder(summary=summary, store=store, progress=progress)
+    started = time.monotonic()
+    try:
+        with progress:
+            if args.from_cache:
+                reparse(source, recorder)
+            else:
+                reparse_archive(source, recorder, args.workers)
+        summary_path = summary.close()
+    finally:
+        summary.abort()
+        store.close()
+        source.close()
+
+    if summary_path is None:
+        print("解析できた確認テストがありませんでした。")
+        return
+    totals = recorder.totals
+    print(f"\nサマリーを {summary_path} に保存しました")
+    print(
+        f"解析し直しました: 確認テスト {totals.exercises} 件 / 問題 {totals.questions} 問"
+        f" ({time.monotonic() - started:.1f} 秒)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,714 @@
+"""Full-text search over scraped questions.
+
+Questions are indexed by character bigrams, which finds Japanese words
+without a dictionary or a morphological analyzer. The index lives in a
+directory of immutable segment files, which are memory-mapped for queries,
+and a SQLite table of the indexed questions:
+
+- Each update writes one new segment for the questions that were added or
+  changed. A question that changed or disappeared is marked deleted, and
+  its postings are dropped the next time the segments are merged.
+- Within a segment, the bigrams form a sorted array searched by bisection.
+  Each bigram's postings are (document, frequency) pairs, delta- and
+  varint-encoded in blocks of _BLOCK_SIZE. The last document of every block
+  is stored separately, so a query only decodes the blocks that can hold
+  its candidates.
+
+Results are ranked with BM25. Until the next merge, a deleted question
+still counts towards the number of questions that contain its bigrams,
+which only shifts the weights of the bigrams it contained.
+
+    uv run python -m src.search 正しいもの
+"""
+
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from itertools import accumulate
+from pathlib import Path
+from typing import Any
+
+from . import models
+from .config import Config
+from .models import Course, Question
+from .storage import QUESTION_STORES, course_records, iter_store_records, question_digest
+
+_MAGIC = b"ZSQ1"
+_HEADER = struct.Struct("<4sIIIII")  # magic, base document, documents, terms, blocks, unused
+_BLOCK_SIZE = 128
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    exercise_id INTEGER NOT NULL,
+    question_number INTEGER NOT NULL,
+    course_title TEXT NOT NULL,
+    chapter_title TEXT NOT NULL,
+    exercise_title TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    question TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    live INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS docs_live_key
+    ON docs (course_id, chapter_id, exercise_id, question_number) WHERE live;
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY
+);
+"""
+
+
+def _runs(text: str) -> list[str]:
+    """Normalize text and split it into runs of non-space characters."""
+    return unicodedata.normalize("NFKC", text).casefold().split()
+
+
+def _bigram(first: str, second: str | None) -> int:
+    """Pack two characters into a term; code points fit in 21 bits."""
+    return (ord(first) << 21) | (ord(second) if second else 0)
+
+
+def tokenize(text: str) -> list[int]:
+    """Split text into character bigram terms.
+
+    The last character of every run is also indexed paired with nothing,
+    so every character starts at least one term and single-character
+    queries can be answered by a prefix lookup.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Terms in text order, with repetitions
+    """
+    terms = []
+    for run in _runs(text):
+        codes = list(map(ord, run))
+        terms += [(a << 21) | b for a, b in zip(codes, codes[1:])]
+        terms.append(codes[-1] << 21)
+    return terms
+
+
+def _question_text(question: Question) -> str:
+    """Text of a question that is indexed."""
+    return "\n".join([question.statement, *(choice.text for choice in question.choices)])
+
+
+def _add_postings(postings: defaultdict[int, list], doc: int, question: Question) -> int:
+    """Add the terms of a question to the postings of a new segment.
+
+    Returns:
+        Number of terms of the question
+    """
+    terms = tokenize(_question_text(question))
+    for term, frequency in Counter(terms).items():
+        postings[term].append((doc, frequency))
+    return len(terms)
+
+
+def _put_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_segment(path: Path, base: int, lengths: list[int], postings: dict[int, list]) -> None:
+    """Write a segment file.
+
+    Args:
+        path: Segment file
+        base: ID of the first document of the segment
+        lengths: Number of terms of each document from base on (0 for
+            documents that are not in the segment); the documents are also
+            stored ordered by length, for ranking
+        postings: (document, frequency) pairs of each term, by document
+    """
+    terms = sorted(postings)
+    first_block = array("I")
+    frequencies = array("I")
+    block_last = array("I")
+    block_offset = array("I")
+    blob = bytearray()
+    for term in terms:
+        pairs = postings[term]
+        first_block.append(len(block_last))
+        frequencies.append(len(pairs))
+        for start in range(0, len(pairs), _BLOCK_SIZE):
+            block_offset.append(len(blob))
+            previous = block_last[-1] if start else base - 1
+            values = []
+            for doc, frequency in pairs[start : start + _BLOCK_SIZE]:
+                values += (doc - previous, frequency)
+                previous = doc
+            if max(values) < 0x80:
+                blob += bytes(values)
+            else:
+                for value in values:
+                    _put_varint(blob, value)
+            block_last.append(previous)
+    first_block.append(len(block_last))
+    block_offset.append(len(blob))
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, base, len(lengths), len(terms), len(block_last), 0))
+        f.write(array("Q", terms).tobytes())
+        by_length = array("I", sorted(range(len(lengths)), key=lengths.__getitem__))
+        for values in (
+            array("I", lengths),
+            by_length,
+            first_block,
+            frequencies,
+            block_last,
+            block_offset,
+        ):
+            f.write(values.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+class _Segment:
+    """A memory-mapped segment file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: list[memoryview] = []
+        view = self._view(0, len(self._mmap), "B")
+        magic, self.base, self.doc_count, term_count, block_count, _ = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError(f"Not a search index segment: {path}")
+
+        offset = _HEADER.size
+
+        def take(fmt: str, count: int) -> memoryview:
+            nonlocal offset
+            size = count * struct.calcsize(fmt)
+            values = self._view(offset, offset + size, fmt)
+            offset += size
+            return values
+
+        self.terms = take("Q", term_count)
+        self.lengths = take("I", self.doc_count)
+        self.by_length = take("I", self.doc_count)
+        self.first_block = take("I", term_count + 1)
+        self.frequencies = take("I", term_count)
+        self.block_last = take("I", block_count)
+        self.block_offset = take("I", block_count + 1)
+        self.postings = self._view(offset, len(self._mmap), "B")
+
+    def _view(self, start: int, end: int, fmt: str) -> memoryview:
+        view = memoryview(self._mmap)[start:end].cast(fmt)
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._mmap.close()
+
+    def find(self, term: int, prefix: bool) -> range:
+        """Indexes of a term, or of all terms starting with a character."""
+        start = bisect_left(self.terms, term)
+        if not prefix:
+            found = start < len(self.terms) and self.terms[start] == term
+            return range(start, start + 1 if found else start)
+        return range(start, bisect_left(self.terms, term + (1 << 21)))
+
+    def _decode(self, block: int, first: bool) -> Iterable[tuple[int, int]]:
+        """Decode the (document, frequency) pairs of a block."""
+        data = self.postings[self.block_offset[block] : self.block_offset[block + 1]].tobytes()
+        previous = self.base - 1 if first else self.block_last[block - 1]
+        if data.isascii():
+            # Every value fits in one byte, as in all but the sparsest blocks
+            docs = accumulate(data[0::2], initial=previous)
+            next(docs)
+            return zip(docs, data[1::2])
+
+        values: list[int] = []
+        value = shift = 0
+        for byte in data:
+            value |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+            else:
+                values.append(value)
+                value = shift = 0
+        docs = accumulate(values[0::2], initial=previous)
+        next(docs)
+        return zip(docs, values[1::2])
+
+    def postings_of(self, term_index: int, docs: set[int] | None = None) -> dict[int, int]:
+        """Frequencies of a term by document.
+
+        Args:
+            term_index: Index from find()
+            docs: Only decode the blocks that can contain these documents
+
+        Returns:
+            Frequency of the term in each document it occurs in (restricted
+            to docs when given)
+        """
+        first, end = self.first_block[term_index], self.first_block[term_index + 1]
+        blocks = range(first, end)
+        # Looking up the block of every candidate only pays off for few candidates
+        if docs is not None and len(docs) < end - first:
+            last = self.block_last[first:end].tolist()
+            blocks = sorted({first + bisect_left(last, doc) for doc in docs} - {end})
+        found: dict[int, int] = {}
+        for block in blocks:
+            found.update(self._decode(block, block == first))
+        if docs is not None:
+            extra = found.keys() - docs
+            if len(extra) > len(found) // 2:
+                return {doc: found[doc] for doc in docs & found.keys()}
+            for doc in extra:
+                del found[doc]
+        return found
+
+
+@dataclass
+class SearchHit:
+    """A question found by a search."""
+
+    score: float
+    course_id: int
+    course_title: str
+    chapter_id: int
+    chapter_title: str
+    exercise_id: int
+    exercise_title: str
+    question_number: int
+    question: Question
+
+
+class SearchIndex:
+    """Bigram inverted index of the stored questions.
+
+    Questions are identified by course, chapter, exercise and question
+    number, like in the question stores. update() only indexes the
+    questions whose content changed, so it can be fed a whole store or just
+    the latest crawl.
+    """
+
+    def __init__(self, path: Path | str | None = None):
+        """Open or create an index.
+
+        Args:
+            path: Index directory (defaults to SEARCH_INDEX_DIR in the output
+                directory)
+        """
+        self.path = Path(path or Path(Config.OUTPUT_DIR) / Config.SEARCH_INDEX_DIR)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path / "docs.sqlite3")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._segments = [
+            _Segment(self.path / name)
+            for name, in self._conn.execute("SELECT name FROM segments ORDER BY name")
+        ]
+        self._load_stats()
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the index."""
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+        self._conn.close()
+
+    def __len__(self) -> int:
+        """Number of indexed questions."""
+        return self._live
+
+    def _load_stats(self) -> None:
+        """Read the collection statistics BM25 needs."""
+        self._live, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE live"
+        ).fetchone()
+        self._average_length = total / self._live if self._live else 0.0
+        self._deleted = {
+            doc for doc, in self._conn.execute("SELECT doc_id FROM docs WHERE NOT live")
+        }
+
+    def update(self, records: Iterable[dict[str, Any]], complete: bool = False) -> tuple[int, int]:
+        """Index new and changed questions.
+
+        Args:
+            records: Question records, as yielded by the stores'
+                iter_records() or by course_records() (exercise_index is not
+                used)
+            complete: The records are the whole corpus; indexed questions
+                missing from them are removed
+
+        Returns:
+            Numbers of indexed and removed questions
+        """
+        indexed = {}
+        for doc, *key, digest, course_title, chapter_title, exercise_title in self._conn.execute(
+            "SELECT doc_id, course_id, chapter_id, exercise_id, question_number,"
+            " digest, course_title, chapter_title, exercise_title FROM docs WHERE live"
+        ):
+            indexed[tuple(key)] = (doc, digest, (course_title, chapter_title, exercise_title))
+        (next_doc,) = self._conn.execute(
+            "SELECT COALESCE(MAX(doc_id), -1) + 1 FROM docs"
+        ).fetchone()
+        base = next_doc
+
+        seen = set()
+        removed: list[int] = []
+        renamed: list[tuple] = []
+        rows: list[tuple] = []
+        lengths: list[int] = []
+        postings: defaultdict[int, list] = defaultdict(list)
+        for record in records:
+            key = (
+                record["course_id"],
+                record["chapter_id"],
+                record["exercise_id"],
+                record["question_number"],
+            )
+            titles = (record["course_title"], record["chapter_title"], record["exercise_title"])
+            question = record["question"]
+            if not isinstance(question, Question):
+                question = Question.from_dict(question)
+            digest = question_digest(question)
+            seen.add(key)
+
+            old = indexed.get(key)
+            if old is not None and old[1] == digest:
+                if old[2] != titles:
+                    renamed.append((*titles, old[0]))
+                continue
+            if old is not None:
+                removed.append(old[0])
+
+            lengths.append(_add_postings(postings, next_doc, question))
+            rows.append(
+                (next_doc, *key, *titles, digest, models.dumps(question), lengths[-1], 1)
+            )
+            indexed[key] = (next_doc, digest, titles)
+            next_doc += 1
+
+        if complete:
+            removed += [doc for key, (doc, _, _) in indexed.items() if key not in seen]
+
+        if rows:
+            name = f"{base:010d}.seg"
+            _write_segment(self.path / name, base, lengths, postings)
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE docs SET live = 0 WHERE doc_id = ?", [(doc,) for doc in removed]
+            )
+            self._conn.executemany(
+                "UPDATE docs SET course_title = ?, chapter_title = ?, exercise_title = ?"
+                " WHERE doc_id = ?",
+                renamed,
+            )
+            self._conn.executemany(
+                "INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            if rows:
+                self._conn.execute("INSERT INTO segments VALUES (?)", (name,))
+        if rows:
+            self._segments.append(_Segment(self.path / name))
+        self._load_stats()
+
+        if len(self._segments) > Config.SEARCH_MAX_SEGMENTS:
+            self.merge()
+        return len(rows), len(removed)
+
+    def add_course(self, course: Course) -> tuple[int, int]:
+        """Index the questions of a crawled course.
+
+        Args:
+            course: Course with its chapters, exercises and questions
+
+        Returns:
+            Numbers of indexed and removed questions
+        """
+        return self.update(course_records(course))
+
+    def merge(self) -> None:
+        """Rewrite all segments as one, dropping deleted questions."""
+        rows = self._conn.execute(
+            "SELECT doc_id, question FROM docs WHERE live ORDER BY doc_id"
+        ).fetchall()
+        old = self._segments
+        self._segments = []
+        for segment in old:
+            segment.close()
+
+        name = None
+        if rows:
+            base = rows[0][0]
+            lengths = [0] * (rows[-1][0] - base + 1)
+            postings: defaultdict[int, list] = defaultdict(list)
+            for doc, data in rows:
+                question = Question.from_dict(json.loads(data))
+                lengths[doc - base] = _add_postings(postings, doc, question)
+            # Named after the newest segment, so it sorts last and cannot clash
+            name = f"{rows[-1][0]:010d}.merged.seg"
+            _write_segment(self.path / name, base, lengths, postings)
+
+        with self._conn:
+            self._conn.execute("DELETE FROM segments")
+            if name:
+                self._conn.execute("INSERT INTO segments VALUES (?)", (name,))
+            self._conn.execute("DELETE FROM docs WHERE NOT live")
+        for segment in old:
+            if segment.path.name != name:
+                segment.path.unlink(missing_ok=True)
+        if name:
+            self._segments.append(_Segment(self.path / name))
+        self._load_stats()
+
+    def search(self, query: str, limit: int = 10, match_all: bool = True) -> list[SearchHit]:
+        """Find the questions that best match a query.
+
+        Args:
+            query: Words to look for in statements and choices
+            limit: Maximum number of hits
+            match_all: Only return questions containing every bigram of the
+                query; otherwise any bigram matches
+
+        Returns:
+            Hits, best first
+        """
+        # (term, prefix lookup) for every distinct query term
+        wanted: dict[tuple[int, bool], None] = {}
+        for run in _runs(query):
+            if len(run) == 1:
+                wanted[(_bigram(run, None), True)] = None
+            for a, b in zip(run, run[1:]):
+                wanted[(_bigram(a, b), False)] = None
+        if not wanted or not self._live:
+            return []
+
+        found = [
+            [segment.find(term, prefix) for segment in self._segments] for term, prefix in wanted
+        ]
+        # A prefix lookup can count a question once per matching term
+        frequencies = [
+            min(
+                sum(
+                    segment.frequencies[i]
+                    for segment, indexes in zip(self._segments, ranges)
+                    for i in indexes
+                ),
+                self._live,
+            )
+            for ranges in found
+        ]
+        weights = [
+            math.log(1 + (self._live - df + 0.5) / (df + 0.5)) * (_K1 + 1) for df in frequencies
+        ]
+        # Intersect from the rarest term, so later terms decode few blocks
+        order = sorted(range(len(found)), key=lambda t: frequencies[t])
+
+        best: list[tuple[float, int]] = []  # heap of (score, -doc)
+        for s, segment in enumerate(self._segments):
+            matches = self._match(segment, [(weights[t], found[t][s]) for t in order], match_all)
+            if matches:
+                self._rank(segment, matches, match_all, best, limit)
+        if not best:
+            return []
+
+        best.sort(reverse=True)
+        rows = {
+            row[0]: row[1:]
+            for row in self._conn.execute(
+                "SELECT doc_id, course_id, course_title, chapter_id, chapter_title, exercise_id,"
+                " exercise_title, question_number, question FROM docs"
+                f" WHERE doc_id IN ({', '.join('?' * len(best))})",
+                [-doc for _, doc in best],
+            )
+        }
+        return [
+            SearchHit(score, *rows[-doc][:-1], Question.from_dict(json.loads(rows[-doc][-1])))
+            for score, doc in best
+        ]
+
+    def _match(
+        self, segment: _Segment, terms: list[tuple[float, range]], match_all: bool
+    ) -> list[tuple[float, dict[int, int]]]:
+        """Find the questions of a segment that match the query terms.
+
+        Args:
+            segment: Segment to search
+            terms: BM25 weight and term indexes (from _Segment.find()) of
+                each query term, rarest first
+            match_all: Whether a question must contain every query term
+
+        Returns:
+            Weight and frequencies by question of each query term; with
+            match_all, only for the questions that contain every term, and
+            empty if there are none
+        """
+        candidates: set[int] | None = None
+        matches = []
+        for weight, indexes in terms:
+            term_frequencies: dict[int, int] = {}
+            for i in indexes:
+                postings = segment.postings_of(i, candidates)
+                if term_frequencies:
+                    for doc, frequency in postings.items():
+                        term_frequencies[doc] = term_frequencies.get(doc, 0) + frequency
+                else:
+                    term_frequencies = postings
+            if match_all:
+                if not term_frequencies:
+                    return []
+                candidates = set(term_frequencies)
+            matches.append((weight, term_frequencies))
+        return matches
+
+    def _rank(
+        self,
+        segment: _Segment,
+        matches: list[tuple[float, dict[int, int]]],
+        match_all: bool,
+        best: list[tuple[float, int]],
+        limit: int,
+    ) -> None:
+        """Score the matching questions of a segment and keep the best.
+
+        Questions in which some query term occurs more than once are scored
+        directly. In the others every term occurs once, so BM25 only depends
+        on their length: with many of them, they are scored from the
+        shortest on, until even a question with every query term could not
+        beat the current best.
+
+        Args:
+            segment: Segment the matches come from
+            matches: Result of _match()
+            match_all: Whether a question must contain every query term
+            best: Heap of (score, -document) of the best questions so far
+            limit: Number of questions to keep
+        """
+        if match_all:
+            # Each term was only looked up for the questions with the terms before it
+            candidates = set(matches[-1][1])
+        else:
+            candidates = set().union(*(term_frequencies for _, term_frequencies in matches))
+        candidates -= self._deleted
+        base = segment.base
+        lengths = segment.lengths
+        scale = _B / self._average_length
+
+        def push(doc: int, norm: float) -> None:
+            score = 0.0
+            for weight, term_frequencies in matches:
+                frequency = term_frequencies.get(doc)
+                if frequency:
+                    score += weight * frequency / (frequency + norm)
+            if len(best) < limit:
+                heapq.heappush(best, (score, -doc))
+            elif (score, -doc) > best[0]:
+                heapq.heapreplace(best, (score, -doc))
+
+        repeated = {
+            doc
+            for _, term_frequencies in matches
+            for doc, frequency in term_frequencies.items()
+            if frequency > 1
+        }
+        single = candidates - repeated
+        for doc in candidates & repeated:
+            push(doc, _K1 * (1 - _B + scale * lengths[doc - base]))
+        if len(single) * 8 < segment.doc_count:
+            for doc in single:
+                push(doc, _K1 * (1 - _B + scale * lengths[doc - base]))
+            return
+
+        total_weight = sum(weight for weight, _ in matches)
+        for offset in segment.by_length:
+            doc = base + offset
+            if doc not in single:
+                continue
+            norm = _K1 * (1 - _B + scale * lengths[offset])
+            if len(best) == limit and total_weight / (1 + norm) < best[0][0]:
+                break
+            push(doc, norm)
+
+
+def _print_hit(rank: int, hit: SearchHit) -> None:
+    print(f"{rank}. {hit.course_title} / {hit.chapter_title} / {hit.exercise_title}"
+          f" 問{hit.question_number} (スコア {hit.score:.2f})")
+    print(f"   {hit.question.statement}")
+    for choice in hit.question.choices:
+        print(f"     {choice.number}. {choice.text}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="取得した問題を全文検索する")
+    parser.add_argument("query", nargs="*", help="検索語 (問題文・選択肢を検索)")
+    parser.add_argument(
+        "--store",
+        choices=QUESTION_STORES,
+        default=Config.QUESTION_STORE,
+        help=f"インデックスを更新する元の問題の保存形式 (デフォルト: {Config.QUESTION_STORE})",
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="保存済みの問題からインデックスを更新してから検索する (変更のあった問題だけを追加)",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=10, help="表示する件数 (デフォルト: 10)"
+    )
+    parser.add_argument(
+        "--any",
+        action="store_true",
+        help="検索語の一部だけを含む問題も表示する (デフォルトはすべてを含む問題のみ)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Search the index from the command line."""
+    args = parse_args(argv)
+    with SearchIndex() as index:
+        if args.update or not len(index):
+            added, removed = index.update(iter_store_records(args.store), complete=True)
+            print(f"インデックスを更新しました: 追加 {added} 問 / 削除 {removed} 問 (計 {len(index)} 問)")
+        if not args.query:
+            return
+
+        hits = index.search(" ".join(args.query), args.limit, match_all=not args.any)
+        if not hits:
+            print("見つかりませんでした")
+        for rank, hit in enumerate(hits, 1):
+            _print_hit(rank, hit)
+
+
+if __name__ == "__main__":
+    main()
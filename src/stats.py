@@ -0,0 +1,196 @@
+"""Counts of the crawled data, for monitoring scripts.
+
+Everything is read straight from the files in the output and cache
+directories, opened read-only, so the command starts without importing the
+HTTP client or the parser and never creates a file that does not exist yet.
+"""
+
+import argparse
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+from .config import Config
+from .summary import find_summary
+
+
+def _query(path: Path, sql: str) -> list[tuple] | None:
+    """Run a query on a SQLite database opened read-only.
+
+    Args:
+        path: Database file
+        sql: Query
+
+    Returns:
+        Result rows, or None if the database or its table does not exist
+    """
+    if not path.exists():
+        return None
+    try:
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        return conn.execute(sql).fetchall()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def summary_stats(output_dir: Path) -> dict[str, Any] | None:
+    """Count the courses, chapters, exercises and questions of the summary.
+
+    Args:
+        output_dir: Output directory
+
+    Returns:
+        Counts with the summary path and modification time, or None if there
+        is no summary
+    """
+    path = find_summary(output_dir)
+    if path is None:
+        return None
+
+    with open(path, encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            courses = [json.loads(line) for line in f if line.strip()]
+        else:
+            courses = json.load(f)["courses"]
+
+    stats = {"path": str(path), "updated_at": path.stat().st_mtime, "courses": len(courses)}
+    stats["chapters"] = stats["exercises"] = stats["questions"] = 0
+    for course in courses:
+        stats["chapters"] += len(course["chapters"])
+        for chapter in course["chapters"]:
+            stats["exercises"] += len(chapter["exercises"])
+            stats["questions"] += sum(len(ex["questions"]) for ex in chapter["exercises"])
+    return stats
+
+
+def collect_stats(output_dir: Path | None = None, cache_dir: Path | None = None) -> dict:
+    """Collect the counts of everything the crawler keeps on disk.
+
+    Args:
+        output_dir: Output directory (defaults to Config.OUTPUT_DIR)
+        cache_dir: Cache directory (defaults to Config.CACHE_DIR)
+
+    Returns:
+        Counts by component; a component without data maps to None
+    """
+    output_dir = Path(output_dir or Config.OUTPUT_DIR)
+    cache_dir = Path(cache_dir or Config.CACHE_DIR)
+    stats: dict[str, Any] = {"summary": summary_stats(output_dir)}
+
+    rows = _query(output_dir / Config.QUESTION_DB_FILE, "SELECT COUNT(*) FROM questions")
+    stats["sqlite_store"] = {"questions": rows[0][0]} if rows else None
+
+    rows = _query(
+        output_dir / Config.QUESTION_CAS_FILE,
+        "SELECT (SELECT COUNT(*) FROM question_refs), (SELECT COUNT(*) FROM question_objects)",
+    )
+    stats["cas_store"] = {"references": rows[0][0], "objects": rows[0][1]} if rows else None
+
+    rows = _query(
+        output_dir / Config.JOURNAL_FILE,
+        "SELECT (SELECT COUNT(*) FROM courses), (SELECT COUNT(*) FROM chapters),"
+        " (SELECT COUNT(*) FROM exercises)",
+    )
+    stats["journal"] = (
+        dict(zip(("courses", "chapters", "exercises"), rows[0])) if rows else None
+    )
+
+    rows = _query(
+        output_dir / Config.WORK_QUEUE_FILE, "SELECT state, COUNT(*) FROM units GROUP BY state"
+    )
+    stats["work_queue"] = dict(rows) if rows is not None else None
+
+    rows = _query(
+        output_dir / Config.PAGE_ARCHIVE_DIR / "index.sqlite3",
+        "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(pack_length), 0) FROM pages",
+    )
+    stats["archive"] = (
+        dict(zip(("pages", "bytes", "compressed_bytes"), rows[0])) if rows else None
+    )
+
+    rows = _query(
+        cache_dir / "http_cache.sqlite3",
+        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses",
+    )
+    stats["cache"] = {"responses": rows[0][0], "bytes": rows[0][1]} if rows else None
+    return stats
+
+
+def print_stats(stats: dict[str, Any]) -> None:
+    """Print the counts collected by collect_stats().
+
+    Args:
+        stats: Counts by component
+    """
+    summary = stats["summary"]
+    if summary is None:
+        print("サマリー: なし")
+    else:
+        print(f"サマリー: {summary['path']}")
+        print(f"  コース: {summary['courses']} 件")
+        print(f"  チャプター: {summary['chapters']} 件")
+        print(f"  確認テスト: {summary['exercises']} 件")
+        print(f"  問題数: {summary['questions']} 問")
+    if stats["sqlite_store"] is not None:
+        print(f"SQLite ストア: {stats['sqlite_store']['questions']} 問")
+    if stats["cas_store"] is not None:
+        cas = stats["cas_store"]
+        print(f"CAS ストア: {cas['objects']} 種類 (参照 {cas['references']} 件)")
+    if stats["journal"] is not None:
+        journal = stats["journal"]
+        print(
+            f"再開用の記録: コース {journal['courses']} 件 / チャプター {journal['chapters']} 件"
+            f" / 確認テスト {journal['exercises']} 件"
+        )
+    if stats["work_queue"] is not None:
+        counts = sorted(stats["work_queue"].items())
+        states = ", ".join(f"{state} {count}" for state, count in counts)
+        print(f"作業キュー: {states or '空'}")
+    if stats["archive"] is not None:
+        archive = stats["archive"]
+        print(
+            f"ページアーカイブ: {archive['pages']} 件"
+            f" ({archive['compressed_bytes'] / 1024 / 1024:.1f} MiB,"
+            f" 展開後 {archive['bytes'] / 1024 / 1024:.1f} MiB)"
+        )
+    if stats["cache"] is not None:
+        cache = stats["cache"]
+        print(f"キャッシュ: {cache['responses']} 件 ({cache['bytes'] / 1024 / 1024:.1f} MiB)")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv: Argument list (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="取得済みデータの件数を表示します")
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="件数を JSON で出力する",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    """Print the counts of the crawled data."""
+    args = parse_args(argv)
+    stats = collect_stats()
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False))
+    else:
+        print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
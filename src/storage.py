@@ -0,0 +1,709 @@
+"""Output storage for scraped questions."""
+
+import hashlib
+import json
+import re
+import sqlite3
+import unicodedata
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from . import models
+from .config import Config
+from .models import Chapter, Course, Exercise, Question
+
+
+def sanitize_filename(name: str) -> str:
+    """Sanitize string for use as filename.
+
+    Args:
+        name: String to sanitize
+
+    Returns:
+        Sanitized string safe for filename
+    """
+    # Remove or replace invalid characters
+    name = re.sub(r'[<>:"/\\|?*]', '', name)
+    # Replace spaces and other problematic chars
+    name = name.replace(' ', '_')
+    # Limit length
+    if len(name) > 100:
+        name = name[:100]
+    return name
+
+
+def save_question_file(
+    course_title: str,
+    course_id: int,
+    chapter_title: str,
+    chapter_id: int,
+    exercise_title: str,
+    exercise_id: int,
+    exercise_index: int,
+    question_num: int,
+    question: Question,
+) -> Path:
+    """Save a single question to a JSON file.
+
+    Args:
+        course_title: Course title
+        course_id: Course ID
+        chapter_title: Chapter title
+        chapter_id: Chapter ID
+        exercise_title: Exercise title
+        exercise_id: Exercise ID
+        exercise_index: Exercise index in chapter (0-indexed)
+        question_num: Question number (1-indexed)
+        question: Question object
+
+    Returns:
+        Path to saved file
+    """
+    # Create directory structure
+    output_base = Path(Config.OUTPUT_DIR)
+
+    course_dir = sanitize_filename(f"{course_title}_{course_id}")
+    chapter_dir = sanitize_filename(f"{chapter_title}_{chapter_id}")
+
+    dir_path = output_base / course_dir / chapter_dir
+    dir_path.mkdir(parents=True, exist_ok=True)
+
+    # Create filename with exercise index for proper ordering
+    exercise_safe = sanitize_filename(exercise_title)
+    filename = f"{exercise_index:03d}_{exercise_safe}_{exercise_id}_q{question_num}.json"
+    file_path = dir_path / filename
+
+    # Save question data
+    question_data = {
+        "course_id": course_id,
+        "course_title": course_title,
+        "chapter_id": chapter_id,
+        "chapter_title": chapter_title,
+        "exercise_id": exercise_id,
+        "exercise_title": exercise_title,
+        "exercise_index": exercise_index,
+        "question_number": question_num,
+        "question": question.to_dict(),
+    }
+
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(question_data, f, ensure_ascii=False, indent=2)
+
+    return file_path
+
+
+class FileQuestionStore:
+    """Question store writing one JSON file per question.
+
+    This is the original output layout: ``OUTPUT_DIR/<course>/<chapter>/``
+    with a file per question, as written by save_question_file().
+    """
+
+    def save_exercise(
+        self,
+        course: Course,
+        chapter: Chapter,
+        chapter_position: int,
+        exercise_id: int,
+        exercise_title: str,
+        exercise_index: int,
+        questions: list[Question],
+    ) -> list[str]:
+        """Save the questions of an exercise.
+
+        Args:
+            course: Course the exercise belongs to
+            chapter: Chapter the exercise belongs to
+            chapter_position: Chapter index in course (1-indexed)
+            exercise_id: Exercise ID
+            exercise_title: Exercise title
+            exercise_index: Exercise index in chapter (1-indexed)
+            questions: Questions of the exercise
+
+        Returns:
+            Name of the saved entry for each question
+        """
+        return [
+            save_question_file(
+                course_title=course.course_title,
+                course_id=course.course_id,
+                chapter_title=chapter.chapter_title,
+                chapter_id=chapter.chapter_id,
+                exercise_title=exercise_title,
+                exercise_id=exercise_id,
+                exercise_index=exercise_index,
+                question_num=q_num,
+                question=question,
+            ).name
+            for q_num, question in enumerate(questions, 1)
+        ]
+
+    def iter_records(self, course_id: int | None = None) -> Iterator[dict[str, Any]]:
+        """Iterate over the saved question files in course order.
+
+        Args:
+            course_id: Only yield questions of this course
+
+        Yields:
+            Question records as stored in the files
+        """
+        output_dir = Path(Config.OUTPUT_DIR)
+        if not output_dir.is_dir():
+            return
+        for course_dir in sorted(p for p in output_dir.iterdir() if p.is_dir()):
+            if course_id is not None and not course_dir.name.endswith(f"_{course_id}"):
+                continue
+            for path in sorted(course_dir.glob("*/*.json")):
+                with open(path, encoding="utf-8") as f:
+                    record = json.load(f)
+                if "question" in record:
+                    yield record
+
+    def close(self) -> None:
+        """Nothing to close; files are complete once written."""
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    course_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    exercise_id INTEGER NOT NULL,
+    question_number INTEGER NOT NULL,
+    course_title TEXT NOT NULL,
+    chapter_title TEXT NOT NULL,
+    chapter_position INTEGER NOT NULL,
+    exercise_title TEXT NOT NULL,
+    exercise_index INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    PRIMARY KEY (course_id, chapter_id, exercise_id, question_number)
+) WITHOUT ROWID;
+"""
+
+def course_records(course: Course) -> Iterator[dict[str, Any]]:
+    """Iterate over the questions of a crawled course as question records.
+
+    A Course keeps only the exercises that had questions, so the position of
+    an exercise among all exercises of its chapter is not known here, and
+    the records have no exercise_index.
+
+    Args:
+        course: Course with its chapters, exercises and questions
+
+    Yields:
+        Records with the fields of the per-question files but
+        exercise_index, holding the Question itself instead of its
+        dictionary
+    """
+    for chapter in course.chapters:
+        for exercise in chapter.exercises:
+            for number, question in enumerate(exercise.questions, 1):
+                yield {
+                    "course_id": course.course_id,
+                    "course_title": course.course_title,
+                    "chapter_id": chapter.chapter_id,
+                    "chapter_title": chapter.chapter_title,
+                    "exercise_id": exercise.exercise_id,
+                    "exercise_title": exercise.exercise_title,
+                    "question_number": number,
+                    "question": question,
+                }
+
+
+# Fields of a question record, in the order of the per-question files
+_RECORD_FIELDS = (
+    "course_id",
+    "course_title",
+    "chapter_id",
+    "chapter_title",
+    "exercise_id",
+    "exercise_title",
+    "exercise_index",
+    "question_number",
+    "question",
+)
+_RECORD_ORDER = (
+    "ORDER BY course_id, chapter_position, chapter_id, exercise_index, exercise_id,"
+    " question_number"
+)
+
+
+class SqliteQuestionStore:
+    """Question store packing all questions into a single SQLite file.
+
+    Each exercise is written in one transaction instead of one file per
+    question, and any course, chapter or exercise can be loaded through the
+    primary key without scanning the rest of the store. export_files()
+    writes the original directory layout from the pack.
+    """
+
+    _schema = _SCHEMA
+
+    def __init__(self, path: Path | str | None = None):
+        """Open or create the store.
+
+        Args:
+            path: SQLite database file (defaults to QUESTION_DB_FILE in the
+                output directory)
+        """
+        self.path = Path(path or Path(Config.OUTPUT_DIR) / Config.QUESTION_DB_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL commits survive a crash of the process with synchronous=NORMAL
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._schema)
+
+    def close(self) -> None:
+        """Close the store."""
+        self._conn.close()
+
+    def save_exercise(
+        self,
+        course: Course,
+        chapter: Chapter,
+        chapter_position: int,
+        exercise_id: int,
+        exercise_title: str,
+        exercise_index: int,
+        questions: list[Question],
+    ) -> list[str]:
+        """Save the questions of an exercise, replacing earlier ones.
+
+        Args:
+            course: Course the exercise belongs to
+            chapter: Chapter the exercise belongs to
+            chapter_position: Chapter index in course (1-indexed)
+            exercise_id: Exercise ID
+            exercise_title: Exercise title
+            exercise_index: Exercise index in chapter (1-indexed)
+            questions: Questions of the exercise
+
+        Returns:
+            Name of the saved entry for each question
+        """
+        rows = [
+            (
+                course.course_id,
+                chapter.chapter_id,
+                exercise_id,
+                q_num,
+                course.course_title,
+                chapter.chapter_title,
+                chapter_position,
+                exercise_title,
+                exercise_index,
+                models.dumps(question),
+            )
+            for q_num, question in enumerate(questions, 1)
+        ]
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM questions"
+                " WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?",
+                (course.course_id, chapter.chapter_id, exercise_id),
+            )
+            self._conn.executemany(
+                "INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return [f"{self.path.name} ({exercise_id}/q{q_num})" for q_num in range(1, len(rows) + 1)]
+
+    def courses(self) -> list[tuple[int, str]]:
+        """List the stored courses.
+
+        Returns:
+            (course_id, course_title) pairs ordered by title
+        """
+        return self._conn.execute(
+            "SELECT course_id, MIN(course_title) FROM questions"
+            " GROUP BY course_id ORDER BY MIN(course_title), course_id"
+        ).fetchall()
+
+    def iter_records(self, course_id: int | None = None) -> Iterator[dict[str, Any]]:
+        """Iterate over stored questions in course order.
+
+        Args:
+            course_id: Only yield questions of this course
+
+        Yields:
+            Question records with the same fields as the per-question files
+        """
+        where, params = ("WHERE course_id = ?", (course_id,)) if course_id is not None else ("", ())
+        rows = self._conn.execute(
+            f"SELECT {', '.join(_RECORD_FIELDS)} FROM questions {where} {_RECORD_ORDER}",
+            params,
+        )
+        for row in rows:
+            record = dict(zip(_RECORD_FIELDS, row))
+            record["question"] = json.loads(record["question"])
+            yield record
+
+    def _build_exercises(self, rows: Iterator[tuple]) -> Iterator[tuple[int, int, Exercise]]:
+        """Group ordered (course_id, chapter_id, exercise_id, title, question) rows."""
+        current = None
+        for course_id, chapter_id, exercise_id, exercise_title, data in rows:
+            key = (course_id, chapter_id, exercise_id)
+            if current is None or current[0] != key:
+                if current is not None:
+                    yield current[0][0], current[0][1], current[1]
+                current = (key, Exercise(exercise_id=exercise_id, exercise_title=exercise_title))
+            current[1].questions.append(Question.from_dict(json.loads(data)))
+        if current is not None:
+            yield current[0][0], current[0][1], current[1]
+
+    def load_exercise(self, course_id: int, chapter_id: int, exercise_id: int) -> Exercise | None:
+        """Load a stored exercise.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+            exercise_id: Exercise ID
+
+        Returns:
+            Exercise with its questions, or None if it is not stored
+        """
+        rows = self._conn.execute(
+            "SELECT course_id, chapter_id, exercise_id, exercise_title, question"
+            " FROM questions WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?"
+            " ORDER BY question_number",
+            (course_id, chapter_id, exercise_id),
+        )
+        return next((exercise for _, _, exercise in self._build_exercises(rows)), None)
+
+    def load_chapter(self, course_id: int, chapter_id: int) -> Chapter | None:
+        """Load a stored chapter.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+
+        Returns:
+            Chapter with its exercises in chapter order, or None if it is not
+            stored
+        """
+        row = self._conn.execute(
+            "SELECT chapter_title FROM questions WHERE course_id = ? AND chapter_id = ?",
+            (course_id, chapter_id),
+        ).fetchone()
+        if row is None:
+            return None
+
+        chapter = Chapter(chapter_id=chapter_id, chapter_title=row[0])
+        rows = self._conn.execute(
+            "SELECT course_id, chapter_id, exercise_id, exercise_title, question"
+            " FROM questions WHERE course_id = ? AND chapter_id = ?"
+            " ORDER BY exercise_index, exercise_id, question_number",
+            (course_id, chapter_id),
+        )
+        chapter.exercises = [exercise for _, _, exercise in self._build_exercises(rows)]
+        return chapter
+
+    def load_course(self, course_id: int) -> Course | None:
+        """Load a stored course.
+
+        Args:
+            course_id: Course ID
+
+        Returns:
+            Course with its chapters in course order, or None if it is not
+            stored
+        """
+        row = self._conn.execute(
+            "SELECT course_title FROM questions WHERE course_id = ?", (course_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        course = Course(course_id=course_id, course_title=row[0])
+        titles = dict(
+            self._conn.execute(
+                "SELECT chapter_id, chapter_title FROM questions WHERE course_id = ?",
+                (course_id,),
+            )
+        )
+        rows = self._conn.execute(
+            "SELECT course_id, chapter_id, exercise_id, exercise_title, question"
+            f" FROM questions WHERE course_id = ? {_RECORD_ORDER}",
+            (course_id,),
+        )
+        for _, chapter_id, exercise in self._build_exercises(rows):
+            if not course.chapters or course.chapters[-1].chapter_id != chapter_id:
+                course.chapters.append(
+                    Chapter(chapter_id=chapter_id, chapter_title=titles[chapter_id])
+                )
+            course.chapters[-1].exercises.append(exercise)
+        return course
+
+    def export_files(self) -> int:
+        """Write the stored questions in the per-question file layout.
+
+        Returns:
+            Number of question files written
+        """
+        count = 0
+        for record in self.iter_records():
+            save_question_file(
+                course_title=record["course_title"],
+                course_id=record["course_id"],
+                chapter_title=record["chapter_title"],
+                chapter_id=record["chapter_id"],
+                exercise_title=record["exercise_title"],
+                exercise_id=record["exercise_id"],
+                exercise_index=record["exercise_index"],
+                question_num=record["question_number"],
+                question=Question.from_dict(record["question"]),
+            )
+            count += 1
+        return count
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so that copies differing only in form hash the same.
+
+    Applies NFKC and collapses runs of whitespace into one space.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def question_digest(question: Question) -> str:
+    """Stable content hash of a question.
+
+    The statement and choice texts are NFKC-normalized and their whitespace
+    collapsed, so the same question copied into another exercise or course
+    revision hashes the same.
+
+    Args:
+        question: Question to hash
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    key = [normalize_text(question.statement)]
+    key += [[choice.number, normalize_text(choice.text)] for choice in question.choices]
+    data = json.dumps(key, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+_CAS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_objects (
+    digest TEXT PRIMARY KEY,
+    question TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS question_refs (
+    course_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    exercise_id INTEGER NOT NULL,
+    question_number INTEGER NOT NULL,
+    course_title TEXT NOT NULL,
+    chapter_title TEXT NOT NULL,
+    chapter_position INTEGER NOT NULL,
+    exercise_title TEXT NOT NULL,
+    exercise_index INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (course_id, chapter_id, exercise_id, question_number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS question_refs_digest ON question_refs (digest);
+-- The layout of SqliteQuestionStore, so all of its loaders work unchanged
+CREATE VIEW IF NOT EXISTS questions AS
+    SELECT course_id, chapter_id, exercise_id, question_number, course_title,
+           chapter_title, chapter_position, exercise_title, exercise_index,
+           question_objects.question AS question
+    FROM question_refs JOIN question_objects USING (digest);
+"""
+
+
+class ContentAddressedQuestionStore(SqliteQuestionStore):
+    """Question store keeping each distinct question once.
+
+    Questions are stored under question_digest(), and exercises hold the
+    digests of their questions in order. A question repeated across
+    exercises, courses or re-runs takes the space of a single copy, and
+    whether an exercise changed is a comparison of its digests.
+
+    The load methods, iter_records() and export_files() rebuild the same
+    structures as SqliteQuestionStore. A question shared by several
+    exercises comes back as the copy stored first.
+    """
+
+    _schema = _CAS_SCHEMA
+
+    def __init__(self, path: Path | str | None = None):
+        """Open or create the store.
+
+        Args:
+            path: SQLite database file (defaults to QUESTION_CAS_FILE in the
+                output directory)
+        """
+        super().__init__(path or Path(Config.OUTPUT_DIR) / Config.QUESTION_CAS_FILE)
+
+    def save_exercise(
+        self,
+        course: Course,
+        chapter: Chapter,
+        chapter_position: int,
+        exercise_id: int,
+        exercise_title: str,
+        exercise_index: int,
+        questions: list[Question],
+    ) -> list[str]:
+        """Save the questions of an exercise, replacing earlier ones.
+
+        Args:
+            course: Course the exercise belongs to
+            chapter: Chapter the exercise belongs to
+            chapter_position: Chapter index in course (1-indexed)
+            exercise_id: Exercise ID
+            exercise_title: Exercise title
+            exercise_index: Exercise index in chapter (1-indexed)
+            questions: Questions of the exercise
+
+        Returns:
+            Name of the saved entry for each question
+        """
+        digests = [question_digest(question) for question in questions]
+        with self._conn:
+            new = set(digests) - self._stored(digests)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO question_objects VALUES (?, ?)",
+                [
+                    (digest, models.dumps(question))
+                    for digest, question in zip(digests, questions)
+                    if digest in new
+                ],
+            )
+            self._conn.execute(
+                "DELETE FROM question_refs"
+                " WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?",
+                (course.course_id, chapter.chapter_id, exercise_id),
+            )
+            self._conn.executemany(
+                "INSERT INTO question_refs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        course.course_id,
+                        chapter.chapter_id,
+                        exercise_id,
+                        q_num,
+                        course.course_title,
+                        chapter.chapter_title,
+                        chapter_position,
+                        exercise_title,
+                        exercise_index,
+                        digest,
+                    )
+                    for q_num, digest in enumerate(digests, 1)
+                ],
+            )
+        return [
+            f"{self.path.name} ({digest[:12]}{'' if digest in new else ', 保存済み'})"
+            for digest in digests
+        ]
+
+    def _stored(self, digests: list[str]) -> set[str]:
+        """Return the digests that already have a stored question."""
+        rows = self._conn.execute(
+            "SELECT digest FROM question_objects"
+            f" WHERE digest IN ({', '.join('?' * len(digests))})",
+            digests,
+        )
+        return {digest for digest, in rows}
+
+    def exercise_digests(self, course_id: int, chapter_id: int, exercise_id: int) -> list[str]:
+        """Digests of the stored questions of an exercise, in order.
+
+        Compare them with question_digest() of freshly parsed questions to
+        tell whether the exercise changed.
+
+        Args:
+            course_id: Course ID
+            chapter_id: Chapter ID
+            exercise_id: Exercise ID
+
+        Returns:
+            Digests (empty if the exercise is not stored)
+        """
+        rows = self._conn.execute(
+            "SELECT digest FROM question_refs"
+            " WHERE course_id = ? AND chapter_id = ? AND exercise_id = ?"
+            " ORDER BY question_number",
+            (course_id, chapter_id, exercise_id),
+        )
+        return [digest for digest, in rows]
+
+    def load_question(self, digest: str) -> Question | None:
+        """Load a question by its digest.
+
+        Args:
+            digest: Digest from question_digest()
+
+        Returns:
+            The question, or None if it is not stored
+        """
+        row = self._conn.execute(
+            "SELECT question FROM question_objects WHERE digest = ?", (digest,)
+        ).fetchone()
+        return None if row is None else Question.from_dict(json.loads(row[0]))
+
+    def counts(self) -> tuple[int, int]:
+        """Count the question references and the distinct questions stored.
+
+        Returns:
+            (references, distinct questions)
+        """
+        (references,) = self._conn.execute("SELECT COUNT(*) FROM question_refs").fetchone()
+        (distinct,) = self._conn.execute("SELECT COUNT(*) FROM question_objects").fetchone()
+        return references, distinct
+
+    def prune(self) -> int:
+        """Delete questions no exercise refers to any more.
+
+        Returns:
+            Number of deleted questions
+        """
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM question_objects"
+                " WHERE digest NOT IN (SELECT digest FROM question_refs)"
+            )
+        return cursor.rowcount
+
+
+QUESTION_STORES = ("files", "sqlite", "cas")
+
+
+def open_question_store(kind: str | None = None) -> FileQuestionStore | SqliteQuestionStore:
+    """Open the question store of the given kind.
+
+    Args:
+        kind: One of QUESTION_STORES (defaults to Config.QUESTION_STORE)
+
+    Returns:
+        The question store
+
+    Raises:
+        ValueError: If the kind is unknown
+    """
+    kind = kind or Config.QUESTION_STORE
+    if kind == "files":
+        return FileQuestionStore()
+    if kind == "sqlite":
+        return SqliteQuestionStore()
+    if kind == "cas":
+        return ContentAddressedQuestionStore()
+    raise ValueError(f"Unknown question store: {kind}")
+
+
+def iter_store_records(kind: str | None = None) -> Iterator[dict[str, Any]]:
+    """Iterate over the questions of a question store.
+
+    Args:
+        kind: One of QUESTION_STORES (defaults to Config.QUESTION_STORE)
+
+    Yields:
+        Question records with the fields of the per-question files
+    """
+    store = open_question_store(kind)
+    try:
+        yield from store.iter_records()
+    finally:
+        store.close()
@@ -0,0 +1,171 @@
+"""Streaming writer and reader for the crawl summary."""
+
+import json
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+from . import models
+from .config import Config
+from .models import Course
+
+
+@dataclass
+class SummaryTotals:
+    """Counts of everything written to the summary."""
+
+    courses: int = 0
+    chapters: int = 0
+    exercises: int = 0
+    questions: int = 0
+
+    def add_course(self, course: Course) -> None:
+        """Count a course with its chapters, exercises and questions."""
+        self.courses += 1
+        self.chapters += len(course.chapters)
+        for chapter in course.chapters:
+            self.exercises += len(chapter.exercises)
+            self.questions += sum(len(ex.questions) for ex in chapter.exercises)
+
+
+class SummaryWriter:
+    """Write the summary one course at a time.
+
+    Only the course being written is held in memory, so memory use does not
+    grow with the number of courses. Two formats are supported:
+
+    - ``json``: the same document as ``json.dump(collection.to_dict(),
+      indent=2)``
+    - ``jsonl``: one course object per line
+
+    The file is written under a temporary name and moved into place by
+    close(), so an interrupted crawl never leaves a truncated summary behind.
+    """
+
+    FORMATS = ("json", "jsonl")
+
+    def __init__(self, path: Path | str | None = None, fmt: str | None = None):
+        """Initialize the writer.
+
+        Args:
+            path: Summary file (defaults to summary.json / summary.jsonl in
+                the output directory)
+            fmt: One of FORMATS (defaults to Config.SUMMARY_FORMAT)
+
+        Raises:
+            ValueError: If the format is unknown
+        """
+        self.fmt = fmt or Config.SUMMARY_FORMAT
+        if self.fmt not in self.FORMATS:
+            raise ValueError(f"Unknown summary format: {self.fmt}")
+        self.path = Path(path or Path(Config.OUTPUT_DIR) / f"summary.{self.fmt}")
+        self.totals = SummaryTotals()
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._file: IO[str] | None = None
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit; the summary is only kept on success."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _open(self) -> IO[str]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+        if self.fmt == "json":
+            self._file.write('{\n  "courses": [\n')
+        return self._file
+
+    def write_course(self, course: Course) -> None:
+        """Append a course to the summary.
+
+        Args:
+            course: Course with its chapters, exercises and questions
+        """
+        if self._file is None:
+            f = self._open()
+        else:
+            f = self._file
+            if self.fmt == "json":
+                f.write(",\n")
+
+        if self.fmt == "json":
+            f.write("    ")
+            models.dump(course, f, indent=2, level=2)
+        else:
+            models.dump(course, f)
+            f.write("\n")
+
+        self.totals.add_course(course)
+
+    def close(self) -> Path | None:
+        """Finish the summary and move it into place.
+
+        Returns:
+            Path of the summary, or None if no course was written
+        """
+        if self._file is None:
+            return None
+
+        if self.fmt == "json":
+            self._file.write("\n  ]\n}")
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        """Discard a summary that was not closed."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._tmp_path.unlink(missing_ok=True)
+
+
+def find_summary(output_dir: Path | str | None = None) -> Path | None:
+    """Find the summary written last in an output directory.
+
+    Args:
+        output_dir: Output directory (defaults to Config.OUTPUT_DIR)
+
+    Returns:
+        The newer of summary.json and summary.jsonl, or None if neither exists
+    """
+    output_dir = Path(output_dir or Config.OUTPUT_DIR)
+    paths = [output_dir / f"summary.{fmt}" for fmt in SummaryWriter.FORMATS]
+    paths = [path for path in paths if path.exists()]
+    return max(paths, key=lambda p: p.stat().st_mtime, default=None)
+
+
+def read_summary(path: Path | str) -> Iterator[Course]:
+    """Read the courses of a summary written by SummaryWriter.
+
+    A jsonl summary is read one line at a time, so only the course being
+    read is held in memory.
+
+    Args:
+        path: summary.json or summary.jsonl
+
+    Yields:
+        Courses in the order they were written
+    """
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield models.loads(line, Course)
+            return
+
+        courses = json.load(f)["courses"]
+    # Drop each course's dictionaries as soon as it is decoded
+    courses.reverse()
+    while courses:
+        yield Course.from_dict(courses.pop())
@@ -0,0 +1,330 @@
+"""Crawl telemetry: request, phase and memory measurements."""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .config import Config
+
+# Phases in the order they are reported
+PHASES = ("parse", "write", "chapter", "course")
+
+
+@dataclass
+class Span:
+    """A measured piece of work.
+
+    ``started`` is a time.monotonic() value, which is shared by all processes
+    on the machine, so spans measured in parser processes line up with the
+    rest of the crawl.
+    """
+
+    category: str  # "http" or one of PHASES
+    name: str
+    started: float
+    seconds: float
+    process: int
+    thread: int
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    rank = max(int(round(q * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class Telemetry:
+    """Collect the timings of a crawl.
+
+    Clients record every request (latency, status, bytes, time spent waiting
+    for the rate limiter, cache outcome), and the crawl records parse and
+    write times and per-chapter and per-course spans. The result can be
+    printed as a summary table and written as a Chrome trace, which opens in
+    chrome://tracing or https://ui.perfetto.dev.
+
+    With ``trace_memory``, tracemalloc runs during the crawl and the peak
+    of every course is recorded. Tracing memory slows the crawl down
+    considerably, so it is off by default.
+
+    Recording is thread-safe.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        """Initialize the collector.
+
+        Args:
+            trace_memory: Record the peak memory of each course with
+                tracemalloc
+        """
+        self.spans: list[Span] = []
+        self.memory: list[tuple[float, str, int, int]] = []  # time, label, current, peak
+        self.trace_memory = trace_memory
+        self.started = time.monotonic()
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._owns_tracemalloc = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def record(
+        self,
+        category: str,
+        name: str,
+        started: float,
+        seconds: float,
+        process: int | None = None,
+        **args: Any,
+    ) -> None:
+        """Record a finished span.
+
+        Args:
+            category: "http" or one of PHASES
+            name: Endpoint or phase name
+            started: time.monotonic() at the start
+            seconds: Duration
+            process: ID of the process that did the work (defaults to this
+                one; spans of other processes get no thread)
+            **args: Details shown with the span
+        """
+        thread = threading.current_thread()
+        span = Span(
+            category,
+            name,
+            started,
+            seconds,
+            process or os.getpid(),
+            0 if process else thread.native_id,
+            args,
+        )
+        with self._lock:
+            self.spans.append(span)
+            if not process:
+                self._threads.setdefault(thread.native_id, thread.name)
+
+    def sample_memory(self, label: str) -> None:
+        """Record current and peak traced memory, and start a new peak.
+
+        Args:
+            label: What the peak belongs to (e.g. the course title)
+        """
+        if not self.trace_memory:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        with self._lock:
+            self.memory.append((time.monotonic(), label, current, peak))
+
+    def close(self) -> None:
+        """Stop tracemalloc if this collector started it."""
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Build a Chrome trace of everything recorded.
+
+        Requests are async events, since several can be in flight on one
+        thread; all other spans are complete events on their thread.
+
+        Returns:
+            Trace in the Chrome trace event format
+        """
+
+        def us(t: float) -> float:
+            return round((t - self.started) * 1e6, 1)
+
+        pid = os.getpid()
+        events: list[dict[str, Any]] = [
+            {"ph": "M", "name": "process_name", "pid": pid, "args": {"name": "crawl"}}
+        ]
+        events += [
+            {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self._threads.items()
+        ]
+        for process in sorted({s.process for s in self.spans} - {pid}):
+            events.append(
+                {"ph": "M", "name": "process_name", "pid": process, "args": {"name": "parser"}}
+            )
+
+        for request_id, span in enumerate(self.spans):
+            common = {
+                "cat": span.category,
+                "name": span.name,
+                "pid": span.process,
+                "tid": span.thread,
+            }
+            if span.category == "http":
+                begin, end = us(span.started), us(span.started + span.seconds)
+                common["id"] = request_id
+                events.append({**common, "ph": "b", "ts": begin, "args": span.args})
+                events.append({**common, "ph": "e", "ts": end})
+            else:
+                events.append(
+                    {
+                        **common,
+                        "ph": "X",
+                        "ts": us(span.started),
+                        "dur": round(span.seconds * 1e6, 1),
+                        "args": span.args,
+                    }
+                )
+
+        for sampled, label, current, peak in self.memory:
+            events.append(
+                {
+                    "ph": "C",
+                    "name": "traced memory (KB)",
+                    "pid": pid,
+                    "ts": us(sampled),
+                    "args": {"current": current // 1024, "peak": peak // 1024},
+                }
+            )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: Path | str | None = None) -> Path:
+        """Write the Chrome trace.
+
+        Args:
+            path: Trace file (defaults to Config.PROFILE_FILE in the output
+                directory)
+
+        Returns:
+            Path of the written file
+        """
+        path = Path(path) if path else Path(Config.OUTPUT_DIR) / Config.PROFILE_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return path
+
+    def print_summary(self, slowest: int = 5) -> None:
+        """Print the recorded timings as tables.
+
+        Args:
+            slowest: Number of slowest requests to list
+        """
+        requests: dict[str, list[Span]] = defaultdict(list)
+        phases: dict[str, list[float]] = defaultdict(list)
+        for span in self.spans:
+            if span.category == "http":
+                requests[span.name].append(span)
+            else:
+                phases[span.category].append(span.seconds)
+
+        print("プロファイル:")
+        if requests:
+            rows = [
+                (
+                    "リクエスト",
+                    "件数",
+                    "エラー",
+                    "キャッシュ",
+                    "平均ms",
+                    "p95ms",
+                    "最大ms",
+                    "受信KB",
+                    "本文KB",
+                    "待機秒",
+                )
+            ]
+            for name, spans in requests.items():
+                # Cache hits never reach the network and would skew latencies
+                fetched = sorted(s.seconds for s in spans if s.args.get("cache") != "hit")
+                errors = sum(
+                    1 for s in spans if "error" in s.args or (s.args.get("status") or 0) >= 400
+                )
+                cached = sum(1 for s in spans if s.args.get("cache") in ("hit", "revalidated"))
+                rows.append(
+                    (
+                        name,
+                        len(spans),
+                        errors,
+                        cached,
+                        f"{sum(fetched) / len(fetched) * 1000 if fetched else 0.0:.1f}",
+                        f"{_percentile(fetched, 0.95) * 1000:.1f}",
+                        f"{(fetched[-1] if fetched else 0.0) * 1000:.1f}",
+                        f"{sum(s.args.get('wire_bytes', 0) for s in spans) / 1024:.1f}",
+                        f"{sum(s.args.get('bytes', 0) for s in spans) / 1024:.1f}",
+                        f"{sum(s.args.get('throttled', 0.0) for s in spans):.1f}",
+                    )
+                )
+            _print_table(rows)
+
+            # Compare the bytes on the wire with the decoded bodies
+            sent = [s for s in self.spans if s.category == "http" and "http_version" in s.args]
+            wire = sum(s.args.get("wire_bytes", 0) for s in sent)
+            body = sum(s.args.get("bytes", 0) for s in sent)
+            if wire and body:
+                print(
+                    f"  転送量: 受信 {wire / 1024:.1f} KB / 本文 {body / 1024:.1f} KB"
+                    f" ({wire / body:.0%})"
+                )
+            if sent:
+                versions = Counter(s.args["http_version"] for s in sent)
+                encodings = Counter(s.args.get("encoding", "identity") for s in sent)
+                print(
+                    "  プロトコル: "
+                    + ", ".join(f"{v} {n} 件" for v, n in versions.most_common())
+                    + " / 圧縮: "
+                    + ", ".join(f"{e} {n} 件" for e, n in encodings.most_common())
+                )
+
+        if phases:
+            rows = [("処理", "件数", "合計秒", "平均ms", "p95ms", "最大ms")]
+            for name in PHASES:
+                values = sorted(phases.get(name, ()))
+                if values:
+                    rows.append(
+                        (
+                            name,
+                            len(values),
+                            f"{sum(values):.2f}",
+                            f"{sum(values) / len(values) * 1000:.1f}",
+                            f"{_percentile(values, 0.95) * 1000:.1f}",
+                            f"{values[-1] * 1000:.1f}",
+                        )
+                    )
+            _print_table(rows)
+
+        slow = sorted(
+            (s for s in self.spans if s.category == "http" and s.args.get("cache") != "hit"),
+            key=lambda s: s.seconds,
+            reverse=True,
+        )[:slowest]
+        if slow:
+            print("  遅いリクエスト:")
+            for span in slow:
+                print(f"    {span.seconds * 1000:8.1f} ms  {span.args.get('url', span.name)}")
+
+        if self.memory:
+            _, label, _, peak = max(self.memory, key=lambda m: m[3])
+            print(f"  メモリ使用量の最大: {peak / 1024 / 1024:.1f} MB ({label})")
+
+
+def _display_width(text: str) -> int:
+    """Width of text in a terminal, counting wide characters twice."""
+    return sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+
+
+def _print_table(rows: list[tuple[Any, ...]]) -> None:
+    """Print rows as a table with a left-aligned first column."""
+    cells = [[str(cell) for cell in row] for row in rows]
+    widths = [max(_display_width(row[i]) for row in cells) for i in range(len(cells[0]))]
+    for row in cells:
+        line = []
+        for i, cell in enumerate(row):
+            padding = " " * (widths[i] - _display_width(cell))
+            line.append(cell + padding if i == 0 else padding + cell)
+        print("  " + "  ".join(line))
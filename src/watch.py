@@ -0,0 +1,260 @@
+"""Keep the output up to date by polling the course list.
+
+Instead of a crawl started from cron, the watcher keeps running with one
+client, so the interpreter, the session cookie and the HTTP client are set
+up once. The session is checked before the first poll. Every
+WATCH_INTERVAL seconds the course list is requested again (revalidated
+against the response cache, so an unchanged list is cheap), and a crawl
+runs only if a course was added, removed or changed. As with ``--incremental``
+the crawl fetches only the chapters and exercises whose metadata changed and
+restores the rest from the journal.
+
+    uv run python -m src.watch
+    uv run python -m src.watch --interval 300
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+import httpx
+
+from .archive import PageArchive
+from .cache import ResponseCache
+from .client import AuthenticationError, ZenStudyClient, print_authentication_help
+from .config import Config
+from .crawler import CrawlRecorder, ondemand_course_pages
+from .journal import CrawlJournal
+from .main import crawl_courses
+from .parser import ExerciseParser
+from .progress import ProgressReporter
+from .ratelimit import TokenBucket
+from .storage import QUESTION_STORES, FileQuestionStore, SqliteQuestionStore, open_question_store
+from .summary import SummaryTotals, SummaryWriter
+
+
+class Watcher:
+    """Poll the course list and crawl what changed, with one client.
+
+    Each poll that finds a change writes a complete summary, like a crawl
+    with ``--incremental``. Polls that find nothing new write nothing.
+    """
+
+    def __init__(
+        self,
+        client: ZenStudyClient,
+        journal: CrawlJournal,
+        cache: ResponseCache | None = None,
+        store: FileQuestionStore | SqliteQuestionStore | None = None,
+        archive: PageArchive | None = None,
+        summary_format: str | None = None,
+        progress: ProgressReporter | None = None,
+    ):
+        """Initialize the watcher.
+
+        Args:
+            client: Client kept open for all polls, created with
+                ``revalidate=True`` so that cached responses never hide a
+                change
+            journal: Incremental journal of the previous crawls
+            cache: Response cache
+            store: Store to save questions in (defaults to one file per
+                question)
+            archive: Archive to keep the fetched exercise pages in
+            summary_format: One of SummaryWriter.FORMATS
+            progress: Reporter to report the crawled units to
+        """
+        self.client = client
+        self.journal = journal
+        self.cache = cache
+        self.store = store
+        self.archive = archive
+        self.summary_format = summary_format
+        self.progress = progress
+        self.totals = SummaryTotals()
+        # On-demand courses of the last crawl, in API order
+        self._course_ids: list[int] | None = None
+
+    def poll(self) -> bool:
+        """Request the course list and crawl it if anything changed.
+
+        Returns:
+            True if a crawl ran and the summary was rewritten
+
+        Raises:
+            AuthenticationError: If the server rejects the session cookie
+        """
+        pages = list(self.client.iter_my_courses())
+        courses = [course for page in ondemand_course_pages(pages) for course in page]
+        ids = [course.get("id") for course in courses]
+        unchanged = CrawlRecorder(self.journal).is_course_done
+        if ids == self._course_ids and all(map(unchanged, courses)):
+            return False
+
+        summary = SummaryWriter(fmt=self.summary_format)
+        try:
+            recorder = CrawlRecorder(
+                self.journal, summary, self.store, archive=self.archive, progress=self.progress
+            )
+            recorder.announce_courses(len(courses))
+            crawl_courses(self.client, courses, recorder, self.cache)
+            summary.close()
+        finally:
+            summary.abort()
+        self._course_ids = ids
+        self.totals = recorder.totals
+        return True
+
+    def run(
+        self,
+        interval: float | None = None,
+        polls: int | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Check the session, then poll on a fixed schedule.
+
+        A poll that fails with a network or server error is reported and
+        tried again at the next scheduled time. Polls start every
+        ``interval`` seconds; after a crawl that took longer, the next poll
+        starts right away.
+
+        Args:
+            interval: Seconds between the starts of two polls (defaults to
+                Config.WATCH_INTERVAL)
+            polls: Number of polls to run (runs until interrupted if omitted)
+            sleep: Function to wait with
+
+        Raises:
+            AuthenticationError: If the server rejects the session cookie
+        """
+        interval = Config.WATCH_INTERVAL if interval is None else interval
+        self.client.check_session()
+        print("セッションを確認しました\n")
+
+        count = 0
+        next_poll = time.monotonic()
+        while True:
+            count += 1
+            started = time.monotonic()
+            requests = self.client.rate_limiter.requests
+            try:
+                changed = self.poll()
+            except httpx.HTTPError as e:
+                status = f"エラー: {e} (次回の確認で再試行します)"
+            else:
+                status = (
+                    f"更新しました (確認テスト {self.totals.exercises} 件 /"
+                    f" 問題 {self.totals.questions} 問)"
+                    if changed
+                    else "変更なし"
+                )
+            print(
+                f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {status}"
+                f" リクエスト {self.client.rate_limiter.requests - requests} 件,"
+                f" {time.monotonic() - started:.1f} 秒"
+            )
+            if polls is not None and count >= polls:
+                return
+
+            next_poll += interval
+            sleep(max(next_poll - time.monotonic(), 0.0))
+            next_poll = max(next_poll, time.monotonic())
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv: Argument list (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="コース一覧を定期的に確認し、変更のあった部分だけを取得し続けます"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=Config.WATCH_INTERVAL,
+        help=f"コース一覧を確認する間隔 (秒, デフォルト: {Config.WATCH_INTERVAL})",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=Config.REQUESTS_PER_SECOND,
+        help=f"1秒あたりのリクエスト数の上限 (0で無制限, デフォルト: {Config.REQUESTS_PER_SECOND})",
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=Config.RATE_BURST,
+        help=f"連続して送れるリクエスト数 (デフォルト: {Config.RATE_BURST})",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=ExerciseParser.ENGINES,
+        default=Config.PARSER_ENGINE,
+        help=f"HTMLパーサーエンジン (デフォルト: {Config.PARSER_ENGINE})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="レスポンスキャッシュを使わない",
+    )
+    parser.add_argument(
+        "--no-archive",
+        action="store_true",
+        help="取得した確認テストのページを保存しない",
+    )
+    parser.add_argument(
+        "--store",
+        choices=QUESTION_STORES,
+        default=Config.QUESTION_STORE,
+        help=f"問題の保存形式 (デフォルト: {Config.QUESTION_STORE})",
+    )
+    parser.add_argument(
+        "--summary-format",
+        choices=SummaryWriter.FORMATS,
+        default=Config.SUMMARY_FORMAT,
+        help=f"サマリーの形式 (デフォルト: {Config.SUMMARY_FORMAT})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Keep crawling the changes until interrupted."""
+    args = parse_args(argv)
+    ExerciseParser.set_default_engine(args.parser)
+
+    cache = None if args.no_cache else ResponseCache()
+    journal = CrawlJournal(incremental=True)
+    store = open_question_store(args.store)
+    archive = None if args.no_archive else PageArchive()
+    # Only problems are printed between the status lines of the polls
+    progress = ProgressReporter("quiet")
+    try:
+        rate_limiter = TokenBucket(args.rate, args.burst)
+        with ZenStudyClient(rate_limiter, cache, revalidate=True) as client:
+            watcher = Watcher(
+                client, journal, cache, store, archive, args.summary_format, progress
+            )
+            print(f"{args.interval:g} 秒ごとにコース一覧を確認します (Ctrl+C で終了)")
+            watcher.run(args.interval)
+    except KeyboardInterrupt:
+        print("\n終了しました。")
+    except AuthenticationError:
+        print_authentication_help()
+        raise SystemExit(1) from None
+    finally:
+        progress.close()
+        if archive is not None:
+            archive.close()
+        store.close()
+        journal.close()
+        if cache is not None:
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()
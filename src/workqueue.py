@@ -0,0 +1,657 @@
+"""Crawl with several worker processes sharing a durable work queue.
+
+The crawl is split into units, one per course, chapter and exercise, kept
+in a SQLite queue in the output directory:
+
+- ``plan`` enqueues the on-demand courses of the enrollment.
+- Workers lease a unit, execute it and acknowledge it. Acknowledging a
+  course or chapter enqueues its chapters or exercises in the same
+  transaction, so the queue never holds half of a finished unit. An
+  exercise unit keeps its parsed questions as its result.
+- A lease lasts WORK_LEASE_SECONDS. The unit of a worker that died or hung
+  is leased again once its lease expires; a unit that failed
+  WORK_MAX_ATTEMPTS times is given up.
+- ``merge`` replays the results in API order through a CrawlRecorder, which
+  writes the same question files and summary as a single-process crawl.
+
+Workers only share the queue file, so each can run with its own
+ZANE_SESSION and request rate:
+
+    uv run python -m src.workqueue plan
+    ZANE_SESSION=... uv run python -m src.workqueue work --rate 5  # once per worker
+    uv run python -m src.workqueue merge
+
+    # All three steps with worker processes on this machine
+    uv run python -m src.workqueue run --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from . import models
+from .cache import ResponseCache
+from .client import AuthenticationError, ZenStudyClient, print_authentication_help
+from .config import Config
+from .crawler import (
+    CrawlRecorder,
+    extract_chapters,
+    extract_exercises,
+    normalize_exercise_url,
+    ondemand_course_pages,
+    parse_exercise,
+)
+from .models import Question
+from .parser import ExerciseParser
+from .progress import ProgressReporter
+from .ratelimit import TokenBucket
+from .storage import QUESTION_STORES, open_question_store
+from .summary import SummaryWriter
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    unit_id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    course_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    exercise_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    UNIQUE (kind, course_id, chapter_id, exercise_id)
+);
+CREATE INDEX IF NOT EXISTS units_state ON units (state, unit_id);
+CREATE INDEX IF NOT EXISTS units_parent ON units (kind, course_id, chapter_id, position);
+"""
+
+# kind, course ID, chapter ID (0 for a course), exercise ID (0 for a course
+# or chapter), position among its siblings (1-indexed) and API dictionary
+NewUnit = tuple[str, int, int, int, int, dict[str, Any]]
+
+
+@dataclass
+class WorkUnit:
+    """A course, chapter or exercise in the queue.
+
+    ``state`` is one of pending, leased, done and failed. ``result`` holds
+    the questions of a done exercise as JSON, or the error of a failed
+    unit.
+    """
+
+    unit_id: int
+    kind: str
+    course_id: int
+    chapter_id: int
+    exercise_id: int
+    position: int
+    data: dict[str, Any]
+    state: str
+    attempts: int
+    result: str | None = None
+
+
+_UNIT_COLUMNS = (
+    "unit_id, kind, course_id, chapter_id, exercise_id, position, data, state, attempts, result"
+)
+
+
+def _unit(row: tuple) -> WorkUnit:
+    unit_id, kind, course_id, chapter_id, exercise_id, position, data, *rest = row
+    return WorkUnit(
+        unit_id, kind, course_id, chapter_id, exercise_id, position, json.loads(data), *rest
+    )
+
+
+def default_worker_id() -> str:
+    """Worker name used when none is given: host and process ID."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """SQLite lease queue of crawl units.
+
+    Every process opens its own WorkQueue on the same file. Leasing is a
+    single UPDATE, so two workers never hold the same unexpired lease.
+    """
+
+    def __init__(self, path: Path | str | None = None):
+        """Open or create the queue.
+
+        Args:
+            path: SQLite file (defaults to WORK_QUEUE_FILE in the output
+                directory)
+        """
+        self.path = Path(path or Path(Config.OUTPUT_DIR) / Config.WORK_QUEUE_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the queue."""
+        self._conn.close()
+
+    def reset(self) -> None:
+        """Remove every unit, to plan a new crawl."""
+        with self._conn:
+            self._conn.execute("DELETE FROM units")
+
+    def enqueue(self, units: list[NewUnit]) -> None:
+        """Add units; units already in the queue are left as they are.
+
+        Args:
+            units: Units to add
+        """
+        with self._conn:
+            self._add(units)
+
+    def _add(self, units: list[NewUnit]) -> None:
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO units"
+            " (kind, course_id, chapter_id, exercise_id, position, data)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [(*unit[:5], json.dumps(unit[5], ensure_ascii=False)) for unit in units],
+        )
+
+    def lease(self, worker: str, seconds: float | None = None) -> WorkUnit | None:
+        """Lease the oldest pending unit or a unit whose lease expired.
+
+        Args:
+            worker: Name of the leasing worker
+            seconds: Lease duration (defaults to Config.WORK_LEASE_SECONDS)
+
+        Returns:
+            Leased unit, or None if no unit is available
+        """
+        lease = Config.WORK_LEASE_SECONDS if seconds is None else seconds
+        while True:
+            now = time.time()
+            with self._conn:
+                row = self._conn.execute(
+                    "UPDATE units SET state = 'leased', worker = ?, lease_expires = ?,"
+                    " attempts = attempts + 1"
+                    " WHERE unit_id = (SELECT unit_id FROM units WHERE state = 'pending'"
+                    " OR (state = 'leased' AND lease_expires < ?) ORDER BY unit_id LIMIT 1)"
+                    f" RETURNING {_UNIT_COLUMNS}",
+                    (worker, now + lease, now),
+                ).fetchone()
+            if row is None:
+                return None
+            unit = _unit(row)
+            if unit.attempts <= Config.WORK_MAX_ATTEMPTS:
+                return unit
+            # Every lease of the unit expired; its workers died or hung on it
+            self.fail(unit, worker, "応答がないまま処理期限を過ぎました")
+
+    def complete(
+        self, unit: WorkUnit, result: str | None = None, children: list[NewUnit] | None = None
+    ) -> None:
+        """Acknowledge a unit and enqueue the units it found.
+
+        If another worker completed the unit after this lease expired, its
+        result and units are kept and these are dropped.
+
+        Args:
+            unit: Leased unit
+            result: Result to keep (the questions of an exercise)
+            children: Chapters of a course or exercises of a chapter
+        """
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE units SET state = 'done', result = ?, worker = NULL,"
+                " lease_expires = NULL WHERE unit_id = ? AND state != 'done'",
+                (result, unit.unit_id),
+            )
+            if cursor.rowcount:
+                self._add(children or [])
+
+    def fail(self, unit: WorkUnit, worker: str, error: Exception | str) -> bool:
+        """Give a unit back after an error.
+
+        Args:
+            unit: Leased unit
+            worker: Name of the worker holding the lease
+            error: What went wrong
+
+        Returns:
+            True if the unit will be leased again, False if it was given up
+        """
+        retry = unit.attempts < Config.WORK_MAX_ATTEMPTS
+        with self._conn:
+            self._conn.execute(
+                "UPDATE units SET state = ?, result = ?, worker = NULL, lease_expires = NULL"
+                " WHERE unit_id = ? AND state = 'leased' AND worker = ?",
+                ("pending" if retry else "failed", str(error), unit.unit_id, worker),
+            )
+        return retry
+
+    def counts(self) -> Counter[str]:
+        """Number of units in each state."""
+        return Counter(
+            dict(self._conn.execute("SELECT state, COUNT(*) FROM units GROUP BY state"))
+        )
+
+    def is_finished(self) -> bool:
+        """Check whether every unit is done or given up."""
+        counts = self.counts()
+        return not counts["pending"] and not counts["leased"]
+
+    def units(
+        self, kind: str, course_id: int | None = None, chapter_id: int | None = None
+    ) -> list[WorkUnit]:
+        """Units of a kind in API order.
+
+        Args:
+            kind: course, chapter or exercise
+            course_id: Only the units of this course
+            chapter_id: Only the units of this chapter
+
+        Returns:
+            Units ordered by position
+        """
+        where, params = ["kind = ?"], [kind]
+        if course_id is not None:
+            where.append("course_id = ?")
+            params.append(course_id)
+        if chapter_id is not None:
+            where.append("chapter_id = ?")
+            params.append(chapter_id)
+        rows = self._conn.execute(
+            f"SELECT {_UNIT_COLUMNS} FROM units WHERE {' AND '.join(where)}"
+            " ORDER BY position, unit_id",
+            params,
+        )
+        return [_unit(row) for row in rows]
+
+
+def plan_crawl(queue: WorkQueue, client: ZenStudyClient) -> int:
+    """Start a new crawl by enqueueing the on-demand courses.
+
+    Courses are enqueued a page of the course list at a time, so workers
+    can start while the list is still being read.
+
+    Args:
+        queue: Queue to reset and fill
+        client: Client to read the course list with
+
+    Returns:
+        Number of courses enqueued
+    """
+    queue.reset()
+    count = 0
+    for courses in ondemand_course_pages(client.iter_my_courses()):
+        queue.enqueue(
+            [
+                ("course", course.get("id"), 0, 0, count + i, course)
+                for i, course in enumerate(courses, 1)
+            ]
+        )
+        count += len(courses)
+    return count
+
+
+def execute_unit(
+    unit: WorkUnit, client: ZenStudyClient, cache: ResponseCache | None = None
+) -> tuple[str | None, list[NewUnit]]:
+    """Fetch a unit.
+
+    Args:
+        unit: Leased unit
+        client: Client to send requests with
+        cache: Response cache holding earlier parse results
+
+    Returns:
+        Result to keep and the units found (see WorkQueue.complete())
+    """
+    if unit.kind == "course":
+        info = client.get_course_info(unit.course_id)
+        chapters = extract_chapters(info)
+        return None, [
+            ("chapter", unit.course_id, chapter.get("id"), 0, position, chapter)
+            for position, chapter in enumerate(chapters, 1)
+        ]
+    if unit.kind == "chapter":
+        info = client.get_chapter_info(unit.course_id, unit.chapter_id)
+        exercises = extract_exercises(info)
+        return None, [
+            ("exercise", unit.course_id, unit.chapter_id, exercise.get("id"), position, exercise)
+            for position, exercise in enumerate(exercises, 1)
+        ]
+
+    html = client.get_exercise_html(normalize_exercise_url(unit.data.get("content_url", "")))
+    return models.dumps_list(parse_exercise(html, cache)), []
+
+
+def _describe(unit: WorkUnit, result: str | None, children: list[NewUnit]) -> str:
+    if unit.kind == "course":
+        return f"【{unit.data.get('title', '')}】 チャプター {len(children)} 件"
+    if unit.kind == "chapter":
+        return f"  > {unit.data.get('title', '')} 確認テスト {len(children)} 件"
+    return f"    - {unit.data.get('title', '')}: {len(json.loads(result))} 問"
+
+
+def run_worker(
+    queue: WorkQueue,
+    client: ZenStudyClient,
+    worker: str | None = None,
+    cache: ResponseCache | None = None,
+) -> Counter[str]:
+    """Lease and execute units until the crawl is finished.
+
+    A worker without a unit to lease waits while other workers hold
+    leases, since their units may add new ones or be given back.
+
+    Args:
+        queue: Queue of the crawl
+        client: Client to send requests with
+        worker: Worker name (defaults to host and process ID)
+        cache: Response cache holding earlier parse results
+
+    Returns:
+        Numbers of units done, retried and given up
+    """
+    worker = worker or default_worker_id()
+    stats: Counter[str] = Counter()
+    while True:
+        unit = queue.lease(worker)
+        if unit is None:
+            if queue.is_finished():
+                return stats
+            time.sleep(Config.WORK_POLL_SECONDS)
+            continue
+
+        try:
+            result, children = execute_unit(unit, client, cache)
+        except AuthenticationError:
+            # Every unit would fail the same way; the lease expires and
+            # another worker takes the unit over
+            raise
+        except Exception as e:
+            retry = queue.fail(unit, worker, e)
+            stats["retried" if retry else "failed"] += 1
+            note = "再試行します" if retry else "中止しました"
+            print(f"[{worker}] ! {unit.kind} {unit.data.get('title', '')}: {e} ({note})")
+            continue
+        queue.complete(unit, result, children)
+        stats["done"] += 1
+        print(f"[{worker}] {_describe(unit, result, children)}")
+
+
+def merge_results(queue: WorkQueue, recorder: CrawlRecorder) -> None:
+    """Record the results of a finished crawl in API order.
+
+    The recorder saves questions and writes the summary exactly as in a
+    single-process crawl. Courses, chapters and exercises that were given up
+    are reported as errors to the recorder's progress reporter, like
+    exercises that failed in a single-process crawl.
+
+    Args:
+        queue: Queue of a finished crawl
+        recorder: Recorder to replay the crawl into
+    """
+    for course in queue.units("course"):
+        recorder.start_course(course.data)
+        if course.state != "done":
+            recorder.record_unit_error(RuntimeError(course.result))
+        else:
+            for chapter in queue.units("chapter", course.course_id):
+                _merge_chapter(queue, recorder, chapter)
+        recorder.finish_course()
+
+
+def _merge_chapter(queue: WorkQueue, recorder: CrawlRecorder, chapter: WorkUnit) -> None:
+    recorder.start_chapter(chapter.data)
+    if chapter.state != "done":
+        recorder.record_unit_error(RuntimeError(chapter.result))
+    else:
+        exercises = queue.units("exercise", chapter.course_id, chapter.chapter_id)
+        for exercise in exercises:
+            recorder.start_exercise(exercise.position, len(exercises), exercise.data)
+            if exercise.state == "done":
+                recorder.record_questions(
+                    [Question.from_dict(q) for q in json.loads(exercise.result)]
+                )
+            else:
+                recorder.record_error(RuntimeError(exercise.result))
+    recorder.finish_chapter()
+
+
+def _work_process(
+    worker: str,
+    rate: float,
+    burst: int,
+    use_cache: bool,
+    parser_engine: str,
+    transport_factory: Callable[[], httpx.BaseTransport] | None = None,
+) -> None:
+    """Entry point of a worker process started by run_workers()."""
+    ExerciseParser.set_default_engine(parser_engine)
+    cache = ResponseCache() if use_cache else None
+    transport = transport_factory() if transport_factory is not None else None
+    client = ZenStudyClient(TokenBucket(rate, burst), cache, transport)
+    try:
+        with WorkQueue() as queue, client:
+            run_worker(queue, client, worker, cache)
+    except AuthenticationError:
+        print_authentication_help()
+        raise SystemExit(1) from None
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def run_workers(
+    count: int,
+    rate: float,
+    burst: int,
+    use_cache: bool = True,
+    transport_factory: Callable[[], httpx.BaseTransport] | None = None,
+) -> None:
+    """Run worker processes on this machine until the crawl is finished.
+
+    Args:
+        count: Number of worker processes
+        rate: Requests per second of each worker
+        burst: Requests each worker may send back to back
+        use_cache: Whether workers use the response cache
+        transport_factory: Picklable function creating the transport each
+            worker sends requests with
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=_work_process,
+            args=(
+                f"{default_worker_id()}-{n}",
+                rate,
+                burst,
+                use_cache,
+                ExerciseParser.default_engine,
+                transport_factory,
+            ),
+        )
+        for n in range(1, count + 1)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def merge(store_kind: str | None = None, summary_format: str | None = None) -> bool:
+    """Write the question files and summary of a finished crawl.
+
+    Args:
+        store_kind: One of QUESTION_STORES (defaults to Config.QUESTION_STORE)
+        summary_format: One of SummaryWriter.FORMATS
+
+    Returns:
+        False if the crawl is not finished yet
+    """
+    with WorkQueue() as queue:
+        counts = queue.counts()
+        if not queue.is_finished():
+            print(
+                f"未完了の作業があります (待機中 {counts['pending']} 件 /"
+                f" 処理中 {counts['leased']} 件)。work の終了後に merge を実行してください。"
+            )
+            return False
+
+        store = open_question_store(store_kind)
+        # Reports the units that were given up
+        progress = ProgressReporter("quiet")
+        try:
+            with SummaryWriter(fmt=summary_format) as summary:
+                recorder = CrawlRecorder(summary=summary, store=store, progress=progress)
+                merge_results(queue, recorder)
+        finally:
+            progress.close()
+            store.close()
+
+    totals = recorder.totals
+    print()
+    print("=" * 50)
+    print("取得完了:")
+    print(f"  コース: {totals.courses} 件")
+    print(f"  チャプター: {totals.chapters} 件")
+    print(f"  確認テスト: {totals.exercises} 件")
+    print(f"  問題数: {totals.questions} 問")
+    if counts["failed"]:
+        print(f"  取得できなかった作業: {counts['failed']} 件")
+    if summary.totals.courses:
+        print(f"  サマリー: {summary.path}")
+    return True
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="複数のワーカープロセスで確認テストを取得します"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("plan", help="受講コースを作業キューに登録する (新しい取得を始める)")
+
+    work = argparse.ArgumentParser(add_help=False)
+    work.add_argument(
+        "--rate",
+        type=float,
+        default=Config.REQUESTS_PER_SECOND,
+        help=(
+            "ワーカーごとの1秒あたりのリクエスト数の上限"
+            f" (0で無制限, デフォルト: {Config.REQUESTS_PER_SECOND})"
+        ),
+    )
+    work.add_argument(
+        "--burst",
+        type=int,
+        default=Config.RATE_BURST,
+        help=f"連続して送れるリクエスト数 (デフォルト: {Config.RATE_BURST})",
+    )
+    work.add_argument(
+        "--parser",
+        choices=ExerciseParser.ENGINES,
+        default=Config.PARSER_ENGINE,
+        help=f"HTMLパーサーエンジン (デフォルト: {Config.PARSER_ENGINE})",
+    )
+    work.add_argument(
+        "--no-cache", action="store_true", help="レスポンスキャッシュを使わない"
+    )
+    worker = commands.add_parser("work", parents=[work], help="作業キューの作業を処理する")
+    worker.add_argument("--worker-id", help="ワーカー名 (デフォルト: ホスト名とプロセスID)")
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument(
+        "--store",
+        choices=QUESTION_STORES,
+        default=Config.QUESTION_STORE,
+        help=f"問題の保存形式 (デフォルト: {Config.QUESTION_STORE})",
+    )
+    output.add_argument(
+        "--summary-format",
+        choices=SummaryWriter.FORMATS,
+        default=Config.SUMMARY_FORMAT,
+        help=f"サマリーの形式 (デフォルト: {Config.SUMMARY_FORMAT})",
+    )
+    commands.add_parser(
+        "merge", parents=[output], help="取得結果から問題ファイルとサマリーを書き出す"
+    )
+
+    run = commands.add_parser(
+        "run", parents=[work, output], help="plan・work・merge をこのマシンでまとめて実行する"
+    )
+    run.add_argument(
+        "--workers", type=int, default=4, help="ワーカープロセス数 (デフォルト: 4)"
+    )
+    return parser.parse_args(argv)
+
+
+def _plan() -> None:
+    with WorkQueue() as queue, ZenStudyClient(TokenBucket(Config.REQUESTS_PER_SECOND)) as client:
+        count = plan_crawl(queue, client)
+    print(f"オンデマンドコース {count} 件を作業キュー ({queue.path}) に登録しました")
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run a step of a crawl with several worker processes."""
+    args = parse_args(argv)
+    try:
+        _run(args)
+    except AuthenticationError:
+        print_authentication_help()
+        raise SystemExit(1) from None
+
+
+def _run(args: argparse.Namespace) -> None:
+    """Run the step chosen on the command line."""
+
+    if args.command == "plan":
+        _plan()
+    elif args.command == "work":
+        ExerciseParser.set_default_engine(args.parser)
+        cache = None if args.no_cache else ResponseCache()
+        try:
+            with WorkQueue() as queue, ZenStudyClient(
+                TokenBucket(args.rate, args.burst), cache
+            ) as client:
+                stats = run_worker(queue, client, args.worker_id, cache)
+        finally:
+            if cache is not None:
+                cache.close()
+        print(
+            f"完了 {stats['done']} 件 / 再試行 {stats['retried']} 件 / 中止 {stats['failed']} 件"
+        )
+    elif args.command == "merge":
+        merge(args.store, args.summary_format)
+    else:
+        ExerciseParser.set_default_engine(args.parser)
+        _plan()
+        run_workers(args.workers, args.rate, args.burst, not args.no_cache)
+        merge(args.store, args.summary_format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Fixtures shared by the tests that crawl the benchmark fake server."""
+
+import contextlib
+import io
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src.config import Config
+from src.crawler import CrawlRecorder, scrape_exercises_concurrent
+from src.main import scrape_exercises
+from src.pipeline import CrawlPipeline
+from src.ratelimit import TokenBucket
+from src.summary import SummaryWriter
+
+
+@pytest.fixture(autouse=True)
+def output_dir(tmp_path, monkeypatch):
+    """Give every test its own output and cache directories and a session."""
+    monkeypatch.setenv("ZANE_SESSION", "test")
+    monkeypatch.setattr(Config, "OUTPUT_DIR", str(tmp_path / "output"))
+    monkeypatch.setattr(Config, "CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "output"
+
+
+def _tree(root: Path) -> dict[str, bytes]:
+    return {
+        str(path.relative_to(root)): path.read_bytes()
+        for path in root.rglob("*")
+        if path.is_file()
+        and ".sqlite3" not in path.name
+        and Config.PAGE_ARCHIVE_DIR not in path.relative_to(root).parts
+    }
+
+
+@pytest.fixture
+def tree() -> Callable[[Path], dict[str, bytes]]:
+    """Read the output files under a directory as {relative path: bytes}.
+
+    Databases (the journal, the work queue) and the page archive record how
+    the output was made, so they are left out.
+    """
+    return _tree
+
+
+@pytest.fixture
+def crawl(monkeypatch) -> Callable[..., CrawlRecorder]:
+    """Crawl a fake server into the output directory, with a summary.
+
+    The returned function takes the server, the crawl mode ("sequential",
+    "concurrent" or "pipeline"), a transport replacing the server's, a
+    response cache, a journal, another output directory and further
+    CrawlRecorder arguments, and returns the recorder.
+    """
+
+    def run(
+        server: FakeZenStudy,
+        mode: str = "sequential",
+        transport: httpx.BaseTransport | httpx.AsyncBaseTransport | None = None,
+        cache: Any = None,
+        journal: Any = None,
+        output_dir: Path | None = None,
+        **recorder_args: Any,
+    ) -> CrawlRecorder:
+        if output_dir is not None:
+            monkeypatch.setattr(Config, "OUTPUT_DIR", str(output_dir))
+        with SummaryWriter() as summary, contextlib.redirect_stdout(io.StringIO()):
+            recorder = CrawlRecorder(journal, summary, **recorder_args)
+            if mode == "sequential":
+                transport = transport or server.transport()
+                scrape_exercises(TokenBucket(0), cache, recorder, transport)
+            elif mode == "concurrent":
+                scrape_exercises_concurrent(
+                    rate_limiter=TokenBucket(0),
+                    cache=cache,
+                    recorder=recorder,
+                    transport=transport or server.async_transport(),
+                )
+            else:
+                CrawlPipeline(
+                    rate_limiter=TokenBucket(0),
+                    cache=cache,
+                    recorder=recorder,
+                    transport=transport or server.transport(),
+                ).run()
+        return recorder
+
+    return run
@@ -0,0 +1,123 @@
+"""Archived pages must read back unchanged and reparse into the crawl's output."""
+
+import contextlib
+import io
+import shutil
+
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src import archive as archive_module
+from src.archive import PageArchive
+from src.config import Config
+from src.crawler import CrawlRecorder
+from src.parser import ExerciseParser
+from src.reparse import reparse_archive
+from src.summary import SummaryWriter
+
+CODECS = [
+    "zlib",
+    pytest.param(
+        "zstd",
+        marks=pytest.mark.skipif(
+            archive_module._zstandard() is None, reason="zstandard is not installed"
+        ),
+    ),
+]
+
+
+@pytest.fixture(autouse=True)
+def train_early(monkeypatch):
+    monkeypatch.setattr(Config, "ARCHIVE_TRAIN_PAGES", 8)
+
+
+def _add(archive, server, exercise_id, html=None):
+    return archive.add(
+        html or server.exercise_html(exercise_id),
+        {"id": 1, "title": "コース"},
+        {"id": 10, "title": "章"},
+        {"id": exercise_id, "title": f"確認テスト{exercise_id}"},
+        1,
+        1,
+        exercise_id,
+        40,
+    )
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_pages_read_back_and_share_a_dictionary(tmp_path, monkeypatch, codec):
+    monkeypatch.setattr(Config, "ARCHIVE_CODEC", codec)
+    server = FakeZenStudy(questions=4)
+    with PageArchive(tmp_path / "archive") as archive:
+        for exercise_id in range(1, 41):
+            assert _add(archive, server, exercise_id)
+        assert not _add(archive, server, 1)  # unchanged
+        assert _add(archive, server, 2, "<html>改訂されたページ</html>")
+
+        pages = archive.pages()
+        assert [p.exercise_id for p in pages] == list(range(1, 41))
+        for page in pages:
+            expected = "<html>改訂されたページ</html>" if page.exercise_id == 2 else None
+            assert archive.read(page) == (expected or server.exercise_html(page.exercise_id))
+
+        # Every page was recompressed with the dictionary trained on the first ones
+        assert {page.dict_id for page in pages} == {pages[0].dict_id} != {None}
+        stats = archive.stats()
+        assert stats["compressed_bytes"] < stats["pack_bytes"]  # the replaced page
+        assert stats["compressed_bytes"] < 0.2 * stats["bytes"]
+
+        archive.compact()
+        assert archive.stats()["pack_bytes"] == archive.stats()["compressed_bytes"]
+        assert archive.read(archive.pages()[-1]) == server.exercise_html(40)
+
+    plain = archive_module._Codec(codec, None)
+    assert stats["compressed_bytes"] < sum(
+        len(plain.compress(server.exercise_html(n).encode())) for n in range(1, 41)
+    ) * 0.7
+    assert len(list((tmp_path / "archive").glob("*.pack"))) == 1
+
+
+def test_interrupted_write_is_cut_off(tmp_path):
+    server = FakeZenStudy()
+    with PageArchive(tmp_path) as archive:
+        _add(archive, server, 1)
+        size = archive.stats()["pack_bytes"]
+        pack = archive._pack_path
+    with open(pack, "ab") as f:
+        f.write(b"half a page")
+
+    with PageArchive(tmp_path) as archive:
+        assert archive.stats()["pack_bytes"] == size
+        _add(archive, server, 2)
+        assert [archive.read(p) for p in archive.pages()] == [
+            server.exercise_html(1),
+            server.exercise_html(2),
+        ]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reparse_writes_the_crawl_output(output_dir, crawl, tree, monkeypatch, workers):
+    server = FakeZenStudy(courses=3, chapters=2, exercises=3, questions=2)
+    crawl(server)
+    expected = tree(output_dir)
+    shutil.rmtree(output_dir)
+
+    # Pages are archived before they are parsed, so a parser error loses nothing
+    parse = ExerciseParser.parse_exercise_html
+
+    def broken(html, engine=None):
+        if "補足説明 10000001<" in html:
+            raise ValueError("broken parser")
+        return parse(html, engine)
+
+    monkeypatch.setattr(ExerciseParser, "parse_exercise_html", broken)
+    with PageArchive() as archive:
+        crawl(server, archive=archive)
+        assert len(archive) == server.total_exercises
+    assert len(tree(output_dir)) == len(expected) - server.questions
+    monkeypatch.setattr(ExerciseParser, "parse_exercise_html", parse)
+
+    with PageArchive() as archive, SummaryWriter() as summary:
+        with contextlib.redirect_stdout(io.StringIO()):
+            reparse_archive(archive, CrawlRecorder(summary=summary), workers)
+    assert tree(output_dir) == expected
@@ -0,0 +1,29 @@
+"""Every crawl mode must save the whole enrollment of the stand-in server."""
+
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from benchmarks.run import parse_args, run_case
+from src.config import Config
+
+
+@pytest.mark.parametrize("case", ["crawl_sequential", "crawl_concurrent", "crawl_pipeline"])
+def test_crawl_saves_every_question(case, monkeypatch):
+    monkeypatch.setenv("ZANE_SESSION", "test")
+    # The case points OUTPUT_DIR at a temporary directory
+    monkeypatch.setattr(Config, "OUTPUT_DIR", Config.OUTPUT_DIR)
+    args, _ = parse_args(["--courses", "2", "--chapters", "2", "--exercises", "2", "--latency", "0"])
+
+    result = run_case(case, args)
+    assert result["pages"] == 8
+    # my_courses, 2 courses, 4 chapters and 8 exercises
+    assert result["requests"] == 15
+
+
+def test_exercise_pages_parse_to_the_configured_questions():
+    from src.parser import ExerciseParser
+
+    server = FakeZenStudy(questions=3)
+    questions = ExerciseParser.parse_exercise_html(server.exercise_html(1))
+    assert len(questions) == 3
+    assert [c.number for c in questions[0].choices] == [1, 2, 3, 4]
@@ -0,0 +1,164 @@
+"""Cached responses must be revalidated after their TTL and evicted least recently used."""
+
+import hashlib
+
+import httpx
+import pytest
+
+from src import cache as cache_module
+from src.cache import ResponseCache
+from src.client import ZenStudyClient
+from src.config import Config
+from src.ratelimit import TokenBucket
+
+PAGE = "https://example.com/exercises/{}"
+
+
+class Origin:
+    """Server answering conditional requests with 304 while a page is unchanged."""
+
+    def __init__(self):
+        self.pages: dict[str, str] = {}
+        self.requests: list[httpx.Request] = []
+
+    def validators(self, path: str) -> tuple[str, str]:
+        digest = hashlib.sha256(self.pages[path].encode()).hexdigest()[:16]
+        return f'"{digest}"', f"Wed, 01 Jan 2025 00:00:{len(self.pages[path]) % 60:02d} GMT"
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        path = request.url.path
+        if path.endswith("/my_courses"):
+            self.pages.setdefault(path, '{"courses": [], "total_count": 0}')
+        etag, last_modified = self.validators(path)
+        headers = {"ETag": etag, "Last-Modified": last_modified}
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, text=self.pages[path], headers=headers)
+
+
+class WallClock:
+    """time.time() of the cache, moved by the test."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        self.now += 0.001  # every access is later than the one before
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = WallClock()
+    monkeypatch.setattr(cache_module.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture
+def origin():
+    return Origin()
+
+
+@pytest.fixture
+def client(origin):
+    def connect(cache):
+        return ZenStudyClient(
+            TokenBucket(0), cache=cache, transport=httpx.MockTransport(origin.handle)
+        )
+
+    return connect
+
+
+def _cached_pages(cache: ResponseCache) -> list[str]:
+    """URLs in the cache, least recently used first."""
+    rows = cache._conn.execute("SELECT url FROM responses ORDER BY accessed_at")
+    return [url.rsplit("/", 1)[1] for (url,) in rows]
+
+
+def test_stale_entries_are_revalidated_with_their_validators(clock, origin, client):
+    origin.pages["/exercises/1"] = "<html>first</html>"
+    etag, last_modified = origin.validators("/exercises/1")
+    cache = ResponseCache(default_ttl=60)
+    with client(cache) as http:
+        assert http.get_exercise_html(PAGE.format(1)) == "<html>first</html>"
+        assert "If-None-Match" not in origin.requests[0].headers
+
+        # Fresh: served without a request
+        assert http.get_exercise_html(PAGE.format(1)) == "<html>first</html>"
+        assert len(origin.requests) == 1
+
+        # Stale: asked with both validators, 304 keeps the cached body
+        clock.now += 61
+        assert http.get_exercise_html(PAGE.format(1)) == "<html>first</html>"
+        assert origin.requests[1].headers["If-None-Match"] == etag
+        assert origin.requests[1].headers["If-Modified-Since"] == last_modified
+        assert (cache.hits, cache.revalidated, cache.misses) == (1, 1, 1)
+
+        # The 304 made the entry fresh again
+        assert http.get_exercise_html(PAGE.format(1)) == "<html>first</html>"
+        assert len(origin.requests) == 2
+
+        # A changed page replaces the entry
+        origin.pages["/exercises/1"] = "<html>second</html>"
+        clock.now += 61
+        assert http.get_exercise_html(PAGE.format(1)) == "<html>second</html>"
+        assert (cache.hits, cache.revalidated, cache.misses) == (2, 1, 2)
+        etag, _ = origin.validators("/exercises/1")
+        assert cache.lookup(cache.make_key(PAGE.format(1))).etag == etag
+    cache.close()
+
+
+def test_each_endpoint_has_its_own_ttl(clock, origin, client):
+    cache = ResponseCache()
+    base = Config.API_BASE_URL
+    assert cache.ttl_for(f"{base}/v3/dashboard/my_courses") == 5 * 60
+    assert cache.ttl_for(f"{base}/v2/material/courses/1") == 24 * 60 * 60
+    assert cache.ttl_for(f"{base}/v2/material/courses/1/chapters/2") == 60 * 60
+    assert cache.ttl_for(PAGE.format(1)) == cache.default_ttl
+
+    origin.pages["/exercises/1"] = "<html></html>"
+    with client(cache) as http:
+        http.get_my_courses()
+        http.get_exercise_html(PAGE.format(1))
+        assert len(origin.requests) == 2
+
+        # Ten minutes on, the course list is stale and the page is not
+        clock.now += 10 * 60
+        http.get_my_courses()
+        http.get_exercise_html(PAGE.format(1))
+        assert len(origin.requests) == 3
+        assert origin.requests[2].url.path.endswith("/my_courses")
+        assert "If-None-Match" in origin.requests[2].headers
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted_first(clock, origin, client):
+    for page in range(1, 6):
+        origin.pages[f"/exercises/{page}"] = f"<p>{page}</p>".ljust(100)
+    cache = ResponseCache(max_bytes=300)
+    with client(cache) as http:
+        for page in (1, 2, 3):
+            http.get_exercise_html(PAGE.format(page))
+        digest = cache_module.page_digest(origin.pages["/exercises/2"])
+        cache.put_parsed(digest, 1, "lxml", [])
+        assert cache.get_parsed(digest, 1, "lxml") == []
+        assert _cached_pages(cache) == ["1", "2", "3"]
+
+        # Reading page 1 makes page 2 the least recently used
+        http.get_exercise_html(PAGE.format(1))
+        http.get_exercise_html(PAGE.format(4))
+        assert _cached_pages(cache) == ["3", "1", "4"]
+
+        # Page 2 took its parse result with it
+        assert cache.get_parsed(digest, 1, "lxml") is None
+
+        http.get_exercise_html(PAGE.format(5))
+        assert _cached_pages(cache) == ["1", "4", "5"]
+        assert len(origin.requests) == 5
+
+        # Evicted pages are fetched again
+        http.get_exercise_html(PAGE.format(2))
+        assert len(origin.requests) == 6
+        assert _cached_pages(cache) == ["4", "5", "2"]
+    cache.close()
@@ -0,0 +1,118 @@
+"""The zen-study command: subcommands, startup imports, offline reparse and stats."""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src import cli
+from src.cache import ResponseCache
+from src.config import Config
+from src.stats import collect_stats
+
+ROOT = Path(__file__).parent.parent
+
+# Modules a quick subcommand must not load; they make up most of the
+# startup time of the crawl
+_HEAVY = ("httpx", "bs4", "lxml", "pyarrow", "dotenv", "src.client", "src.parser")
+
+
+@pytest.fixture(autouse=True)
+def program_name(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["zen-study"])  # renamed for the subcommand
+
+
+def _run(code: str, cwd: Path) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def test_stats_starts_without_heavy_imports(tmp_path, crawl):
+    crawl(FakeZenStudy(courses=2, chapters=2, exercises=2, questions=2))
+
+    loaded = f"print(json.dumps(sorted(m for m in {_HEAVY!r} if m in sys.modules)))\n"
+    code = (
+        "import json, sys\n"
+        "from src import cli\n"
+        + loaded
+        + "cli.main(['stats', '--json'])\n"
+        + loaded
+    )
+    # The output directory is ./output of the working directory
+    on_import, stats_json, on_stats = _run(code, tmp_path).stdout.splitlines()
+    assert json.loads(on_import) == json.loads(on_stats) == []
+    assert json.loads(stats_json)["summary"]["questions"] == 16
+
+
+def test_subcommands_run_their_module(monkeypatch):
+    called = []
+    for name, (module, _) in cli.COMMANDS.items():
+        __import__(module)
+        monkeypatch.setattr(sys.modules[module], "main", called.append)
+
+    cli.main(["crawl", "--resume"])
+    cli.main(["stats"])
+    assert called == [["--resume"], []]
+
+    with pytest.raises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+        cli.main(["unknown"])
+
+
+def test_reparse_rewrites_the_output_offline(output_dir, crawl, tree):
+    server = FakeZenStudy(courses=2, chapters=2, exercises=3, questions=2)
+    cache = ResponseCache()
+    crawl(server, cache=cache)
+    expected = tree(output_dir)
+
+    # Drop the output and one exercise page from the cache
+    for path in sorted(output_dir.rglob("*"), reverse=True):
+        path.unlink() if path.is_file() else path.rmdir()
+    page = f"{Config.PAGE_BASE_URL}/exercises/10000001"
+    cache._conn.execute("DELETE FROM responses WHERE url = ?", (page,))
+    cache._conn.commit()
+    cache.close()
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        cli.main(["reparse", "--from-cache"])
+    assert "確認テスト 11 件 / 問題 22 問" in out.getvalue()
+    reparsed = tree(output_dir)
+    assert {name for name in expected if name not in reparsed} == {
+        name for name in expected if "_10000001_" in name
+    }
+    assert all(reparsed[name] == expected[name] for name in reparsed if name != "summary.json")
+
+
+def test_stats_count_the_output(output_dir, crawl):
+    assert collect_stats() == {
+        "summary": None,
+        "sqlite_store": None,
+        "cas_store": None,
+        "journal": None,
+        "work_queue": None,
+        "archive": None,
+        "cache": None,
+    }
+    assert not output_dir.exists()
+
+    server = FakeZenStudy(courses=2, chapters=1, exercises=2, questions=3)
+    cache = ResponseCache()
+    crawl(server, cache=cache)
+    cache.close()
+    stats = collect_stats()
+    assert stats["summary"] | {"path": None, "updated_at": None} == {
+        "path": None,
+        "updated_at": None,
+        "courses": 2,
+        "chapters": 2,
+        "exercises": 4,
+        "questions": server.total_questions,
+    }
+    assert stats["cache"]["responses"] == 1 + 2 + 2 + 4
@@ -0,0 +1,47 @@
+"""Columnar tables must hold every question and choice of the summary."""
+
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src import columnar
+from src.summary import find_summary, read_summary
+
+pa = pytest.importorskip("pyarrow")
+pc = pytest.importorskip("pyarrow.compute")
+
+
+@pytest.mark.parametrize("fmt", columnar.FORMATS)
+def test_tables_round_trip_the_summary(crawl, fmt):
+    server = FakeZenStudy(courses=2, chapters=2, exercises=3, questions=2)
+    crawl(server)
+    courses = list(read_summary(find_summary()))
+
+    paths = columnar.write_tables(courses, fmt=fmt)
+    assert sorted(path.name for path in paths.values()) == [f"choices.{fmt}", f"questions.{fmt}"]
+    tables = columnar.load_tables(fmt=fmt)
+    questions, choices = tables["questions"], tables["choices"]
+
+    assert questions.num_rows == server.total_questions
+    assert choices.num_rows == 4 * server.total_questions
+    assert pa.types.is_dictionary(questions.schema.field("chapter_title").type)
+    assert questions.column("course_title").combine_chunks().dictionary.to_pylist() == [
+        course.course_title for course in courses
+    ]
+
+    # Rebuild the first exercise from the tables
+    exercise = courses[0].chapters[0].exercises[0]
+    rows = questions.filter(pc.equal(questions["exercise_id"], exercise.exercise_id))
+    assert rows["statement"].to_pylist() == [q.statement for q in exercise.questions]
+    joined = choices.join(
+        rows.select(["question_id", "question_number"]), "question_id", join_type="inner"
+    )
+    joined = joined.sort_by([("question_number", "ascending"), ("number", "ascending")])
+    assert joined["text"].to_pylist() == [
+        c.text for q in exercise.questions for c in q.choices
+    ]
+
+    # Per-exercise counts and statement lengths without a Python loop
+    counts = questions.group_by("exercise_id").aggregate([("question_id", "count")])
+    assert set(counts["question_id_count"].to_pylist()) == {server.questions}
+    lengths = pc.utf8_length(questions["statement"])
+    assert pc.max(lengths).as_py() == max(len(q.statement) for q in exercise.questions)
@@ -0,0 +1,32 @@
+"""A concurrent crawl must write the same output as a sequential one."""
+
+import asyncio
+
+import httpx
+
+from benchmarks.fake_server import FakeZenStudy
+
+
+def _shuffled(server: FakeZenStudy) -> httpx.MockTransport:
+    """Async transport whose exercise pages arrive out of order."""
+
+    async def handle(request):
+        if "/exercises/" in request.url.path:
+            # Later exercises of a chapter answer first
+            await asyncio.sleep((9 - int(request.url.path.rsplit("/", 1)[1]) % 10) * 0.002)
+        return await server._handle_async(request)
+
+    return httpx.MockTransport(handle)
+
+
+def test_concurrent_output_is_byte_identical(tmp_path, crawl, tree):
+    server = FakeZenStudy(courses=3, chapters=3, exercises=4, questions=2)
+    sequential = crawl(server, output_dir=tmp_path / "sequential")
+    expected = tree(tmp_path / "sequential")
+    assert len(expected) == server.total_questions + 1  # and the summary
+
+    concurrent = crawl(
+        server, "concurrent", transport=_shuffled(server), output_dir=tmp_path / "concurrent"
+    )
+    assert tree(tmp_path / "concurrent") == expected
+    assert concurrent.totals == sequential.totals
@@ -0,0 +1,92 @@
+"""The course list must be read page by page, each course once."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src.client import AsyncZenStudyClient, ZenStudyClient
+from src.crawler import ondemand_course_pages, ondemand_course_pages_async
+
+
+@pytest.fixture(autouse=True)
+def session(monkeypatch):
+    monkeypatch.setenv("ZANE_SESSION", "test")
+
+
+def _course_ids(pages):
+    return [[course["id"] for course in courses] for courses in pages]
+
+
+def test_reads_every_page():
+    server = FakeZenStudy(courses=45)
+    with ZenStudyClient(transport=server.transport()) as client:
+        pages = _course_ids(ondemand_course_pages(client.iter_my_courses(page_size=20)))
+
+    assert [len(page) for page in pages] == [20, 20, 5]
+    assert sum(pages, []) == list(range(1000, 1045))
+    assert server.requests == 3
+
+
+def test_a_full_last_page_costs_one_empty_request():
+    server = FakeZenStudy(courses=40)
+    with ZenStudyClient(transport=server.transport()) as client:
+        pages = _course_ids(ondemand_course_pages(client.iter_my_courses(page_size=20)))
+    assert [len(page) for page in pages] == [20, 20, 0]
+
+
+def test_async_pages_match_sync_pages():
+    server = FakeZenStudy(courses=25)
+
+    async def read():
+        async with AsyncZenStudyClient(transport=server.async_transport()) as client:
+            pages = ondemand_course_pages_async(client.iter_my_courses(page_size=10))
+            return _course_ids([courses async for courses in pages])
+
+    assert asyncio.run(read()) == [
+        list(range(1000, 1010)),
+        list(range(1010, 1020)),
+        list(range(1020, 1025)),
+    ]
+
+
+def test_next_page_is_requested_before_the_current_one_is_done():
+    server = FakeZenStudy(courses=30)
+    with ZenStudyClient(transport=server.transport()) as client:
+        pages = client.iter_my_courses(page_size=20)
+        next(pages)
+        # Give the prefetching thread a moment
+        for _ in range(100):
+            if server.requests == 2:
+                break
+            time.sleep(0.01)
+        assert server.requests == 2
+        pages.close()
+
+
+def test_courses_are_deduplicated_across_services_and_pages():
+    def handler(request):
+        offset = int(request.url.params["offset"])
+        first = {"id": 1, "title": "A:オンデマンド"}
+        second = {"id": 2, "title": "B:オンデマンド"}
+        if offset == 0:
+            services = [{"courses": [first, second]}, {"courses": [first]}]
+        else:
+            services = [{"courses": [second, {"id": 3, "title": "ライブ授業"}]}]
+        return httpx.Response(200, json={"services": services})
+
+    with ZenStudyClient(transport=httpx.MockTransport(handler)) as client:
+        pages = _course_ids(ondemand_course_pages(client.iter_my_courses(page_size=3)))
+    assert pages == [[1, 2], []]
+
+
+def test_a_server_ignoring_the_offset_does_not_loop_forever():
+    def handler(request):
+        courses = [{"id": i, "title": f"{i}:オンデマンド"} for i in range(2)]
+        return httpx.Response(200, json={"services": [{"courses": courses}]})
+
+    with ZenStudyClient(transport=httpx.MockTransport(handler)) as client:
+        pages = _course_ids(ondemand_course_pages(client.iter_my_courses(page_size=2)))
+    assert pages == [[0, 1], []]
@@ -0,0 +1,172 @@
+"""Near-duplicate clusters must match the pairs found by comparing every statement."""
+
+import contextlib
+import io
+import json
+import random
+
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src import duplicates as duplicates_module
+from src.config import Config
+from src.crawler import CrawlRecorder
+from src.duplicates import DuplicateFinder, _probes, shingles, signature, similarity
+from src.main import scrape_exercises
+from src.ratelimit import TokenBucket
+
+_ALPHABET = "あいうえおかきくけこさしすせそたちつてとなにぬねの憲法国会内閣需要供給価格"
+
+
+def _statement(rng):
+    return "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(60, 100)))
+
+
+def _reword(rng, statement, edits):
+    chars = list(statement)
+    for _ in range(edits):
+        chars[rng.randrange(len(chars))] = "★"
+    return "".join(chars)
+
+
+def _record(course_id, number, statement):
+    return {
+        "course_id": course_id,
+        "course_title": f"コース{course_id}",
+        "chapter_id": course_id * 10,
+        "chapter_title": "章",
+        "exercise_id": course_id * 100,
+        "exercise_title": "確認テスト",
+        "question_number": number,
+        "question": {"statement": statement, "choices": []},
+    }
+
+
+def _keys(cluster):
+    return {(m.course_id, m.question_number) for m in cluster.members}
+
+
+@pytest.fixture
+def finder(tmp_path):
+    with DuplicateFinder(tmp_path / "duplicates.sqlite3") as finder:
+        yield finder
+
+
+def test_signature_agreement_estimates_similarity():
+    rng = random.Random(0)
+    bins = 128
+    probes = _probes(bins)
+    errors = []
+    for _ in range(100):
+        first = _statement(rng)
+        second = _reword(rng, first, rng.randint(0, 6))
+        a, b = shingles(first), shingles(second)
+        agreement = sum(
+            x == y for x, y in zip(signature(a, bins, probes), signature(b, bins, probes))
+        )
+        errors.append(agreement / bins - similarity(a, b))
+    assert abs(sum(errors) / len(errors)) < 0.02
+    assert max(map(abs, errors)) < 0.2
+
+
+def test_clusters_match_all_pairs(finder):
+    rng = random.Random(1)
+    originals = [_statement(rng) for _ in range(300)]
+    records = [_record(1, n, s) for n, s in enumerate(originals, 1)]
+    # Reworded copies in other courses, one with two rewordings
+    records += [_record(2, n, _reword(rng, originals[n - 1], 1)) for n in range(1, 31)]
+    records.append(_record(3, 1, _reword(rng, originals[0], 2)))
+    # The same statement with other surrounding whitespace
+    records.append(_record(3, 2, f"\u3000{originals[1]} \n"))
+
+    assert finder.update(records[:200]) == (200, 0)
+    assert finder.update(records) == (len(records) - 200, 0)
+    assert finder.update(records) == (0, 0)
+
+    statements = {
+        (r["course_id"], r["question_number"]): r["question"]["statement"] for r in records
+    }
+    expected = set()
+    for a in statements:
+        for b in statements:
+            if a < b and similarity(shingles(statements[a]), shingles(statements[b])) >= 0.8:
+                expected.add((a, b))
+    found = {
+        (a, b)
+        for cluster in finder.clusters()
+        for a in _keys(cluster)
+        for b in _keys(cluster)
+        if a < b
+    }
+    # Banding misses a few percent of the pairs right at the threshold
+    assert found <= expected | {((1, 1), (3, 1)), ((2, 1), (3, 1))}
+    assert len(found & expected) >= 0.9 * len(expected)
+
+    clusters = finder.clusters()
+    assert any(_keys(c) == {(1, 1), (2, 1), (3, 1)} for c in clusters)
+    assert any(_keys(c) == {(1, 2), (2, 2), (3, 2)} for c in clusters)
+    assert all(0.8 <= c.similarity <= 1.0 for c in clusters)
+
+
+def test_updates_follow_the_corpus(finder):
+    rng = random.Random(2)
+    statement = _statement(rng)
+    records = [_record(1, 1, statement), _record(2, 1, _reword(rng, statement, 1))]
+    finder.update(records)
+    (cluster,) = finder.clusters()
+    assert cluster.similarity < 1.0
+    assert finder.clusters(threshold=1.0) == []
+
+    # Renaming a course keeps the signature; changing a statement replaces it
+    records[0] = {**records[0], "course_title": "新しいコース名"}
+    assert finder.update(records) == (0, 0)
+    assert finder.clusters()[0].members[0].course_title == "新しいコース名"
+    records[1] = _record(2, 1, _statement(rng))
+    assert finder.update(records) == (1, 0)
+    assert finder.clusters() == []
+
+    records.append(_record(3, 1, statement))
+    finder.update(records)
+    (cluster,) = finder.clusters()
+    assert cluster.similarity == 1.0
+    assert finder.update(records[:2], complete=True) == (0, 1)
+    assert finder.clusters() == []
+    assert len(finder) == 2
+
+
+def test_other_settings_start_over(tmp_path, monkeypatch):
+    path = tmp_path / "duplicates.sqlite3"
+    with DuplicateFinder(path) as finder:
+        finder.update([_record(1, 1, "問題文"), _record(2, 1, "問題文")])
+        assert len(finder.clusters()) == 1
+
+    monkeypatch.setattr(Config, "MINHASH_ROWS", 4)
+    with DuplicateFinder(path) as finder:
+        assert len(finder) == 0
+        finder.update([_record(1, 1, "問題文"), _record(2, 1, "問題文")])
+        assert len(finder.clusters()) == 1
+
+
+def test_crawl_and_cli_write_the_report(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZANE_SESSION", "test")
+    monkeypatch.setattr(Config, "OUTPUT_DIR", str(tmp_path))
+    server = FakeZenStudy(courses=2, chapters=1, exercises=2, questions=3)
+
+    with DuplicateFinder() as finder, contextlib.redirect_stdout(io.StringIO()):
+        recorder = CrawlRecorder(duplicates=finder)
+        scrape_exercises(TokenBucket(0), None, recorder, server.transport())
+        assert len(finder) == server.total_questions
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        duplicates_module.main(["--threshold", "0.5"])
+    assert f"計 {server.total_questions} 問" in out.getvalue()
+
+    report = json.loads((tmp_path / Config.DUPLICATES_REPORT).read_text(encoding="utf-8"))
+    with DuplicateFinder() as finder:
+        assert len(report["clusters"]) == len(finder.clusters(0.5))
+    for cluster in report["clusters"]:
+        assert cluster["similarity"] >= 0.5
+        assert len(cluster["members"]) > 1
+        assert {"course_id", "chapter_id", "exercise_id", "question_number"} <= set(
+            cluster["members"][0]
+        )
@@ -0,0 +1,75 @@
+"""Markdown generation must only regenerate courses whose files changed."""
+
+import generate_markdown
+from src.config import Config
+from src.models import Choice, Question
+from src.storage import save_question_file
+
+
+def _save(exercise_id, question_num, statement):
+    return save_question_file(
+        course_title="コース:オンデマンド",
+        course_id=1,
+        chapter_title="01. 章",
+        chapter_id=10,
+        exercise_title="確認テスト",
+        exercise_id=exercise_id,
+        exercise_index=1,
+        question_num=question_num,
+        question=Question(statement, [Choice(1, "A"), Choice(2, "B")]),
+    )
+
+
+def test_renders_and_skips_unchanged_courses(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, "OUTPUT_DIR", "output")
+    _save(100, 1, "問題文")
+    _save(100, 2, "別の問題")
+
+    generate_markdown.main([])
+    markdown = (tmp_path / "output" / "コースオンデマンド.md").read_text(encoding="utf-8")
+    assert markdown == "\n".join(
+        [
+            "# コースオンデマンド\n",
+            "## 01._章\n",
+            "### 確認テスト - 問1\n",
+            "**問題:** 問題文\n",
+            "1. A",
+            "2. B",
+            "\n---\n",
+            "### 確認テスト - 問2\n",
+            "**問題:** 別の問題\n",
+            "1. A",
+            "2. B",
+            "\n---\n",
+        ]
+    )
+
+    # Rewriting a file with the same content is not a change
+    capsys.readouterr()
+    _save(100, 1, "問題文")
+    generate_markdown.main([])
+    assert "✓ 生成" not in capsys.readouterr().out
+
+    _save(100, 1, "変更後の問題文")
+    generate_markdown.main([])
+    assert "✓ 生成: コースオンデマンド.md" in capsys.readouterr().out
+
+
+def test_directories_without_question_files_are_not_courses(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, "OUTPUT_DIR", "output")
+    _save(100, 1, "問題文")
+    for name, artifact in [
+        (Config.SEARCH_INDEX_DIR, "0000000000.seg"),
+        (Config.PAGE_ARCHIVE_DIR, "pages.sqlite3"),
+        (Config.COLUMNAR_DIR, "questions.parquet"),
+    ]:
+        (tmp_path / "output" / name).mkdir()
+        (tmp_path / "output" / name / artifact).write_bytes(b"")
+
+    generate_markdown.main([])
+    assert sorted(path.name for path in (tmp_path / "output").glob("*.md")) == [
+        "コースオンデマンド.md"
+    ]
+    assert "✓ 生成: コースオンデマンド.md" in capsys.readouterr().out
@@ -0,0 +1,84 @@
+"""The model encoder must produce exactly what json.dumps(to_dict()) does."""
+
+import dataclasses
+import io
+import json
+import pickle
+
+import pytest
+
+from src import models
+from src.models import Chapter, Choice, Course, Exercise, ExerciseCollection, Question
+
+
+def _collection():
+    question = Question('問題 "引用"\\\n改行\t', [Choice(1, "A"), Choice(2, "選択肢 ")])
+    return ExerciseCollection(
+        [
+            Course(
+                1,
+                "コース",
+                [
+                    Chapter(10, "章", [Exercise(100, "確認テスト", [question, Question("空")])]),
+                    Chapter(11, "空の章"),
+                ],
+            ),
+            Course(None, "IDなし"),
+        ]
+    )
+
+
+@pytest.mark.parametrize("indent", [None, 2, 4])
+def test_dumps_matches_json_dumps(indent):
+    collection = _collection()
+    expected = json.dumps(collection.to_dict(), ensure_ascii=False, indent=indent)
+    assert models.dumps(collection, indent) == expected
+
+    f = io.StringIO()
+    models.dump(collection.courses[0], f, indent)
+    assert f.getvalue() == json.dumps(
+        collection.courses[0].to_dict(), ensure_ascii=False, indent=indent
+    )
+
+
+def test_dumps_indents_nested_documents():
+    course = _collection().courses[0]
+    text = json.dumps(course.to_dict(), ensure_ascii=False, indent=2)
+    assert models.dumps(course, 2, level=2) == text.replace("\n", "\n    ")
+
+
+def test_dumps_list_matches_json_dumps():
+    questions = _collection().courses[0].chapters[0].exercises[0].questions
+    assert models.dumps_list(questions) == json.dumps(
+        [q.to_dict() for q in questions], ensure_ascii=False
+    )
+    assert models.dumps_list([]) == "[]"
+
+
+def test_every_model_round_trips():
+    collection = _collection()
+    assert models.loads(models.dumps(collection), ExerciseCollection) == collection
+    course = collection.courses[0]
+    assert Course.from_dict(course.to_dict()) == course
+    assert Chapter.from_dict(course.chapters[0].to_dict()) == course.chapters[0]
+    exercise = course.chapters[0].exercises[0]
+    assert Exercise.from_dict(exercise.to_dict()) == exercise
+    assert pickle.loads(pickle.dumps(collection)) == collection
+
+
+def test_models_are_slotted_and_leaves_frozen():
+    question = _collection().courses[0].chapters[0].exercises[0].questions[0]
+    assert not hasattr(question, "__dict__")
+    assert not hasattr(Course(1, "コース"), "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        question.statement = "変更"
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        question.choices[0].text = "変更"
+
+
+def test_questions_are_hashable():
+    question = Question("問題", [Choice(1, "A"), Choice(2, "B")])
+    assert question.choices == (Choice(1, "A"), Choice(2, "B"))
+    assert question == Question("問題", (Choice(1, "A"), Choice(2, "B")))
+    assert Question.from_dict(question.to_dict()) == question
+    assert len({question, Question.from_dict(question.to_dict()), Question("問題")}) == 2
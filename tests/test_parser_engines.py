@@ -0,0 +1,98 @@
+"""All parser engines must extract the same questions as the bs4 engine."""
+
+import pytest
+
+from src.models import Choice, Question
+from src.parser import ExerciseParser
+
+
+def _section(statement, choices=None, word=False, cls="exercise"):
+    html = f'<section class="{cls}"><div class="statement">{statement}</div>'
+    if choices is not None:
+        items = "".join(
+            f'<li data-input-value="{number}">{text}</li>' for number, text in choices
+        )
+        html += f'<ul class="answers">{items}</ul>'
+    if word:
+        html += '<ul><li data-type="word"><input class="answers" type="text"></li></ul>'
+    return html + "</section>"
+
+
+def _page(body, kokuban=True):
+    if kokuban:
+        body = f'<div id="kokuban-input-target">{body}</div>'
+    return (
+        "<!DOCTYPE html><html><head><title>t</title>"
+        "<script>var s = '<section class=\"exercise\">';</script></head>"
+        f"<body><header>h</header>{body}</body></html>"
+    )
+
+
+PAGES = {
+    "choices": (
+        _page(_section("問題 1", [(1, "① 選択肢A"), (2, "② 1. 選択肢B"), (3, "③")])),
+        [Question("問題 1", [Choice(1, "選択肢A"), Choice(2, "選択肢B")])],
+    ),
+    "word input": (
+        _page(_section("空欄を埋めよ", word=True)),
+        [Question("空欄を埋めよ")],
+    ),
+    "nested sections": (
+        _page(
+            '<section class="exercise"><div class="statement">外側</div>'
+            '<ul class="answers"><li data-input-value="1">外</li></ul>'
+            + _section("内側", [(2, "内")])
+            + "</section>"
+        ),
+        [
+            Question("外側", [Choice(1, "外")]),
+            Question("内側", [Choice(2, "内")]),
+        ],
+    ),
+    "no kokuban": (
+        _page(_section("直下の問題", [(1, "A")]), kokuban=False),
+        [Question("直下の問題", [Choice(1, "A")])],
+    ),
+    "outside kokuban is ignored": (
+        _page(_section("内", [(1, "A")])) + _section("外", [(1, "B")]),
+        [Question("内", [Choice(1, "A")])],
+    ),
+    "comments and scripts": (
+        _page(
+            _section(
+                "  <p>複数<br>行</p> <!-- comment -->テキスト<script>x = 1</script>"
+                "<style>p {}</style>",
+                [(1, "<em>強調</em> <!-- c -->付き")],
+            )
+        ),
+        [Question("複数行テキスト", [Choice(1, "強調付き")])],
+    ),
+    "multi-class attributes": (
+        _page(
+            _section("A", [(1, "a")], cls="exercise foo")
+            + _section("B", [(1, "b")], cls="foo  exercise\tbar")
+            + _section("C", [(1, "c")], cls="exercises")
+        ),
+        [Question("A", [Choice(1, "a")]), Question("B", [Choice(1, "b")])],
+    ),
+    "invalid choice numbers": (
+        _page(_section("問", [("x", "A"), ("", "B"), (2, "C")])),
+        [Question("問", [Choice(2, "C")])],
+    ),
+    "empty page": ("", []),
+}
+
+
+def _engine_or_skip(engine):
+    try:
+        ExerciseParser._get_engine(engine)
+    except ImportError:
+        pytest.skip(f"{engine} is not installed")
+    return engine
+
+
+@pytest.mark.parametrize("engine", ExerciseParser.ENGINES)
+@pytest.mark.parametrize("name", PAGES)
+def test_engines_agree(engine, name):
+    html, expected = PAGES[name]
+    assert ExerciseParser.parse_exercise_html(html, _engine_or_skip(engine)) == expected
@@ -0,0 +1,127 @@
+"""The pipeline must write in traversal order, bound its buffers and stop on failures."""
+
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import httpx
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src import pipeline as pipeline_module
+from src.client import AuthenticationError
+from src.pipeline import CrawlPipeline
+from src.ratelimit import TokenBucket
+
+# Exercises of the first course of FakeZenStudy(courses=1, chapters=2, exercises=3)
+EXERCISES = [10000000, 10000001, 10000002, 10000100, 10000101, 10000102]
+
+
+def _exercise_id(request: httpx.Request) -> int | None:
+    if "/exercises/" not in request.url.path:
+        return None
+    return int(request.url.path.rsplit("/", 1)[1])
+
+
+class RecordingPipeline(CrawlPipeline):
+    """Pipeline remembering the items its writer applied."""
+
+    def __init__(self, server: FakeZenStudy, handle=None, **kwargs):
+        transport = server.transport()
+        super().__init__(
+            rate_limiter=TokenBucket(0),
+            transport=httpx.MockTransport(handle or transport.handle_request),
+            **kwargs,
+        )
+        self.written: list[tuple[str, int | None]] = []
+
+    def _write(self, item):
+        super()._write(item)
+        self.written.append((item.kind, item.data.get("id")))
+
+    @property
+    def exercises(self) -> list[int]:
+        return [unit_id for kind, unit_id in self.written if kind == "exercise"]
+
+
+def test_out_of_order_pages_are_written_in_order(tmp_path, crawl, tree):
+    server = FakeZenStudy(courses=2, chapters=2, exercises=5, questions=2)
+    crawl(server, output_dir=tmp_path / "sequential")
+    transport = server.transport()
+
+    def handle(request):
+        if (exercise_id := _exercise_id(request)) is not None:
+            # Later exercises of a chapter arrive first
+            time.sleep((9 - exercise_id % 10) * 0.003)
+        return transport.handle_request(request)
+
+    crawl(server, "pipeline", httpx.MockTransport(handle), output_dir=tmp_path / "pipeline")
+    assert tree(tmp_path / "pipeline") == tree(tmp_path / "sequential")
+
+
+def test_planner_stops_a_window_ahead_of_the_writer(capsys):
+    server = FakeZenStudy(courses=2, chapters=3, exercises=5, questions=1)
+    transport = server.transport()
+    release = threading.Event()
+    fetched = []
+
+    def handle(request):
+        if (exercise_id := _exercise_id(request)) is not None:
+            fetched.append(exercise_id)
+            if exercise_id == EXERCISES[0]:
+                release.wait(10)  # holds up the writer
+        return transport.handle_request(request)
+
+    pipeline = RecordingPipeline(
+        server, handle, fetch_workers=2, parse_workers=1, queue_size=2
+    )
+    thread = threading.Thread(target=pipeline.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while pipeline._seq - len(pipeline.written) < pipeline.window:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        time.sleep(0.2)
+        assert pipeline._seq - len(pipeline.written) == pipeline.window
+        assert len(fetched) < pipeline.window < server.total_exercises
+    finally:
+        release.set()
+        thread.join()
+    assert len(pipeline.exercises) == server.total_exercises
+
+
+def test_fetch_failure_ends_the_crawl_after_the_items_before_it(capsys):
+    server = FakeZenStudy(courses=1, chapters=2, exercises=3, questions=1)
+    transport = server.transport()
+
+    def handle(request):
+        if _exercise_id(request) == EXERCISES[3]:
+            return httpx.Response(401)
+        return transport.handle_request(request)
+
+    pipeline = RecordingPipeline(server, handle, fetch_workers=1, parse_workers=1)
+    with pytest.raises(AuthenticationError):
+        pipeline.run()
+    assert pipeline.exercises == EXERCISES[:3]
+    assert ("chapter_end", EXERCISES[3] // 100) not in pipeline.written
+
+
+def test_parse_failure_ends_the_crawl_after_the_items_before_it(monkeypatch, capsys):
+    class BreakingPool(ProcessPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            BreakingPool.submitted += 1
+            if BreakingPool.submitted > 3:
+                raise BrokenProcessPool("a parser process died")
+            return super().submit(*args, **kwargs)
+
+    monkeypatch.setattr(pipeline_module, "ProcessPoolExecutor", BreakingPool)
+    server = FakeZenStudy(courses=1, chapters=2, exercises=3, questions=1)
+    pipeline = RecordingPipeline(server, fetch_workers=1, parse_workers=1)
+    with pytest.raises(BrokenProcessPool):
+        pipeline.run()
+    assert pipeline.exercises == EXERCISES[:3]
+    assert pipeline.stats["parse"].items == 3
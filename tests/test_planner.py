@@ -0,0 +1,87 @@
+"""Incremental crawls must fetch only what changed and write the full output."""
+
+import shutil
+
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src.config import Config
+from src.crawler import CrawlRecorder
+from src.journal import CrawlJournal
+from src.planner import plan_crawl
+from src.ratelimit import TokenBucket
+
+
+@pytest.fixture
+def journaled(crawl):
+    """Crawl with a journal, like python -m src.main [--incremental]."""
+
+    def run(server, mode="sequential", incremental=False):
+        journal = CrawlJournal(incremental=incremental)
+        try:
+            crawl(server, mode, journal=journal)
+        finally:
+            journal.close()
+
+    return run
+
+
+def _plan(server):
+    journal = CrawlJournal(incremental=True)
+    try:
+        return plan_crawl(CrawlRecorder(journal), TokenBucket(0), None, server.transport())
+    finally:
+        journal.close()
+
+
+@pytest.mark.parametrize("mode", ["sequential", "concurrent", "pipeline"])
+def test_incremental_crawl_fetches_only_the_changes(output_dir, journaled, tree, mode):
+    server = FakeZenStudy(courses=3, chapters=2, exercises=2, questions=2)
+    journaled(server, mode)
+
+    # Nothing changed: only the course list is requested
+    server.requests = 0
+    plan = _plan(server)
+    assert (plan.requests, plan.courses, plan.changed) == (1, 3, [])
+    server.requests = 0
+    journaled(server, mode, incremental=True)
+    assert server.requests == 1
+
+    # A new exercise: its course, its chapter and its page
+    server.add_exercise(100101)
+    server.requests = 0
+    plan = _plan(server)
+    assert [(c.course_id, c.chapters, c.exercises) for c in plan.changed] == [(1001, 1, 1)]
+    assert plan.requests == 1 + 3
+    assert server.requests == plan.requests - plan.exercises
+
+    server.requests = 0
+    journaled(server, mode, incremental=True)
+    assert server.requests == plan.requests
+    assert _plan(server).requests == 1
+    incremental = tree(output_dir)
+
+    # The output is the same as that of a full crawl
+    shutil.rmtree(output_dir)
+    journaled(server, mode)
+    assert incremental == tree(output_dir)
+
+
+def test_old_or_removed_units_are_not_restored(journaled, monkeypatch):
+    server = FakeZenStudy(courses=2, chapters=2, exercises=2, questions=1)
+    server.add_exercise(100001)
+    journaled(server)
+
+    # The added exercise is gone again; the chapter forgets it
+    server.added.clear()
+    server.revisions[1000] += 1
+    server.revisions[100001] += 1
+    journaled(server, incremental=True)
+    journal = CrawlJournal(incremental=True)
+    assert len(journal) == server.total_exercises
+    assert len(journal.load_chapter(1000, 100001).exercises) == 2
+    journal.close()
+
+    # Units recorded too long ago are fetched again
+    monkeypatch.setattr(Config, "PLAN_MAX_AGE", 0)
+    assert _plan(server).requests == 1 + 2 * (1 + 2 + 4)
@@ -0,0 +1,110 @@
+"""Progress must be reported off the crawl thread, in every mode."""
+
+import io
+import json
+import threading
+
+import httpx
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src.journal import CrawlJournal
+from src.progress import ProgressReporter
+
+# The second exercise of the first chapter is missing
+MISSING_PAGE = "/exercises/10000001"
+
+
+@pytest.fixture
+def reported(crawl):
+    """Crawl reporting to a progress reporter, optionally missing a page."""
+
+    def run(server, progress, journal=None, missing=False):
+        transport = server.transport()
+
+        def handle(request):
+            if missing and request.url.path.endswith(MISSING_PAGE):
+                return httpx.Response(404)
+            return transport.handle_request(request)
+
+        with progress:
+            crawl(server, transport=httpx.MockTransport(handle), journal=journal, progress=progress)
+
+    return run
+
+
+def test_jsonl_events_cover_the_crawl(reported, tmp_path):
+    server = FakeZenStudy(courses=2, chapters=2, exercises=3, questions=2)
+    path = tmp_path / "events.jsonl"
+    reported(server, ProgressReporter("jsonl", path))
+
+    events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    names = [event["event"] for event in events]
+    assert {k: events[0][k] for k in ("event", "count", "more")} == {
+        "event": "courses",
+        "count": 2,
+        "more": False,
+    }
+    assert names.count("course_done") == server.courses
+    assert names.count("exercise") == names.count("saved") == server.total_exercises
+    saved = [event for event in events if event["event"] == "saved"]
+    assert sum(event["questions"] for event in saved) == server.total_questions
+    assert all(len(event["files"]) == event["questions"] for event in saved)
+    assert [event["elapsed"] for event in events] == sorted(event["elapsed"] for event in events)
+
+
+def test_live_status_counts_fetched_and_restored_exercises(reported):
+    server = FakeZenStudy(courses=2, chapters=2, exercises=2, questions=2)
+    journal = CrawlJournal()
+    out = io.StringIO()
+    reported(server, ProgressReporter("live", stream=out), journal, missing=True)
+    journal.close()
+
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith("コース 0/2 | ")  # drawn on the first event
+    assert sum(line.startswith("! 確認テスト1: エラー: ") for line in lines) == 1
+    assert lines[-1].startswith("コース 2/2 | 確認テスト 7 件 | 問題 14 問 | ")
+    assert lines[-1].endswith(" | エラー 1 件")
+
+    # Everything but the missing exercise is restored on resume
+    journal = CrawlJournal(resume=True)
+    out = io.StringIO()
+    reported(server, ProgressReporter("live", stream=out), journal)
+    journal.close()
+    assert out.getvalue().splitlines()[-1].startswith(
+        "コース 2/2 | 確認テスト 1 件 (取得済み 7 件) | 問題 16 問 | "
+    )
+
+
+def test_quiet_mode_prints_only_problems(reported):
+    server = FakeZenStudy(courses=1, chapters=1, exercises=2, questions=1)
+    out = io.StringIO()
+    reported(server, ProgressReporter("quiet", stream=out), missing=True)
+    assert out.getvalue().startswith("! 確認テスト1: エラー: Client error '404 Not Found'")
+    assert "コース" not in out.getvalue()
+
+
+def test_emit_does_not_wait_for_the_stream():
+    class StalledStream(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.released = threading.Event()
+
+        def write(self, text):
+            self.released.wait()
+            return super().write(text)
+
+    stream = StalledStream()
+    progress = ProgressReporter("jsonl", stream=stream)
+    for exercise_id in range(1000):
+        progress.emit("saved", exercise_id=exercise_id, questions=1, files=[])
+    assert stream.getvalue() == ""
+
+    stream.released.set()
+    progress.close()
+    assert len(stream.getvalue().splitlines()) == 1000
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ProgressReporter("verbose")
@@ -0,0 +1,135 @@
+"""Rate limiters must pace requests and account for the waits exactly."""
+
+import pytest
+
+from src import ratelimit
+from src.ratelimit import AdaptiveTokenBucket, TokenBucket
+
+
+class FakeClock:
+    """time.monotonic() and time.sleep() without real time passing."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+        self.advance_on_sleep = True
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        if self.advance_on_sleep:
+            self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(ratelimit.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_burst_is_free_and_the_rest_is_paced(clock):
+    bucket = TokenBucket(10, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert clock.sleeps == []
+
+    # Beyond the burst, one request every 1/rate seconds
+    started = clock.now
+    waits = [bucket.acquire() for _ in range(20)]
+    assert waits == pytest.approx([0.1] * 20)
+    assert clock.now - started == pytest.approx(2.0)
+    assert (bucket.requests, bucket.throttled_requests) == (23, 20)
+
+
+def test_unused_budget_adds_no_wait(clock):
+    bucket = TokenBucket(5, burst=2)
+    for _ in range(10):
+        clock.now += 0.2  # exactly the rate
+        assert bucket.acquire() == 0.0
+
+    # An idle bucket refills up to the burst, not beyond it
+    clock.now += 60
+    assert [bucket.acquire() for _ in range(3)] == pytest.approx([0.0, 0.0, 0.2])
+    assert bucket.throttled_requests == 1
+
+
+def test_unlimited_bucket_never_waits(clock):
+    bucket = TokenBucket(0)
+    assert all(bucket.acquire() == 0.0 for _ in range(100))
+    assert (bucket.requests, bucket.throttled_requests, clock.sleeps) == (100, 0, [])
+
+
+def test_overlapping_waits_are_counted_once_in_wall_time(clock):
+    bucket = TokenBucket(10, burst=1)
+    bucket.acquire()
+
+    # Three callers reserve at the same instant and sleep side by side
+    clock.advance_on_sleep = False
+    assert [bucket.acquire() for _ in range(3)] == pytest.approx([0.1, 0.2, 0.3])
+    assert bucket.throttled_seconds == pytest.approx(0.6)
+    assert bucket.throttled_wall_seconds == pytest.approx(0.3)
+
+    # A later wait adds only the part past the earlier ones
+    clock.now += 0.25
+    assert bucket.acquire() == pytest.approx(0.15)
+    assert bucket.throttled_wall_seconds == pytest.approx(0.4)
+
+
+def test_pause_holds_back_and_spreads_the_waiting_requests(clock):
+    bucket = TokenBucket(10, burst=5)
+    bucket.pause(2.0)
+    assert [bucket.acquire() for _ in range(2)] == pytest.approx([2.1, 0.1])
+
+    unlimited = TokenBucket(0)
+    unlimited.pause(1.5)
+    assert unlimited.acquire() == pytest.approx(1.5)
+    assert unlimited.acquire() == 0.0
+
+
+def test_adaptive_rate_backs_off_and_recovers(clock):
+    bucket = AdaptiveTokenBucket(10, min_rate=1, max_rate=20)
+    bucket.increase, bucket.decrease = 1.0, 0.5
+
+    bucket.record_throttle()
+    assert bucket.rate == pytest.approx(5)
+    bucket.record_throttle()  # in flight at the old rate: ignored
+    assert (bucket.rate, bucket.decreases, bucket.throttle_signals) == (5, 1, 2)
+    clock.now += 1.0
+    bucket.record_throttle()
+    assert bucket.rate == pytest.approx(2.5)
+
+    # Additive increase: one request per second per second of healthy responses
+    for _ in range(100):
+        bucket.record_success("exercise", 0.01)
+    assert 14 < bucket.rate < 15
+    for _ in range(1000):
+        bucket.record_success("exercise", 0.01)
+    assert bucket.rate == bucket.peak_rate == 20
+
+    # Repeated throttling never goes below the floor
+    for _ in range(10):
+        clock.now += 1.0
+        bucket.record_throttle()
+    assert bucket.rate == 1
+
+
+def test_adaptive_rate_backs_off_on_latency(clock):
+    bucket = AdaptiveTokenBucket(10, min_rate=1, max_rate=20)
+    bucket.latency_tolerance = 3.0
+    for _ in range(20):
+        bucket.record_success("course", 0.1)
+    rate = bucket.rate
+
+    bucket.record_success("course", 1.0)  # one slow response is smoothed away
+    assert bucket.decreases == 0
+    bucket.record_success("course", 1.0)
+    assert bucket.decreases == 1
+    assert bucket.rate < rate
+
+    # Another endpoint has its own usual latency
+    clock.now += 2.0
+    bucket.record_success("exercise", 1.0)
+    assert bucket.decreases == 1
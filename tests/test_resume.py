@@ -0,0 +1,83 @@
+"""A resumed crawl must fetch only what the interrupted one left and write the same output."""
+
+import re
+
+import httpx
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src.client import AuthenticationError
+from src.journal import CrawlJournal
+
+_UNIT_PATH = re.compile(r"/(courses|chapters|exercises)/(\d+)$")
+
+
+class Recording:
+    """Transport recording the units requested, rejecting the session after a limit."""
+
+    def __init__(self, server: FakeZenStudy, mode: str, pages: int | None = None):
+        self.server = server
+        self.pages = pages
+        self.requested: list[tuple[str, int]] = []
+        self.transport = httpx.MockTransport(
+            self.handle_async if mode == "concurrent" else self.handle
+        )
+
+    def _accept(self, request: httpx.Request) -> bool:
+        if match := _UNIT_PATH.search(request.url.path):
+            unit, unit_id = match[1], int(match[2])
+            if unit == "exercises" and self.pages is not None:
+                if self.pages == 0:
+                    return False
+                self.pages -= 1
+            self.requested.append((unit, unit_id))
+        return True
+
+    def handle(self, request):
+        if not self._accept(request):
+            return httpx.Response(401, request=request)
+        return self.server._handle(request)
+
+    async def handle_async(self, request):
+        if not self._accept(request):
+            return httpx.Response(401, request=request)
+        return await self.server._handle_async(request)
+
+    def units(self, unit: str) -> set[int]:
+        return {unit_id for name, unit_id in self.requested if name == unit}
+
+
+@pytest.mark.parametrize("mode", ["sequential", "concurrent", "pipeline"])
+def test_resume_fetches_only_the_unfinished_units(tmp_path, crawl, tree, mode):
+    server = FakeZenStudy(courses=3, chapters=2, exercises=3, questions=2)
+    crawl(server, output_dir=tmp_path / "expected")
+    expected = tree(tmp_path / "expected")
+
+    # The session expires after seven exercise pages
+    output_dir = tmp_path / "output"
+    interrupted = Recording(server, mode, pages=7)
+    journal = CrawlJournal(output_dir / "journal.sqlite3")
+    with pytest.raises(AuthenticationError):
+        crawl(server, mode, interrupted.transport, journal=journal, output_dir=output_dir)
+    journal.close()
+    assert not (output_dir / "summary.json").exists()
+
+    journal = CrawlJournal(output_dir / "journal.sqlite3", resume=True)
+    done_exercises = {unit[2] for unit in journal._exercises}
+    done_chapters = {unit[1] for unit in journal._chapters}
+    done_courses = set(journal._courses)
+    if mode == "sequential":
+        assert done_exercises == interrupted.units("exercises")
+    assert 0 < len(done_exercises) < server.total_exercises
+    assert done_courses  # the first course is complete
+
+    resumed = Recording(server, mode)
+    try:
+        crawl(server, mode, resumed.transport, journal=journal, output_dir=output_dir)
+    finally:
+        journal.close()
+    assert resumed.units("exercises").isdisjoint(done_exercises)
+    assert len(resumed.units("exercises")) == server.total_exercises - len(done_exercises)
+    assert resumed.units("chapters").isdisjoint(done_chapters)
+    assert resumed.units("courses").isdisjoint(done_courses)
+    assert tree(output_dir) == expected
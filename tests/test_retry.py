@@ -0,0 +1,126 @@
+"""Transient failures must be retried, and the adaptive rate must follow the server."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.client import AsyncZenStudyClient, ZenStudyClient, parse_retry_after
+from src.config import Config
+from src.ratelimit import AdaptiveTokenBucket, TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def session(monkeypatch):
+    monkeypatch.setenv("ZANE_SESSION", "test")
+    monkeypatch.setattr(Config, "RETRY_BACKOFF", 0.001)
+
+
+def _flaky(*failures):
+    """Transport answering with the given failures before succeeding."""
+    remaining = list(failures)
+
+    def handler(request):
+        if remaining:
+            failure = remaining.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        return httpx.Response(200, text="ok")
+
+    return handler
+
+
+def test_retries_throttling_server_errors_and_timeouts():
+    limiter = TokenBucket(0)
+    transport = httpx.MockTransport(
+        _flaky(
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(502),
+            httpx.ReadTimeout("timed out"),
+        )
+    )
+    with ZenStudyClient(limiter, transport=transport) as client:
+        assert client.get_exercise_html("https://example.com/ex/1") == "ok"
+
+    assert limiter.retries == 3
+    assert limiter.throttle_signals == 2  # the 429 and the timeout
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(Config, "MAX_RETRIES", 1)
+    limiter = TokenBucket(0)
+    transport = httpx.MockTransport(_flaky(*[httpx.Response(503)] * 3))
+    with ZenStudyClient(limiter, transport=transport) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            client.get_exercise_html("https://example.com/ex/1")
+    assert limiter.retries == 1
+
+
+def test_client_errors_are_not_retried():
+    limiter = TokenBucket(0)
+    transport = httpx.MockTransport(_flaky(httpx.Response(404)))
+    with ZenStudyClient(limiter, transport=transport) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            client.get_exercise_html("https://example.com/ex/1")
+    assert limiter.retries == 0
+
+
+async def _fetch_async(limiter, handler):
+    async def async_handler(request):
+        return handler(request)
+
+    transport = httpx.MockTransport(async_handler)
+    async with AsyncZenStudyClient(rate_limiter=limiter, transport=transport) as client:
+        return await client.get_exercise_html("https://example.com/ex/1")
+
+
+def test_async_client_retries():
+    limiter = TokenBucket(0)
+    handler = _flaky(httpx.Response(500), httpx.ConnectError("refused"))
+    assert asyncio.run(_fetch_async(limiter, handler)) == "ok"
+    assert limiter.retries == 2
+
+
+def test_retry_after_pauses_every_request():
+    limiter = TokenBucket(0)
+    limiter.pause(0.05)
+    assert limiter.acquire() > 0.04
+    assert limiter.acquire() == 0.0
+
+
+def test_parse_retry_after():
+    def response(value):
+        return httpx.Response(429, headers={"Retry-After": value})
+
+    assert parse_retry_after(response("7")) == 7.0
+    assert parse_retry_after(response("Wed, 21 Oct 2015 07:28:00 GMT")) == 0.0
+    assert parse_retry_after(response("soon")) is None
+    assert parse_retry_after(response("99999")) == Config.RETRY_AFTER_MAX
+    assert parse_retry_after(httpx.Response(429)) is None
+
+
+def test_adaptive_rate_grows_while_healthy_and_halves_on_throttling():
+    limiter = AdaptiveTokenBucket(10, min_rate=1, max_rate=100)
+    for _ in range(100):
+        limiter.record_success("exercise", 0.1)
+    assert limiter.rate > 15
+
+    grown = limiter.rate
+    limiter.record_throttle()
+    assert limiter.rate == pytest.approx(grown / 2)
+    # Signals right after a decrease come from requests sent at the old rate
+    limiter.record_throttle()
+    assert limiter.rate == pytest.approx(grown / 2)
+    assert limiter.decreases == 1
+
+
+def test_adaptive_rate_backs_off_when_latency_rises():
+    limiter = AdaptiveTokenBucket(10, min_rate=1, max_rate=100)
+    for _ in range(20):
+        limiter.record_success("exercise", 0.1)
+    before = limiter.rate
+    for _ in range(10):
+        limiter.record_success("exercise", 2.0)
+    assert limiter.rate < before
+    assert limiter.decreases == 1
@@ -0,0 +1,182 @@
+"""The search index must rank like a brute-force BM25 over the live questions."""
+
+import contextlib
+import io
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src import search
+from src.config import Config
+from src.crawler import CrawlRecorder
+from src.main import scrape_exercises
+from src.models import Question
+from src.ratelimit import TokenBucket
+from src.search import SearchIndex, tokenize
+
+_WORDS = ["憲法", "権利", "国会", "内閣", "需要", "供給", "価格", "関数", "配列", "暗号", "で", "を"]
+
+
+def _records(courses, seed=0, start=0):
+    rng = random.Random(seed)
+    for course_id in range(start, start + courses):
+        for exercise_id in range(4):
+            for number in range(1, 6):
+                words = rng.choices(_WORDS, k=rng.randint(3, 12))
+                yield {
+                    "course_id": course_id,
+                    "course_title": f"コース{course_id}",
+                    "chapter_id": course_id * 10,
+                    "chapter_title": "章",
+                    "exercise_id": course_id * 100 + exercise_id,
+                    "exercise_title": "確認テスト",
+                    "question_number": number,
+                    "question": {
+                        "statement": "".join(words) + "について正しいものを選べ。",
+                        "choices": [
+                            {"number": n, "text": " ".join(rng.choices(_WORDS, k=2))}
+                            for n in range(1, 5)
+                        ],
+                    },
+                }
+
+
+def _terms(record):
+    question = Question.from_dict(record["question"])
+    return tokenize("\n".join([question.statement, *(c.text for c in question.choices)]))
+
+
+def _brute_force(records, query, limit, match_all=True, deleted=()):
+    """BM25 over the records, from the definition.
+
+    The deleted records still count towards document frequencies, as they
+    do in the index until it is merged.
+    """
+    docs = {(r["course_id"], r["exercise_id"], r["question_number"]): _terms(r) for r in records}
+    wanted = {t for t in tokenize(query) if t & ((1 << 21) - 1)}
+    average = sum(len(terms) for terms in docs.values()) / len(docs)
+    counts = {key: Counter(terms) for key, terms in docs.items()}
+    indexed = [*counts.values(), *(Counter(_terms(r)) for r in deleted)]
+    scores = {}
+    for key, terms in docs.items():
+        present = [t for t in wanted if counts[key][t]]
+        if not present or (match_all and len(present) < len(wanted)):
+            continue
+        score = 0.0
+        for term in present:
+            df = min(sum(1 for c in indexed if c[term]), len(docs))
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            f = counts[key][term]
+            score += idf * f * 2.2 / (f + 1.2 * (0.25 + 0.75 * len(terms) / average))
+        scores[key] = score
+    return sorted(scores.values(), reverse=True)[:limit]
+
+
+@pytest.fixture
+def index(tmp_path):
+    with SearchIndex(tmp_path / "index") as index:
+        yield index
+
+
+def test_tokenize_pairs_characters_within_runs():
+    assert tokenize("憲法 ＡＢ") == [
+        (ord("憲") << 21) | ord("法"),
+        ord("法") << 21,
+        (ord("a") << 21) | ord("b"),
+        ord("b") << 21,
+    ]
+
+
+@pytest.mark.parametrize("query", ["憲法", "需要供給", "関数 配列", "正しいもの", "で"])
+@pytest.mark.parametrize("match_all", [True, False])
+def test_ranking_matches_brute_force(index, monkeypatch, query, match_all):
+    monkeypatch.setattr(search, "_BLOCK_SIZE", 4)  # many blocks per term
+    records = list(_records(6))
+    # Several segments, with changed and removed questions in older ones
+    index.update(records[:50])
+    index.update(records[50:])
+    changed = list(_records(6, seed=1))[:20] + records[20:90]
+    index.update(changed, complete=True)
+
+    hits = index.search(query, limit=15, match_all=match_all)
+    if query == "で":
+        # A single character matches every question containing it
+        assert len(hits) == 15
+        assert all("で" in h.question.statement or any("で" in c.text for c in h.question.choices)
+                   for h in hits)
+        return
+    expected = _brute_force(changed, query, 15, match_all, deleted=records[:20] + records[90:])
+    assert [round(h.score, 9) for h in hits] == [round(s, 9) for s in expected]
+
+    index.merge()
+    expected = _brute_force(changed, query, 15, match_all)
+    assert [round(h.score, 9) for h in index.search(query, 15, match_all)] == [
+        round(s, 9) for s in expected
+    ]
+
+
+def test_updates_only_index_changes(index):
+    records = list(_records(2))
+    assert index.update(records) == (40, 0)
+    assert index.update(records) == (0, 0)
+
+    records[0] = {**records[0], "course_title": "新しいコース名"}
+    records[1] = {**records[1], "question": {"statement": "新しい問題文", "choices": []}}
+    assert index.update(records[:30], complete=True) == (1, 11)
+    assert len(index) == 30
+
+    (hit,) = index.search("新しい問題")
+    assert hit.question == Question("新しい問題文")
+    assert hit.question_number == 2
+    assert {h.course_title for h in index.search("正しい", limit=40)} == {
+        "コース0",
+        "コース1",
+        "新しいコース名",
+    }
+
+
+def test_index_survives_reopening_and_merging(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SEARCH_MAX_SEGMENTS", 2)
+    path = tmp_path / "index"
+    with SearchIndex(path) as index:
+        for course in range(3):
+            index.update(_records(1, seed=course, start=course))
+        assert len(list(path.glob("*.seg"))) == 1  # merged after the third
+        expected = index.search("憲法")
+
+    with SearchIndex(path) as index:
+        assert len(index) == 60
+        assert index.search("憲法") == expected
+        assert index.search("存在しない") == []
+        assert index.search("   ") == []
+
+
+def test_crawl_adds_finished_courses(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZANE_SESSION", "test")
+    monkeypatch.setattr(Config, "OUTPUT_DIR", str(tmp_path))
+    server = FakeZenStudy(courses=2, chapters=2, exercises=2, questions=3)
+
+    with SearchIndex() as index, contextlib.redirect_stdout(io.StringIO()):
+        scrape_exercises(TokenBucket(0), None, CrawlRecorder(index=index), server.transport())
+        assert len(index) == server.total_questions
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        search.main(["選択肢", "3（問2"])
+    assert "1. ベンチマーク" in out.getvalue()
+    assert "問2" in out.getvalue()
+
+
+def test_cli_builds_the_index_from_the_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZANE_SESSION", "test")
+    monkeypatch.setattr(Config, "OUTPUT_DIR", str(tmp_path))
+    server = FakeZenStudy(courses=1, chapters=1, exercises=2, questions=2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        scrape_exercises(TokenBucket(0), None, CrawlRecorder(), server.transport())
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        search.main(["--limit", "1", "正しいもの"])
+    assert "追加 4 問" in out.getvalue()
+    assert out.getvalue().count("スコア") == 1
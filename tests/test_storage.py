@@ -0,0 +1,145 @@
+"""The SQLite question store must round-trip what the file layout stores."""
+
+import pytest
+
+from src.config import Config
+from src.models import Chapter, Choice, Course, Exercise, Question
+from src.storage import (
+    ContentAddressedQuestionStore,
+    FileQuestionStore,
+    SqliteQuestionStore,
+    course_records,
+    question_digest,
+)
+
+SQLITE_STORES = pytest.mark.parametrize(
+    "store_class", [SqliteQuestionStore, ContentAddressedQuestionStore]
+)
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "OUTPUT_DIR", str(tmp_path / "output"))
+    return tmp_path / "output"
+
+
+def _course():
+    course = Course(7, "コース:オンデマンド")
+    for position, chapter_id in enumerate((30, 20), 1):
+        chapter = Chapter(chapter_id, f"{position:02d}. 章")
+        for index, exercise_id in enumerate((900 + chapter_id, 800 + chapter_id), 1):
+            questions = [
+                Question(f"問{n} of {exercise_id}", [Choice(1, "A"), Choice(2, "B")])
+                for n in range(1, 3)
+            ]
+            chapter.exercises.append(Exercise(exercise_id, f"確認テスト{index}", questions))
+        course.chapters.append(chapter)
+    return course
+
+
+def _save(store, course):
+    for position, chapter in enumerate(course.chapters, 1):
+        for index, exercise in enumerate(chapter.exercises, 1):
+            store.save_exercise(
+                course,
+                chapter,
+                position,
+                exercise.exercise_id,
+                exercise.exercise_title,
+                index,
+                exercise.questions,
+            )
+
+
+def test_course_records_match_the_files_but_the_exercise_index(output_dir):
+    course = _course()
+    _save(FileQuestionStore(), course)
+
+    def key(record):
+        return record["exercise_id"], record["question_number"]
+
+    files = {}
+    for record in FileQuestionStore().iter_records():
+        del record["exercise_index"]
+        record["question"] = Question.from_dict(record["question"])
+        files[key(record)] = record
+    assert {key(record): record for record in course_records(course)} == files
+
+
+@SQLITE_STORES
+def test_load_returns_the_saved_structure(output_dir, store_class):
+    course = _course()
+    store = store_class()
+    _save(store, course)
+
+    assert store.courses() == [(7, course.course_title)]
+    assert store.load_course(7) == course
+    assert store.load_chapter(7, 20) == course.chapters[1]
+    assert store.load_exercise(7, 30, 930) == course.chapters[0].exercises[0]
+    assert store.load_exercise(7, 30, 1) is None
+    assert store.load_course(8) is None
+
+
+@SQLITE_STORES
+def test_saving_an_exercise_again_replaces_its_questions(output_dir, store_class):
+    course = _course()
+    chapter = course.chapters[0]
+    store = store_class()
+    _save(store, course)
+
+    store.save_exercise(course, chapter, 1, 930, "確認テスト1", 1, [Question("新しい問題")])
+    assert store.load_exercise(7, 30, 930).questions == [Question("新しい問題")]
+
+
+@SQLITE_STORES
+def test_export_matches_the_file_layout(output_dir, tmp_path, store_class):
+    course = _course()
+    _save(FileQuestionStore(), course)
+    expected = {
+        path.relative_to(output_dir): path.read_bytes()
+        for path in output_dir.rglob("*.json")
+    }
+
+    store = store_class(tmp_path / "questions.sqlite3")
+    _save(store, course)
+    for path in output_dir.rglob("*.json"):
+        path.unlink()
+    assert store.export_files() == len(expected)
+
+    exported = {
+        path.relative_to(output_dir): path.read_bytes()
+        for path in output_dir.rglob("*.json")
+    }
+    assert exported == expected
+
+
+def test_digest_ignores_form_but_not_content():
+    question = Question("問題　文\n", [Choice(1, "Ａ"), Choice(2, "B")])
+    assert question_digest(question) == question_digest(
+        Question("問題 文", [Choice(1, "A"), Choice(2, " B ")])
+    )
+    assert question_digest(question) != question_digest(
+        Question("問題 文", [Choice(2, "A"), Choice(1, "B")])
+    )
+    assert question_digest(question) != question_digest(Question("問題 文"))
+
+
+def test_repeated_questions_are_stored_once(output_dir):
+    course = _course()
+    shared = Question("共通の問題", [Choice(1, "A"), Choice(2, "B")])
+    for chapter in course.chapters:
+        for exercise in chapter.exercises:
+            exercise.questions.append(shared)
+    store = ContentAddressedQuestionStore()
+    _save(store, course)
+    _save(store, course)  # a re-run stores nothing new
+
+    assert store.counts() == (12, 9)
+    assert store.load_course(7) == course
+    assert store.load_question(question_digest(shared)) == shared
+    exercise = course.chapters[0].exercises[0]
+    assert store.exercise_digests(7, 30, 930) == [question_digest(q) for q in exercise.questions]
+
+    store.save_exercise(course, course.chapters[0], 1, 930, "確認テスト1", 1, [shared])
+    assert store.prune() == 2
+    assert store.counts() == (10, 7)
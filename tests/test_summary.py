@@ -0,0 +1,60 @@
+"""The streaming summary writer must match the summary built in memory."""
+
+import json
+
+import pytest
+
+from src.models import Chapter, Choice, Course, Exercise, ExerciseCollection, Question
+from src.summary import SummaryWriter, read_summary
+
+
+def _collection():
+    courses = []
+    for course_id in range(3):
+        chapter = Chapter(course_id * 10, f'第{course_id}章 "引用"\\改行なし')
+        chapter.exercises.append(
+            Exercise(1, "確認テスト", [Question("問題", [Choice(1, "A"), Choice(2, "B")])])
+        )
+        courses.append(Course(course_id, f"コース{course_id}", [chapter]))
+    return ExerciseCollection(courses)
+
+
+def test_json_matches_json_dump(tmp_path):
+    collection = _collection()
+    with SummaryWriter(tmp_path / "summary.json", "json") as summary:
+        for course in collection.courses:
+            summary.write_course(course)
+
+    expected = json.dumps(collection.to_dict(), ensure_ascii=False, indent=2)
+    assert (tmp_path / "summary.json").read_text(encoding="utf-8") == expected
+    assert summary.totals.courses == 3
+    assert summary.totals.questions == 3
+
+
+def test_jsonl_has_one_course_per_line(tmp_path):
+    collection = _collection()
+    with SummaryWriter(tmp_path / "summary.jsonl", "jsonl") as summary:
+        for course in collection.courses:
+            summary.write_course(course)
+
+    lines = (tmp_path / "summary.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == collection.to_dict()["courses"]
+
+
+def test_nothing_is_written_without_courses_or_on_abort(tmp_path):
+    assert SummaryWriter(tmp_path / "empty.json").close() is None
+
+    summary = SummaryWriter(tmp_path / "aborted.json")
+    summary.write_course(_collection().courses[0])
+    summary.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("fmt", SummaryWriter.FORMATS)
+def test_read_summary_returns_the_written_courses(tmp_path, fmt):
+    collection = _collection()
+    with SummaryWriter(tmp_path / f"summary.{fmt}", fmt) as summary:
+        for course in collection.courses:
+            summary.write_course(course)
+
+    assert list(read_summary(summary.path)) == collection.courses
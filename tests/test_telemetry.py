@@ -0,0 +1,50 @@
+"""Telemetry must account for every request and phase of a crawl."""
+
+import contextlib
+import io
+from collections import Counter
+
+from benchmarks.fake_server import FakeZenStudy
+from src.config import Config
+from src.crawler import CrawlRecorder
+from src.main import scrape_exercises
+from src.ratelimit import TokenBucket
+from src.telemetry import Telemetry
+
+
+def test_crawl_records_requests_and_phases(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZANE_SESSION", "test")
+    monkeypatch.setattr(Config, "OUTPUT_DIR", str(tmp_path))
+    server = FakeZenStudy(courses=2, chapters=2, exercises=2, questions=3)
+    telemetry = Telemetry(trace_memory=True)
+    recorder = CrawlRecorder(telemetry=telemetry)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        scrape_exercises(TokenBucket(0), None, recorder, server.transport())
+    telemetry.close()
+
+    requests = Counter(s.name for s in telemetry.spans if s.category == "http")
+    assert requests == {"my_courses": 1, "course": 2, "chapter": 4, "exercise": 8}
+    phases = Counter(s.category for s in telemetry.spans if s.category != "http")
+    assert phases == {"parse": 8, "write": 8, "chapter": 4, "course": 2}
+    assert all(
+        s.args["status"] == 200 and s.args["bytes"] > 0
+        for s in telemetry.spans
+        if s.category == "http"
+    )
+    assert [label for _, label, _, _ in telemetry.memory] == [
+        "ベンチマーク0:オンデマンド",
+        "ベンチマーク1:オンデマンド",
+    ]
+
+    trace = telemetry.to_chrome_trace()["traceEvents"]
+    kinds = Counter(e["ph"] for e in trace)
+    assert kinds["b"] == kinds["e"] == server.requests
+    assert kinds["X"] == 22
+    assert kinds["C"] == 2
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        telemetry.print_summary()
+    assert "exercise" in out.getvalue()
+    assert telemetry.write_trace().name == Config.PROFILE_FILE
+
@@ -0,0 +1,64 @@
+"""Connection pooling, HTTP/2 and content encodings of the clients."""
+
+import contextlib
+import io
+
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src import client as client_module
+from src.client import AsyncZenStudyClient, ZenStudyClient, accepted_encodings, http2_enabled
+from src.config import Config
+from src.crawler import CrawlRecorder
+from src.main import scrape_exercises
+from src.ratelimit import TokenBucket
+from src.telemetry import Telemetry
+
+
+@pytest.fixture(autouse=True)
+def session(monkeypatch):
+    monkeypatch.setenv("ZANE_SESSION", "test")
+
+
+def test_encodings_need_their_decoder(monkeypatch):
+    monkeypatch.setattr(client_module, "_installed", lambda *packages: False)
+    assert accepted_encodings() == ["gzip", "deflate"]
+    assert not http2_enabled()
+
+    monkeypatch.setattr(client_module, "_installed", lambda *packages: True)
+    assert accepted_encodings() == list(Config.ACCEPT_ENCODINGS)
+    assert http2_enabled()
+    monkeypatch.setattr(Config, "HTTP2", False)
+    assert not http2_enabled()
+
+
+def test_pool_is_sized_to_the_crawl():
+    with ZenStudyClient(TokenBucket(0), max_connections=6) as client:
+        options = client._client_options(6)
+        assert options["limits"].max_connections == 6
+        assert options["limits"].max_keepalive_connections == 6
+        assert "gzip" in client.client.headers["Accept-Encoding"]
+
+    client = AsyncZenStudyClient(max_concurrency=3)
+    assert client._client_options(client.max_concurrency)["limits"].max_connections == 3
+
+
+def test_compressed_responses_are_measured(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "OUTPUT_DIR", str(tmp_path))
+    server = FakeZenStudy(courses=1, chapters=2, exercises=2, questions=3)
+    telemetry = Telemetry()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = CrawlRecorder(telemetry=telemetry)
+        scrape_exercises(TokenBucket(0), None, recorder, server.transport())
+
+    spans = [s for s in telemetry.spans if s.category == "http"]
+    assert spans and all(s.args["encoding"] == "gzip" for s in spans)
+    assert all(s.args["http_version"] == "HTTP/1.1" for s in spans)
+    pages = [s for s in spans if s.name == "exercise"]
+    assert all(0 < s.args["wire_bytes"] < s.args["bytes"] / 2 for s in pages)
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        telemetry.print_summary()
+    assert "転送量" in out.getvalue()
+    assert "gzip" in out.getvalue()
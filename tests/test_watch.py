@@ -0,0 +1,69 @@
+"""The watcher must poll cheaply and crawl only what changed."""
+
+import contextlib
+import io
+
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src.cache import ResponseCache
+from src.client import AuthenticationError, ZenStudyClient
+from src.journal import CrawlJournal
+from src.ratelimit import TokenBucket
+from src.summary import read_summary
+from src.watch import Watcher
+
+
+@contextlib.contextmanager
+def _watcher(server, cache=None):
+    journal = CrawlJournal(incremental=True)
+    try:
+        with ZenStudyClient(TokenBucket(0), cache, server.transport(), revalidate=True) as client:
+            yield Watcher(client, journal, cache)
+    finally:
+        journal.close()
+
+
+def test_polls_crawl_only_the_changes(output_dir):
+    server = FakeZenStudy(courses=3, chapters=2, exercises=2, questions=2)
+    requests = []
+
+    def sleep(seconds):
+        requests.append(server.requests)
+        server.requests = 0
+        if len(requests) == 2:
+            server.add_exercise(100201)
+
+    cache = ResponseCache()
+    with _watcher(server, cache) as watcher, contextlib.redirect_stdout(io.StringIO()) as out:
+        watcher.run(interval=0, polls=4, sleep=sleep)
+    cache.close()
+    requests.append(server.requests)
+
+    # Session check and full crawl; an unchanged list; the new exercise and
+    # its course and chapter; an unchanged list again
+    assert requests == [1 + 1 + 3 * (1 + 2 + 4), 1, 1 + 3, 1]
+    assert out.getvalue().count("変更なし") == 2
+    summary = list(read_summary(output_dir / "summary.json"))
+    assert sum(len(ex.questions) for c in summary for ch in c.chapters for ex in ch.exercises) == (
+        server.total_questions
+    )
+
+
+def test_rejected_session_is_raised_not_exited(output_dir):
+    server = FakeZenStudy(courses=2, chapters=1, exercises=2)
+    server.session_valid = False
+    with _watcher(server) as watcher, contextlib.redirect_stdout(io.StringIO()):
+        with pytest.raises(AuthenticationError):
+            watcher.run(interval=0, polls=1)
+        assert server.requests == 1  # checked before anything is crawled
+
+        # A session that expires in the middle of a crawl ends the poll
+        server.session_valid = True
+        server.add_exercise(100001)
+        watcher.poll()
+        server.add_exercise(100001)
+        server.session_valid = False
+        with pytest.raises(AuthenticationError):
+            watcher.poll()
+    assert not (output_dir / "summary.json.tmp").exists()
@@ -0,0 +1,145 @@
+"""A crawl split across workers must write the same output as a single process."""
+
+import contextlib
+import io
+import threading
+from pathlib import Path
+
+import httpx
+import pytest
+
+from benchmarks.fake_server import FakeZenStudy
+from src.client import ZenStudyClient
+from src.config import Config
+from src.ratelimit import TokenBucket
+from src.workqueue import WorkQueue, merge, plan_crawl, run_worker, run_workers
+
+
+@pytest.fixture(autouse=True)
+def quick_workers(monkeypatch):
+    monkeypatch.setattr(Config, "WORK_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(Config, "MAX_RETRIES", 0)
+
+
+def _fake_transport() -> httpx.BaseTransport:
+    return FakeZenStudy(courses=2, chapters=2, exercises=2, questions=2).transport()
+
+
+def _failing(server: FakeZenStudy, exercise_id: int) -> httpx.MockTransport:
+    """Transport of a server that always fails to serve one exercise."""
+
+    def handle(request):
+        if request.url.path.endswith(f"/exercises/{exercise_id}"):
+            return httpx.Response(500)
+        return server._handle(request)
+
+    return httpx.MockTransport(handle)
+
+
+def _distributed(output_dir: Path, transport, workers=3) -> str:
+    """Plan, work and merge a crawl, returning what merge() printed."""
+    Config.OUTPUT_DIR = str(output_dir)  # restored by the output_dir fixture
+    with WorkQueue() as queue, ZenStudyClient(TokenBucket(0), transport=transport) as client:
+        assert plan_crawl(queue, client) > 0
+
+    def work(n):
+        with WorkQueue() as queue, ZenStudyClient(TokenBucket(0), transport=transport) as client:
+            run_worker(queue, client, f"worker-{n}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        assert merge()
+    return out.getvalue()
+
+
+def test_workers_write_the_same_output(tmp_path, crawl, tree):
+    server = FakeZenStudy(courses=3, chapters=3, exercises=3, questions=2)
+    crawl(server, output_dir=tmp_path / "single")
+    expected = tree(tmp_path / "single")
+    assert len(expected) == server.total_questions + 1  # and the summary
+
+    _distributed(tmp_path / "queue", server.transport())
+    assert tree(tmp_path / "queue") == expected
+
+
+def test_failed_exercises_are_reported_like_a_single_crawl(tmp_path, crawl, tree):
+    server = FakeZenStudy(courses=2, chapters=2, exercises=2, questions=2)
+    broken = 1000 * 100 * 100 + 1  # second exercise of the first chapter
+    crawl(server, transport=_failing(server, broken), output_dir=tmp_path / "single")
+    expected = tree(tmp_path / "single")
+
+    merged = _distributed(tmp_path / "queue", _failing(server, broken))
+    assert tree(tmp_path / "queue") == expected
+    assert "! 確認テスト1: エラー: Server error '500 Internal Server Error'" in merged
+    with WorkQueue() as queue:
+        (failed,) = [u for u in queue.units("exercise", 1000, 100000) if u.state == "failed"]
+        assert failed.exercise_id == broken
+        assert failed.attempts == Config.WORK_MAX_ATTEMPTS
+
+
+def test_failed_courses_are_reported_with_their_title(tmp_path, tree):
+    server = FakeZenStudy(courses=2, chapters=2, exercises=2, questions=2)
+
+    def handle(request):
+        if request.url.path.endswith("/courses/1000"):
+            return httpx.Response(500)
+        return server._handle(request)
+
+    merged = _distributed(tmp_path / "queue", httpx.MockTransport(handle))
+    assert "! ベンチマーク0:オンデマンド: エラー: Server error '500" in merged
+    assert "取得できなかった作業: 1 件" in merged
+    assert len(tree(tmp_path / "queue")) == server.total_questions // 2 + 1
+
+
+def test_expired_leases_are_reclaimed(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "WORK_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(Config, "OUTPUT_DIR", str(tmp_path))
+    with WorkQueue() as queue:
+        queue.enqueue([("course", 1, 0, 0, 1, {"id": 1, "title": "コース"})])
+
+        first = queue.lease("a", seconds=0)
+        second = queue.lease("b")
+        assert (first.unit_id, second.attempts) == (second.unit_id, 2)
+        assert queue.lease("c") is None  # b holds an unexpired lease
+        assert not queue.is_finished()
+
+        # The late worker's result is kept, the other acknowledgement is ignored
+        queue.complete(first, children=[("chapter", 1, 10, 0, 1, {"id": 10})])
+        queue.complete(second, children=[("chapter", 1, 11, 0, 1, {"id": 11})])
+        assert [u.chapter_id for u in queue.units("chapter", 1)] == [10]
+
+        # A unit whose every lease expires is given up
+        chapter = queue.lease("a", seconds=0)
+        assert queue.lease("b", seconds=0).attempts == 2
+        assert queue.lease("c") is None
+        (chapter,) = queue.units("chapter", 1)
+        assert chapter.state == "failed"
+        assert queue.is_finished()
+
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            queue.enqueue([("course", 2, 0, 0, 2, {"id": 2, "title": "コース2"})])
+            assert not merge()
+        assert "未完了" in out.getvalue()
+
+
+def test_worker_processes(tmp_path, monkeypatch, crawl, tree):
+    # Worker processes open the queue in ./output
+    monkeypatch.chdir(tmp_path)
+    server = FakeZenStudy(courses=2, chapters=2, exercises=2, questions=2)
+    crawl(server, output_dir=tmp_path / "single")
+    expected = tree(tmp_path / "single")
+    Config.OUTPUT_DIR = "output"
+
+    with WorkQueue() as queue, ZenStudyClient(
+        TokenBucket(0), transport=server.transport()
+    ) as client:
+        plan_crawl(queue, client)
+    run_workers(2, 0, 1, use_cache=False, transport_factory=_fake_transport)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert merge()
+    assert tree(tmp_path / "output") == expected